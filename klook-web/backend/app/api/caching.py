@@ -0,0 +1,49 @@
+"""列表接口的条件请求（ETag / 304）与响应缓存"""
+from typing import Awaitable, Callable, Hashable
+
+from app.storage.response_cache import response_cache
+from fastapi import Request, Response, status
+
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    """If-None-Match 是否包含当前 ETag（忽略弱校验前缀）"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = [candidate.strip().removeprefix("W/") for candidate in header.split(",")]
+    return "*" in candidates or etag in candidates
+
+
+def _not_modified(etag: str) -> Response:
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag, "Cache-Control": "no-cache"})
+
+
+async def cached_list_response(
+        request: Request,
+        resource: str,
+        key: Hashable,
+        load: Callable[[], Awaitable[bytes]]
+) -> Response:
+    """
+    返回列表接口的响应：版本未变时直接使用缓存的响应体或返回 304，否则查询并缓存
+
+    Args:
+        request: 当前请求（读取 If-None-Match）
+        resource: 资源名（版本号按资源维护）
+        key: 缓存键（查询参数）
+        load: 查询数据库并返回序列化后的响应体
+    """
+    etag = response_cache.etag(resource)
+    if _etag_matches(request, etag):
+        return _not_modified(etag)
+
+    entry = response_cache.get(resource, key)
+    if entry is None:
+        version = response_cache.version(resource)
+        entry = response_cache.put(resource, key, version, await load())
+
+    return Response(
+        content=entry.body,
+        media_type="application/json",
+        headers={"ETag": entry.etag, "Cache-Control": "no-cache"}
+    )
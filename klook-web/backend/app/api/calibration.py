@@ -0,0 +1,38 @@
+"""网络补偿校准 API"""
+from typing import Optional
+
+from app.core.config import settings
+from app.core.klook_client import klook_clients
+from app.services.calibration import calibrate
+from fastapi import APIRouter, HTTPException, Query, status
+
+router = APIRouter()
+
+
+@router.get("/calibration")
+async def run_calibration(
+        samples: Optional[int] = Query(default=None, ge=1, le=20, description="采样次数上限")
+):
+    """
+    校准网络补偿
+
+    测量到 Klook 的往返时间和服务器时钟偏移，返回推荐的网络延迟补偿（毫秒）及置信区间。
+    每次采样最多等待 1 秒对齐服务器整秒，耗时约为采样次数秒。
+    """
+    client = klook_clients.get()
+    try:
+        # 先建立连接，避免握手计入往返时间
+        await client.warm_up()
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_502_BAD_GATEWAY,
+            detail=f"无法连接 Klook: {e}"
+        )
+
+    calibration = await calibrate(client, samples or settings.calibration_samples)
+    if calibration is None:
+        raise HTTPException(
+            status_code=status.HTTP_502_BAD_GATEWAY,
+            detail="校准采样全部失败"
+        )
+    return calibration.as_dict()
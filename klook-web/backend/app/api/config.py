@@ -1,4 +1,6 @@
 """配置管理 API"""
+from app.api.caching import cached_list_response
+from app.core.serialization import ListSerializer, rows_as_dicts
 from app.models.config import (
     ConfigCreate,
     ConfigUpdate,
@@ -6,12 +8,15 @@ from app.models.config import (
     ConfigListResponse
 )
 from app.storage.config_store import ConfigStore
-from app.storage.database import get_db
-from fastapi import APIRouter, Depends, HTTPException, status
+from app.storage.database import get_db, get_read_db
+from app.storage.response_cache import CONFIGS
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from sqlalchemy.ext.asyncio import AsyncSession
 
 router = APIRouter()
 
+list_serializer = ListSerializer(ConfigListResponse)
+
 
 @router.post("/configs", response_model=ConfigResponse, status_code=status.HTTP_201_CREATED)
 async def create_config(
@@ -37,19 +42,23 @@ async def create_config(
 
 
 @router.get("/configs", response_model=ConfigListResponse)
-async def list_configs(db: AsyncSession = Depends(get_db)):
-    """获取所有配置列表"""
-    configs = await ConfigStore.get_all(db)
-    return {
-        "total": len(configs),
-        "items": configs
-    }
+async def list_configs(request: Request, db: AsyncSession = Depends(get_read_db)):
+    """获取所有配置列表（支持 If-None-Match，未变更时返回 304）"""
+
+    async def load():
+        configs = await ConfigStore.get_all(db)
+        return list_serializer.dumps({
+            "total": len(configs),
+            "items": rows_as_dicts(configs)
+        })
+
+    return await cached_list_response(request, CONFIGS, None, load)
 
 
 @router.get("/configs/{config_id}", response_model=ConfigResponse)
 async def get_config(
         config_id: int,
-        db: AsyncSession = Depends(get_db)
+        db: AsyncSession = Depends(get_read_db)
 ):
     """根据 ID 获取配置详情"""
     db_config = await ConfigStore.get_by_id(db, config_id)
@@ -110,14 +119,14 @@ async def delete_config(
 @router.post("/configs/{config_id}/validate")
 async def validate_config(
         config_id: int,
-        db: AsyncSession = Depends(get_db)
+        db: AsyncSession = Depends(get_read_db)
 ):
     """
     验证配置
 
     通过调用 Klook API 获取用户信息来测试 Headers 是否有效
     """
-    from app.core.klook_client import KlookClient
+    from app.core.klook_client import klook_clients
 
     db_config = await ConfigStore.get_by_id(db, config_id)
     if not db_config:
@@ -134,29 +143,29 @@ async def validate_config(
             "message": "Headers 格式错误，必须是 JSON 对象"
         }
 
-    # 使用 Klook API 进行实际验证
-    async with KlookClient() as client:
-        success, result = await client.get_user_profile(headers)
-
-        if success:
-            # 验证成功，返回用户信息
-            user_info = result.get("result", {})
-            return {
-                "valid": True,
-                "message": "配置验证成功",
-                "user_info": {
-                    "user_id": user_info.get("user_id"),
-                    "mobile": user_info.get("mobile"),
-                    "email": user_info.get("email"),
-                    "user_residence": user_info.get("user_residence"),
-                    "membership_level": user_info.get("membership_level")
-                }
-            }
-        else:
-            # 验证失败
-            error_info = result.get("error", {})
-            return {
-                "valid": False,
-                "message": f"配置验证失败: {error_info.get('message', '未知错误')}",
-                "error_code": error_info.get("code", "")
+    # 使用 Klook API 进行实际验证（复用应用共享的长连接客户端）
+    client = klook_clients.get()
+    success, result = await client.get_user_profile(headers)
+
+    if success:
+        # 验证成功，返回用户信息
+        user_info = result.get("result", {})
+        return {
+            "valid": True,
+            "message": "配置验证成功",
+            "user_info": {
+                "user_id": user_info.get("user_id"),
+                "mobile": user_info.get("mobile"),
+                "email": user_info.get("email"),
+                "user_residence": user_info.get("user_residence"),
+                "membership_level": user_info.get("membership_level")
             }
+        }
+    else:
+        # 验证失败
+        error_info = result.get("error", {})
+        return {
+            "valid": False,
+            "message": f"配置验证失败: {error_info.get('message', '未知错误')}",
+            "error_code": error_info.get("code", "")
+        }
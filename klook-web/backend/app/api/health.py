@@ -1,7 +1,9 @@
 """健康检查 API"""
 from datetime import datetime
 
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException, Response, status
+
+from app.core.config import settings
 
 router = APIRouter()
 
@@ -16,6 +18,74 @@ async def health_check():
     }
 
 
+@router.get("/health/executor")
+async def executor_health():
+    """执行器状态（拆分部署时为执行器进程的状态及其租约）"""
+    from app.services.task_executor import task_executor
+
+    if settings.executor_mode != "api":
+        return task_executor.status()
+
+    from app.services.executor_ipc import ExecutorUnavailable
+    try:
+        return {**await task_executor.call("status"), "executor_pid": task_executor.executor_pid}
+    except ExecutorUnavailable as e:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e))
+
+
+@router.get("/health/deep")
+async def deep_health(response: Response):
+    """
+    深度健康检查：事件循环延迟、SQLite 往返耗时、已登记的定时器
+
+    最近一分钟事件循环延迟的中位数（持续的延迟；单次尖峰只体现在 max_ms 和触发窗口警告）
+    或 SQLite 往返耗时超过阈值时为 degraded；SQLite 探测失败或（拆分部署时）执行器进程不可用时
+    为 unhealthy，返回 503。
+    """
+    from app.core.metrics import metrics
+    from app.services.health_monitor import health_monitor
+    from app.services.task_executor import task_executor
+
+    event_loop = metrics.loop_lag.snapshot()
+    database = health_monitor.db_status()
+    problems = []
+
+    if settings.executor_mode == "api":
+        from app.services.executor_ipc import ExecutorUnavailable
+        try:
+            executor = await task_executor.call("status")
+        except ExecutorUnavailable as e:
+            executor = {"error": str(e)}
+            problems.append("executor_unavailable")
+    else:
+        executor = task_executor.status()
+
+    if database["error"] is not None:
+        problems.append("database_error")
+    elif health_monitor.db_degraded():
+        problems.append("database_slow")
+    # 拆分部署时执行器进程的事件循环单独采样
+    for name, lag in (("event_loop_lag", event_loop), ("executor_loop_lag", executor.get("loop_lag"))):
+        if lag and lag["p50_ms"] is not None and lag["p50_ms"] >= settings.loop_lag_warn_ms:
+            problems.append(name)
+
+    unhealthy = {"database_error", "executor_unavailable"} & set(problems)
+    if unhealthy:
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    return {
+        "status": "unhealthy" if unhealthy else "degraded" if problems else "healthy",
+        "problems": problems,
+        "timestamp": datetime.now().isoformat(),
+        "event_loop": event_loop,
+        "database": database,
+        "timers": {
+            "armed": len(executor.get("armed", [])),
+            "next_target_time": executor.get("next_target_time")
+        },
+        "executor": executor
+    }
+
+
 @router.get("/")
 async def root():
     """根路径"""
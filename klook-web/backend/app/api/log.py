@@ -1,19 +1,55 @@
 """日志管理 API"""
-from typing import Optional
+from collections import deque
+from typing import AsyncIterator, Optional
 
+from app.core.config import settings
+from app.core.log_tail import LogEvent, log_tail
+from app.core.serialization import ListSerializer, rows_as_dicts
 from app.models.log import (
     LogCreate,
     LogResponse,
     LogListResponse,
     LogLevel
 )
-from app.storage.database import get_db
-from app.storage.log_store import LogStore
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from app.services.log_retention import log_retention
+from app.storage.database import get_db, get_read_db, read_session_maker
+from app.storage.log_store import LogStore, LogCursor
+from fastapi import APIRouter, Depends, Header, HTTPException, Response, status, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
 router = APIRouter()
 
+list_serializer = ListSerializer(LogListResponse)
+
+# 日志跟踪续传时每次从数据库补齐的行数
+BACKFILL_PAGE = 500
+# 续传时记住的最近补齐的日志 ID 数：迟到的日志 ID 接近最新位置，只需与最近补齐的行去重
+BACKFILL_DEDUP = 2 * BACKFILL_PAGE
+
+
+def _parse_cursor(cursor: Optional[str]) -> Optional[LogCursor]:
+    """解析游标参数"""
+    if not cursor:
+        return None
+    try:
+        return LogCursor.decode(cursor)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+
+def _build_page(logs: list, total: int, limit: int) -> Response:
+    """构建分页响应，满页时返回下一页游标"""
+    next_cursor = LogCursor.after(logs[-1]).encode() if len(logs) == limit else None
+    return list_serializer.response({
+        "total": total,
+        "logs": rows_as_dicts(logs),
+        "next_cursor": next_cursor
+    })
+
 
 @router.post("/logs", response_model=LogResponse, status_code=status.HTTP_201_CREATED)
 async def create_log(
@@ -38,7 +74,9 @@ async def get_logs(
         level: Optional[LogLevel] = Query(None, description="按日志级别筛选"),
         limit: int = Query(100, ge=1, le=1000, description="每页数量"),
         offset: int = Query(0, ge=0, description="偏移量"),
-        db: AsyncSession = Depends(get_db)
+        cursor: Optional[str] = Query(None, description="游标（上一页的 next_cursor），传入时忽略 offset"),
+        include_archived: bool = Query(False, description="包含已归档的日志"),
+        db: AsyncSession = Depends(get_read_db)
 ):
     """
     获取日志列表
@@ -48,25 +86,135 @@ async def get_logs(
     - **level**: 按日志级别筛选（可选）
     - **limit**: 每页数量（1-1000，默认100）
     - **offset**: 偏移量（默认0）
+    - **cursor**: 游标分页，翻页代价与页码无关（可选）
+    - **include_archived**: 包含已归档的日志（默认只查询 logs 表）
     """
     logs, total = await LogStore.get_all(
         db,
         task_id=task_id,
         level=level,
         limit=limit,
-        offset=offset
+        offset=offset,
+        cursor=_parse_cursor(cursor),
+        include_archived=include_archived
     )
 
-    return LogListResponse(
-        total=total,
-        logs=logs
+    return _build_page(logs, total, limit)
+
+
+@router.get("/logs/stream")
+async def stream_logs(
+        task_id: Optional[int] = Query(None, description="按任务 ID 筛选"),
+        level: Optional[LogLevel] = Query(None, description="按日志级别筛选"),
+        last_id: Optional[int] = Query(None, ge=0, description="最后收到的日志 ID，从其后续传"),
+        last_event_id: Optional[str] = Header(None, description="EventSource 重连时自动携带，优先于 last_id")
+):
+    """
+    实时跟踪日志（Server-Sent Events）
+
+    每条新日志是一个 `event: log` 事件，`id` 为日志 ID，`data` 与日志列表中的单条日志相同。
+    - **task_id** / **level**: 筛选条件（可选）
+    - **last_id**: 断线续传位置；不传时只推送连接之后写入的日志
+
+    新日志直接来自写入路径，不轮询数据库；只有续传时从数据库补齐 last_id 之后的日志。
+    客户端读取过慢导致积压超过上限时服务端关闭连接，EventSource 会携带 Last-Event-ID 自动重连续传。
+    提交晚于更大 ID 的日志（迟到）在到达时推送，不带 `id` 字段；断开期间才提交的迟到日志不会在续传时补发。
+    """
+    if last_event_id:
+        try:
+            last_id = int(last_event_id)
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"无效的 Last-Event-ID: {last_event_id}"
+            )
+
+    return StreamingResponse(
+        _tail(task_id, level, last_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
     )
 
 
+async def _tail(task_id: Optional[int], level: Optional[LogLevel], last_id: Optional[int]) -> AsyncIterator[str]:
+    """补齐 last_id 之后的日志，再转发订阅队列中的新日志"""
+    # 先订阅再补齐：补齐查询期间提交的日志进入队列，按 ID 去重
+    subscriber = log_tail.subscribe(task_id, level.value if level else None)
+    # 最近补齐的日志 ID：补齐查询已经读到的行随后可能作为迟到事件再次到达
+    backfilled: deque[int] = deque(maxlen=BACKFILL_DEDUP)
+    try:
+        yield "retry: 1000\n\n"
+        while last_id is not None:
+            async with read_session_maker() as db:
+                rows = await LogStore.get_after_id(db, last_id, task_id, level, BACKFILL_PAGE)
+            if rows:
+                yield "".join(LogEvent(row._asdict()).text for row in rows)
+                backfilled.extend(row.id for row in rows)
+                last_id = rows[-1].id
+            if len(rows) < BACKFILL_PAGE:
+                break
+        backfilled = set(backfilled)
+
+        while True:
+            events = await subscriber.get(settings.log_stream_heartbeat)
+            if subscriber.overflowed:
+                return
+            if not events:
+                yield ": ping\n\n"
+                continue
+            if last_id is not None:
+                # 按序的日志按 last_id 过滤；迟到的日志 ID 小于已推送的位置，只排除已补齐的行
+                events = [
+                    event for event in events
+                    if (event.id not in backfilled if event.late else event.id > last_id)
+                ]
+                if not events:
+                    continue
+            yield "".join(event.text for event in events)
+            last_id = max(last_id or 0, max((event.id for event in events if not event.late), default=0))
+    finally:
+        log_tail.unsubscribe(subscriber)
+
+
+@router.get("/logs/retention")
+async def get_log_retention():
+    """
+    获取日志保留状态
+
+    返回保留策略、已归档的日志数量和上一轮归档结果
+    """
+    if settings.executor_mode == "api":
+        return await _executor_call("retention.status")
+    return await log_retention.status()
+
+
+@router.post("/logs/retention/run")
+async def run_log_retention():
+    """
+    立即执行一轮日志归档
+
+    按保留策略把最旧的日志移入压缩归档；有任务即将触发时会等待触发结束后再继续
+    """
+    if settings.executor_mode == "api":
+        # 拆分部署时归档由执行器进程执行（只有它知道任务何时触发）
+        return await _executor_call("retention.run", timeout=0)
+    return await log_retention.run_once()
+
+
+async def _executor_call(op: str, timeout: Optional[float] = None):
+    from app.services.executor_ipc import ExecutorUnavailable
+    from app.services.task_executor import task_executor
+
+    try:
+        return await task_executor.call(op, timeout=timeout)
+    except ExecutorUnavailable as e:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=f"执行器不可用: {e}")
+
+
 @router.get("/logs/{log_id}", response_model=LogResponse)
 async def get_log(
         log_id: int,
-        db: AsyncSession = Depends(get_db)
+        db: AsyncSession = Depends(get_read_db)
 ):
     """
     获取单个日志
@@ -88,7 +236,9 @@ async def get_task_logs(
         level: Optional[LogLevel] = Query(None, description="按日志级别筛选"),
         limit: int = Query(100, ge=1, le=1000, description="每页数量"),
         offset: int = Query(0, ge=0, description="偏移量"),
-        db: AsyncSession = Depends(get_db)
+        cursor: Optional[str] = Query(None, description="游标（上一页的 next_cursor），传入时忽略 offset"),
+        include_archived: bool = Query(False, description="包含已归档的日志"),
+        db: AsyncSession = Depends(get_read_db)
 ):
     """
     获取任务的日志列表
@@ -97,19 +247,20 @@ async def get_task_logs(
     - **level**: 按日志级别筛选（可选）
     - **limit**: 每页数量（1-1000，默认100）
     - **offset**: 偏移量（默认0）
+    - **cursor**: 游标分页，翻页代价与页码无关（可选）
+    - **include_archived**: 包含已归档的日志（默认只查询 logs 表）
     """
     logs, total = await LogStore.get_by_task_id(
         db,
         task_id=task_id,
         level=level,
         limit=limit,
-        offset=offset
+        offset=offset,
+        cursor=_parse_cursor(cursor),
+        include_archived=include_archived
     )
 
-    return LogListResponse(
-        total=total,
-        logs=logs
-    )
+    return _build_page(logs, total, limit)
 
 
 @router.delete("/logs/{log_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -146,11 +297,16 @@ async def delete_task_logs(
 
 
 @router.delete("/logs", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_all_logs(db: AsyncSession = Depends(get_db)):
+async def delete_all_logs():
     """
     删除所有日志
 
+    与日志归档相同分块删除（包括已归档的日志）；有任务即将触发时会等待触发结束后再继续
+
     ⚠️ 警告：此操作将删除系统中的所有日志，不可恢复！
     """
-    await LogStore.delete_all(db)
-    await db.commit()
+    if settings.executor_mode == "api":
+        # 拆分部署时由执行器进程执行（只有它知道任务何时触发）
+        await _executor_call("retention.delete_all", timeout=0)
+        return
+    await log_retention.delete_all()
@@ -0,0 +1,40 @@
+"""运行指标 API"""
+import os
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from fastapi import APIRouter, HTTPException, status
+from fastapi.responses import PlainTextResponse
+from loguru import logger
+
+router = APIRouter()
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """
+    运行指标（Prometheus 文本格式）
+
+    触发误差、抢购请求各阶段耗时、事件分发、写后日志写入、WebSocket 推送和事件循环延迟的直方图。
+
+    拆分部署时触发相关的指标记录在执行器进程，与本工作进程的指标合并输出，
+    用 process 标签区分（executor / api-<pid>）；执行器不可用时只输出本进程的指标。
+    """
+    if not metrics.enabled:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="运行指标未启用（METRICS_ENABLED=false）"
+        )
+    if settings.executor_mode == "api":
+        from app.services.executor_ipc import ExecutorUnavailable
+        from app.services.task_executor import task_executor
+
+        try:
+            executor_samples = await task_executor.call("metrics")
+        except (ExecutorUnavailable, RuntimeError) as e:
+            logger.warning(f"获取执行器运行指标失败: {e}")
+            executor_samples = {}
+        content = metrics.render_merged(f"api-{os.getpid()}", executor_samples)
+    else:
+        content = metrics.render()
+    return PlainTextResponse(content, media_type="text/plain; version=0.0.4; charset=utf-8")
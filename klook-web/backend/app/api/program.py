@@ -1,17 +1,22 @@
 """优惠券项目管理 API"""
+from app.api.caching import cached_list_response
+from app.core.serialization import ListSerializer, rows_as_dicts
 from app.models.program import (
     ProgramCreate,
     ProgramUpdate,
     ProgramResponse,
     ProgramListResponse
 )
-from app.storage.database import get_db
+from app.storage.database import get_db, get_read_db
 from app.storage.program_store import ProgramStore
-from fastapi import APIRouter, Depends, HTTPException, status
+from app.storage.response_cache import PROGRAMS
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from sqlalchemy.ext.asyncio import AsyncSession
 
 router = APIRouter()
 
+list_serializer = ListSerializer(ProgramListResponse)
+
 
 @router.post("/programs", response_model=ProgramResponse, status_code=status.HTTP_201_CREATED)
 async def create_program(
@@ -38,19 +43,23 @@ async def create_program(
 
 
 @router.get("/programs", response_model=ProgramListResponse)
-async def list_programs(db: AsyncSession = Depends(get_db)):
-    """获取所有优惠券项目列表"""
-    programs = await ProgramStore.get_all(db)
-    return {
-        "total": len(programs),
-        "items": programs
-    }
+async def list_programs(request: Request, db: AsyncSession = Depends(get_read_db)):
+    """获取所有优惠券项目列表（支持 If-None-Match，未变更时返回 304）"""
+
+    async def load():
+        programs = await ProgramStore.get_all(db)
+        return list_serializer.dumps({
+            "total": len(programs),
+            "items": rows_as_dicts(programs)
+        })
+
+    return await cached_list_response(request, PROGRAMS, None, load)
 
 
 @router.get("/programs/{program_id}", response_model=ProgramResponse)
 async def get_program(
         program_id: int,
-        db: AsyncSession = Depends(get_db)
+        db: AsyncSession = Depends(get_read_db)
 ):
     """根据 ID 获取优惠券项目详情"""
     db_program = await ProgramStore.get_by_id(db, program_id)
@@ -1,6 +1,8 @@
 """任务管理 API"""
 from datetime import datetime
 
+from app.api.caching import cached_list_response
+from app.core.serialization import ListSerializer, rows_as_dicts
 from app.models.task import (
     TaskCreate,
     TaskUpdate,
@@ -8,14 +10,19 @@ from app.models.task import (
     TaskListResponse,
     TaskStatus
 )
+from app.services.executor_ipc import ExecutorUnavailable
 from app.storage.config_store import ConfigStore
-from app.storage.database import get_db
+from app.storage.database import get_db, get_read_db
+from app.storage.response_cache import TASKS
+from app.storage.task_stats import task_stats
 from app.storage.task_store import TaskStore
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from sqlalchemy.ext.asyncio import AsyncSession
 
 router = APIRouter()
 
+list_serializer = ListSerializer(TaskListResponse)
+
 
 @router.post("/tasks", response_model=TaskResponse, status_code=status.HTTP_201_CREATED)
 async def create_task(
@@ -51,15 +58,18 @@ async def create_task(
 
 @router.get("/tasks", response_model=TaskListResponse)
 async def list_tasks(
+        request: Request,
         status: str = None,
         limit: int = None,
-        db: AsyncSession = Depends(get_db)
+        db: AsyncSession = Depends(get_read_db)
 ):
     """
     获取任务列表
 
     - **status**: 按状态筛选（pending/countdown/running/completed/failed/cancelled）
     - **limit**: 限制返回数量
+
+    支持 If-None-Match，任务未变更时返回 304。
     """
     task_status = None
     if status:
@@ -71,17 +81,20 @@ async def list_tasks(
                 detail=f"无效的状态值: {status}"
             )
 
-    tasks = await TaskStore.get_all(db, status=task_status, limit=limit)
-    return {
-        "total": len(tasks),
-        "items": tasks
-    }
+    async def load():
+        tasks = await TaskStore.get_all(db, status=task_status, limit=limit)
+        return list_serializer.dumps({
+            "total": len(tasks),
+            "items": rows_as_dicts(tasks)
+        })
+
+    return await cached_list_response(request, TASKS, (task_status, limit), load)
 
 
 @router.get("/tasks/{task_id}", response_model=TaskResponse)
 async def get_task(
         task_id: int,
-        db: AsyncSession = Depends(get_db)
+        db: AsyncSession = Depends(get_read_db)
 ):
     """根据 ID 获取任务详情"""
     db_task = await TaskStore.get_by_id(db, task_id)
@@ -106,7 +119,11 @@ async def update_task(
     - **target_time**: 目标时间
     - **network_compensation**: 网络延迟补偿
     - **status**: 任务状态
+
+    倒计时中的任务修改触发参数时立即按新参数重新登记，触发窗口打开后不能再修改
     """
+    from app.services.task_executor import task_executor
+
     # 如果更新目标时间，验证不能是过去时间
     if task.target_time and task.target_time <= datetime.now():
         raise HTTPException(
@@ -114,6 +131,22 @@ async def update_task(
             detail="目标时间必须是未来时间"
         )
 
+    # 已启动的任务先在执行器中改期（未启动时执行器不做任何事）
+    changes = task.model_dump(
+        exclude_unset=True,
+        include={"target_time", "network_compensation", "max_retries", "retry_interval"}
+    )
+    if changes:
+        try:
+            outcome = await task_executor.reschedule(task_id, changes)
+        except ExecutorUnavailable as e:
+            raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=f"执行器不可用: {e}")
+        if outcome == "firing":
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="任务即将触发或正在抢购，无法修改"
+            )
+
     db_task = await TaskStore.update(db, task_id, task)
     if not db_task:
         raise HTTPException(
@@ -156,7 +189,10 @@ async def start_task(
         )
 
     # 启动任务执行器
-    success = await task_executor.start_task(task_id, db)
+    try:
+        success = await task_executor.start_task(task_id, db)
+    except ExecutorUnavailable as e:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=f"执行器不可用: {e}")
     if not success:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -196,7 +232,10 @@ async def cancel_task(
         )
 
     # 取消任务执行器
-    await task_executor.cancel_task(task_id)
+    try:
+        await task_executor.cancel_task(task_id)
+    except ExecutorUnavailable as e:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=f"执行器不可用: {e}")
 
     # 更新任务状态
     db_task = await TaskStore.update_status(db, task_id, TaskStatus.CANCELLED)
@@ -241,28 +280,10 @@ async def delete_task(
 
 
 @router.get("/tasks/stats/summary")
-async def get_task_stats(db: AsyncSession = Depends(get_db)):
+async def get_task_stats(db: AsyncSession = Depends(get_read_db)):
     """
     获取任务统计信息
 
     返回各状态的任务数量
     """
-    total = await TaskStore.count(db)
-    pending = await TaskStore.count(db, TaskStatus.PENDING)
-    countdown = await TaskStore.count(db, TaskStatus.COUNTDOWN)
-    running = await TaskStore.count(db, TaskStatus.RUNNING)
-    completed = await TaskStore.count(db, TaskStatus.COMPLETED)
-    failed = await TaskStore.count(db, TaskStatus.FAILED)
-    cancelled = await TaskStore.count(db, TaskStatus.CANCELLED)
-
-    return {
-        "total": total,
-        "by_status": {
-            "pending": pending,
-            "countdown": countdown,
-            "running": running,
-            "completed": completed,
-            "failed": failed,
-            "cancelled": cancelled
-        }
-    }
+    return await task_stats.summary(db)
@@ -1,10 +1,10 @@
 """WebSocket API"""
-from app.core.websocket_manager import websocket_manager
-from app.storage.database import get_db
+from app.core.websocket_manager import CHANNELS, STATS_CHANNEL, task_topic, websocket_manager
+from app.services.stats_publisher import stats_publisher
+from app.storage.database import read_session_maker
 from app.storage.task_store import TaskStore
-from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Depends
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect
 from loguru import logger
-from sqlalchemy.ext.asyncio import AsyncSession
 
 router = APIRouter()
 
@@ -12,16 +12,16 @@ router = APIRouter()
 @router.websocket("/ws/tasks/{task_id}")
 async def websocket_endpoint(
         websocket: WebSocket,
-        task_id: int,
-        db: AsyncSession = Depends(get_db)
+        task_id: int
 ):
     """
     WebSocket 端点，用于实时推送任务状态
 
     连接到: ws://localhost:8000/api/ws/tasks/{task_id}
     """
-    # 验证任务是否存在
-    task = await TaskStore.get_by_id(db, task_id)
+    # 验证任务是否存在（短会话，不在整个连接期间占用数据库连接）
+    async with read_session_maker() as db:
+        task = await TaskStore.get_by_id(db, task_id)
     if not task:
         await websocket.close(code=4004, reason=f"Task {task_id} not found")
         return
@@ -31,11 +31,13 @@ async def websocket_endpoint(
 
     try:
         # 发送欢迎消息
-        await websocket.send_json({
+        await websocket_manager.send_personal(websocket, {
             "type": "connected",
             "task_id": task_id,
             "message": f"已连接到任务 {task_id}"
         })
+        # 任务已启动时回放当前状态和最近事件
+        await websocket_manager.send_replay(websocket, task_id)
 
         # 保持连接，接收客户端消息（心跳等）
         while True:
@@ -44,7 +46,7 @@ async def websocket_endpoint(
 
                 # 处理心跳
                 if data.get("type") == "ping":
-                    await websocket.send_json({
+                    await websocket_manager.send_personal(websocket, {
                         "type": "pong",
                         "task_id": task_id
                     })
@@ -57,3 +59,108 @@ async def websocket_endpoint(
         logger.info(f"WebSocket 断开连接: task_id={task_id}")
     finally:
         websocket_manager.disconnect(websocket, task_id)
+
+
+@router.websocket("/ws")
+async def multiplexed_websocket_endpoint(websocket: WebSocket):
+    """
+    多路复用 WebSocket 端点，一个连接订阅任意多个任务及全局频道
+
+    连接到: ws://localhost:8000/api/ws
+
+    客户端消息:
+    - {"type": "subscribe", "task_ids": [1, 2], "channels": ["tasks", "stats"]}
+    - {"type": "unsubscribe", "task_ids": [1], "channels": ["stats"]}
+    - {"type": "ping"}
+
+    任务消息与 /ws/tasks/{task_id} 相同（均带 task_id 字段），订阅已启动的任务时先收到一帧 snapshot；
+    tasks 频道接收所有任务的消息，stats 频道接收任务统计（type=stats）。
+    """
+    await websocket_manager.connect(websocket)
+
+    try:
+        await websocket_manager.send_personal(websocket, {
+            "type": "connected",
+            "message": "已连接"
+        })
+
+        while True:
+            try:
+                data = await websocket.receive_json()
+            except WebSocketDisconnect:
+                raise
+            except Exception as e:
+                logger.error(f"WebSocket 接收消息异常: {e}")
+                break
+
+            message_type = data.get("type") if isinstance(data, dict) else None
+            if message_type == "ping":
+                await websocket_manager.send_personal(websocket, {"type": "pong"})
+            elif message_type in ("subscribe", "unsubscribe"):
+                await _handle_subscription(websocket, message_type, data)
+            else:
+                await websocket_manager.send_personal(websocket, {
+                    "type": "error",
+                    "message": f"未知消息类型: {message_type}"
+                })
+
+    except WebSocketDisconnect:
+        logger.info("WebSocket 断开连接")
+    finally:
+        websocket_manager.disconnect(websocket)
+
+
+async def _handle_subscription(websocket: WebSocket, action: str, data: dict):
+    """处理订阅 / 退订请求"""
+    try:
+        task_ids = sorted({int(task_id) for task_id in data.get("task_ids") or []})
+    except (TypeError, ValueError):
+        await websocket_manager.send_personal(websocket, {
+            "type": "error",
+            "message": "task_ids 必须是整数列表"
+        })
+        return
+
+    channels = [channel for channel in data.get("channels") or [] if channel in CHANNELS]
+    invalid_channels = [channel for channel in data.get("channels") or [] if channel not in CHANNELS]
+
+    if action == "unsubscribe":
+        for task_id in task_ids:
+            websocket_manager.unsubscribe(websocket, task_topic(task_id))
+        for channel in channels:
+            websocket_manager.unsubscribe(websocket, channel)
+        await websocket_manager.send_personal(websocket, {
+            "type": "unsubscribed",
+            "task_ids": task_ids,
+            "channels": channels
+        })
+        return
+
+    # 只订阅存在的任务（单次查询）
+    existing = set()
+    if task_ids:
+        async with read_session_maker() as db:
+            existing = await TaskStore.get_existing_ids(db, task_ids)
+
+    for task_id in task_ids:
+        if task_id in existing:
+            websocket_manager.subscribe(websocket, task_topic(task_id))
+    for channel in channels:
+        websocket_manager.subscribe(websocket, channel)
+
+    await websocket_manager.send_personal(websocket, {
+        "type": "subscribed",
+        "task_ids": [task_id for task_id in task_ids if task_id in existing],
+        "channels": channels,
+        "missing": [task_id for task_id in task_ids if task_id not in existing],
+        "invalid_channels": invalid_channels
+    })
+
+    # 已启动的任务回放当前状态和最近事件
+    for task_id in task_ids:
+        if task_id in existing:
+            await websocket_manager.send_replay(websocket, task_id)
+
+    # 订阅统计频道时先推送一次当前统计
+    if STATS_CHANNEL in channels:
+        await websocket_manager.send_personal(websocket, await stats_publisher.snapshot())
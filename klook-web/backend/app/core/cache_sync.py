@@ -0,0 +1,49 @@
+"""进程内缓存的跨进程同步
+
+单进程部署时什么都不做。拆分部署（独立执行器进程 + 多个 API 工作进程）时，
+各进程的进程内缓存（列表响应版本号、日志总数、任务状态计数、日志跟踪）在本进程提交后照常更新，
+同时把这次变更经执行器进程转发给其他进程，由其按同样的方式更新本地缓存。
+"""
+from typing import Callable, Optional
+
+from loguru import logger
+
+
+class CacheSync:
+    """变更的登记与转发：{类型: 只更新本进程缓存的处理函数}"""
+
+    def __init__(self):
+        self._handlers: dict[str, Callable[..., None]] = {}
+        self._transport: Optional[Callable[[str, list], None]] = None
+
+    @property
+    def attached(self) -> bool:
+        """是否需要转发（拆分部署且已连接）"""
+        return self._transport is not None
+
+    def register(self, kind: str, handler: Callable[..., None]):
+        """登记变更类型及其在其他进程中的处理函数（参数需可 JSON 序列化）"""
+        self._handlers[kind] = handler
+
+    def attach(self, transport: Callable[[str, list], None]):
+        self._transport = transport
+
+    def detach(self):
+        self._transport = None
+
+    def emit(self, kind: str, *args):
+        """本进程已应用的变更，转发给其他进程"""
+        if self._transport is not None:
+            self._transport(kind, list(args))
+
+    def apply(self, kind: str, args: list):
+        """应用其他进程转发的变更（不再转发）"""
+        handler = self._handlers.get(kind)
+        if handler is None:
+            logger.warning(f"未知的缓存同步类型: {kind}")
+            return
+        handler(*args)
+
+
+# 全局缓存同步
+cache_sync = CacheSync()
@@ -19,8 +19,89 @@ class Settings(BaseSettings):
     # 数据库配置
     database_url: str = "sqlite+aiosqlite:///./klook-web.db"
 
+    # SQLite 存储配置（每个连接建立时通过 PRAGMA 应用）
+    sqlite_journal_mode: str = "WAL"  # WAL 下读写互不阻塞
+    sqlite_synchronous: str = "NORMAL"  # WAL 模式下 NORMAL 已足够安全
+    sqlite_busy_timeout: int = 5000  # 锁等待超时（毫秒）
+    sqlite_mmap_size: int = 256 * 1024 * 1024  # 内存映射大小（字节），0 表示关闭
+    sqlite_cache_size: int = -64 * 1024  # 页缓存大小，负数表示 KiB
+    sqlite_temp_store: str = "MEMORY"  # 临时表和排序使用内存
+    sqlite_auto_vacuum: str = "INCREMENTAL"  # 新建数据库生效；已有数据库需要一次 VACUUM 才会切换
+
+    # 连接池：写连接供执行器和写接口使用，读连接供查询接口使用
+    db_write_pool_size: int = 3
+    db_read_pool_size: int = 5
+    db_pool_timeout: float = 30.0  # 获取连接的超时时间（秒）
+    db_echo: bool = False  # 打印每条 SQL（同步写出，不随 debug 开启）
+
+    # 定时器配置
+    timer_mode: str = "sleep"  # sleep: 仅事件循环睡眠；hybrid: 睡眠 + 保护窗口内让出/自旋
+    timer_guard_window_ms: float = 20  # 保护窗口（毫秒）
+    timer_spin_window_ms: float = 1  # 自旋窗口（毫秒）
+    countdown_publish_hz: float = 10  # 倒计时帧推送频率上限（每任务每秒帧数）
+    firing_runtime: str = "local"  # local: 在主事件循环上触发；thread: 独立触发线程（自有事件循环和 HTTP 客户端）
+
+    # 执行器部署方式
+    # embedded: 执行器运行在 API 进程中（单进程，默认）
+    # api: 本进程是 API 工作进程，经 Unix 套接字调用独立执行器进程（python executor.py），可多进程运行
+    executor_mode: str = "embedded"
+    executor_socket: str = "./klook-executor.sock"  # 执行器进程监听的 Unix 套接字
+    executor_request_timeout: float = 10.0  # API 进程调用执行器的超时（秒）
+    executor_lease_ttl: float = 10.0  # 执行器租约有效期（秒），持有者失联超过该时间后备用执行器接管
+    executor_heartbeat_interval: float = 3.0  # 租约续约间隔（秒），应明显小于有效期
+
+    # WebSocket 配置
+    ws_send_queue_size: int = 64  # 每个连接的发送队列上限（终态消息不计入）
+    ws_replay_size: int = 50  # 每个任务保留的最近事件数，新订阅者连接时回放（0 表示不保留）
+    ws_replay_linger: float = 60.0  # 任务结束后事件继续保留的秒数
+
+    # 日志实时跟踪（/api/logs/stream，SSE）
+    log_stream_queue_size: int = 1000  # 每个连接未发送的日志行上限，超出时断开由客户端按 last_id 续传
+    log_stream_heartbeat: float = 15.0  # 空闲时发送心跳注释的间隔（秒）
+
     # Klook API
     klook_base_url: str = "https://www.klook.cn"
+    klook_http2: bool = False  # 启用 HTTP/2（需要安装 h2，未安装时回退到 HTTP/1.1）
+    klook_pool_size: int = 20  # 连接池保留的空闲连接数上限
+    klook_keepalive_expiry: float = 60.0  # 空闲连接保留时长（秒）
+    klook_prewarm_lead: float = 10.0  # 触发前提前建立并验证连接的时间（秒），0 表示不预热
+    klook_keepalive_interval: float = 3.0  # 预热后到触发前的保活请求间隔（秒）
+
+    # 网络补偿校准（在预热阶段采样往返时间和服务器时钟偏移）
+    calibration_enabled: bool = True  # 触发前校准并把结果记录到任务结果
+    calibration_samples: int = 8  # 采样次数上限（每次最多等待 1 秒对齐服务器整秒）
+    calibration_auto_apply: bool = False  # 用推荐值替换任务的网络补偿
+
+    # 日志保留：超过保留期或行数上限的最旧日志移入压缩归档（仍可通过日志接口读取）
+    log_retention_enabled: bool = True
+    log_retention_days: float = 30  # 保留期（天），0 表示不按时间归档
+    log_retention_max_rows: int = 1_000_000  # logs 表行数上限，0 表示不限
+    log_retention_interval: float = 3600  # 检查间隔（秒）
+    log_retention_chunk_size: int = 500  # 每个事务归档 / 删除的行数
+    log_retention_vacuum_pages: int = 2000  # 归档后增量回收空闲页时每步回收的页数（auto_vacuum=INCREMENTAL 时）
+    log_archive_dir: str = "./log-archive"  # 归档段文件目录
+    log_archive_compression: str = "gzip"  # gzip / zstd（zstd 需要安装 zstandard，未安装时回退到 gzip）
+    log_archive_segment_bytes: int = 64 * 1024 * 1024  # 单个段文件大小上限（字节）
+
+    # 运行指标（/api/metrics，Prometheus 文本格式）
+    metrics_enabled: bool = True  # 关闭后热路径打点直接返回
+    metrics_loop_lag_interval: float = 0.5  # 事件循环延迟采样间隔（秒）
+
+    # 健康检查（/api/health/deep）：事件循环延迟看门狗和 SQLite 往返探测
+    loop_lag_warn_ms: float = 5.0  # 触发窗口内的延迟告警阈值，也是判定降级的阈值（毫秒）
+    loop_lag_guard_interval_ms: float = 2.0  # 有任务处于触发窗口时的采样间隔（毫秒）
+    health_db_probe_interval: float = 5.0  # SQLite 往返探测间隔（秒），任务预热和触发期间暂停
+    health_db_slow_ms: float = 100.0  # SQLite 往返耗时超过该值时判定降级（毫秒）
+
+    # 应用日志：调用方只构造记录并入队，格式化和写入在后台线程完成
+    log_level: str = "INFO"
+    log_levels: dict[str, str] = {}  # 按模块覆盖级别，如 {"app.core.klook_client": "WARNING"}
+    log_console_format: str = "text"  # 控制台格式 text / json（JSON 行）
+    log_file: str = ""  # 日志文件（JSON 行），为空时不写文件
+    log_file_max_bytes: int = 50 * 1024 * 1024  # 单个日志文件大小上限，超出时轮转并 gzip 压缩
+    log_file_backups: int = 10  # 保留的已轮转文件数
+    log_max_message_length: int = 2000  # 单条消息的长度上限，超出部分截断
+    log_payload_preview: int = 512  # 请求 / 响应体写入日志的字节数上限
 
     # CORS 配置
     cors_origins: list[str] = ["http://localhost:5173", "http://localhost:3000"]
@@ -1,14 +1,193 @@
-"""Klook API 客户端（重构自原 klook/api.py）"""
+"""Klook API 客户端（重构自原 klook/api.py）
+
+KlookClient 持有一个带连接池的 httpx.AsyncClient；应用内通过 klook_clients 注册表
+按事件循环共享长连接客户端，触发前预热连接，抢购请求不再承担 DNS / TCP / TLS 握手。
+"""
+import asyncio
+import time
+from http.cookiejar import CookieJar, DefaultCookiePolicy
+from typing import Optional
+
 import httpx
+from app.core.config import settings
+from app.core.logging_config import payload_preview
+from app.core.metrics import metrics
 from loguru import logger
 
+# 建立连接的阶段（httpcore trace 事件名）
+CONNECT_PHASES = frozenset({"connection.connect_tcp", "connection.start_tls", "connection.connect_unix_socket"})
+# 开始写请求头的阶段：开始时刻即请求交给连接发送的时刻
+SEND_PHASES = frozenset({"http11.send_request_headers", "http2.send_request_headers"})
+# 收到响应头的阶段：完成时刻即首字节时间（TTFB）
+RESPONSE_HEADERS_PHASES = frozenset({"http11.receive_response_headers", "http2.receive_response_headers"})
+
+REDEEM_PATH = "/v2/promosrv/program/manual_redeem"
+PROFILE_PATH = "/v3/userserv/user/profile_service/get_simple_profile_by_token"
+
+
+class RequestTimings:
+    """单次请求的耗时分解，作为 httpx 的 trace 扩展收集连接建立耗时和首字节时间"""
+
+    def __init__(self, woke_ns: Optional[int] = None):
+        """
+        Args:
+            woke_ns: 本次尝试的唤醒时刻（到达触发时刻或重试间隔结束，perf_counter_ns），用于计算唤醒到发出的耗时
+        """
+        self.started_ns = time.perf_counter_ns()
+        self.woke_ns = woke_ns
+        self.sent_ns: Optional[int] = None
+        self.finished_ns: Optional[int] = None
+        self.parsed_ns: Optional[int] = None
+        self.connect_ns = 0
+        self.ttfb_ns: Optional[int] = None
+        self._phase_started: dict[str, int] = {}
+
+    async def __call__(self, event_name: str, info: dict):
+        phase, _, state = event_name.rpartition(".")
+        if phase in SEND_PHASES:
+            if state == "started" and self.sent_ns is None:
+                self.sent_ns = time.perf_counter_ns()
+            return
+        if phase in RESPONSE_HEADERS_PHASES:
+            if state == "complete":
+                self.ttfb_ns = time.perf_counter_ns() - self.started_ns
+            return
+        if phase not in CONNECT_PHASES:
+            return
+        if state == "started":
+            self._phase_started[phase] = time.perf_counter_ns()
+        elif state in ("complete", "failed") and phase in self._phase_started:
+            self.connect_ns += time.perf_counter_ns() - self._phase_started.pop(phase)
+
+    def finish(self):
+        self.finished_ns = time.perf_counter_ns()
+
+    def parsed(self):
+        """响应解析完成，把各阶段耗时计入指标"""
+        self.parsed_ns = time.perf_counter_ns()
+        if not metrics.enabled or self.finished_ns is None:
+            return
+        metrics.redeem_phase.observe(self.connect_ns / 1e9, "connect")
+        if self.ttfb_ns is not None:
+            metrics.redeem_phase.observe(self.ttfb_ns / 1e9, "ttfb")
+        metrics.redeem_phase.observe((self.finished_ns - self.started_ns) / 1e9, "total")
+        metrics.redeem_phase.observe((self.parsed_ns - self.finished_ns) / 1e9, "parse")
+        if self.woke_ns is not None and self.sent_ns is not None:
+            metrics.redeem_phase.observe((self.sent_ns - self.woke_ns) / 1e9, "wakeup_to_send")
+
+    def as_dict(self) -> dict:
+        """耗时（毫秒）；connect_ms 为 0 表示复用了已建立的连接，wakeup_to_send_us 为唤醒到请求发出的微秒数"""
+        finished_ns = self.finished_ns or time.perf_counter_ns()
+        return {
+            "total_ms": round((finished_ns - self.started_ns) / 1e6, 3),
+            "connect_ms": round(self.connect_ns / 1e6, 3),
+            "ttfb_ms": round(self.ttfb_ns / 1e6, 3) if self.ttfb_ns is not None else None,
+            "parse_ms": round((self.parsed_ns - finished_ns) / 1e6, 3) if self.parsed_ns is not None else None,
+            "wakeup_to_send_us": (
+                round((self.sent_ns - self.woke_ns) / 1e3, 1)
+                if self.woke_ns is not None and self.sent_ns is not None else None
+            ),
+            "reused_connection": self.connect_ns == 0
+        }
+
+
+class PreparedRequest:
+    """构建完成的请求：URL、合并后的请求头（含客户端默认头、Content-Length）和编码后的请求体
+
+    在倒计时期间构建，触发时只需交给连接池发送；创建后不再修改，每次重试复用。
+    """
+    __slots__ = ("method", "url", "headers", "stream", "extensions")
+
+    def __init__(self, request: httpx.Request):
+        self.method = request.method
+        self.url = request.url
+        self.headers = request.headers
+        self.stream = request.stream
+        # 包含客户端的超时设置
+        self.extensions = request.extensions
+
+    def build(self, timings: Optional[RequestTimings] = None) -> httpx.Request:
+        """为一次发送创建请求对象（复制请求头列表，请求体不再编码）"""
+        extensions = self.extensions if timings is None else {**self.extensions, "trace": timings}
+        return httpx.Request(self.method, self.url, headers=self.headers, stream=self.stream, extensions=extensions)
+
+
+class _RejectAllCookies(DefaultCookiePolicy):
+    """不保存也不发送任何 Cookie 的策略"""
+
+    def set_ok(self, cookie, request) -> bool:
+        return False
+
+    def return_ok(self, cookie, request) -> bool:
+        return False
+
+
+def _create_http_client(transport: Optional[httpx.AsyncBaseTransport] = None) -> httpx.AsyncClient:
+    """创建带连接池的 HTTP 客户端；启用 HTTP/2 但未安装 h2 时回退到 HTTP/1.1
+
+    客户端由所有配置共享，Cookie 只来自各配置自己的请求头：响应的 Set-Cookie 不写入客户端，
+    否则一个账号的 Cookie 会随后续请求发给其他配置。
+    """
+    options = dict(
+        timeout=30.0,
+        limits=httpx.Limits(
+            max_keepalive_connections=settings.klook_pool_size,
+            keepalive_expiry=settings.klook_keepalive_expiry
+        ),
+        cookies=CookieJar(policy=_RejectAllCookies()),
+        transport=transport
+    )
+    if settings.klook_http2:
+        try:
+            return httpx.AsyncClient(http2=True, **options)
+        except ImportError:
+            logger.warning("未安装 h2，Klook 客户端回退到 HTTP/1.1")
+    return httpx.AsyncClient(**options)
+
 
 class KlookClient:
     """Klook API 客户端"""
 
-    def __init__(self, base_url: str = "https://www.klook.cn"):
-        self.base_url = base_url
-        self.client = httpx.AsyncClient(timeout=30.0)
+    def __init__(self, base_url: Optional[str] = None, transport: Optional[httpx.AsyncBaseTransport] = None):
+        self.base_url = base_url or settings.klook_base_url
+        self.client = _create_http_client(transport)
+
+    async def warm_up(self) -> float:
+        """
+        建立并验证到 Klook 的连接（DNS / TCP / TLS），连接放回连接池供后续请求复用
+
+        任何 HTTP 响应都说明连接可用；网络异常直接抛出。
+
+        Returns:
+            耗时（毫秒）
+        """
+        start = time.perf_counter()
+        response = await self.client.head(self.base_url)
+        await response.aclose()
+        return (time.perf_counter() - start) * 1000
+
+    async def probe_clock(self) -> tuple[float, float, Optional[str]]:
+        """
+        发送一次轻量请求，用于测量往返时间和服务器时钟
+
+        Returns:
+            (发送时刻, 收到响应头的时刻, 响应的 Date 头)，时刻为本机墙上时间戳（秒）
+        """
+        sent_at = time.time()
+        response = await self.client.head(self.base_url)
+        received_at = time.time()
+        await response.aclose()
+        return sent_at, received_at, response.headers.get("date")
+
+    def prepare_profile(self, headers: dict[str, str]) -> PreparedRequest:
+        """构建获取用户信息（验证配置）的请求"""
+        return PreparedRequest(self.client.build_request("GET", f"{self.base_url}{PROFILE_PATH}", headers=headers))
+
+    def prepare_redeem(self, program_uuid: str, headers: dict[str, str]) -> PreparedRequest:
+        """构建兑换优惠券的请求（触发前调用，请求体在此编码）"""
+        return PreparedRequest(self.client.build_request(
+            "POST", f"{self.base_url}{REDEEM_PATH}", headers=headers, json={"program_uuid": program_uuid}
+        ))
 
     async def get_user_profile(
             self,
@@ -23,13 +202,8 @@ class KlookClient:
         Returns:
             (是否成功, 响应数据)
         """
-        url = f"{self.base_url}/v3/userserv/user/profile_service/get_simple_profile_by_token"
-
         try:
-            response = await self.client.get(
-                url=url,
-                headers=headers
-            )
+            response = await self.client.send(self.prepare_profile(headers).build())
 
             logger.info(f"获取用户信息 API 响应: status={response.status_code}")
 
@@ -55,40 +229,63 @@ class KlookClient:
     async def manual_redeem(
             self,
             program_uuid: str,
-            headers: dict[str, str]
+            headers: dict[str, str],
+            timings: Optional[RequestTimings] = None
     ) -> tuple[bool, dict]:
         """
-        手动兑换优惠券
+        手动兑换优惠券（构建请求并发送；触发时使用 prepare_redeem + redeem）
 
         Args:
             program_uuid: 优惠券项目 UUID
             headers: 请求头（包含认证信息）
+            timings: 收集本次请求的耗时分解（可选）
 
         Returns:
             (是否成功, 响应数据)
         """
-        url = f"{self.base_url}/v2/promosrv/program/manual_redeem"
-
+        logger.debug(f"开始兑换优惠券: program_uuid={program_uuid}")
         try:
-            logger.info(f"开始兑换优惠券: program_uuid={program_uuid}")
+            prepared = self.prepare_redeem(program_uuid, headers)
+        except Exception as e:
+            logger.error(f"请求异常: {e}")
+            return False, {"error": str(e)}
+        return await self.redeem(prepared, timings)
 
-            response = await self.client.post(
-                url=url,
-                headers=headers,
-                json={"program_uuid": program_uuid}
-            )
+    async def redeem(
+            self,
+            prepared: PreparedRequest,
+            timings: Optional[RequestTimings] = None
+    ) -> tuple[bool, dict]:
+        """
+        发送已构建的兑换请求
 
-            logger.info(f"兑换优惠券 API 响应: status={response.status_code}, body={response.text}")
+        Args:
+            prepared: prepare_redeem 构建的请求
+            timings: 收集本次请求的耗时分解（可选）
+
+        Returns:
+            (是否成功, 响应数据)
+        """
+        try:
+            try:
+                response = await self.client.send(prepared.build(timings))
+            finally:
+                if timings is not None:
+                    timings.finish()
+
+            logger.info(f"兑换优惠券 API 响应: status={response.status_code}, body={payload_preview(response.content)}")
 
             if response.status_code == 200:
                 result = response.json()
                 success = result.get("success", False)
-                return success, result
             else:
-                return False, {
+                success, result = False, {
                     "error": f"HTTP {response.status_code}",
                     "message": response.text
                 }
+            if timings is not None:
+                timings.parsed()
+            return success, result
 
         except Exception as e:
             logger.error(f"请求异常: {e}")
@@ -103,3 +300,32 @@ class KlookClient:
 
     async def __aexit__(self, exc_type, exc_val, exc_tb):
         await self.close()
+
+
+class KlookClientRegistry:
+    """应用级 KlookClient 注册表：每个事件循环一个长连接客户端
+
+    httpx 的连接绑定创建它的事件循环，独立触发线程使用自己的客户端；
+    应用关闭时由 lifespan 关闭连接池。
+    """
+
+    def __init__(self):
+        self._clients: dict[asyncio.AbstractEventLoop, KlookClient] = {}
+
+    def get(self, loop: Optional[asyncio.AbstractEventLoop] = None) -> KlookClient:
+        """获取（首次调用时创建）事件循环对应的客户端，默认为当前运行的事件循环"""
+        loop = loop or asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None:
+            client = self._clients[loop] = KlookClient()
+        return client
+
+    async def close(self, loop: Optional[asyncio.AbstractEventLoop] = None):
+        """关闭事件循环对应的客户端及其连接池（在该事件循环上调用）"""
+        client = self._clients.pop(loop or asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.close()
+
+
+# 全局 Klook 客户端注册表
+klook_clients = KlookClientRegistry()
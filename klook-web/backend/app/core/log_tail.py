@@ -0,0 +1,191 @@
+"""日志实时跟踪（SSE 推送的订阅中心）
+
+日志的写入路径（写后日志批量写入 / LogStore.create）在事务提交后把新行交给这里，
+按 task_id 索引分发给订阅者；每行只序列化一次，所有订阅者共享同一段 SSE 文本。
+订阅者不查询数据库，只有断线续传时按 last_id 从数据库补齐。
+
+续传以最后收到的 ID 为界，因此分发必须按 ID 递增：SQLite 按提交顺序分配 ID，
+但并发写事务的提交回调、其他进程经 IPC 转发的日志到达本进程的顺序都可能与 ID 顺序不同。
+LogTail 按 ID 重排：前序 ID 未到达的日志暂存，最多等待 REORDER_WAIT 秒后跳过缺口；
+跳过缺口后才到达的日志（以及删除最新日志后被复用的 ID）标记为迟到，直接分发。
+迟到的事件不带 SSE id 字段，客户端的 Last-Event-ID 停留在按序收到的最大 ID，续传时不会回退重发。
+已知缺口：客户端断开期间才提交的迟到日志（ID 不大于其续传位置）不会在续传时补发，
+只能通过日志列表接口查到；它需要提交比更大 ID 的日志晚 REORDER_WAIT 秒以上，实际很少出现。
+拆分部署时与执行器的连接断开期间的日志无法送达，重连时关闭本进程的跟踪连接，由客户端续传补齐。
+"""
+import asyncio
+import json
+from collections import deque
+from datetime import datetime
+from typing import Iterable, Optional
+
+from app.core.cache_sync import cache_sync
+from app.core.config import settings
+
+# 等待前序日志 ID 到达的最长时间（秒）
+REORDER_WAIT = 0.5
+
+
+class LogEvent:
+    """序列化后的日志行（SSE 事件），同一行的所有订阅者共享"""
+    __slots__ = ("id", "task_id", "level", "text", "late")
+
+    def __init__(self, log: dict, late: bool = False):
+        self.id = log["id"]
+        # 在更大的 ID 之后才分发：不带 id 字段，不改变客户端的续传位置
+        self.late = late
+        self.task_id = log["task_id"]
+        self.level = log["level"]
+        # 字段与 LogResponse 一致
+        data = json.dumps(
+            {
+                "task_id": self.task_id,
+                "level": self.level,
+                "message": log["message"],
+                "id": self.id,
+                "created_at": log["created_at"].isoformat()
+            },
+            separators=(",", ":"),
+            ensure_ascii=False
+        )
+        head = "" if late else f"id: {self.id}\n"
+        self.text = f"{head}event: log\ndata: {data}\n\n"
+
+
+class LogSubscriber:
+    """单个跟踪连接：按 task_id / level 筛选的有界事件队列"""
+
+    def __init__(self, task_id: Optional[int], level: Optional[str], max_queue: int):
+        self.task_id = task_id
+        self.level = level
+        self.max_queue = max_queue
+        # 队列溢出（客户端读得太慢）：连接随后关闭，客户端按 last_id 续传
+        self.overflowed = False
+        self._queue: deque[LogEvent] = deque()
+        self._ready = asyncio.Event()
+
+    def enqueue(self, event: LogEvent):
+        if self.overflowed or (self.level and event.level != self.level):
+            return
+        if len(self._queue) >= self.max_queue:
+            self.overflowed = True
+            self._queue.clear()
+        else:
+            self._queue.append(event)
+        self._ready.set()
+
+    async def get(self, timeout: float) -> list[LogEvent]:
+        """等待并取出队列中的全部事件（超时返回空列表）"""
+        if not self._queue and not self.overflowed:
+            self._ready.clear()
+            try:
+                await asyncio.wait_for(self._ready.wait(), timeout)
+            except asyncio.TimeoutError:
+                return []
+        events = list(self._queue)
+        self._queue.clear()
+        return events
+
+
+class LogTail:
+    """日志跟踪订阅中心：{task_id（None 表示全部任务）: 订阅者集合}"""
+
+    def __init__(self):
+        self._subscribers: dict[Optional[int], set[LogSubscriber]] = {}
+        # 下一个按顺序分发的日志 ID（首条日志到达前未知），及等待前序 ID 的日志
+        self._next_id: Optional[int] = None
+        self._held: dict[int, dict] = {}
+        self._gap_timer: Optional[asyncio.TimerHandle] = None
+
+    def subscribe(self, task_id: Optional[int] = None, level: Optional[str] = None) -> LogSubscriber:
+        subscriber = LogSubscriber(task_id, level, settings.log_stream_queue_size)
+        self._subscribers.setdefault(task_id, set()).add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: LogSubscriber):
+        subscribers = self._subscribers.get(subscriber.task_id)
+        if subscribers is not None:
+            subscribers.discard(subscriber)
+            if not subscribers:
+                del self._subscribers[subscriber.task_id]
+
+    @property
+    def subscriber_count(self) -> int:
+        return sum(len(subscribers) for subscribers in self._subscribers.values())
+
+    def resync(self):
+        """关闭所有跟踪连接（客户端按 last_id 续传，从数据库补齐），用于与执行器的连接断开后"""
+        for subscribers in self._subscribers.values():
+            for subscriber in subscribers:
+                subscriber.overflowed = True
+                subscriber._ready.set()
+        self._next_id = None
+        self._held.clear()
+
+    def publish(self, logs: Iterable[dict]):
+        """分发已提交的日志行（按 ID 递增；事务提交后在事件循环中调用），同步到其他进程"""
+        if cache_sync.attached:
+            logs = list(logs)
+            cache_sync.emit("log_tail.publish", [{**log, "created_at": log["created_at"].isoformat()} for log in logs])
+        self._publish(logs)
+
+    def _publish_synced(self, logs: list[dict]):
+        """其他进程转发的日志行"""
+        self._publish([{**log, "created_at": datetime.fromisoformat(log["created_at"])} for log in logs])
+
+    def _publish(self, logs: Iterable[dict]):
+        if not self._subscribers:
+            # 没有订阅者时只记录位置
+            for log in logs:
+                if self._next_id is None or log["id"] >= self._next_id:
+                    self._next_id = log["id"] + 1
+            self._held.clear()
+            return
+        late = []
+        for log in logs:
+            if self._next_id is None:
+                self._next_id = log["id"]
+            if log["id"] < self._next_id:
+                late.append(log)
+            else:
+                self._held[log["id"]] = log
+        if late:
+            self._dispatch(late, late=True)
+        self._release()
+
+    def _release(self):
+        """分发从 _next_id 起连续的暂存日志，仍有缺口时启动等待计时"""
+        ready = []
+        while self._next_id in self._held:
+            ready.append(self._held.pop(self._next_id))
+            self._next_id += 1
+        if ready:
+            self._dispatch(ready)
+        if self._held and self._gap_timer is None:
+            self._gap_timer = asyncio.get_running_loop().call_later(REORDER_WAIT, self._skip_gap)
+
+    def _skip_gap(self):
+        """前序 ID 等待超时：跳到最小的暂存 ID 继续分发"""
+        self._gap_timer = None
+        if self._held:
+            self._next_id = min(self._held)
+            self._release()
+
+    def _dispatch(self, logs: list[dict], late: bool = False):
+        everyone = self._subscribers.get(None)
+        for log in logs:
+            subscribers = self._subscribers.get(log["task_id"])
+            if not subscribers and not everyone:
+                continue
+            event = LogEvent(log, late)
+            if subscribers:
+                for subscriber in subscribers:
+                    subscriber.enqueue(event)
+            if everyone:
+                for subscriber in everyone:
+                    subscriber.enqueue(event)
+
+
+# 全局日志跟踪订阅中心
+log_tail = LogTail()
+cache_sync.register("log_tail.publish", log_tail._publish_synced)
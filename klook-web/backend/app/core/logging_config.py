@@ -0,0 +1,222 @@
+"""应用日志
+
+loguru 处理器只做最少的工作：构造记录、按模块级别过滤，然后把记录放入队列；
+格式化（文本或 JSON 行）、截断、写入控制台 / 文件、轮转和压缩都在后台写线程完成，
+事件循环和触发线程不会因为终端或磁盘写入变慢而阻塞。
+
+任务相关的日志通过 logger.contextualize(task_id=...) 关联任务 ID（JSON 行中的 task_id 字段）。
+"""
+import atexit
+import glob
+import gzip
+import json
+import os
+import queue
+import shutil
+import sys
+import threading
+import traceback
+from datetime import datetime
+from typing import Callable, Optional, TextIO
+
+from app.core.config import settings
+from loguru import logger
+
+# 写线程每批最多处理的记录数（之后刷新输出）
+BATCH_SIZE = 1000
+
+
+def payload_preview(content: bytes) -> str:
+    """请求 / 响应体的日志预览：只解码前 log_payload_preview 个字节"""
+    limit = settings.log_payload_preview
+    if len(content) <= limit:
+        return content.decode("utf-8", "replace")
+    return f"{content[:limit].decode('utf-8', 'replace')}...（共 {len(content)} 字节）"
+
+
+def _truncate(message: str) -> str:
+    limit = settings.log_max_message_length
+    if len(message) <= limit:
+        return message
+    return f"{message[:limit]}...（截断，共 {len(message)} 字符）"
+
+
+def _format_exception(record: dict) -> Optional[str]:
+    exception = record["exception"]
+    if exception is None:
+        return None
+    return "".join(traceback.format_exception(exception.type, exception.value, exception.traceback))
+
+
+def format_text(record: dict) -> str:
+    """与 loguru 默认格式一致的文本行"""
+    line = (
+        f"{record['time']:%Y-%m-%d %H:%M:%S}.{record['time'].microsecond // 1000:03d} | "
+        f"{record['level'].name:<8} | {record['name']}:{record['function']}:{record['line']} - "
+        f"{_truncate(record['message'])}\n"
+    )
+    exception = _format_exception(record)
+    return line + exception if exception else line
+
+
+def format_json(record: dict) -> str:
+    """JSON 行：时间、级别、来源、任务 ID（有时）和消息"""
+    entry = {
+        "ts": record["time"].isoformat(timespec="milliseconds"),
+        "level": record["level"].name,
+        "logger": record["name"],
+        "func": record["function"],
+        "line": record["line"],
+        "msg": _truncate(record["message"]),
+    }
+    if record["extra"]:
+        entry.update(record["extra"])
+    exception = _format_exception(record)
+    if exception:
+        entry["exc"] = exception
+    return json.dumps(entry, ensure_ascii=False, default=str) + "\n"
+
+
+class StreamOutput:
+    """写入已打开的文本流（控制台）"""
+
+    def __init__(self, stream: TextIO, formatter: Callable[[dict], str]):
+        self.stream = stream
+        self.formatter = formatter
+
+    def write(self, record: dict):
+        self.stream.write(self.formatter(record))
+
+    def flush(self):
+        self.stream.flush()
+
+    def close(self):
+        self.flush()
+
+
+class RotatingFileOutput:
+    """JSON 行日志文件：超过大小上限时轮转，旧文件 gzip 压缩，只保留最近 backups 个"""
+
+    def __init__(self, path: str, max_bytes: int, backups: int):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._file = open(path, "a", encoding="utf-8")
+        self._size = self._file.tell()
+
+    def write(self, record: dict):
+        line = format_json(record)
+        size = len(line.encode("utf-8"))
+        if self._size and self._size + size > self.max_bytes:
+            self._rotate()
+        self._file.write(line)
+        self._size += size
+
+    def flush(self):
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+    def _rotate(self):
+        self._file.close()
+        rotated = f"{self.path}.{datetime.now():%Y%m%d-%H%M%S-%f}"
+        os.replace(self.path, rotated)
+        with open(rotated, "rb") as source, gzip.open(f"{rotated}.gz", "wb") as target:
+            shutil.copyfileobj(source, target)
+        os.remove(rotated)
+
+        for stale in sorted(glob.glob(f"{glob.escape(self.path)}.*.gz"))[:-self.backups or None]:
+            os.remove(stale)
+
+        self._file = open(self.path, "a", encoding="utf-8")
+        self._size = 0
+
+
+class QueuedLogWriter:
+    """loguru 的 sink：记录入队后立即返回，由后台线程格式化并写入各输出"""
+
+    def __init__(self, outputs: list):
+        self.outputs = outputs
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._thread: Optional[threading.Thread] = None
+
+    def __call__(self, message):
+        self._queue.put(message.record)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="klook-log-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        """写完已入队的记录后停止"""
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join(timeout)
+        self._thread = None
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < BATCH_SIZE:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            for record in batch:
+                if record is None:
+                    self._close()
+                    return
+                for output in self.outputs:
+                    try:
+                        output.write(record)
+                    except Exception as e:
+                        sys.__stderr__.write(f"日志写入失败: {e!r}\n")
+            for output in self.outputs:
+                try:
+                    output.flush()
+                except Exception:
+                    pass
+
+    def _close(self):
+        for output in self.outputs:
+            try:
+                output.close()
+            except Exception:
+                pass
+
+
+_writer: Optional[QueuedLogWriter] = None
+
+
+def setup_logging():
+    """替换 loguru 的默认处理器（进程启动时调用，重复调用无效）"""
+    global _writer
+    if _writer is not None:
+        return
+
+    console_format = format_json if settings.log_console_format == "json" else format_text
+    outputs = [StreamOutput(sys.stderr, console_format)]
+    if settings.log_file:
+        outputs.append(RotatingFileOutput(settings.log_file, settings.log_file_max_bytes, settings.log_file_backups))
+
+    # 按模块的级别（"" 为默认级别），处理器级别取其中最低的，低于它的日志在构造记录前就被丢弃
+    levels = {"": settings.log_level.upper(), **{module: level.upper() for module, level in settings.log_levels.items()}}
+    _writer = QueuedLogWriter(outputs)
+    _writer.start()
+    logger.remove()
+    logger.add(_writer, level=min(logger.level(level).no for level in levels.values()), format="{message}", filter=levels)
+    atexit.register(shutdown_logging)
+
+
+def shutdown_logging():
+    """写完队列中的日志并关闭输出（进程退出前调用）"""
+    global _writer
+    writer, _writer = _writer, None
+    if writer is None:
+        return
+    logger.remove()
+    writer.stop()
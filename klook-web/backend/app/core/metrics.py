@@ -0,0 +1,346 @@
+"""运行指标
+
+热路径（定时器、Klook 请求、事件分发、写后日志、WebSocket 推送）按阶段用单调时钟打点，
+聚合为直方图 / 计数器，由 /api/metrics 以 Prometheus 文本格式导出。
+
+METRICS_ENABLED=false 时 observe / inc 只做一次属性判断后返回。
+触发线程与主事件循环都会写入，每个指标持有自己的锁（只在更新计数时持有）。
+
+事件循环延迟看门狗（LoopLagWatchdog）不受 METRICS_ENABLED 影响，供 /api/health/deep 使用。
+"""
+import asyncio
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from typing import Callable, Optional
+
+from app.core.config import settings
+from loguru import logger
+
+# 默认桶上界（秒）：覆盖微秒级的触发误差到秒级的网络请求
+DEFAULT_BUCKETS = (
+    0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+    0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0
+)
+
+
+def _format_labels(names: tuple[str, ...], values: tuple[str, ...], *extra: str) -> str:
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values)]
+    pairs.extend(label for label in extra if label)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Series:
+    """一组标签值对应的直方图数据"""
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self, size: int):
+        self.counts = [0] * size
+        self.sum = 0.0
+        self.count = 0
+
+
+class Histogram:
+    """直方图（单位：秒），可带固定的标签名"""
+
+    def __init__(self, registry: "MetricsRegistry", name: str, help_text: str,
+                 labels: tuple[str, ...] = (), buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        self._registry = registry
+        self.name = name
+        self.help = help_text
+        self.label_names = labels
+        self.buckets = buckets
+        self._series: dict[tuple[str, ...], _Series] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values: str):
+        """记录一个观测值（秒）"""
+        if not self._registry.enabled:
+            return
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = _Series(len(self.buckets) + 1)
+            series.counts[index] += 1
+            series.sum += value
+            series.count += 1
+
+    def header(self) -> list[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+
+    def render(self) -> list[str]:
+        return self.header() + self.samples()
+
+    def samples(self, extra: str = "") -> list[str]:
+        """样本行（不含 HELP / TYPE），extra 为附加到每个样本的标签"""
+        lines = []
+        with self._lock:
+            snapshot = [
+                (label_values, list(series.counts), series.sum, series.count)
+                for label_values, series in sorted(self._series.items())
+            ]
+        for label_values, counts, total, count in snapshot:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.label_names, label_values, extra, f'le="{bound}"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.label_names, label_values, extra, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{labels} {count}")
+            labels = _format_labels(self.label_names, label_values, extra)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+
+
+class Counter:
+    """单调递增计数器，可带固定的标签名"""
+
+    def __init__(self, registry: "MetricsRegistry", name: str, help_text: str, labels: tuple[str, ...] = ()):
+        self._registry = registry
+        self.name = name
+        self.help = help_text
+        self.label_names = labels
+        self._values: dict[tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values: str, amount: float = 1):
+        if not self._registry.enabled:
+            return
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def header(self) -> list[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+
+    def render(self) -> list[str]:
+        return self.header() + self.samples()
+
+    def samples(self, extra: str = "") -> list[str]:
+        """样本行（不含 HELP / TYPE），extra 为附加到每个样本的标签"""
+        with self._lock:
+            snapshot = sorted(self._values.items())
+        return [
+            f"{self.name}{_format_labels(self.label_names, label_values, extra)} {_format_value(value)}"
+            for label_values, value in snapshot
+        ]
+
+    def reset(self):
+        with self._lock:
+            self._values.clear()
+
+
+class LoopLagWatchdog:
+    """事件循环延迟看门狗
+
+    定时睡眠，用 perf_counter_ns 测量实际醒来时刻超出预期的时间（事件循环的调度延迟）。
+    有任务处于触发窗口（触发窗口打开 ~ 触发时刻）时改为每 loop_lag_guard_interval_ms 采样一次，
+    延迟达到 loop_lag_warn_ms 时为该任务记录一次警告，并记下窗口内的最大延迟供触发时写入任务结果。
+    """
+
+    # snapshot 统计的时间范围（秒）
+    RECENT_SECONDS = 60
+
+    def __init__(self, histogram: Histogram):
+        self._histogram = histogram
+        self._recent: deque = deque(maxlen=4096)  # (采样时刻, 延迟纳秒)
+        self.last_lag_ns: Optional[int] = None
+        self._windows: Callable[[], list] = lambda: []
+        # 处于触发窗口的任务: 窗口内观测到的最大延迟（纳秒）
+        self._window_max: dict[int, int] = {}
+        self._warned: set[int] = set()
+        self._runner: Optional[asyncio.Task] = None
+
+    def watch(self, windows: Callable[[], list[tuple[int, float, float]]]):
+        """设置触发窗口来源：返回 [(任务 ID, 窗口打开时刻, 触发时刻)]，时刻为单调时钟秒"""
+        self._windows = windows
+
+    def start(self):
+        if self._runner is None:
+            self._runner = asyncio.create_task(self._run())
+
+    async def stop(self):
+        runner, self._runner = self._runner, None
+        if runner is None:
+            return
+        runner.cancel()
+        try:
+            await runner
+        except asyncio.CancelledError:
+            pass
+
+    async def _run(self):
+        interval = settings.metrics_loop_lag_interval
+        guard_interval = settings.loop_lag_guard_interval_ms / 1000
+        while True:
+            now = time.monotonic()
+            windows = self._windows()
+            active = {task_id: deadline for task_id, opens_at, deadline in windows if opens_at <= now < deadline}
+            if active:
+                delay = guard_interval
+            else:
+                # 睡到下一个触发窗口打开为止
+                upcoming = min((opens_at - now for _, opens_at, _ in windows if opens_at > now), default=interval)
+                delay = min(interval, max(upcoming, guard_interval))
+
+            started = time.perf_counter_ns()
+            await asyncio.sleep(delay)
+            lag_ns = max(0, time.perf_counter_ns() - started - int(delay * 1e9))
+            # 触发之后才醒来的采样包含触发本身及抢购请求的耗时，不计入该任务的触发窗口
+            woke = time.monotonic()
+            guarded = [task_id for task_id, deadline in active.items() if woke < deadline]
+            self._record(lag_ns, guarded, {task_id for task_id, _, _ in windows})
+
+    def _record(self, lag_ns: int, guarded: list[int], armed: set[int]):
+        self.last_lag_ns = lag_ns
+        self._recent.append((time.monotonic(), lag_ns))
+        self._histogram.observe(lag_ns / 1e9)
+
+        for task_id in guarded:
+            if lag_ns > self._window_max.get(task_id, -1):
+                self._window_max[task_id] = lag_ns
+            if lag_ns >= settings.loop_lag_warn_ms * 1e6 and task_id not in self._warned:
+                self._warned.add(task_id)
+                with logger.contextualize(task_id=task_id):
+                    logger.warning(
+                        f"任务 {task_id} 触发窗口内事件循环延迟 {lag_ns / 1e6:.2f}ms"
+                        f"（阈值 {settings.loop_lag_warn_ms}ms），触发可能推迟"
+                    )
+
+        # 已结束或取消的任务
+        for task_id in [task_id for task_id in self._window_max if task_id not in armed]:
+            del self._window_max[task_id]
+        self._warned &= armed
+
+    def at_fire(self, task_id: int) -> dict:
+        """触发时刻的事件循环延迟（毫秒）：最近一次采样和该任务触发窗口内的最大值（可在触发线程中调用）"""
+        window_max = self._window_max.get(task_id)
+        return {
+            "loop_lag_ms": round(self.last_lag_ns / 1e6, 3) if self.last_lag_ns is not None else None,
+            "loop_lag_window_max_ms": round(window_max / 1e6, 3) if window_max is not None else None
+        }
+
+    def snapshot(self) -> dict:
+        """最近一次采样及最近 RECENT_SECONDS 秒内的延迟统计（毫秒）"""
+        since = time.monotonic() - self.RECENT_SECONDS
+        recent = sorted(lag_ns for at, lag_ns in self._recent if at >= since)
+        return {
+            "running": self._runner is not None,
+            "last_ms": round(self.last_lag_ns / 1e6, 3) if self.last_lag_ns is not None else None,
+            "p50_ms": round(recent[len(recent) // 2] / 1e6, 3) if recent else None,
+            "max_ms": round(recent[-1] / 1e6, 3) if recent else None,
+            "samples": len(recent),
+            "window_seconds": self.RECENT_SECONDS,
+            "warn_ms": settings.loop_lag_warn_ms,
+            "guarded_tasks": sorted(self._window_max)
+        }
+
+
+class MetricsRegistry:
+    """应用指标集合"""
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._metrics: list = []
+
+        self.timer_wakeup_lateness = self.histogram(
+            "klook_timer_wakeup_lateness_seconds",
+            "定时器粗粒度睡眠结束时刻晚于保护窗口起点的时间"
+        )
+        self.firing_error = self.histogram(
+            "klook_firing_error_seconds",
+            "触发误差（实际触发时刻 - 目标时刻）"
+        )
+        self.redeem_phase = self.histogram(
+            "klook_redeem_phase_seconds",
+            "抢购请求各阶段耗时（connect: 建立连接, ttfb: 首字节, total: 请求总耗时, parse: 解析响应, wakeup_to_send: 唤醒到请求发出）",
+            labels=("phase",)
+        )
+        self.redeem_attempts = self.counter(
+            "klook_redeem_attempts_total",
+            "抢购尝试次数（success / fail / error）",
+            labels=("outcome",)
+        )
+        self.event_dispatch = self.histogram(
+            "klook_event_dispatch_seconds",
+            "触发运行时产出事件到主事件循环处理完成（写日志入队、WebSocket 入队）的耗时",
+            labels=("kind",)
+        )
+        self.db_write = self.histogram(
+            "klook_journal_write_seconds",
+            "写后日志每批写入数据库（含提交）的耗时"
+        )
+        self.ws_fanout = self.histogram(
+            "klook_ws_fanout_seconds",
+            "WebSocket 消息从发布到写入连接的耗时（每个连接一次）"
+        )
+        self.event_loop_lag = self.histogram(
+            "klook_event_loop_lag_seconds",
+            "主事件循环延迟（定时采样的睡眠超时量）"
+        )
+        self.loop_lag = LoopLagWatchdog(self.event_loop_lag)
+
+    def histogram(self, name: str, help_text: str, labels: tuple[str, ...] = (),
+                  buckets: tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        metric = Histogram(self, name, help_text, labels, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, help_text: str, labels: tuple[str, ...] = ()) -> Counter:
+        metric = Counter(self, name, help_text, labels)
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        """Prometheus 文本格式（0.0.4）"""
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def samples(self, process: str) -> dict[str, list[str]]:
+        """各指标的样本行（按指标名），每个样本带 process 标签，用于合并多个进程的指标"""
+        label = f'process="{process}"'
+        return {metric.name: metric.samples(label) for metric in self._metrics}
+
+    def render_merged(self, process: str, others: dict[str, list[str]]) -> str:
+        """
+        本进程与其他进程的指标合并为一份 Prometheus 文本（每个指标只输出一次 HELP / TYPE）
+
+        Args:
+            process: 本进程的 process 标签
+            others: 其他进程 samples() 的结果
+        """
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.header())
+            lines.extend(metric.samples(f'process="{process}"'))
+            lines.extend(others.get(metric.name, ()))
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        for metric in self._metrics:
+            metric.reset()
+
+    # ---- 事件循环延迟采样 ----
+
+    def start(self):
+        """在当前事件循环上启动延迟看门狗（指标未启用时也运行，只是不计入直方图）"""
+        self.loop_lag.start()
+
+    async def stop(self):
+        await self.loop_lag.stop()
+
+
+# 全局指标实例
+metrics = MetricsRegistry(enabled=settings.metrics_enabled)
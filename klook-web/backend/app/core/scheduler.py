@@ -0,0 +1,158 @@
+"""集中式截止时间调度器
+
+所有已启动任务的触发计划放在一个按截止时间排序的最小堆中，由单个唤醒循环
+在最早的截止时间精确唤醒，替代每个任务各自轮询的倒计时协程。
+截止时间统一使用事件循环的单调时钟（loop.time()），不受系统时间跳变影响。
+"""
+import asyncio
+import heapq
+import itertools
+import time
+from typing import Awaitable, Callable, Optional
+
+from loguru import logger
+
+
+class FirePlan:
+    """触发计划（紧凑结构，只保存调度所需字段）"""
+    __slots__ = ("deadline", "seq", "task_id", "callback", "cancelled")
+
+    def __init__(self, deadline: float, seq: int, task_id: int, callback: Callable[[], Awaitable]):
+        self.deadline = deadline
+        self.seq = seq
+        self.task_id = task_id
+        self.callback = callback
+        self.cancelled = False
+
+    def __lt__(self, other: "FirePlan") -> bool:
+        if self.deadline != other.deadline:
+            return self.deadline < other.deadline
+        return self.seq < other.seq
+
+
+class DeadlineScheduler:
+    """最小堆调度器：O(log n) 插入，O(1) 惰性取消，单循环唤醒"""
+
+    def __init__(self):
+        self._heap: list[FirePlan] = []
+        self._plans: dict[int, FirePlan] = {}
+        self._seq = itertools.count()
+        self._cancelled = 0
+        self._wakeup: Optional[asyncio.Event] = None
+        self._runner: Optional[asyncio.Task] = None
+        # 触发后正在执行的回调，保持引用防止被回收
+        self._firing: set[asyncio.Task] = set()
+
+    @staticmethod
+    def deadline_from_timestamp(timestamp: float) -> float:
+        """把墙上时间戳换算为事件循环单调时钟上的截止时间（只在登记时换算一次）"""
+        return asyncio.get_running_loop().time() + (timestamp - time.time())
+
+    def schedule(self, task_id: int, deadline: float, callback: Callable[[], Awaitable]) -> FirePlan:
+        """
+        登记触发计划，同一任务重复登记时替换旧计划
+
+        Args:
+            task_id: 任务 ID
+            deadline: 单调时钟截止时间（loop.time() 基准）
+            callback: 到期时调用的异步函数
+        """
+        self.cancel(task_id)
+        self._ensure_runner()
+
+        plan = FirePlan(deadline, next(self._seq), task_id, callback)
+        heapq.heappush(self._heap, plan)
+        self._plans[task_id] = plan
+
+        # 新计划成为最早截止时间时，唤醒循环重新计算等待时长
+        if self._heap[0] is plan:
+            self._wakeup.set()
+        return plan
+
+    def cancel(self, task_id: int) -> bool:
+        """取消触发计划（惰性删除，堆顶出队时丢弃）"""
+        plan = self._plans.pop(task_id, None)
+        if plan is None:
+            return False
+
+        plan.cancelled = True
+        self._cancelled += 1
+        # 已取消的计划过多时重建堆，避免内存膨胀
+        if self._cancelled > 64 and self._cancelled > len(self._heap) // 2:
+            self._heap = [plan for plan in self._heap if not plan.cancelled]
+            heapq.heapify(self._heap)
+            self._cancelled = 0
+        return True
+
+    def __len__(self) -> int:
+        return len(self._plans)
+
+    def __contains__(self, task_id: int) -> bool:
+        return task_id in self._plans
+
+    # ---- 生命周期 ----
+
+    def _ensure_runner(self):
+        if self._runner is None or self._runner.done():
+            self._wakeup = asyncio.Event()
+            self._runner = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """停止唤醒循环并取消所有计划"""
+        for task_id in list(self._plans):
+            self.cancel(task_id)
+        self._heap.clear()
+        self._cancelled = 0
+
+        runner, self._runner = self._runner, None
+        if runner is not None:
+            runner.cancel()
+            try:
+                await runner
+            except asyncio.CancelledError:
+                pass
+
+    # ---- 唤醒循环 ----
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            plan = self._peek()
+            if plan is None:
+                await self._wakeup.wait()
+                self._wakeup.clear()
+                continue
+
+            if plan.deadline > loop.time():
+                # 在最早截止时间唤醒；期间有更早的计划登记时提前唤醒
+                handle = loop.call_at(plan.deadline, self._wakeup.set)
+                try:
+                    await self._wakeup.wait()
+                finally:
+                    handle.cancel()
+                self._wakeup.clear()
+                continue
+
+            heapq.heappop(self._heap)
+            del self._plans[plan.task_id]
+            self._fire(plan)
+
+    def _peek(self) -> Optional[FirePlan]:
+        """返回最早的有效计划，顺带丢弃已取消的堆顶"""
+        while self._heap and self._heap[0].cancelled:
+            heapq.heappop(self._heap)
+            self._cancelled -= 1
+        return self._heap[0] if self._heap else None
+
+    def _fire(self, plan: FirePlan):
+        try:
+            firing = asyncio.create_task(plan.callback())
+        except Exception as e:
+            logger.error(f"任务 {plan.task_id} 触发回调异常: {e}")
+            return
+        self._firing.add(firing)
+        firing.add_done_callback(self._firing.discard)
+
+
+# 全局调度器实例
+scheduler = DeadlineScheduler()
@@ -0,0 +1,50 @@
+"""列表接口的快速序列化
+
+列表接口的存储层查询只取响应模型需要的列（按模型字段顺序），返回 Row 元组，
+跳过 ORM 对象构造和 identity map；响应体在这里一次性序列化，不再逐行经过
+from_attributes 校验和 jsonable_encoder：
+- 安装了 orjson 时直接序列化行字典（行数据由 API 写入时已经过模型校验）
+- 否则用 TypeAdapter 批量校验并由 pydantic-core 序列化
+
+接口仍声明原有的 response_model，OpenAPI 文档不变。
+"""
+from typing import Any, Sequence
+
+from fastapi import Response
+from pydantic import BaseModel, TypeAdapter
+from sqlalchemy.orm import InstrumentedAttribute
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def response_columns(table, model: type[BaseModel]) -> tuple[InstrumentedAttribute, ...]:
+    """按响应模型字段顺序取表的列，用于列表查询"""
+    return tuple(getattr(table, name) for name in model.model_fields)
+
+
+def rows_as_dicts(rows: Sequence) -> list[dict]:
+    """查询结果行（Row）转为字典（列名只取一次，不逐行调用 Row._asdict）"""
+    if not rows:
+        return []
+    fields = rows[0]._fields
+    return [dict(zip(fields, row)) for row in rows]
+
+
+class ListSerializer:
+    """列表响应模型的序列化器"""
+
+    def __init__(self, model: type[BaseModel]):
+        self.model = model
+        self._adapter = TypeAdapter(model)
+
+    def dumps(self, data: dict[str, Any]) -> bytes:
+        """序列化为 JSON 字节串（data 中的行为 rows_as_dicts 的结果）"""
+        if orjson is not None:
+            return orjson.dumps(data)
+        return self._adapter.dump_json(self._adapter.validate_python(data))
+
+    def response(self, data: dict[str, Any]) -> Response:
+        return Response(content=self.dumps(data), media_type="application/json")
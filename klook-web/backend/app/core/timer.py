@@ -2,11 +2,19 @@
 import asyncio
 import time
 from datetime import datetime
-from typing import Callable, Optional
+from enum import Enum
+from typing import Optional
 
+from app.core.metrics import metrics
 from loguru import logger
 
 
+class TimerMode(str, Enum):
+    """触发模式"""
+    SLEEP = "sleep"  # 仅依赖事件循环睡眠，误差受事件循环调度粒度限制（原实现）
+    HYBRID = "hybrid"  # 粗粒度睡眠到保护窗口，之后让出事件循环轮询，最后自旋到目标时刻
+
+
 class PrecisionTimer:
     """高精度定时器，支持毫秒级精度"""
 
@@ -14,61 +22,107 @@ class PrecisionTimer:
             self,
             target_time: datetime,
             network_compensation: int = 200,
-            callback: Optional[Callable] = None
+            mode: TimerMode = TimerMode.SLEEP,
+            guard_window_ms: float = 20,
+            spin_window_ms: float = 1
     ):
         """
         Args:
             target_time: 目标触发时间
             network_compensation: 网络延迟补偿（毫秒）
-            callback: 触发时的回调函数（异步）
+            mode: 触发模式
+            guard_window_ms: 保护窗口（毫秒），hybrid 模式下进入该窗口后不再睡眠
+            spin_window_ms: 自旋窗口（毫秒），hybrid 模式下最后阶段不让出事件循环
         """
         self.target_time = target_time
         self.network_compensation = network_compensation
-        self.callback = callback
+        self.mode = TimerMode(mode)
+        self.guard_window_ns = int(guard_window_ms * 1_000_000)
+        self.spin_window_ns = int(spin_window_ms * 1_000_000)
 
-        # 计算实际触发时间戳（提前补偿网络延迟）
-        self.target_timestamp = target_time.timestamp() - (network_compensation / 1000.0)
+        self._set_deadline()
+
+        # 实际触发时刻与目标时刻之差（纳秒），触发后记录
+        self.firing_error_ns: Optional[int] = None
+        # hybrid 模式粗粒度睡眠结束时刻晚于保护窗口起点的时间（纳秒），即触发所在事件循环的调度延迟
+        self.wakeup_lateness_ns: Optional[int] = None
 
         self._cancelled = False
 
-    async def countdown(self, progress_callback: Optional[Callable] = None):
+    def _set_deadline(self):
+        # 计算实际触发时间戳（提前补偿网络延迟）
+        self.target_timestamp = self.target_time.timestamp() - (self.network_compensation / 1000.0)
+
+        # 只在登记（或改期）时把墙上时间换算到单调时钟一次，之后系统时间跳变（NTP 校时等）不影响触发时刻
+        self.deadline_ns = time.monotonic_ns() + round((self.target_timestamp - time.time()) * 1e9)
+
+    @property
+    def deadline(self) -> float:
+        """目标时刻（单调时钟秒，与 loop.time() 同基准）"""
+        return self.deadline_ns / 1e9
+
+    @property
+    def wake_deadline(self) -> float:
+        """调度器需要唤醒的时刻：hybrid 模式提前一个保护窗口，由 fire_at_deadline 完成最后阶段"""
+        if self.mode == TimerMode.HYBRID:
+            return (self.deadline_ns - self.guard_window_ns) / 1e9
+        return self.deadline
+
+    def set_network_compensation(self, network_compensation: int):
+        """调整网络延迟补偿（触发前校准），按差值平移触发时刻"""
+        delta_ms = network_compensation - self.network_compensation
+        self.network_compensation = network_compensation
+        self.target_timestamp -= delta_ms / 1000.0
+        self.deadline_ns -= round(delta_ms * 1_000_000)
+
+    def reschedule(self, target_time: Optional[datetime] = None, network_compensation: Optional[int] = None):
+        """修改目标时间和 / 或网络延迟补偿（触发窗口打开前调用，运行时随后按新的时刻重新登记）"""
+        if target_time is not None:
+            self.target_time = target_time
+        if network_compensation is not None:
+            self.network_compensation = network_compensation
+        self._set_deadline()
+
+    def remaining_ns(self) -> int:
+        return self.deadline_ns - time.monotonic_ns()
+
+    async def fire_at_deadline(self) -> Optional[int]:
         """
-        执行倒计时，支持进度回调
+        完成触发前的最后阶段等待，并记录触发误差
 
-        Args:
-            progress_callback: 倒计时进度回调，接收剩余秒数
+        Returns:
+            触发误差（纳秒，实际 - 目标）；被取消时返回 None
         """
-        logger.info(f"开始倒计时，目标时间: {self.target_time}, 补偿: {self.network_compensation}ms")
-
-        while not self._cancelled:
-            remaining = self.target_timestamp - time.time()
-
-            if remaining <= 0:
-                logger.info("倒计时结束，触发执行")
-                break
-
-            # 回调进度
-            if progress_callback:
-                try:
-                    await progress_callback(remaining)
-                except Exception as e:
-                    logger.error(f"进度回调异常: {e}")
-
-            # 根据剩余时间动态调整睡眠间隔
-            sleep_interval = self._calculate_sleep_interval(remaining)
-            await asyncio.sleep(sleep_interval)
-
-        # 触发回调
-        if not self._cancelled and self.callback:
-            try:
-                if asyncio.iscoroutinefunction(self.callback):
-                    await self.callback()
-                else:
-                    self.callback()
-            except Exception as e:
-                logger.error(f"定时器回调异常: {e}")
-
-    def _calculate_sleep_interval(self, remaining: float) -> float:
+        if self.mode == TimerMode.HYBRID:
+            # 粗粒度睡眠到保护窗口
+            remaining_ns = self.remaining_ns() - self.guard_window_ns
+            if remaining_ns > 0:
+                await asyncio.sleep(remaining_ns / 1e9)
+                self.wakeup_lateness_ns = max(0, self.guard_window_ns - self.remaining_ns())
+                metrics.timer_wakeup_lateness.observe(self.wakeup_lateness_ns / 1e9)
+
+            # 保护窗口内：只让出事件循环，不依赖睡眠定时器
+            while not self._cancelled and self.remaining_ns() > self.spin_window_ns:
+                await asyncio.sleep(0)
+
+            # 自旋窗口内：忙等到目标时刻
+            deadline_ns = self.deadline_ns
+            while not self._cancelled and time.monotonic_ns() < deadline_ns:
+                pass
+        else:
+            remaining_ns = self.remaining_ns()
+            if remaining_ns > 0:
+                await asyncio.sleep(remaining_ns / 1e9)
+
+        if self._cancelled:
+            return None
+
+        self.firing_error_ns = time.monotonic_ns() - self.deadline_ns
+        metrics.firing_error.observe(abs(self.firing_error_ns) / 1e9)
+        return self.firing_error_ns
+
+    @staticmethod
+    def calculate_sleep_interval(remaining: float) -> float:
         """
         根据剩余时间计算睡眠间隔（与原逻辑一致）
 
@@ -88,11 +142,11 @@ class PrecisionTimer:
             return 0.01  # 最后 0.5 秒内，每 0.01 秒检查一次（10ms 精度）
 
     def cancel(self):
-        """取消定时器"""
+        """取消定时器（等待中的触发协程由运行时取消）"""
         self._cancelled = True
         logger.info("定时器已取消")
 
     @property
     def remaining_seconds(self) -> float:
         """获取剩余秒数"""
-        return max(0, self.target_timestamp - time.time())
+        return max(0, self.remaining_ns() / 1e9)
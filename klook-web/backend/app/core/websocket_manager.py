@@ -1,68 +1,366 @@
-"""WebSocket 连接管理器"""
-from typing import Dict, Set
+"""WebSocket 连接管理器
 
+连接按主题订阅：/api/ws/tasks/{task_id} 的连接固定订阅单个任务，
+/api/ws 的多路复用连接可以订阅任意多个任务以及全局频道。
+每个连接有独立的有界发送队列和写协程，广播时消息只序列化一次后入队，
+调用方不等待任何连接的 socket 写入，个别卡住的客户端不影响其他订阅者。
+队列积压时按消息类型处理：
+- 倒计时帧：同一任务只保留最新一帧（合并），统计帧同理
+- 任务的终态消息（带 task_id 的 success / failed / cancelled / error）：保证送达，不丢弃，不计入队列上限；
+  发给单个连接的协议错误（不带 task_id 的 error）按普通消息处理
+- 其他消息：队列满时丢弃最旧的可丢弃消息
+
+任务消息同时记入该任务的回放缓冲（最近 N 条事件 + 最新倒计时），
+订阅任务时先收到一帧 snapshot（当前状态和最近事件），不必再查询日志表；任务结束后缓冲短暂保留再丢弃。
+"""
+import asyncio
+import json
+import time
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Optional
+
+from app.core.config import settings
+from app.core.metrics import metrics
 from fastapi import WebSocket
 from loguru import logger
 
+# 可合并的消息类型：新帧替换队列中同类型（同一任务）尚未发送的旧帧
+COALESCE_TYPES = frozenset({"countdown", "stats"})
+# 任务结束的消息类型（之后回放缓冲只再保留 ws_replay_linger 秒）
+ENDED_TYPES = frozenset({"success", "failed", "cancelled", "error"})
+# 保证送达的消息类型：任务的结束消息（客户端据此停止倒计时、刷新任务状态）
+GUARANTEED_TYPES = ENDED_TYPES
 
-class ConnectionManager:
-    """管理 WebSocket 连接"""
 
-    def __init__(self):
-        # 存储所有活跃连接：{task_id: Set[WebSocket]}
-        self.active_connections: Dict[int, Set[WebSocket]] = {}
+class Frame:
+    """序列化后的出站消息，同一次广播的所有连接共享"""
+    __slots__ = ("type", "task_id", "text", "created_ns")
 
-    async def connect(self, websocket: WebSocket, task_id: int):
-        """接受新连接"""
-        await websocket.accept()
+    def __init__(self, message: dict):
+        self.type = message.get("type")
+        self.task_id = message.get("task_id")
+        self.created_ns = time.perf_counter_ns()
+        # 与 WebSocket.send_json 的序列化方式一致
+        self.text = json.dumps(message, separators=(",", ":"), ensure_ascii=False)
 
-        if task_id not in self.active_connections:
-            self.active_connections[task_id] = set()
+    @property
+    def coalescable(self) -> bool:
+        return self.type in COALESCE_TYPES
 
-        self.active_connections[task_id].add(websocket)
-        logger.info(f"WebSocket 连接建立: task_id={task_id}, 连接数={len(self.active_connections[task_id])}")
+    @property
+    def guaranteed(self) -> bool:
+        # 只保证任务消息；客户端发错帧时回复的协议错误不带 task_id，计入队列上限，不会无限积压
+        return self.task_id is not None and self.type in GUARANTEED_TYPES
 
-    def disconnect(self, websocket: WebSocket, task_id: int):
-        """断开连接"""
-        if task_id in self.active_connections:
-            self.active_connections[task_id].discard(websocket)
 
-            # 如果该任务没有连接了，删除记录
-            if not self.active_connections[task_id]:
-                del self.active_connections[task_id]
+class ClientConnection:
+    """单个 WebSocket 连接：有界发送队列 + 写协程"""
 
-            logger.info(f"WebSocket 连接断开: task_id={task_id}")
+    def __init__(self, websocket: WebSocket, max_queue: int, on_error=None):
+        """
+        Args:
+            websocket: 已接受的 WebSocket 连接
+            max_queue: 可丢弃消息的队列上限
+            on_error: 发送失败时的回调（用于从管理器中移除连接）
+        """
+        self.websocket = websocket
+        self.max_queue = max_queue
+        self.dropped = 0  # 被丢弃或合并的消息数
+        self.topics: set[str] = set()  # 已订阅的主题
+        self._on_error = on_error
+        self._queue: deque[Frame] = deque()
+        self._droppable = 0  # 队列中可丢弃消息的数量
+        self._ready = asyncio.Event()
+        self._closed = False
+        self._writer = asyncio.create_task(self._write_loop())
 
-    async def send_message(self, task_id: int, message: dict):
-        """发送消息给指定任务的所有连接"""
-        if task_id not in self.active_connections:
+    def enqueue(self, frame: Frame):
+        """消息入队（不阻塞）"""
+        if self._closed:
+            return
+
+        if frame.coalescable:
+            for index, queued in enumerate(self._queue):
+                if queued.coalescable and queued.task_id == frame.task_id:
+                    self._queue[index] = frame
+                    self.dropped += 1
+                    return
+
+        if not frame.guaranteed:
+            if self._droppable >= self.max_queue:
+                self._drop_oldest()
+            self._droppable += 1
+
+        self._queue.append(frame)
+        self._ready.set()
+
+    def _drop_oldest(self):
+        for queued in self._queue:
+            if not queued.guaranteed:
+                self._queue.remove(queued)
+                self._droppable -= 1
+                self.dropped += 1
+                return
+
+    @property
+    def pending(self) -> int:
+        return len(self._queue)
+
+    def close(self):
+        """停止写协程，丢弃未发送的消息"""
+        if self._closed:
             return
+        self._closed = True
+        self._queue.clear()
+        if self._writer is not asyncio.current_task():
+            self._writer.cancel()
+
+    async def _write_loop(self):
+        while True:
+            while not self._queue:
+                self._ready.clear()
+                await self._ready.wait()
 
-        # 移除断开的连接
-        disconnected = set()
+            frame = self._queue.popleft()
+            if not frame.guaranteed:
+                self._droppable -= 1
 
-        for connection in self.active_connections[task_id]:
             try:
-                await connection.send_json(message)
+                await self.websocket.send_text(frame.text)
+                metrics.ws_fanout.observe((time.perf_counter_ns() - frame.created_ns) / 1e9)
             except Exception as e:
                 logger.error(f"发送消息失败: {e}")
-                disconnected.add(connection)
+                self.close()
+                if self._on_error is not None:
+                    self._on_error(self)
+                return
+
+
+class TaskReplay:
+    """单个任务的回放缓冲：最近的事件（不含倒计时帧）、最新的倒计时和由事件推出的当前状态"""
+    __slots__ = ("events", "status", "target_time", "retry_count", "remaining", "remaining_at", "ended")
+
+    def __init__(self, size: int):
+        # (记录时刻, 消息)
+        self.events: deque[tuple[str, dict]] = deque(maxlen=size)
+        self.status: Optional[str] = None
+        self.target_time: Optional[str] = None
+        self.retry_count = 0
+        self.remaining: Optional[float] = None
+        self.remaining_at = 0.0
+        self.ended = False
+
+    def record(self, message: dict):
+        message_type = message.get("type")
+        if message_type == "countdown":
+            # 倒计时帧只保留最新一帧
+            self.remaining = message.get("remaining")
+            self.remaining_at = time.monotonic()
+            return
+
+        self.events.append((datetime.now().isoformat(timespec="milliseconds"), message))
+        if message_type in ("task_started", "rescheduled"):
+            self.status = "countdown"
+            self.target_time = message.get("target_time")
+            # 改期前的倒计时帧已经过时
+            self.remaining = None
+        else:
+            self.status = message_type
+            if message_type == "retry":
+                self.retry_count = message.get("retry_count", self.retry_count)
+        if message_type in ENDED_TYPES:
+            self.ended = True
+
+    def snapshot(self, task_id: int) -> dict:
+        remaining = None
+        if self.status == "countdown":
+            if self.remaining is not None:
+                remaining = max(0.0, self.remaining - (time.monotonic() - self.remaining_at))
+            elif self.target_time is not None:
+                remaining = max(0.0, (datetime.fromisoformat(self.target_time) - datetime.now()) / timedelta(seconds=1))
+        return {
+            "type": "snapshot",
+            "task_id": task_id,
+            "status": self.status,
+            "target_time": self.target_time,
+            "remaining": remaining,
+            "retry_count": self.retry_count,
+            "ended": self.ended,
+            "events": [{**message, "at": at} for at, message in self.events]
+        }
+
+
+def task_topic(task_id: int) -> str:
+    """单个任务的订阅主题"""
+    return f"task:{task_id}"
+
+
+# 全局频道：所有任务的推送消息 / 任务统计
+TASKS_CHANNEL = "tasks"
+STATS_CHANNEL = "stats"
+CHANNELS = frozenset({TASKS_CHANNEL, STATS_CHANNEL})
+
+
+class ConnectionManager:
+    """管理 WebSocket 连接
+
+    连接与主题（task:{id} / tasks / stats）分离：一个连接可以订阅任意多个主题，
+    主题到订阅者的索引保证推送时只遍历相关连接。
+    """
 
-        # 清理断开的连接
-        for connection in disconnected:
-            self.disconnect(connection, task_id)
+    def __init__(self, max_queue: Optional[int] = None):
+        """
+        Args:
+            max_queue: 每个连接可丢弃消息的队列上限，默认取配置 ws_send_queue_size
+        """
+        self.max_queue = max_queue or settings.ws_send_queue_size
+        # 所有活跃连接：{WebSocket: ClientConnection}
+        self.connections: Dict[WebSocket, ClientConnection] = {}
+        # 主题索引：{topic: {WebSocket: ClientConnection}}
+        self.topics: Dict[str, Dict[WebSocket, ClientConnection]] = {}
+        # 转发模式（独立执行器进程）：消息不在本进程推送，交给 relay(task_id, topic, message) 转发到 API 进程
+        self.relay: Optional[Callable[[Optional[int], Optional[str], dict], None]] = None
+        # 任务回放缓冲：{task_id: TaskReplay}
+        self.replays: Dict[int, TaskReplay] = {}
+
+    async def connect(self, websocket: WebSocket, task_id: Optional[int] = None):
+        """接受新连接，指定 task_id 时同时订阅该任务"""
+        await websocket.accept()
+
+        self.connections[websocket] = ClientConnection(
+            websocket,
+            self.max_queue,
+            on_error=lambda connection: self.disconnect(connection.websocket)
+        )
+        if task_id is not None:
+            self.subscribe(websocket, task_topic(task_id))
+            logger.info(f"WebSocket 连接建立: task_id={task_id}, 连接数={self.get_connection_count(task_id)}")
+        else:
+            logger.info(f"WebSocket 连接建立: 总连接数={len(self.connections)}")
+
+    def disconnect(self, websocket: WebSocket, task_id: Optional[int] = None):
+        """断开连接，退订其全部主题"""
+        connection = self.connections.pop(websocket, None)
+        if connection is None:
+            return
+        connection.close()
+
+        for topic in connection.topics:
+            subscribers = self.topics.get(topic)
+            if subscribers is not None:
+                subscribers.pop(websocket, None)
+                # 如果该主题没有订阅者了，删除记录
+                if not subscribers:
+                    del self.topics[topic]
+        connection.topics.clear()
+
+        logger.info(f"WebSocket 连接断开: task_id={task_id}" if task_id is not None else "WebSocket 连接断开")
+
+    def subscribe(self, websocket: WebSocket, topic: str) -> bool:
+        """订阅主题"""
+        connection = self.connections.get(websocket)
+        if connection is None:
+            return False
+        self.topics.setdefault(topic, {})[websocket] = connection
+        connection.topics.add(topic)
+        return True
+
+    def unsubscribe(self, websocket: WebSocket, topic: str):
+        """退订主题"""
+        connection = self.connections.get(websocket)
+        if connection is not None:
+            connection.topics.discard(topic)
+        subscribers = self.topics.get(topic)
+        if subscribers is not None:
+            subscribers.pop(websocket, None)
+            if not subscribers:
+                del self.topics[topic]
+
+    async def send_message(self, task_id: int, message: dict):
+        """发送任务消息给该任务和全部任务频道的订阅者（只入队，不等待发送完成）"""
+        if self.relay is not None:
+            self.relay(task_id, None, message)
+            return
+
+        if settings.ws_replay_size > 0:
+            self._record(task_id, message)
+
+        subscribers = self.topics.get(task_topic(task_id))
+        everyone = self.topics.get(TASKS_CHANNEL)
+        if not subscribers and not everyone:
+            return
+
+        frame = Frame(message)
+        if subscribers:
+            for connection in list(subscribers.values()):
+                connection.enqueue(frame)
+        if everyone:
+            for websocket, connection in list(everyone.items()):
+                # 同时订阅了该任务的连接已经收到
+                if not subscribers or websocket not in subscribers:
+                    connection.enqueue(frame)
+
+    async def publish(self, topic: str, message: dict):
+        """发送消息给主题的订阅者"""
+        if self.relay is not None:
+            self.relay(None, topic, message)
+            return
+
+        subscribers = self.topics.get(topic)
+        if not subscribers:
+            return
+
+        frame = Frame(message)
+        for connection in list(subscribers.values()):
+            connection.enqueue(frame)
+
+    def _record(self, task_id: int, message: dict):
+        """记入任务的回放缓冲，任务结束时安排丢弃"""
+        replay = self.replays.get(task_id)
+        if replay is None or (replay.ended and message.get("type") == "task_started"):
+            replay = self.replays[task_id] = TaskReplay(settings.ws_replay_size)
+        was_ended = replay.ended
+        replay.record(message)
+        if replay.ended and not was_ended:
+            asyncio.get_running_loop().call_later(settings.ws_replay_linger, self._evict, task_id, replay)
+
+    def _evict(self, task_id: int, replay: TaskReplay):
+        # 期间任务重新启动时缓冲已被替换
+        if self.replays.get(task_id) is replay:
+            del self.replays[task_id]
+
+    async def send_replay(self, websocket: WebSocket, task_id: int):
+        """向刚订阅任务的连接发送回放快照（没有缓冲时不发送）"""
+        replay = self.replays.get(task_id)
+        if replay is not None:
+            await self.send_personal(websocket, replay.snapshot(task_id))
+
+    async def send_personal(self, websocket: WebSocket, message: dict):
+        """发送消息给单个连接（与广播消息共用发送队列，保证顺序）"""
+        connection = self.connections.get(websocket)
+        if connection is not None:
+            connection.enqueue(Frame(message))
 
     async def broadcast(self, message: dict):
         """广播消息给所有连接"""
-        for task_id in list(self.active_connections.keys()):
-            await self.send_message(task_id, message)
+        frame = Frame(message)
+        for connection in list(self.connections.values()):
+            connection.enqueue(frame)
+
+    def wants(self, task_id: int) -> bool:
+        """是否需要推送该任务的消息（转发模式下订阅者在 API 进程中，总是需要）"""
+        return self.relay is not None or self.get_connection_count(task_id) > 0
+
+    def get_subscriber_count(self, topic: str) -> int:
+        return len(self.topics.get(topic, {}))
 
     def get_connection_count(self, task_id: int = None) -> int:
-        """获取连接数"""
+        """获取连接数（指定任务时为会收到该任务消息的订阅者数）"""
         if task_id is not None:
-            return len(self.active_connections.get(task_id, set()))
+            return self.get_subscriber_count(task_topic(task_id)) + self.get_subscriber_count(TASKS_CHANNEL)
 
-        return sum(len(connections) for connections in self.active_connections.values())
+        return len(self.connections)
 
 
 # 全局 WebSocket 管理器实例
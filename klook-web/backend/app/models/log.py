@@ -1,6 +1,7 @@
 """日志相关数据模型"""
 from datetime import datetime
 from enum import Enum
+from typing import Optional
 
 from pydantic import BaseModel, Field
 
@@ -39,3 +40,4 @@ class LogListResponse(BaseModel):
     """日志列表响应模型"""
     total: int = Field(..., description="总数")
     logs: list[LogResponse] = Field(..., description="日志列表")
+    next_cursor: Optional[str] = Field(None, description="下一页游标（没有更多数据时为空）")
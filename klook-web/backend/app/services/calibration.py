@@ -0,0 +1,168 @@
+"""网络补偿校准
+
+用若干次轻量请求测量到 Klook 的往返时间（RTT）和服务器时钟相对本机的偏移，
+计算推荐的网络延迟补偿：请求需要在服务器时钟到达目标时刻时到达，
+因此补偿 = 时钟偏移（服务器 - 本机）+ 单程延迟（RTT / 2）。
+
+HTTP Date 头只有秒级精度：每次采样只能确定服务器处理请求的时刻落在 [Date, Date + 1)，
+而本机对应时刻落在 [发送, 收到响应]，由此得到时钟偏移的一个区间。
+后续采样把发送时刻对齐到"按当前估计服务器恰好跨过整秒"的位置，每次采样把区间大致减半。
+"""
+import asyncio
+import statistics
+import time
+from email.utils import parsedate_to_datetime
+from typing import Optional
+
+from app.core.klook_client import KlookClient
+from loguru import logger
+
+# 发送时刻对齐时预留的调度余量（秒）
+SCHEDULE_SLACK = 0.01
+
+
+class ClockSample:
+    """一次采样：本机发送 / 收到时刻与服务器 Date（均为墙上时间戳，秒）"""
+    __slots__ = ("sent_at", "received_at", "server_date")
+
+    def __init__(self, sent_at: float, received_at: float, server_date: Optional[float]):
+        self.sent_at = sent_at
+        self.received_at = received_at
+        self.server_date = server_date
+
+    @property
+    def rtt(self) -> float:
+        return self.received_at - self.sent_at
+
+    @property
+    def offset_bounds(self) -> Optional[tuple[float, float]]:
+        """时钟偏移（服务器 - 本机）的区间；没有 Date 头时为 None"""
+        if self.server_date is None:
+            return None
+        return self.server_date - self.received_at, self.server_date + 1 - self.sent_at
+
+
+class CalibrationResult:
+    """校准结果（时间单位：秒；推荐值与置信区间单位：毫秒）"""
+
+    def __init__(self, samples: list[ClockSample]):
+        self.samples = samples
+        rtts = [sample.rtt for sample in samples]
+        self.rtt_median = statistics.median(rtts)
+        self.rtt_min = min(rtts)
+        self.rtt_max = max(rtts)
+
+        # 各采样偏移区间的交集；网络抖动导致区间不相交时取冲突边界之间的范围
+        bounds = [sample.offset_bounds for sample in samples if sample.offset_bounds is not None]
+        self.offset_low: Optional[float] = None
+        self.offset_high: Optional[float] = None
+        self.consistent = True
+        if bounds:
+            low = max(bound[0] for bound in bounds)
+            high = min(bound[1] for bound in bounds)
+            if low > high:
+                low, high = high, low
+                self.consistent = False
+            self.offset_low, self.offset_high = low, high
+
+    @property
+    def offset(self) -> Optional[float]:
+        if self.offset_low is None:
+            return None
+        return (self.offset_low + self.offset_high) / 2
+
+    @property
+    def recommended_ms(self) -> float:
+        """推荐补偿：时钟偏移区间中点 + RTT 中位数的一半；没有 Date 头时只补偿单程延迟"""
+        return ((self.offset or 0.0) + self.rtt_median / 2) * 1000
+
+    @property
+    def interval_ms(self) -> tuple[float, float]:
+        """推荐补偿的置信区间：偏移区间上下界分别加上采样到的最小 / 最大单程延迟"""
+        offset_low = self.offset_low if self.offset_low is not None else 0.0
+        offset_high = self.offset_high if self.offset_high is not None else 0.0
+        return (offset_low + self.rtt_min / 2) * 1000, (offset_high + self.rtt_max / 2) * 1000
+
+    def as_dict(self) -> dict:
+        """记录到任务结果 / 接口响应的摘要（毫秒）"""
+        low, high = self.interval_ms
+        return {
+            "recommended_ms": round(self.recommended_ms, 3),
+            "ci_low_ms": round(low, 3),
+            "ci_high_ms": round(high, 3),
+            "clock_offset_ms": round(self.offset * 1000, 3) if self.offset is not None else None,
+            "rtt_median_ms": round(self.rtt_median * 1000, 3),
+            "consistent": self.consistent,
+            "samples": [
+                {
+                    "sent_at": sample.sent_at,
+                    "rtt_ms": round(sample.rtt * 1000, 3),
+                    "server_date": sample.server_date
+                }
+                for sample in self.samples
+            ]
+        }
+
+
+def _parse_date(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        return parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+
+def _next_send_at(samples: list[ClockSample], now: float) -> float:
+    """下一次发送时刻：按当前估计，服务器处理该请求时恰好跨过整秒"""
+    result = CalibrationResult(samples)
+    if result.offset is None:
+        return now
+    lead = result.offset + result.rtt_median / 2
+    # 服务器处理时刻 ≈ 发送时刻 + lead，取不早于 now 的最近整秒
+    second = int(now + SCHEDULE_SLACK + lead) + 1
+    return second - lead
+
+
+async def calibrate(
+        client: KlookClient,
+        max_samples: int,
+        deadline: Optional[float] = None
+) -> Optional[CalibrationResult]:
+    """
+    采样并计算推荐补偿（调用前应已建立连接，避免握手计入 RTT）
+
+    Args:
+        client: Klook 客户端
+        max_samples: 采样次数上限
+        deadline: 必须完成的时刻（事件循环单调时钟），时间不足时提前结束
+
+    Returns:
+        校准结果；没有成功的采样时返回 None
+    """
+    loop = asyncio.get_running_loop()
+    samples: list[ClockSample] = []
+
+    for _ in range(max_samples):
+        send_at = _next_send_at(samples, time.time()) if samples else time.time()
+        wait = max(0.0, send_at - time.time())
+        expected_rtt = statistics.median(sample.rtt for sample in samples) if samples else 0.0
+        if deadline is not None and loop.time() + wait + 2 * expected_rtt + SCHEDULE_SLACK > deadline:
+            break
+
+        await asyncio.sleep(wait)
+        try:
+            sent_at, received_at, date = await client.probe_clock()
+        except Exception as e:
+            logger.warning(f"校准采样失败: {e!r}")
+            continue
+        samples.append(ClockSample(sent_at, received_at, _parse_date(date)))
+
+        # 偏移区间已经窄于 RTT 抖动时，继续采样意义不大
+        result = CalibrationResult(samples)
+        if result.offset is not None and result.offset_high - result.offset_low < (result.rtt_max - result.rtt_min) / 2:
+            break
+
+    if not samples:
+        return None
+    return CalibrationResult(samples)
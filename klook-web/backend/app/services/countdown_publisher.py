@@ -0,0 +1,137 @@
+"""倒计时进度推送
+
+定时器不再逐次回调推送进度，只登记各任务的截止时间；推送协程按固定的界面刷新率
+合并发送倒计时帧（中间值直接跳过）。任务进入触发窗口后暂停该任务的推送，
+直到其触发完成，保证触发的关键路径上没有该任务的 WebSocket I/O；其他任务照常推送。
+"""
+import asyncio
+import time
+from typing import Optional
+
+from app.core.config import settings
+from app.core.timer import PrecisionTimer
+from app.core.websocket_manager import websocket_manager
+from loguru import logger
+
+# 目标时刻之后仍未被移除的倒计时视为残留（触发事件已丢弃），超过该时长（秒）后不再跟踪
+QUIET_GUARD = 1.0
+
+
+class _Countdown:
+    """单个任务的倒计时状态"""
+    __slots__ = ("deadline", "quiet_at", "next_publish")
+
+    def __init__(self, deadline: float, quiet_at: float):
+        self.deadline = deadline  # 目标时刻（单调时钟秒）
+        self.quiet_at = quiet_at  # 触发窗口打开时刻，此后不再推送
+        self.next_publish = 0.0  # 下次推送时刻
+
+
+class CountdownPublisher:
+    """按界面刷新率合并推送倒计时帧"""
+
+    def __init__(self, rate_hz: Optional[float] = None):
+        """
+        Args:
+            rate_hz: 单个任务的最高推送频率，默认取配置 countdown_publish_hz
+        """
+        self.rate_hz = rate_hz or settings.countdown_publish_hz
+        self._countdowns: dict[int, _Countdown] = {}
+        self._wakeup: Optional[asyncio.Event] = None
+        self._runner: Optional[asyncio.Task] = None
+
+    def track(self, task_id: int, deadline: float, quiet_at: float):
+        """
+        登记任务倒计时
+
+        Args:
+            task_id: 任务 ID
+            deadline: 目标时刻（单调时钟秒）
+            quiet_at: 触发窗口打开时刻（单调时钟秒）
+        """
+        self._countdowns[task_id] = _Countdown(deadline, quiet_at)
+        self._ensure_runner()
+        self._wakeup.set()
+
+    def untrack(self, task_id: int):
+        """任务已触发或取消，停止推送"""
+        if self._countdowns.pop(task_id, None) is not None and self._wakeup is not None:
+            self._wakeup.set()
+
+    def remaining(self, task_id: int) -> Optional[float]:
+        countdown = self._countdowns.get(task_id)
+        if countdown is None:
+            return None
+        return max(0.0, countdown.deadline - time.monotonic())
+
+    def __contains__(self, task_id: int) -> bool:
+        return task_id in self._countdowns
+
+    # ---- 生命周期 ----
+
+    def _ensure_runner(self):
+        if self._runner is None or self._runner.done():
+            self._wakeup = asyncio.Event()
+            self._runner = asyncio.create_task(self._run())
+
+    async def stop(self):
+        self._countdowns.clear()
+        runner, self._runner = self._runner, None
+        if runner is not None:
+            runner.cancel()
+            try:
+                await runner
+            except asyncio.CancelledError:
+                pass
+
+    # ---- 推送循环 ----
+
+    async def _run(self):
+        min_interval = 1 / self.rate_hz
+        while self._countdowns:
+            now = time.monotonic()
+            wake_at = float("inf")
+
+            for task_id, countdown in list(self._countdowns.items()):
+                if countdown.quiet_at <= now:
+                    # 处于触发窗口内：暂停该任务的推送，等待其触发完成后被移除
+                    expires_at = countdown.deadline + QUIET_GUARD
+                    if expires_at <= now:
+                        # 推送期间任务可能已被重新登记
+                        if self._countdowns.get(task_id) is countdown:
+                            del self._countdowns[task_id]
+                    else:
+                        wake_at = min(wake_at, expires_at)
+                    continue
+
+                remaining = countdown.deadline - now
+                if countdown.next_publish <= now:
+                    # 远离目标时刻时沿用原有的稀疏间隔，临近时不超过界面刷新率
+                    countdown.next_publish = now + max(min_interval, PrecisionTimer.calculate_sleep_interval(remaining))
+                    if websocket_manager.wants(task_id):
+                        await self._publish(task_id, remaining)
+                wake_at = min(wake_at, countdown.next_publish, countdown.quiet_at)
+
+            if not self._countdowns:
+                break
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), max(0.0, wake_at - time.monotonic()))
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    @staticmethod
+    async def _publish(task_id: int, remaining: float):
+        try:
+            await websocket_manager.send_message(task_id, {
+                "type": "countdown",
+                "task_id": task_id,
+                "remaining": remaining,
+                "message": f"剩余 {remaining:.3f} 秒"
+            })
+        except Exception as e:
+            logger.error(f"任务 {task_id} 倒计时推送异常: {e}")
+
+
+# 全局倒计时推送实例
+countdown_publisher = CountdownPublisher()
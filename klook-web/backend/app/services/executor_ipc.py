@@ -0,0 +1,363 @@
+"""执行器进程与 API 工作进程之间的 IPC（Unix 套接字，每行一个 JSON 消息）
+
+拆分部署时由独立执行器进程（python executor.py）持有租约、登记和触发任务，
+任意数量的 API 工作进程经本地 Unix 套接字与其通信：
+
+- call / reply: API 进程调用执行器（启动 / 取消 / 改期任务、状态、运行指标、日志归档），按 id 匹配应答
+- ws: 执行器推送的 WebSocket 消息，由每个 API 进程分发给本进程的连接
+- sync: 进程内缓存的变更（见 app/core/cache_sync.py），执行器应用后转发给其他 API 进程
+
+API 进程与执行器断开期间调用直接失败（不排队），重连后丢弃本进程的缓存重新加载。
+"""
+import asyncio
+import json
+import os
+from datetime import datetime
+from typing import Optional
+
+from app.core.cache_sync import cache_sync
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.core.websocket_manager import websocket_manager
+from loguru import logger
+
+# 单条消息的长度上限（字节）
+MESSAGE_LIMIT = 16 * 1024 * 1024
+# 单个 API 进程未发出的字节上限，超出时断开该连接（API 进程重连后重新加载缓存）
+PEER_BUFFER_LIMIT = 8 * 1024 * 1024
+# API 进程重连间隔（秒）
+RECONNECT_DELAY = 0.5
+
+
+class ExecutorUnavailable(Exception):
+    """执行器进程未连接或调用超时"""
+
+
+def _encode(message: dict) -> bytes:
+    return json.dumps(message, separators=(",", ":"), ensure_ascii=False).encode() + b"\n"
+
+
+# ---- 执行器进程 ----
+
+class _Peer:
+    """一个已连接的 API 进程"""
+    __slots__ = ("writer", "name")
+
+    def __init__(self, writer: asyncio.StreamWriter, name: str):
+        self.writer = writer
+        self.name = name
+
+    def send(self, data: bytes) -> bool:
+        """写入发送缓冲（不等待），积压过多时断开并返回 False"""
+        if self.writer.is_closing():
+            return False
+        if self.writer.transport.get_write_buffer_size() > PEER_BUFFER_LIMIT:
+            logger.warning(f"API 进程 {self.name} 积压过多，断开连接")
+            self.writer.close()
+            return False
+        self.writer.write(data)
+        return True
+
+
+class ExecutorServer:
+    """执行器进程的 IPC 服务端"""
+
+    def __init__(self, executor, lease, path: Optional[str] = None):
+        """
+        Args:
+            executor: 本进程的 TaskExecutor
+            lease: 本进程持有的 ExecutorLease
+            path: Unix 套接字路径，默认取配置 executor_socket
+        """
+        self.executor = executor
+        self.lease = lease
+        self.path = path or settings.executor_socket
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._peers: set[_Peer] = set()
+
+    async def start(self):
+        """监听套接字，并把 WebSocket 推送和缓存变更改为转发给 API 进程"""
+        # 上一个持有者异常退出时遗留的套接字文件
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        self._server = await asyncio.start_unix_server(self._handle, self.path, limit=MESSAGE_LIMIT)
+        websocket_manager.relay = self._relay_ws
+        # 回放缓冲由 API 进程各自记录
+        websocket_manager.replays.clear()
+        cache_sync.attach(self._relay_sync)
+        logger.info(f"执行器 IPC 已监听: {self.path}")
+
+    async def stop(self):
+        websocket_manager.relay = None
+        cache_sync.detach()
+        if self._server is not None:
+            self._server.close()
+            for peer in list(self._peers):
+                peer.writer.close()
+            await self._server.wait_closed()
+            self._server = None
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+    @property
+    def peer_count(self) -> int:
+        return len(self._peers)
+
+    def _broadcast(self, message: dict, exclude: Optional[_Peer] = None):
+        if not self._peers:
+            return
+        data = _encode(message)
+        for peer in list(self._peers):
+            if peer is not exclude:
+                peer.send(data)
+
+    def _relay_ws(self, task_id: Optional[int], topic: Optional[str], message: dict):
+        self._broadcast({"t": "ws", "task_id": task_id, "topic": topic, "message": message})
+
+    def _relay_sync(self, kind: str, args: list):
+        self._broadcast({"t": "sync", "kind": kind, "args": args})
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        peer = _Peer(writer, f"#{id(writer) & 0xffff:04x}")
+        self._peers.add(peer)
+        peer.send(_encode({"t": "hello", "owner": self.lease.owner, "pid": os.getpid()}))
+        logger.info(f"API 进程 {peer.name} 已连接，共 {len(self._peers)} 个")
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                # 单条消息处理失败不影响该连接上的后续消息
+                try:
+                    self._dispatch(peer, json.loads(line))
+                except Exception as e:
+                    logger.error(f"处理 API 进程 {peer.name} 的消息失败: {e!r}")
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError) as e:
+            logger.warning(f"API 进程 {peer.name} 连接异常: {e!r}")
+        except Exception as e:
+            logger.error(f"API 进程 {peer.name} 连接处理异常: {e!r}")
+        finally:
+            self._peers.discard(peer)
+            writer.close()
+            logger.info(f"API 进程 {peer.name} 已断开，剩余 {len(self._peers)} 个")
+
+    def _dispatch(self, peer: _Peer, message: dict):
+        kind = message.get("t")
+        if kind == "call":
+            asyncio.create_task(self._reply(peer, message))
+        elif kind == "sync":
+            # 先转发：本进程应用失败不影响其他 API 进程
+            self._broadcast(message, exclude=peer)
+            _apply_sync(message)
+
+    async def _reply(self, peer: _Peer, message: dict):
+        try:
+            result = await self._call(message["op"], **message.get("args", {}))
+            reply = {"t": "reply", "id": message["id"], "result": result}
+        except Exception as e:
+            logger.error(f"执行器调用 {message.get('op')} 失败: {e}")
+            reply = {"t": "reply", "id": message["id"], "error": str(e)}
+        peer.send(_encode(reply))
+
+    async def _call(self, op: str, **args):
+        from app.services.log_retention import log_retention
+        from app.storage.database import read_session_maker
+
+        if not self.lease.valid():
+            raise RuntimeError("执行器租约已失效")
+        if op == "start":
+            async with read_session_maker() as db:
+                return await self.executor.start_task(args["task_id"], db)
+        if op == "cancel":
+            await self.executor.cancel_task(args["task_id"])
+            return True
+        if op == "reschedule":
+            changes = args["changes"]
+            if changes.get("target_time") is not None:
+                changes["target_time"] = datetime.fromisoformat(changes["target_time"])
+            return await self.executor.reschedule(args["task_id"], changes)
+        if op == "status":
+            return {**self.executor.status(), "loop_lag": metrics.loop_lag.snapshot(), "owner": self.lease.owner,
+                    "lease_valid_for": round(self.lease.remaining(), 3), "api_processes": len(self._peers)}
+        if op == "metrics":
+            return metrics.samples("executor") if metrics.enabled else {}
+        if op == "retention.status":
+            return await log_retention.status()
+        if op == "retention.run":
+            return await log_retention.run_once()
+        if op == "retention.delete_all":
+            return await log_retention.delete_all()
+        raise ValueError(f"未知的执行器调用: {op}")
+
+
+# ---- API 工作进程 ----
+
+class RemoteTaskExecutor:
+    """API 工作进程中的执行器客户端，与 TaskExecutor 的接口一致"""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or settings.executor_socket
+        self.executor_pid: Optional[int] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._pending: dict[int, asyncio.Future] = {}
+        self._next_id = 0
+        self._runner: Optional[asyncio.Task] = None
+
+    @property
+    def connected(self) -> bool:
+        return self._writer is not None and not self._writer.is_closing()
+
+    # ---- 生命周期 ----
+
+    def start(self):
+        """在后台连接执行器进程（断开后自动重连）"""
+        if self._runner is None or self._runner.done():
+            self._runner = asyncio.create_task(self._run())
+
+    async def stop(self):
+        runner, self._runner = self._runner, None
+        if runner is not None:
+            runner.cancel()
+            try:
+                await runner
+            except asyncio.CancelledError:
+                pass
+
+    async def restore(self) -> dict:
+        """触发计划由执行器进程在获取租约后恢复"""
+        return {"restored": 0, "missed": 0}
+
+    async def _run(self):
+        announced = False
+        while True:
+            try:
+                reader, writer = await asyncio.open_unix_connection(self.path, limit=MESSAGE_LIMIT)
+            except OSError as e:
+                if not announced:
+                    logger.warning(f"无法连接执行器进程（{self.path}）: {e}，稍后重试")
+                    announced = True
+                await asyncio.sleep(RECONNECT_DELAY)
+                continue
+
+            announced = False
+            self._writer = writer
+            try:
+                # 断开期间其他进程的变更没有送达，丢弃本进程缓存
+                _reset_local_caches()
+                cache_sync.attach(self._send_sync)
+                await self._read_loop(reader)
+            except (ConnectionError, asyncio.IncompleteReadError, ValueError) as e:
+                logger.warning(f"执行器连接异常: {e!r}")
+            except Exception as e:
+                # 任何异常都只断开本次连接，重连循环不退出
+                logger.error(f"执行器连接处理异常: {e!r}")
+            finally:
+                cache_sync.detach()
+                self._writer = None
+                writer.close()
+                for future in self._pending.values():
+                    if not future.done():
+                        future.set_exception(ExecutorUnavailable("执行器连接已断开"))
+                self._pending.clear()
+            logger.warning("与执行器进程的连接已断开，正在重连")
+            await asyncio.sleep(RECONNECT_DELAY)
+
+    async def _read_loop(self, reader: asyncio.StreamReader):
+        while True:
+            line = await reader.readline()
+            if not line:
+                return
+            # 单条消息处理失败不影响后续消息
+            try:
+                await self._dispatch(json.loads(line))
+            except Exception as e:
+                logger.error(f"处理执行器消息失败: {e!r}")
+
+    async def _dispatch(self, message: dict):
+        kind = message.get("t")
+        if kind == "ws":
+            if message["topic"] is not None:
+                await websocket_manager.publish(message["topic"], message["message"])
+            else:
+                await websocket_manager.send_message(message["task_id"], message["message"])
+        elif kind == "sync":
+            _apply_sync(message)
+        elif kind == "reply":
+            future = self._pending.pop(message["id"], None)
+            if future is not None and not future.done():
+                if "error" in message:
+                    future.set_exception(RuntimeError(message["error"]))
+                else:
+                    future.set_result(message["result"])
+        elif kind == "hello":
+            self.executor_pid = message["pid"]
+            logger.info(f"已连接执行器进程 pid={message['pid']}（{message['owner']}）")
+
+    def _send(self, message: dict):
+        if not self.connected:
+            raise ExecutorUnavailable("执行器进程未连接")
+        self._writer.write(_encode(message))
+
+    def _send_sync(self, kind: str, args: list):
+        try:
+            self._send({"t": "sync", "kind": kind, "args": args})
+        except ExecutorUnavailable:
+            pass
+
+    async def call(self, op: str, args: Optional[dict] = None, timeout: Optional[float] = None):
+        """
+        调用执行器进程，未连接或超时时抛出 ExecutorUnavailable
+
+        Args:
+            op: 调用名称
+            args: 调用参数
+            timeout: 超时（秒），默认取配置 executor_request_timeout；0 表示不限
+        """
+        self._next_id += 1
+        call_id = self._next_id
+        future = asyncio.get_running_loop().create_future()
+        self._pending[call_id] = future
+        if timeout is None:
+            timeout = settings.executor_request_timeout
+        try:
+            self._send({"t": "call", "id": call_id, "op": op, "args": args or {}})
+            return await asyncio.wait_for(future, timeout or None)
+        except asyncio.TimeoutError:
+            raise ExecutorUnavailable(f"执行器调用 {op} 超时")
+        finally:
+            self._pending.pop(call_id, None)
+
+    # ---- 与 TaskExecutor 一致的接口 ----
+
+    async def start_task(self, task_id: int, db=None) -> bool:
+        return await self.call("start", {"task_id": task_id})
+
+    async def cancel_task(self, task_id: int):
+        await self.call("cancel", {"task_id": task_id})
+
+    async def reschedule(self, task_id: int, changes: dict) -> str:
+        if changes.get("target_time") is not None:
+            changes = {**changes, "target_time": changes["target_time"].isoformat()}
+        return await self.call("reschedule", {"task_id": task_id, "changes": changes})
+
+
+def _apply_sync(message: dict):
+    """应用其他进程转发的缓存变更；应用失败时本进程缓存状态未知，丢弃后重新加载"""
+    try:
+        cache_sync.apply(message["kind"], message["args"])
+    except Exception as e:
+        logger.error(f"应用缓存同步 {message.get('kind')} 失败，丢弃本进程缓存: {e!r}")
+        _reset_local_caches()
+
+
+def _reset_local_caches():
+    """丢弃本进程的进程内缓存（下次访问时重新加载），日志跟踪连接改为从数据库续传"""
+    from app.core.log_tail import log_tail
+    from app.storage.log_store import log_totals
+    from app.storage.response_cache import response_cache
+    from app.storage.task_stats import task_stats
+
+    response_cache.reset()
+    log_totals._clear()
+    task_stats._invalidate()
+    log_tail.resync()
@@ -0,0 +1,391 @@
+"""触发运行时
+
+负责倒计时最后阶段和抢购请求本身，只产出事件，不访问数据库和 WebSocket：
+- LocalFiringRuntime: 运行在主事件循环上（默认）
+- ThreadedFiringRuntime: 独立线程 + 独立事件循环 + 独立的 HTTP 客户端，
+  主事件循环上的 API 请求、WebSocket 推送和 SQLite I/O 不再直接推迟触发时刻
+
+运行时在触发前 klook_prewarm_lead 秒接管任务：先建立并验证连接，按间隔保活，
+触发窗口打开后再进入最后阶段等待，抢购请求直接复用连接池中的连接。
+
+事件通过 emit 回调交给 TaskExecutor，由其在主事件循环上落库和推送。
+"""
+import asyncio
+import gc
+import sys
+import threading
+import time
+from functools import partial
+from typing import Callable, Optional
+
+from app.core.config import settings
+from app.core.klook_client import KlookClient, RequestTimings, klook_clients
+from app.core.metrics import metrics
+from app.core.scheduler import DeadlineScheduler, scheduler
+from app.core.timer import PrecisionTimer
+from app.services.calibration import calibrate
+from loguru import logger
+
+
+class FiringWindow:
+    """触发窗口：从唤醒到触发的最后阶段内暂停自动 GC 并缩短 GIL 切换间隔
+
+    分代 GC 的一次完整回收会持有 GIL 数十毫秒，主线程处理请求时的长时间 GIL 占用
+    也会推迟触发线程；多个任务的窗口重叠时按引用计数恢复。
+    """
+
+    LEAD = 0.05  # 窗口在唤醒时刻之前提前打开的时间（秒），覆盖唤醒本身的延迟
+    SWITCH_INTERVAL = 0.0002  # 窗口内的 GIL 切换间隔（秒），默认值为 0.005
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._depth = 0
+        self._gc_enabled = True
+        self._switch_interval = sys.getswitchinterval()
+
+    def __enter__(self):
+        with self._lock:
+            if self._depth == 0:
+                self._gc_enabled = gc.isenabled()
+                self._switch_interval = sys.getswitchinterval()
+                gc.disable()
+                sys.setswitchinterval(self.SWITCH_INTERVAL)
+            self._depth += 1
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        with self._lock:
+            self._depth -= 1
+            if self._depth == 0:
+                sys.setswitchinterval(self._switch_interval)
+                if self._gc_enabled:
+                    gc.enable()
+
+
+firing_window = FiringWindow()
+
+
+def window_opens_at(timer: PrecisionTimer) -> float:
+    """触发窗口打开的时刻（单调时钟秒）：唤醒时刻再提前一个窗口提前量"""
+    return timer.wake_deadline - FiringWindow.LEAD
+
+
+def prewarm_at(timer: PrecisionTimer) -> float:
+    """触发运行时接管任务（开始预热连接）的时刻（单调时钟秒）"""
+    return window_opens_at(timer) - settings.klook_prewarm_lead
+
+
+# 最后一次保活请求距离触发窗口的最小间隔（秒），保证保活响应不落在触发窗口内
+KEEPALIVE_GAP = 1.0
+
+# 执行权检查：独立执行器进程中为租约的本地有效性检查，每次发出抢购请求前调用（单进程部署总是通过）
+_fence: Callable[[], bool] = lambda: True
+
+
+def set_fence(check: Callable[[], bool]):
+    """设置执行权检查（必须是不阻塞、可在触发线程中调用的函数）"""
+    global _fence
+    _fence = check
+
+
+class FireSpec:
+    """触发抢购所需的任务快照（倒计时期间不持有 ORM 对象）"""
+    __slots__ = (
+        "task_id", "program_uuid", "headers", "target_time",
+        "network_compensation", "max_retries", "retry_interval", "metrics", "timer"
+    )
+
+    def __init__(self, task, config):
+        self.task_id = task.id
+        self.program_uuid = task.program_uuid
+        self.headers = dict(config.headers)
+        self.target_time = task.target_time
+        self.network_compensation = task.network_compensation
+        self.max_retries = task.max_retries
+        self.retry_interval = task.retry_interval
+        # 执行过程中的测量值，随最终状态写入 TaskDB.result
+        self.metrics: dict = {}
+        # 登记触发时创建的定时器
+        self.timer: Optional[PrecisionTimer] = None
+
+
+class FireEvent:
+    """触发运行时产出的事件"""
+    __slots__ = ("kind", "spec", "data", "emitted_ns")
+
+    FIRED = "fired"  # 到达触发时刻
+    ATTEMPT = "attempt"  # 完成一次抢购尝试
+    FINISHED = "finished"  # 抢购结束（成功或重试耗尽）
+    ERROR = "error"  # 运行时异常
+    CALIBRATED = "calibrated"  # 完成网络补偿校准（触发前）
+
+    def __init__(self, kind: str, spec: FireSpec, **data):
+        self.kind = kind
+        self.spec = spec
+        self.data = data
+        # 产出时刻，用于统计事件回到主事件循环处理的耗时
+        self.emitted_ns = time.perf_counter_ns()
+
+
+async def keep_warm(spec: FireSpec, client: KlookClient, emit: Callable[[FireEvent], None]):
+    """触发窗口打开前建立连接、校准网络补偿并保活，结果记录到 spec.metrics"""
+    if settings.klook_prewarm_lead <= 0:
+        return
+
+    loop = asyncio.get_running_loop()
+    until = window_opens_at(spec.timer)
+    interval = settings.klook_keepalive_interval
+
+    # 剩余时间不足以完成一次请求时跳过预热，避免握手落在触发窗口内
+    if until - loop.time() > KEEPALIVE_GAP:
+        try:
+            warmup_ms = await asyncio.wait_for(client.warm_up(), until - loop.time() - KEEPALIVE_GAP)
+            spec.metrics["warmup_ms"] = round(warmup_ms, 3)
+        except Exception as e:
+            logger.warning(f"任务 {spec.task_id} 预热连接失败: {e!r}")
+            spec.metrics["warmup_error"] = repr(e)
+
+    # 连接可用时校准网络补偿（采样请求同时起到保活作用）
+    if settings.calibration_enabled and "warmup_ms" in spec.metrics:
+        until = await _calibrate(spec, client, emit, until)
+
+    keepalives = 0
+    while True:
+        remaining = until - loop.time()
+        if remaining < interval + KEEPALIVE_GAP:
+            await asyncio.sleep(max(remaining, 0))
+            break
+        await asyncio.sleep(interval)
+        try:
+            await asyncio.wait_for(client.warm_up(), KEEPALIVE_GAP)
+            keepalives += 1
+        except Exception as e:
+            logger.warning(f"任务 {spec.task_id} 连接保活失败: {e!r}")
+    spec.metrics["keepalives"] = keepalives
+
+
+async def _calibrate(spec: FireSpec, client: KlookClient, emit: Callable[[FireEvent], None], until: float) -> float:
+    """校准网络补偿，按配置应用到定时器；返回（可能提前的）触发窗口打开时刻"""
+    calibration = await calibrate(client, settings.calibration_samples, deadline=until - KEEPALIVE_GAP)
+    if calibration is None:
+        return until
+
+    spec.metrics["calibration"] = calibration.as_dict()
+    applied = settings.calibration_auto_apply
+    if applied:
+        # 上限与任务参数一致；服务器时钟落后时补偿可以为负（推迟发送）
+        compensation = min(max(round(calibration.recommended_ms), -2000), 2000)
+        spec.timer.set_network_compensation(compensation)
+        spec.network_compensation = compensation
+        spec.metrics["network_compensation_applied"] = compensation
+        until = window_opens_at(spec.timer)
+
+    emit(FireEvent(FireEvent.CALIBRATED, spec, calibration=calibration.as_dict(), applied=applied))
+    return until
+
+
+async def run_fire_plan(
+        spec: FireSpec,
+        client: KlookClient,
+        emit: Callable[[FireEvent], None]
+):
+    """完成最后阶段等待并执行抢购重试循环，过程中只调用 emit"""
+    timer = spec.timer
+    try:
+        # 触发窗口打开前构建好请求（URL、请求头、请求体），触发后只需发送
+        request = client.prepare_redeem(spec.program_uuid, spec.headers)
+        with firing_window:
+            firing_error_ns = await timer.fire_at_deadline()
+        if firing_error_ns is None:
+            # 最后阶段被取消
+            return
+        spec.metrics["timer_mode"] = timer.mode.value
+        spec.metrics["firing_error_ns"] = firing_error_ns
+        # 触发时刻的事件循环延迟：主事件循环的看门狗采样，以及触发所在事件循环的唤醒延迟
+        spec.metrics.update(metrics.loop_lag.at_fire(spec.task_id))
+        if timer.wakeup_lateness_ns is not None:
+            spec.metrics["wakeup_lateness_ms"] = round(timer.wakeup_lateness_ns / 1e6, 3)
+        emit(FireEvent(FireEvent.FIRED, spec))
+        fired_ns = woke_ns = time.perf_counter_ns()
+
+        last_result = None  # 保存最后一次的结果，用于最终失败时展示
+        attempt_timings = spec.metrics["attempt_timings"] = []
+        for attempt in range(1, spec.max_retries + 1):
+            if not _fence():
+                # 已失去执行权：接管的执行器按重启恢复规则处理该任务，这里不再发出请求也不产出事件
+                logger.error(f"任务 {spec.task_id} 放弃抢购：执行器租约已失效")
+                return
+            timings = RequestTimings(woke_ns)
+            try:
+                success, result = await client.redeem(request, timings)
+                error = None
+            except Exception as e:
+                success, result, error = False, {"error": str(e)}, str(e)
+            last_result = result
+            metrics.redeem_attempts.inc("success" if success else "fail" if error is None else "error")
+            # at_ms: 本次尝试相对触发时刻的开始时间
+            attempt_timings.append({
+                "attempt": attempt,
+                "at_ms": round((timings.started_ns - fired_ns) / 1e6, 3),
+                **timings.as_dict()
+            })
+
+            emit(FireEvent(FireEvent.ATTEMPT, spec, attempt=attempt, success=success, result=result, error=error))
+            if success:
+                emit(FireEvent(FireEvent.FINISHED, spec, success=True, attempts=attempt, result=result))
+                return
+
+            # 等待指定间隔后重试（毫秒转秒）
+            await asyncio.sleep(spec.retry_interval / 1000)
+            woke_ns = time.perf_counter_ns()
+
+        emit(FireEvent(FireEvent.FINISHED, spec, success=False, attempts=spec.max_retries, result=last_result))
+
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        emit(FireEvent(FireEvent.ERROR, spec, error=str(e)))
+
+
+class LocalFiringRuntime:
+    """在主事件循环上触发（使用全局调度器）"""
+
+    def __init__(self, emit: Callable[[FireEvent], None]):
+        self._emit = emit
+        self._client: Optional[KlookClient] = None
+        self._firing: dict[int, asyncio.Task] = {}
+
+    def start(self):
+        # 预先获取共享的 HTTP 客户端：创建时加载证书等开销不能落在保护窗口内
+        self._client = klook_clients.get()
+
+    async def stop(self):
+        # 客户端由应用共享，在 lifespan 关闭时统一关闭
+        await scheduler.stop()
+        for firing in list(self._firing.values()):
+            firing.cancel()
+
+    def arm(self, spec: FireSpec):
+        scheduler.schedule(spec.task_id, prewarm_at(spec.timer), partial(self._fire, spec))
+
+    def cancel(self, task_id: int):
+        scheduler.cancel(task_id)
+        firing = self._firing.pop(task_id, None)
+        if firing is not None:
+            firing.cancel()
+
+    def rearm(self, spec: FireSpec):
+        """触发时刻已变化：停止预热并按新的时刻重新登记（触发窗口打开前调用）"""
+        self.cancel(spec.task_id)
+        self.arm(spec)
+
+    async def _fire(self, spec: FireSpec):
+        current = self._firing[spec.task_id] = asyncio.current_task()
+        try:
+            with logger.contextualize(task_id=spec.task_id):
+                await keep_warm(spec, self._client, self._emit)
+                await run_fire_plan(spec, self._client, self._emit)
+        finally:
+            # 重新登记后新的触发协程可能已经登记
+            if self._firing.get(spec.task_id) is current:
+                del self._firing[spec.task_id]
+
+
+class ThreadedFiringRuntime:
+    """独立线程运行时：自有事件循环、调度器和 HTTP 客户端"""
+
+    def __init__(self, emit: Callable[[FireEvent], None]):
+        """
+        Args:
+            emit: 事件回调，会在触发线程中调用，必须是线程安全的
+        """
+        self._emit = emit
+        self._thread: Optional[threading.Thread] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._scheduler: Optional[DeadlineScheduler] = None
+        self._client: Optional[KlookClient] = None
+        self._firing: dict[int, asyncio.Task] = {}
+        self._ready = threading.Event()
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._ready.clear()
+        self._thread = threading.Thread(target=self._run, name="klook-firing", daemon=True)
+        self._thread.start()
+        self._ready.wait()
+        logger.info("独立触发线程已启动")
+
+    async def stop(self):
+        if self._thread is None:
+            return
+        future = asyncio.run_coroutine_threadsafe(self._shutdown(), self._loop)
+        await asyncio.wrap_future(future)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        await asyncio.to_thread(self._thread.join)
+        self._thread = None
+        logger.info("独立触发线程已停止")
+
+    def arm(self, spec: FireSpec):
+        self._loop.call_soon_threadsafe(self._arm, spec)
+
+    def cancel(self, task_id: int):
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._cancel, task_id)
+
+    def rearm(self, spec: FireSpec):
+        """触发时刻已变化：停止预热并按新的时刻重新登记（触发窗口打开前调用）"""
+        self._loop.call_soon_threadsafe(self._rearm, spec)
+
+    # ---- 以下方法在触发线程中执行 ----
+
+    def _run(self):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        self._scheduler = DeadlineScheduler()
+        # 预先创建本线程事件循环的 HTTP 客户端，触发时直接复用
+        self._client = klook_clients.get(self._loop)
+        self._ready.set()
+        try:
+            self._loop.run_forever()
+        finally:
+            self._loop.close()
+
+    def _arm(self, spec: FireSpec):
+        # 触发线程没有其他工作，保护窗口内直接自旋，不经过事件循环的 select
+        spec.timer.spin_window_ns = spec.timer.guard_window_ns
+        self._scheduler.schedule(spec.task_id, prewarm_at(spec.timer), partial(self._fire, spec))
+
+    def _cancel(self, task_id: int):
+        self._scheduler.cancel(task_id)
+        firing = self._firing.pop(task_id, None)
+        if firing is not None:
+            firing.cancel()
+
+    def _rearm(self, spec: FireSpec):
+        self._cancel(spec.task_id)
+        self._arm(spec)
+
+    async def _fire(self, spec: FireSpec):
+        current = self._firing[spec.task_id] = asyncio.current_task()
+        try:
+            with logger.contextualize(task_id=spec.task_id):
+                await keep_warm(spec, self._client, self._emit)
+                await run_fire_plan(spec, self._client, self._emit)
+        finally:
+            # 重新登记后新的触发协程可能已经登记
+            if self._firing.get(spec.task_id) is current:
+                del self._firing[spec.task_id]
+
+    async def _shutdown(self):
+        await self._scheduler.stop()
+        for firing in list(self._firing.values()):
+            firing.cancel()
+        await klook_clients.close(self._loop)
+
+
+def create_firing_runtime(emit: Callable[[FireEvent], None]):
+    """按配置创建触发运行时（local: 主事件循环；thread: 独立线程）"""
+    if settings.firing_runtime == "thread":
+        return ThreadedFiringRuntime(emit)
+    return LocalFiringRuntime(emit)
@@ -0,0 +1,93 @@
+"""健康监测
+
+后台任务每 HEALTH_DB_PROBE_INTERVAL 秒从读连接池取一个连接执行 SELECT 1，记录 SQLite 往返耗时；
+有任务处于预热 / 触发阶段时暂停探测，不在触发前后增加线程切换。
+探测卡住（连接池耗尽、数据库文件被锁）时 status 给出已等待的时长。
+
+事件循环延迟由 app/core/metrics.py 的 LoopLagWatchdog 采样，两者由 /api/health/deep 汇总。
+"""
+import asyncio
+import math
+import time
+from datetime import datetime
+from typing import Callable, Optional
+
+from app.core.config import settings
+from app.storage.database import read_session_maker
+from app.storage.task_journal import task_journal
+from loguru import logger
+from sqlalchemy import text
+
+
+class HealthMonitor:
+    """SQLite 往返探测后台任务"""
+
+    def __init__(self):
+        self._runner: Optional[asyncio.Task] = None
+        # 距离下一次触发的秒数（由 TaskExecutor 提供）
+        self._quiet_for: Callable[[], float] = lambda: math.inf
+        self.db_rtt_ms: Optional[float] = None
+        self.db_error: Optional[str] = None
+        self.db_probed_at: Optional[datetime] = None
+        self._probe_started: Optional[float] = None
+
+    def start(self, quiet_for: Optional[Callable[[], float]] = None):
+        if quiet_for is not None:
+            self._quiet_for = quiet_for
+        if self._runner is None:
+            self._runner = asyncio.create_task(self._run())
+
+    async def stop(self):
+        runner, self._runner = self._runner, None
+        if runner is None:
+            return
+        runner.cancel()
+        try:
+            await runner
+        except asyncio.CancelledError:
+            pass
+
+    async def _run(self):
+        while True:
+            if self._quiet_for() > 0:
+                await self.probe_db()
+            await asyncio.sleep(settings.health_db_probe_interval)
+
+    async def probe_db(self) -> Optional[float]:
+        """执行一次往返探测，返回耗时（毫秒），失败时返回 None"""
+        self._probe_started = time.perf_counter()
+        try:
+            async with read_session_maker() as session:
+                await session.execute(text("SELECT 1"))
+            self.db_rtt_ms = round((time.perf_counter() - self._probe_started) * 1000, 3)
+            self.db_error = None
+        except Exception as e:
+            logger.warning(f"SQLite 探测失败: {e!r}")
+            self.db_rtt_ms = None
+            self.db_error = repr(e)
+        finally:
+            self._probe_started = None
+            self.db_probed_at = datetime.now()
+        return self.db_rtt_ms
+
+    def db_status(self) -> dict:
+        """最近一次探测结果、进行中的探测已等待的时长（毫秒）和写后日志积压"""
+        probing_for = self._probe_started and (time.perf_counter() - self._probe_started) * 1000
+        return {
+            "rtt_ms": self.db_rtt_ms,
+            "error": self.db_error,
+            "probed_at": self.db_probed_at.isoformat() if self.db_probed_at else None,
+            "probing_for_ms": round(probing_for, 3) if probing_for else None,
+            "paused": self._runner is not None and self._quiet_for() <= 0,
+            "journal_pending": task_journal.pending_count,
+            "slow_ms": settings.health_db_slow_ms
+        }
+
+    def db_degraded(self) -> bool:
+        status = self.db_status()
+        slowest = max(status["rtt_ms"] or 0, status["probing_for_ms"] or 0)
+        return status["error"] is not None or slowest > settings.health_db_slow_ms
+
+
+# 全局健康监测实例
+health_monitor = HealthMonitor()
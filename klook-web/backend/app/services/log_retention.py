@@ -0,0 +1,253 @@
+"""日志保留
+
+后台任务按保留策略把最旧的日志移入压缩归档（app/storage/log_archive.py）：
+- 时间: 早于 LOG_RETENTION_DAYS 天的日志
+- 行数: logs 表超过 LOG_RETENTION_MAX_ROWS 行时的最旧部分
+
+每块 LOG_RETENTION_CHUNK_SIZE 行：先在读连接上查出最旧的行，压缩并追加到段文件（fsync）后，
+再用一个短事务按 ID 删除这些行并写入块索引，压缩和文件 I/O 期间不持有写锁；
+每块之前检查触发计划，有任务即将进入预热 / 触发阶段时暂停，等触发结束后继续。
+一轮结束后在 auto_vacuum=INCREMENTAL 的数据库上增量回收空闲页。
+
+清空全部日志（DELETE /api/logs）同样分块删除日志行和归档块，块之间避开触发，不与归档同时执行。
+"""
+import asyncio
+import math
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Optional
+
+from app.core.config import settings
+from app.storage.database import after_commit, async_session_maker, engine, read_session_maker
+from app.storage.log_archive import log_archive
+from app.storage.log_store import LIST_COLUMNS, LogStore, log_totals
+from app.storage.models import LogArchiveChunkDB, LogArchiveIndexDB, LogDB
+from loguru import logger
+from sqlalchemy import delete, insert, select
+
+# 距离下一次触发（开始预热）少于该秒数时不再开始新的块
+QUIET_MARGIN = 5.0
+# 等待触发结束时的轮询间隔（秒）
+QUIET_POLL = 1.0
+# 块之间让出的时间（秒），让写后日志等其他写入穿插执行
+CHUNK_PAUSE = 0.02
+# 启动后第一次检查的延迟（秒）
+STARTUP_DELAY = 60.0
+# 查出的行在删除前被其他请求删除时，重新查询该块的次数
+CHUNK_ATTEMPTS = 3
+# 清空日志时每个事务删除的归档块数（每块连同其按任务 / 级别的索引行）
+ARCHIVE_CHUNKS_PER_DELETE = 10
+
+
+class LogRetention:
+    """日志保留后台任务"""
+
+    def __init__(self):
+        self._runner: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+        # 距离下一次触发的秒数（由 TaskExecutor 提供）
+        self._quiet_for: Callable[[], float] = lambda: math.inf
+        self.last_run: Optional[dict] = None
+
+    def start(self, quiet_for: Optional[Callable[[], float]] = None):
+        """启动后台任务（LOG_RETENTION_ENABLED=false 时只记录回调，可手动执行）"""
+        if quiet_for is not None:
+            self._quiet_for = quiet_for
+        if not settings.log_retention_enabled or self._runner is not None:
+            return
+        self._runner = asyncio.create_task(self._run())
+        logger.info("日志保留任务已启动")
+
+    async def stop(self):
+        runner, self._runner = self._runner, None
+        if runner is None:
+            return
+        runner.cancel()
+        try:
+            await runner
+        except asyncio.CancelledError:
+            pass
+
+    async def _run(self):
+        await asyncio.sleep(min(STARTUP_DELAY, settings.log_retention_interval))
+        while True:
+            try:
+                await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"日志归档失败: {e!r}")
+            await asyncio.sleep(settings.log_retention_interval)
+
+    async def run_once(self) -> dict:
+        """按保留策略执行一轮归档，返回本轮摘要"""
+        async with self._lock:
+            started = time.perf_counter()
+            cutoff = (
+                datetime.now() - timedelta(days=settings.log_retention_days)
+                if settings.log_retention_days > 0 else None
+            )
+            excess = 0
+            if settings.log_retention_max_rows > 0:
+                async with async_session_maker() as session:
+                    excess = await LogStore.count(session) - settings.log_retention_max_rows
+
+            archived = chunks = paused = 0
+            while excess > 0 or cutoff is not None:
+                paused += await self._wait_quiet()
+                limit = settings.log_retention_chunk_size
+                if excess > 0:
+                    count = await self._archive_chunk(min(limit, excess), None)
+                else:
+                    count = await self._archive_chunk(limit, cutoff)
+                if count == 0:
+                    break
+                excess -= count
+                archived += count
+                chunks += 1
+                await asyncio.sleep(CHUNK_PAUSE)
+
+            if chunks:
+                paused += await self._incremental_vacuum()
+
+            self.last_run = {
+                "finished_at": datetime.now().isoformat(),
+                "archived": archived,
+                "chunks": chunks,
+                "paused_s": round(paused, 3),
+                "duration_s": round(time.perf_counter() - started, 3)
+            }
+            if archived:
+                logger.info(f"日志归档完成: {archived} 条，{chunks} 块，耗时 {self.last_run['duration_s']}s")
+            return self.last_run
+
+    async def delete_all(self) -> int:
+        """
+        删除全部日志和归档：按块删除，每块之前等待远离触发；返回删除的日志行数（不含归档）
+
+        只删除开始时已存在的日志（ID 不超过当时的最大 ID），之后写入的日志保留
+        """
+        async with self._lock:
+            async with read_session_maker() as session:
+                max_id = await LogStore.max_id(session)
+
+            limit = settings.log_retention_chunk_size
+            deleted = 0
+            while max_id is not None:
+                await self._wait_quiet()
+                async with async_session_maker() as session:
+                    count = await LogStore.delete_chunk(session, max_id, limit)
+                    await session.commit()
+                deleted += count
+                if count < limit:
+                    break
+                await asyncio.sleep(CHUNK_PAUSE)
+
+            while True:
+                await self._wait_quiet()
+                async with async_session_maker() as session:
+                    count = await LogStore.delete_archive_chunks(session, ARCHIVE_CHUNKS_PER_DELETE)
+                    await session.commit()
+                if count == 0:
+                    break
+                await asyncio.sleep(CHUNK_PAUSE)
+            # 索引已全部删除，段文件不再被引用
+            log_archive.remove_all()
+
+            await self._incremental_vacuum()
+            logger.warning(f"删除了所有日志，共 {deleted} 条")
+            return deleted
+
+    async def _wait_quiet(self) -> float:
+        """等待到距离下一次触发足够远；返回等待的秒数"""
+        waited = 0.0
+        while self._quiet_for() < QUIET_MARGIN:
+            await asyncio.sleep(QUIET_POLL)
+            waited += QUIET_POLL
+        return waited
+
+    @staticmethod
+    async def _archive_chunk(limit: int, cutoff: Optional[datetime]) -> int:
+        """把最旧的 limit 行日志写入归档块并从 logs 表删除；返回归档的行数"""
+        oldest = select(*LIST_COLUMNS).order_by(LogDB.created_at, LogDB.id).limit(limit)
+        if cutoff is not None:
+            oldest = oldest.where(LogDB.created_at < cutoff)
+
+        for _ in range(CHUNK_ATTEMPTS):
+            async with read_session_maker() as session:
+                rows = [row._asdict() for row in (await session.execute(oldest)).all()]
+            if not rows:
+                return 0
+
+            # 压缩和写入段文件在事务之外；事务未提交时追加的字节不会被引用
+            segment, offset, length, groups = await asyncio.to_thread(log_archive.append, rows)
+            ids = [row["id"] for row in rows]
+            async with async_session_maker() as session:
+                deleted = (await session.execute(delete(LogDB).where(LogDB.id.in_(ids)).returning(LogDB.id))).all()
+                if len(deleted) != len(rows):
+                    # 查询之后有行被删除（如删除任务日志），归档块会包含已删除的日志，重新查询
+                    await session.rollback()
+                    logger.debug(f"归档块中有 {len(rows) - len(deleted)} 条日志已被删除，重新查询")
+                    continue
+                chunk = LogArchiveChunkDB(
+                    segment=segment,
+                    offset=offset,
+                    length=length,
+                    row_count=len(rows),
+                    min_id=min(ids),
+                    max_id=max(ids),
+                    min_created_at=min(row["created_at"] for row in rows),
+                    max_created_at=max(row["created_at"] for row in rows)
+                )
+                session.add(chunk)
+                await session.flush()
+                await session.execute(insert(LogArchiveIndexDB), [{"chunk_id": chunk.id, **group} for group in groups])
+                after_commit(session, log_totals.clear)
+                await session.commit()
+            return len(rows)
+        return 0
+
+    async def _incremental_vacuum(self) -> float:
+        """
+        分步回收空闲页（只在 auto_vacuum=INCREMENTAL 的 SQLite 数据库上执行），每步之前同样避开触发；
+        返回等待的秒数
+        """
+        pages = int(settings.log_retention_vacuum_pages)
+        if engine.dialect.name != "sqlite" or pages <= 0:
+            return 0.0
+        waited = 0.0
+        async with engine.connect() as conn:
+            if (await conn.exec_driver_sql("PRAGMA auto_vacuum")).scalar() != 2:
+                return waited
+            driver = (await conn.get_raw_connection()).driver_connection
+            while (await conn.exec_driver_sql("PRAGMA freelist_count")).scalar():
+                waited += await self._wait_quiet()
+                # 每回收一页返回一行，取完结果才会回收全部页（经 SQLAlchemy 执行只回收一页）
+                cursor = await driver.execute(f"PRAGMA incremental_vacuum({pages})")
+                await cursor.fetchall()
+                await cursor.close()
+                await conn.commit()
+                await asyncio.sleep(CHUNK_PAUSE)
+            # WAL 模式下文件在检查点后才会截断
+            await conn.exec_driver_sql("PRAGMA wal_checkpoint(PASSIVE)")
+        return waited
+
+    async def status(self) -> dict:
+        """保留策略、归档统计和上一轮结果"""
+        async with async_session_maker() as session:
+            archived = await log_archive.count(session)
+            chunks = (await session.execute(select(LogArchiveChunkDB.segment))).scalars().all()
+        return {
+            "enabled": settings.log_retention_enabled,
+            "retention_days": settings.log_retention_days,
+            "max_rows": settings.log_retention_max_rows,
+            "compression": log_archive.codec,
+            "archived_rows": archived,
+            "archive_chunks": len(chunks),
+            "archive_segments": len(set(chunks)),
+            "last_run": self.last_run
+        }
+
+
+# 全局日志保留任务
+log_retention = LogRetention()
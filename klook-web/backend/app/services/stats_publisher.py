@@ -0,0 +1,70 @@
+"""任务统计推送
+
+任务状态计数变化时向 stats 频道推送最新统计，短时间内的多次变化合并为一帧。
+没有订阅者时不做任何事。
+"""
+import asyncio
+from typing import Optional
+
+from app.core.websocket_manager import STATS_CHANNEL, websocket_manager
+from app.storage.database import read_session_maker
+from app.storage.task_stats import task_stats
+from loguru import logger
+
+
+class StatsPublisher:
+    """合并推送任务统计"""
+
+    MIN_INTERVAL = 0.1  # 两次推送的最小间隔（秒）
+
+    def __init__(self):
+        self._dirty: Optional[asyncio.Event] = None
+        self._runner: Optional[asyncio.Task] = None
+
+    def notify(self):
+        """统计发生变化（task_stats 回调）"""
+        if not websocket_manager.get_subscriber_count(STATS_CHANNEL):
+            return
+        try:
+            self._ensure_runner()
+        except RuntimeError:
+            # 没有运行中的事件循环
+            return
+        self._dirty.set()
+
+    @staticmethod
+    async def snapshot() -> dict:
+        """当前统计帧"""
+        async with read_session_maker() as db:
+            summary = await task_stats.summary(db)
+        return {"type": "stats", **summary}
+
+    def _ensure_runner(self):
+        if self._runner is None or self._runner.done():
+            self._dirty = asyncio.Event()
+            self._runner = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        runner, self._runner = self._runner, None
+        if runner is not None:
+            runner.cancel()
+            try:
+                await runner
+            except asyncio.CancelledError:
+                pass
+
+    async def _run(self):
+        while True:
+            await self._dirty.wait()
+            self._dirty.clear()
+            if websocket_manager.get_subscriber_count(STATS_CHANNEL):
+                try:
+                    await websocket_manager.publish(STATS_CHANNEL, await self.snapshot())
+                except Exception as e:
+                    logger.error(f"统计推送异常: {e}")
+            await asyncio.sleep(self.MIN_INTERVAL)
+
+
+# 全局统计推送实例
+stats_publisher = StatsPublisher()
+task_stats.add_listener(stats_publisher.notify)
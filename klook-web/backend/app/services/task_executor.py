@@ -1,30 +1,85 @@
 """任务执行服务"""
 import asyncio
-
-from app.core.klook_client import KlookClient
+import math
+import queue
+import threading
+import time
+from datetime import datetime
+from typing import Optional
+
+from app.core.config import settings
+from app.core.metrics import metrics
 from app.core.timer import PrecisionTimer
 from app.core.websocket_manager import websocket_manager
-from app.models.log import LogCreate, LogLevel
+from app.models.log import LogLevel
 from app.models.task import TaskStatus
+from app.services.countdown_publisher import countdown_publisher
+from app.services.firing_runtime import FireEvent, FireSpec, create_firing_runtime, prewarm_at, window_opens_at
 from app.storage.config_store import ConfigStore
-from app.storage.log_store import LogStore
+from app.storage.task_journal import task_journal
 from app.storage.task_store import TaskStore
 from loguru import logger
 
 
 class TaskExecutor:
-    """任务执行器"""
+    """任务执行器
+
+    触发和抢购请求由触发运行时完成（可运行在独立线程），运行时产出的事件经
+    线程安全队列回到主事件循环，在这里统一写日志、更新状态和推送 WebSocket。
+    """
 
     def __init__(self):
-        # 存储运行中的任务：{task_id: asyncio.Task}
-        self.running_tasks: dict[int, asyncio.Task] = {}
-        # 存储定时器：{task_id: PrecisionTimer}
-        self.timers: dict[int, PrecisionTimer] = {}
+        # 已启动（倒计时中或正在执行抢购）的任务：{task_id: FireSpec}
+        self.armed: dict[int, FireSpec] = {}
+        self._runtime = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread: Optional[int] = None
+        # 运行时事件队列（可跨线程写入）及其唤醒事件
+        self._events: queue.SimpleQueue = queue.SimpleQueue()
+        self._events_ready: Optional[asyncio.Event] = None
+        self._dispatcher: Optional[asyncio.Task] = None
+
+    # ---- 生命周期 ----
+
+    def start(self):
+        """启动触发运行时和事件分发协程（未显式启动时在首次启动任务时调用）"""
+        if self._runtime is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread = threading.get_ident()
+        self._events_ready = asyncio.Event()
+        self._dispatcher = asyncio.create_task(self._dispatch_events())
+        self._runtime = create_firing_runtime(self._emit)
+        self._runtime.start()
+        # 事件循环延迟看门狗在触发窗口内加密采样
+        metrics.loop_lag.watch(self.guard_windows)
+
+    async def stop(self):
+        """停止触发运行时，处理完剩余事件"""
+        if self._runtime is None:
+            return
+        runtime, self._runtime = self._runtime, None
+        await runtime.stop()
+        await countdown_publisher.stop()
+
+        dispatcher, self._dispatcher = self._dispatcher, None
+        dispatcher.cancel()
+        try:
+            await dispatcher
+        except asyncio.CancelledError:
+            pass
+
+        # 运行时停止前已产出的事件仍然落库
+        while not self._events.empty():
+            await self._handle_event(self._events.get_nowait())
+        self.armed.clear()
+
+    # ---- 启动 / 取消 ----
 
     async def start_task(self, task_id: int, db):
         """启动任务"""
         # 检查任务是否已在运行
-        if task_id in self.running_tasks:
+        if self.is_running(task_id):
             logger.warning(f"任务 {task_id} 已在运行中")
             return False
 
@@ -40,112 +95,267 @@ class TaskExecutor:
             logger.error(f"配置 {task.config_id} 不存在")
             return False
 
-        # 创建异步任务
-        task_coro = self._execute_task(task_id, task, config)
-        async_task = asyncio.create_task(task_coro)
-        self.running_tasks[task_id] = async_task
-
-        logger.info(f"任务 {task_id} 已启动")
-        return True
+        self.start()
+        spec = FireSpec(task, config)
+        self._arm(spec)
 
-    async def _execute_task(self, task_id: int, task, config):
-        """执行任务的核心逻辑"""
-        from app.storage.database import async_session_maker
+        # 记录日志：任务启动
+        task_journal.log(task_id, LogLevel.INFO, f"任务启动，目标时间: {spec.target_time.isoformat()}, 网络补偿: {spec.network_compensation}ms")
 
-        try:
-            # 记录日志：任务启动
-            async with async_session_maker() as session:
-                await LogStore.create(session, LogCreate(
-                    task_id=task_id,
-                    level=LogLevel.INFO,
-                    message=f"任务启动，目标时间: {task.target_time.isoformat()}, 网络补偿: {task.network_compensation}ms"
-                ))
-                await session.commit()
-
-            # 发送任务开始消息
-            await websocket_manager.send_message(task_id, {
-                "type": "task_started",
-                "task_id": task_id,
-                "target_time": task.target_time.isoformat(),
-                "message": "任务已启动，开始倒计时"
-            })
+        # 更新任务状态为倒计时中
+        task_journal.update_status(task_id, TaskStatus.COUNTDOWN)
 
-            # 创建高精度定时器
-            async def progress_callback(remaining: float):
-                """倒计时进度回调"""
-                await websocket_manager.send_message(task_id, {
-                    "type": "countdown",
-                    "task_id": task_id,
-                    "remaining": remaining,
-                    "message": f"剩余 {remaining:.3f} 秒"
-                })
+        # 发送任务开始消息
+        await websocket_manager.send_message(task_id, {
+            "type": "task_started",
+            "task_id": task_id,
+            "target_time": task.target_time.isoformat(),
+            "message": "任务已启动，开始倒计时"
+        })
 
-            async def execute_callback():
-                """到达目标时间，执行抢购"""
-                await self._execute_redeem(task_id, task, config)
+        logger.info(f"任务 {task_id} 已启动")
+        return True
 
-            # 创建定时器
-            timer = PrecisionTimer(
-                target_time=task.target_time,
-                network_compensation=task.network_compensation,
-                callback=execute_callback
-            )
-            self.timers[task_id] = timer
+    def _arm(self, spec: FireSpec):
+        """向触发运行时登记触发计划"""
+        task_id = spec.task_id
+
+        # 计算补偿网络延迟后的触发时间（锚定到单调时钟）
+        spec.timer = PrecisionTimer(
+            target_time=spec.target_time,
+            network_compensation=spec.network_compensation,
+            mode=settings.timer_mode,
+            guard_window_ms=settings.timer_guard_window_ms,
+            spin_window_ms=settings.timer_spin_window_ms
+        )
+        self.armed[task_id] = spec
+        self._runtime.arm(spec)
+
+        # 倒计时进度由推送协程按界面刷新率发送，触发窗口打开后自动停止
+        countdown_publisher.track(task_id, spec.timer.deadline, window_opens_at(spec.timer))
+
+    async def restore(self) -> dict:
+        """服务重启后从数据库恢复触发计划
+
+        单次索引查询取出重启前已登记的任务：目标时间仍在未来的倒计时任务重新登记，
+        目标时间已过或重启时正在执行抢购的任务标记为错过（失败）。
+
+        Returns:
+            {"restored": 恢复的任务数, "missed": 错过的任务数}
+        """
+        from app.storage.database import read_session_maker
+
+        async with read_session_maker() as db:
+            rows = await TaskStore.get_scheduled_tasks(db)
+
+        self.start()
+        now = datetime.now()
+        restored = missed = 0
+        for row in rows:
+            if row.id in self.armed:
+                continue
+            if row.status == TaskStatus.COUNTDOWN.value and row.target_time > now:
+                # 查询行同时带有任务字段和配置的 headers
+                self._arm(FireSpec(row, row))
+                task_journal.log(row.id, LogLevel.INFO, f"服务重启，恢复倒计时，目标时间: {row.target_time.isoformat()}")
+                # 记入回放缓冲，之后打开倒计时的客户端能拿到目标时间
+                await websocket_manager.send_message(row.id, {
+                    "type": "task_started",
+                    "task_id": row.id,
+                    "target_time": row.target_time.isoformat(),
+                    "message": "服务重启，恢复倒计时"
+                })
+                restored += 1
+            else:
+                self._mark_missed(row.id, row.status)
+                missed += 1
+
+        if rows:
+            logger.info(f"已恢复 {restored} 个倒计时任务，{missed} 个任务已错过目标时间")
+        return {"restored": restored, "missed": missed}
+
+    @staticmethod
+    def _mark_missed(task_id: int, status: str):
+        """标记重启期间错过触发的任务"""
+        if status == TaskStatus.RUNNING.value:
+            error = "服务重启，抢购执行被中断"
+        else:
+            error = "服务重启时已错过目标时间"
+
+        task_journal.log(task_id, LogLevel.ERROR, error)
+        task_journal.update_status(
+            task_id,
+            TaskStatus.FAILED,
+            {"success": False, "missed": True, "error": error}
+        )
 
-            # 更新任务状态为倒计时中
-            async with async_session_maker() as session:
-                await TaskStore.update_status(session, task_id, TaskStatus.COUNTDOWN)
-                await session.commit()
+    async def cancel_task(self, task_id: int):
+        """取消任务"""
+        spec = self.armed.pop(task_id, None)
+        countdown_publisher.untrack(task_id)
+        if spec is not None:
+            spec.timer.cancel()
+            self._runtime.cancel(task_id)
+            logger.info(f"任务 {task_id} 已取消")
 
-            # 开始倒计时
-            await timer.countdown(progress_callback)
+        # 先落库已入队的状态，避免其覆盖随后写入的 cancelled 状态
+        await task_journal.flush()
 
-            logger.info(f"任务 {task_id} 倒计时完成")
+        await websocket_manager.send_message(task_id, {
+            "type": "cancelled",
+            "task_id": task_id,
+            "message": "任务已取消"
+        })
 
-        except Exception as e:
-            logger.error(f"任务 {task_id} 执行异常: {e}")
-            await websocket_manager.send_message(task_id, {
-                "type": "error",
-                "task_id": task_id,
-                "message": f"任务执行异常: {str(e)}"
-            })
+    async def reschedule(self, task_id: int, changes: dict) -> str:
+        """修改已启动任务的触发参数，原地重新登记
+
+        运行时撤销旧的触发计划（停止已开始的预热），立即按新的触发时刻重新登记。
+
+        Args:
+            changes: 要修改的 target_time / network_compensation / max_retries / retry_interval
+
+        Returns:
+            "rescheduled": 已生效；"not_armed": 任务未启动（只需更新数据库）；
+            "firing": 触发窗口已打开或已在抢购，不能再修改
+        """
+        spec = self.armed.get(task_id)
+        if spec is None:
+            return "not_armed"
+        if spec.timer.firing_error_ns is not None or time.monotonic() >= window_opens_at(spec.timer):
+            return "firing"
+
+        if changes.get("max_retries") is not None:
+            spec.max_retries = changes["max_retries"]
+        if changes.get("retry_interval") is not None:
+            spec.retry_interval = changes["retry_interval"]
+
+        target_time = changes.get("target_time")
+        network_compensation = changes.get("network_compensation")
+        if target_time is not None or network_compensation is not None:
+            if target_time is not None:
+                spec.target_time = target_time
+            if network_compensation is not None:
+                spec.network_compensation = network_compensation
+            spec.timer.reschedule(spec.target_time, spec.network_compensation)
+            self._runtime.rearm(spec)
+            countdown_publisher.track(task_id, spec.timer.deadline, window_opens_at(spec.timer))
+
+        message = f"任务已改期，目标时间: {spec.target_time.isoformat()}, 网络补偿: {spec.network_compensation}ms"
+        task_journal.log(task_id, LogLevel.INFO, message)
+        await websocket_manager.send_message(task_id, {
+            "type": "rescheduled",
+            "task_id": task_id,
+            "target_time": spec.target_time.isoformat(),
+            "network_compensation": spec.network_compensation,
+            "max_retries": spec.max_retries,
+            "retry_interval": spec.retry_interval,
+            "message": message
+        })
+        logger.info(f"任务 {task_id} {message}")
+        return "rescheduled"
 
-            # 更新任务状态为失败
-            async with async_session_maker() as session:
-                await TaskStore.update_status(
-                    session,
-                    task_id,
-                    TaskStatus.FAILED,
-                    {"error": str(e)}
-                )
-                await session.commit()
-
-        finally:
-            # 清理
-            if task_id in self.running_tasks:
-                del self.running_tasks[task_id]
-            if task_id in self.timers:
-                del self.timers[task_id]
-
-    async def _execute_redeem(self, task_id: int, task, config):
-        """执行抢购逻辑"""
-        from app.storage.database import async_session_maker
-
-        logger.info(f"任务 {task_id} 开始执行抢购")
+    def is_running(self, task_id: int) -> bool:
+        """检查任务是否在运行（倒计时中或正在执行抢购）"""
+        return task_id in self.armed
+
+    def status(self) -> dict:
+        """执行器状态（已启动的任务及最近一个任务的目标时间）"""
+        targets = [spec.target_time for spec in self.armed.values()]
+        return {
+            "mode": settings.executor_mode,
+            "running": self._runtime is not None,
+            "armed": sorted(self.armed),
+            "next_target_time": min(targets).isoformat() if targets else None
+        }
+
+    def guard_windows(self) -> list[tuple[int, float, float]]:
+        """已启动任务的触发窗口：[(任务 ID, 窗口打开时刻, 触发时刻)]，时刻为单调时钟秒"""
+        return [(task_id, window_opens_at(spec.timer), spec.timer.deadline) for task_id, spec in self.armed.items()]
+
+    def quiet_for(self) -> float:
+        """距离最近一个已启动任务开始预热的秒数（已在预热 / 触发中为 0，没有任务为无穷大）"""
+        if not self.armed:
+            return math.inf
+        return max(0.0, min(prewarm_at(spec.timer) for spec in self.armed.values()) - time.monotonic())
+
+    # ---- 运行时事件 ----
+
+    def _emit(self, event: FireEvent):
+        """运行时事件入队（可能在触发线程中调用）"""
+        self._events.put(event)
+        if threading.get_ident() == self._loop_thread:
+            self._events_ready.set()
+        else:
+            self._loop.call_soon_threadsafe(self._events_ready.set)
+
+    async def _dispatch_events(self):
+        """在主事件循环上按顺序处理运行时事件"""
+        while True:
+            await self._events_ready.wait()
+            self._events_ready.clear()
+            while not self._events.empty():
+                event = self._events.get_nowait()
+                with logger.contextualize(task_id=event.spec.task_id):
+                    try:
+                        await self._handle_event(event)
+                    except Exception as e:
+                        logger.error(f"任务 {event.spec.task_id} 事件处理异常: {e}")
+                metrics.event_dispatch.observe((time.perf_counter_ns() - event.emitted_ns) / 1e9, event.kind)
+
+    async def _handle_event(self, event: FireEvent):
+        spec = event.spec
+        task_id = spec.task_id
+        # 已取消（或被重新登记）的任务，丢弃旧计划的残留事件
+        if self.armed.get(task_id) is not spec:
+            return
+
+        if event.kind in (FireEvent.FIRED, FireEvent.FINISHED, FireEvent.ERROR):
+            countdown_publisher.untrack(task_id)
+
+        if event.kind == FireEvent.CALIBRATED:
+            self._on_calibrated(spec, **event.data)
+        elif event.kind == FireEvent.FIRED:
+            await self._on_fired(spec)
+        elif event.kind == FireEvent.ATTEMPT:
+            await self._on_attempt(spec, **event.data)
+        elif event.kind == FireEvent.FINISHED:
+            self.armed.pop(task_id, None)
+            await self._on_finished(spec, **event.data)
+        elif event.kind == FireEvent.ERROR:
+            self.armed.pop(task_id, None)
+            await self._on_error(spec, event.data["error"])
+
+    @staticmethod
+    def _on_calibrated(spec: FireSpec, calibration: dict, applied: bool):
+        task_id = spec.task_id
+        offset = calibration["clock_offset_ms"]
+        message = (
+            f"网络补偿校准: 推荐 {calibration['recommended_ms']:.1f}ms"
+            f"（区间 {calibration['ci_low_ms']:.1f} ~ {calibration['ci_high_ms']:.1f}ms），"
+            f"RTT 中位数 {calibration['rtt_median_ms']:.1f}ms，"
+            f"服务器时钟偏移 {f'{offset:.1f}ms' if offset is not None else '未知'}，"
+            f"采样 {len(calibration['samples'])} 次"
+        )
+        if applied:
+            message += f"，已应用补偿 {spec.network_compensation}ms"
+            # 触发时刻已调整，倒计时按新的截止时间推送
+            countdown_publisher.track(task_id, spec.timer.deadline, window_opens_at(spec.timer))
+        logger.info(f"任务 {task_id} {message}")
+        task_journal.log(task_id, LogLevel.INFO, message)
+
+    async def _on_fired(self, spec: FireSpec):
+        task_id = spec.task_id
+        logger.info(f"任务 {task_id} 倒计时完成，触发误差: {spec.metrics['firing_error_ns'] / 1e6:.3f}ms")
 
         # 记录日志：开始执行抢购
-        async with async_session_maker() as session:
-            await LogStore.create(session, LogCreate(
-                task_id=task_id,
-                level=LogLevel.INFO,
-                message=f"倒计时完成，开始执行抢购（最大重试: {task.max_retries} 次，间隔: {task.retry_interval}ms）"
-            ))
-            await session.commit()
+        task_journal.log(task_id, LogLevel.INFO, f"倒计时完成，开始执行抢购（最大重试: {spec.max_retries} 次，间隔: {spec.retry_interval}ms）")
+        window_lag = spec.metrics.get("loop_lag_window_max_ms")
+        if window_lag is not None and window_lag >= settings.loop_lag_warn_ms:
+            task_journal.log(task_id, LogLevel.WARNING, f"触发窗口内事件循环延迟最高 {window_lag:.2f}ms（阈值 {settings.loop_lag_warn_ms}ms）")
 
         # 更新任务状态为执行中
-        async with async_session_maker() as session:
-            await TaskStore.update_status(session, task_id, TaskStatus.RUNNING)
-            await session.commit()
+        task_journal.update_status(task_id, TaskStatus.RUNNING)
 
         await websocket_manager.send_message(task_id, {
             "type": "executing",
@@ -153,147 +363,103 @@ class TaskExecutor:
             "message": "正在执行抢购..."
         })
 
-        # 使用 Klook API 客户端执行抢购
-        async with KlookClient() as client:
-            max_retries = task.max_retries
-            retry_count = 0
-            last_result = None  # 保存最后一次的结果，用于最终失败时展示
-
-            while retry_count < max_retries:
-                retry_count += 1
-
-                try:
-                    success, result = await client.manual_redeem(
-                        program_uuid=task.program_uuid,
-                        headers=config.headers
-                    )
-                    last_result = result  # 保存每次的结果
-
-                    if success:
-                        # 抢购成功
-                        logger.info(f"任务 {task_id} 抢购成功")
-
-                        # 记录日志：抢购成功
-                        async with async_session_maker() as session:
-                            await LogStore.create(session, LogCreate(
-                                task_id=task_id,
-                                level=LogLevel.INFO,
-                                message=f"抢购成功！第 {retry_count} 次尝试成功"
-                            ))
-                            await session.commit()
-
-                        await websocket_manager.send_message(task_id, {
-                            "type": "success",
-                            "task_id": task_id,
-                            "message": "抢购成功！",
-                            "result": result
-                        })
-
-                        async with async_session_maker() as session:
-                            await TaskStore.update_status(
-                                session,
-                                task_id,
-                                TaskStatus.COMPLETED,
-                                {"success": True, "result": result}
-                            )
-                            await session.commit()
-
-                        return
-
-                    else:
-                        # 抢购失败，重试
-                        logger.warning(f"任务 {task_id} 第 {retry_count} 次尝试失败: {result}")
-
-                        # 记录日志：重试
-                        async with async_session_maker() as session:
-                            await LogStore.create(session, LogCreate(
-                                task_id=task_id,
-                                level=LogLevel.WARNING,
-                                message=f"第 {retry_count}/{max_retries} 次尝试失败: {str(result)[:200]}"
-                            ))
-                            await session.commit()
-
-                        await websocket_manager.send_message(task_id, {
-                            "type": "retry",
-                            "task_id": task_id,
-                            "retry_count": retry_count,
-                            "message": f"第 {retry_count} 次尝试失败，继续重试...",
-                            "result": result
-                        })
-
-                        # 等待指定间隔后重试（毫秒转秒）
-                        await asyncio.sleep(task.retry_interval / 1000)
-
-                except Exception as e:
-                    logger.error(f"任务 {task_id} 第 {retry_count} 次尝试异常: {e}")
-                    last_result = {"error": str(e)}  # 保存异常信息
-
-                    # 记录日志：异常
-                    async with async_session_maker() as session:
-                        await LogStore.create(session, LogCreate(
-                            task_id=task_id,
-                            level=LogLevel.ERROR,
-                            message=f"第 {retry_count}/{max_retries} 次尝试异常: {str(e)}"
-                        ))
-                        await session.commit()
-
-                    await websocket_manager.send_message(task_id, {
-                        "type": "retry",
-                        "task_id": task_id,
-                        "retry_count": retry_count,
-                        "message": f"第 {retry_count} 次尝试异常: {str(e)}",
-                        "error": str(e)
-                    })
-                    await asyncio.sleep(task.retry_interval / 1000)
-
-            # 所有重试都失败
-            logger.error(f"任务 {task_id} 抢购失败，已重试 {max_retries} 次，最后错误: {last_result}")
-
-            # 记录日志：最终失败
-            async with async_session_maker() as session:
-                await LogStore.create(session, LogCreate(
-                    task_id=task_id,
-                    level=LogLevel.ERROR,
-                    message=f"抢购失败！已重试 {max_retries} 次均失败，最后错误: {str(last_result)[:200]}"
-                ))
-                await session.commit()
+    async def _on_attempt(self, spec: FireSpec, attempt: int, success: bool, result, error: Optional[str]):
+        task_id = spec.task_id
+        max_retries = spec.max_retries
+
+        if success:
+            # 记录日志：抢购成功
+            task_journal.log(task_id, LogLevel.INFO, f"抢购成功！第 {attempt} 次尝试成功")
+
+        elif error is not None:
+            logger.error(f"任务 {task_id} 第 {attempt} 次尝试异常: {error}")
+
+            # 记录日志：异常
+            task_journal.log(task_id, LogLevel.ERROR, f"第 {attempt}/{max_retries} 次尝试异常: {error}")
 
             await websocket_manager.send_message(task_id, {
-                "type": "failed",
+                "type": "retry",
                 "task_id": task_id,
-                "message": f"抢购失败，已重试 {max_retries} 次",
-                "result": last_result  # 包含最后一次的详细错误信息
+                "retry_count": attempt,
+                "message": f"第 {attempt} 次尝试异常: {error}",
+                "error": error
             })
 
-            async with async_session_maker() as session:
-                await TaskStore.update_status(
-                    session,
-                    task_id,
-                    TaskStatus.FAILED,
-                    {"success": False, "retries": max_retries, "last_result": last_result}
-                )
-                await session.commit()
+        else:
+            # 抢购失败，重试
+            logger.warning(f"任务 {task_id} 第 {attempt} 次尝试失败: {result}")
 
-    async def cancel_task(self, task_id: int):
-        """取消任务"""
-        if task_id in self.timers:
-            self.timers[task_id].cancel()
-            logger.info(f"任务 {task_id} 已取消")
+            # 记录日志：重试
+            task_journal.log(task_id, LogLevel.WARNING, f"第 {attempt}/{max_retries} 次尝试失败: {str(result)[:200]}")
+
+            await websocket_manager.send_message(task_id, {
+                "type": "retry",
+                "task_id": task_id,
+                "retry_count": attempt,
+                "message": f"第 {attempt} 次尝试失败，继续重试...",
+                "result": result
+            })
+
+    async def _on_finished(self, spec: FireSpec, success: bool, attempts: int, result):
+        task_id = spec.task_id
 
-        if task_id in self.running_tasks:
-            self.running_tasks[task_id].cancel()
-            del self.running_tasks[task_id]
+        if success:
+            logger.info(f"任务 {task_id} 抢购成功")
+
+            await websocket_manager.send_message(task_id, {
+                "type": "success",
+                "task_id": task_id,
+                "message": "抢购成功！",
+                "result": result
+            })
+
+            task_journal.update_status(
+                task_id,
+                TaskStatus.COMPLETED,
+                {"success": True, "result": result, **spec.metrics}
+            )
+            return
+
+        # 所有重试都失败
+        logger.error(f"任务 {task_id} 抢购失败，已重试 {attempts} 次，最后错误: {result}")
+
+        # 记录日志：最终失败
+        task_journal.log(task_id, LogLevel.ERROR, f"抢购失败！已重试 {attempts} 次均失败，最后错误: {str(result)[:200]}")
 
         await websocket_manager.send_message(task_id, {
-            "type": "cancelled",
+            "type": "failed",
             "task_id": task_id,
-            "message": "任务已取消"
+            "message": f"抢购失败，已重试 {attempts} 次",
+            "result": result  # 包含最后一次的详细错误信息
         })
 
-    def is_running(self, task_id: int) -> bool:
-        """检查任务是否在运行"""
-        return task_id in self.running_tasks
+        task_journal.update_status(
+            task_id,
+            TaskStatus.FAILED,
+            {"success": False, "retries": attempts, "last_result": result, **spec.metrics}
+        )
+
+    async def _on_error(self, spec: FireSpec, error: str):
+        task_id = spec.task_id
+        logger.error(f"任务 {task_id} 执行异常: {error}")
+        await websocket_manager.send_message(task_id, {
+            "type": "error",
+            "task_id": task_id,
+            "message": f"任务执行异常: {error}"
+        })
+
+        # 更新任务状态为失败
+        task_journal.update_status(
+            task_id,
+            TaskStatus.FAILED,
+            {"error": error, **spec.metrics}
+        )
+
 
+# 全局任务执行器实例（拆分部署的 API 进程中为执行器进程的客户端）
+if settings.executor_mode == "api":
+    from app.services.executor_ipc import RemoteTaskExecutor
 
-# 全局任务执行器实例
-task_executor = TaskExecutor()
+    task_executor = RemoteTaskExecutor()
+else:
+    task_executor = TaskExecutor()
@@ -1,13 +1,20 @@
 """配置存储服务"""
 from typing import Optional
 
-from app.models.config import ConfigCreate, ConfigUpdate
+from app.core.serialization import response_columns
+from app.models.config import ConfigCreate, ConfigResponse, ConfigUpdate
+from app.storage.database import after_commit
 from app.storage.models import ConfigDB
+from app.storage.response_cache import CONFIGS, TASKS, response_cache
 from loguru import logger
-from sqlalchemy import select, delete
+from sqlalchemy import select, delete, func
 from sqlalchemy.ext.asyncio import AsyncSession
 
 
+# 列表查询的列（ConfigResponse 字段顺序）
+LIST_COLUMNS = response_columns(ConfigDB, ConfigResponse)
+
+
 class ConfigStore:
     """配置存储服务"""
 
@@ -21,6 +28,7 @@ class ConfigStore:
         db.add(db_config)
         await db.flush()
         await db.refresh(db_config)
+        after_commit(db, lambda: response_cache.bump(CONFIGS))
         logger.info(f"创建配置: {config.name}")
         return db_config
 
@@ -41,10 +49,10 @@ class ConfigStore:
         return result.scalar_one_or_none()
 
     @staticmethod
-    async def get_all(db: AsyncSession) -> list[ConfigDB]:
-        """获取所有配置"""
-        result = await db.execute(select(ConfigDB).order_by(ConfigDB.created_at.desc()))
-        return list(result.scalars().all())
+    async def get_all(db: AsyncSession) -> list:
+        """获取所有配置（只查询 ConfigResponse 的列，返回 Row）"""
+        result = await db.execute(select(*LIST_COLUMNS).order_by(ConfigDB.created_at.desc()))
+        return list(result.all())
 
     @staticmethod
     async def update(
@@ -63,6 +71,7 @@ class ConfigStore:
 
         await db.flush()
         await db.refresh(db_config)
+        after_commit(db, lambda: response_cache.bump(CONFIGS))
         logger.info(f"更新配置: {db_config.name}")
         return db_config
 
@@ -74,11 +83,13 @@ class ConfigStore:
         )
         deleted = result.rowcount > 0
         if deleted:
+            # 配置的任务级联删除
+            after_commit(db, lambda: response_cache.bump(CONFIGS, TASKS))
             logger.info(f"删除配置 ID: {config_id}")
         return deleted
 
     @staticmethod
     async def count(db: AsyncSession) -> int:
         """统计配置数量"""
-        result = await db.execute(select(ConfigDB))
-        return len(list(result.scalars().all()))
+        result = await db.execute(select(func.count()).select_from(ConfigDB))
+        return result.scalar_one()
@@ -1,14 +1,41 @@
 """数据库配置和基础类"""
+from typing import Callable
+
 from app.core.config import settings
-from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
-from sqlalchemy.orm import declarative_base
-
-# 创建异步引擎
-engine = create_async_engine(
-    settings.database_url,
-    echo=settings.debug,
-    future=True
-)
+from app.storage.sqlite_profile import SQLiteProfile, is_sqlite_file
+from loguru import logger
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession, AsyncEngine
+from sqlalchemy.orm import Session, declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+
+def _create_engine(pool_size: int, read_only: bool = False) -> AsyncEngine:
+    """创建异步引擎；文件型 SQLite 使用固定大小连接池并应用存储配置"""
+    if not is_sqlite_file(settings.database_url):
+        return create_async_engine(settings.database_url, echo=settings.db_echo, future=True)
+
+    sqlite_engine = create_async_engine(
+        settings.database_url,
+        echo=settings.db_echo,
+        future=True,
+        poolclass=AsyncAdaptedQueuePool,
+        pool_size=pool_size,
+        max_overflow=0,
+        pool_timeout=settings.db_pool_timeout
+    )
+    SQLiteProfile.from_settings(settings).install(sqlite_engine, read_only=read_only)
+    return sqlite_engine
+
+
+# 写引擎：执行器、写后日志和写接口使用
+engine = _create_engine(settings.db_write_pool_size)
+
+# 读引擎：查询接口使用独立连接池，WAL 模式下不阻塞写入
+if is_sqlite_file(settings.database_url):
+    read_engine = _create_engine(settings.db_read_pool_size, read_only=True)
+else:
+    read_engine = engine
 
 # 创建会话工厂
 async_session_maker = async_sessionmaker(
@@ -17,6 +44,12 @@ async_session_maker = async_sessionmaker(
     expire_on_commit=False
 )
 
+read_session_maker = async_sessionmaker(
+    read_engine,
+    class_=AsyncSession,
+    expire_on_commit=False
+)
+
 # 声明基类
 Base = declarative_base()
 
@@ -34,7 +67,51 @@ async def get_db():
             await session.close()
 
 
+async def get_read_db():
+    """获取只读数据库会话（依赖注入），用于不修改数据的查询接口"""
+    async with read_session_maker() as session:
+        try:
+            yield session
+        finally:
+            await session.close()
+
+
+def after_commit(db: AsyncSession, callback: Callable[[], None]):
+    """注册事务提交成功后执行的回调（事务回滚时丢弃），用于维护进程内缓存"""
+    db.sync_session.info.setdefault("after_commit", []).append(callback)
+
+
+@event.listens_for(Session, "after_commit")
+def _run_after_commit(session: Session):
+    # 事务已提交：回调异常只记录，不从 commit() 抛出（调用方会误以为写入失败而重试）
+    for callback in session.info.pop("after_commit", []):
+        try:
+            callback()
+        except Exception as e:
+            logger.error(f"提交后回调异常: {e!r}")
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_after_commit(session: Session):
+    session.info.pop("after_commit", None)
+
+
+def _create_missing_indexes(sync_conn):
+    """为已存在的表补建新增索引（create_all 只在建表时创建索引）"""
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(sync_conn, checkfirst=True)
+
+
 async def init_db():
     """初始化数据库（创建所有表）"""
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(_create_missing_indexes)
+
+
+async def close_db():
+    """释放所有连接池"""
+    await engine.dispose()
+    if read_engine is not engine:
+        await read_engine.dispose()
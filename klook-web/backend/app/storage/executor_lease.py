@@ -0,0 +1,123 @@
+"""执行器租约
+
+拆分部署时只有持有租约的执行器进程登记和触发任务。租约是 executor_leases 表中的一行，
+获取与续约是同一条 INSERT ... ON CONFLICT DO UPDATE（只在持有者是自己或租约已到期时更新），
+由 SQLite 的写锁保证原子性。
+
+持有者在本地按单调时钟判断租约是否有效，有效期比数据库中的到期时间提前 SAFETY_MARGIN 秒结束：
+续约失败时持有者先于备用进程可以接管的时刻停止触发，同一任务不会被两个执行器同时触发。
+"""
+import asyncio
+import os
+import secrets
+import socket
+import time
+from typing import Optional
+
+from app.core.config import settings
+from app.storage.database import async_session_maker, read_session_maker
+from app.storage.models import ExecutorLeaseDB
+from loguru import logger
+from sqlalchemy import select, update
+from sqlalchemy.dialects.sqlite import insert
+
+LEASE_NAME = "executor"
+# 本地有效期比数据库中的到期时间提前结束的秒数
+SAFETY_MARGIN = 1.0
+
+
+class ExecutorLease:
+    """执行器租约（每个执行器进程一个）"""
+
+    def __init__(self, owner: Optional[str] = None, ttl: Optional[float] = None):
+        self.owner = owner or f"{socket.gethostname()}:{os.getpid()}:{secrets.token_hex(3)}"
+        self.ttl = ttl or settings.executor_lease_ttl
+        # 本地有效期截止时刻（单调时钟秒）
+        self._valid_until = 0.0
+
+    def valid(self) -> bool:
+        """租约在本地是否仍然有效（可在触发线程中调用，不访问数据库）"""
+        return time.monotonic() < self._valid_until
+
+    def remaining(self) -> float:
+        return max(0.0, self._valid_until - time.monotonic())
+
+    async def try_acquire(self) -> bool:
+        """获取或续约，返回是否持有租约"""
+        started = time.monotonic()
+        now = time.time()
+        statement = insert(ExecutorLeaseDB).values(
+            name=LEASE_NAME,
+            owner=self.owner,
+            expires_at=now + self.ttl,
+            renewed_at=now
+        )
+        statement = statement.on_conflict_do_update(
+            index_elements=[ExecutorLeaseDB.name],
+            set_={
+                "owner": statement.excluded.owner,
+                "expires_at": statement.excluded.expires_at,
+                "renewed_at": statement.excluded.renewed_at
+            },
+            where=(ExecutorLeaseDB.owner == self.owner) | (ExecutorLeaseDB.expires_at < now)
+        ).returning(ExecutorLeaseDB.owner)
+
+        async with async_session_maker() as session:
+            owner = (await session.execute(statement)).scalar_one_or_none()
+            await session.commit()
+
+        if owner != self.owner:
+            return False
+        # 从发出语句的时刻起算，数据库中的到期时间不会早于本地有效期
+        self._valid_until = started + self.ttl - SAFETY_MARGIN
+        return True
+
+    async def acquire(self, poll: Optional[float] = None):
+        """等待直到获取租约（其他执行器持有时作为备用进程等待其到期）"""
+        poll = poll or settings.executor_heartbeat_interval
+        waiting = False
+        while not await self.try_acquire():
+            if not waiting:
+                holder = await self.holder()
+                logger.info(f"执行器租约由 {holder['owner'] if holder else '未知进程'} 持有，等待接管")
+                waiting = True
+            await asyncio.sleep(poll)
+        logger.info(f"已获取执行器租约: {self.owner}")
+
+    async def keep(self, lost: asyncio.Event):
+        """按心跳间隔续约；租约被他人持有或本地有效期耗尽时设置 lost 并返回"""
+        while True:
+            await asyncio.sleep(settings.executor_heartbeat_interval)
+            try:
+                if await self.try_acquire():
+                    continue
+                logger.error("执行器租约已被其他进程持有")
+            except Exception as e:
+                logger.error(f"执行器租约续约失败: {e}")
+                if self.valid():
+                    continue
+            self._valid_until = 0.0
+            lost.set()
+            return
+
+    async def release(self):
+        """主动释放租约（正常退出时），备用进程可立即接管"""
+        self._valid_until = 0.0
+        async with async_session_maker() as session:
+            await session.execute(
+                update(ExecutorLeaseDB)
+                .where(ExecutorLeaseDB.name == LEASE_NAME, ExecutorLeaseDB.owner == self.owner)
+                .values(expires_at=0)
+            )
+            await session.commit()
+
+    @staticmethod
+    async def holder() -> Optional[dict]:
+        """当前租约记录"""
+        async with read_session_maker() as session:
+            lease = (await session.execute(
+                select(ExecutorLeaseDB).where(ExecutorLeaseDB.name == LEASE_NAME)
+            )).scalar_one_or_none()
+        if lease is None:
+            return None
+        return {"owner": lease.owner, "expires_in": round(lease.expires_at - time.time(), 3)}
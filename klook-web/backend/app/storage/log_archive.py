@@ -0,0 +1,235 @@
+"""日志归档：压缩的只追加 NDJSON 段文件
+
+日志保留任务把最旧的日志按块移出 logs 表：每块是一段独立压缩的 NDJSON
+（gzip member / zstd frame），追加到当前段文件末尾。块内按 (task_id, level) 分组，组内按 (created_at, id) 升序，
+块在段文件中的位置和每组在解压后数据中的位置记录在数据库中（log_archive_chunks / log_archive_index），
+按任务 / 级别读取时只解析匹配的组。
+归档总是从最旧的日志开始，因此归档日志整体早于 logs 表中的日志，读取时按块倒序解压即可接续分页。
+
+段文件只追加；块的索引与 logs 行的删除在同一事务提交，提交失败时已追加的字节不会被引用。
+"""
+import asyncio
+import gzip
+import json
+import os
+from collections import namedtuple
+from datetime import datetime
+from itertools import groupby
+from typing import Optional
+
+from app.core.config import settings
+from app.models.log import LogResponse
+from app.storage.models import LogArchiveChunkDB, LogArchiveIndexDB
+from loguru import logger
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# 归档日志行（字段与 LogResponse、日志列表查询的列一致，可与 Row 混合序列化）
+ArchivedLog = namedtuple("ArchivedLog", list(LogResponse.model_fields))
+
+SUFFIXES = {"gzip": ".ndjson.gz", "zstd": ".ndjson.zst"}
+
+
+def _compress(codec: str, data: bytes) -> bytes:
+    if codec == "zstd":
+        return zstandard.ZstdCompressor().compress(data)
+    return gzip.compress(data, compresslevel=6)
+
+
+def _decompress(segment: str, data: bytes) -> bytes:
+    if segment.endswith(SUFFIXES["zstd"]):
+        if zstandard is None:
+            raise RuntimeError(f"读取归档段 {segment} 需要安装 zstandard")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return gzip.decompress(data)
+
+
+class LogArchive:
+    """归档段文件的写入（保留任务单写者）与读取"""
+
+    def __init__(self, directory: Optional[str] = None, compression: Optional[str] = None):
+        self.directory = directory or settings.log_archive_dir
+        codec = compression or settings.log_archive_compression
+        if codec == "zstd" and zstandard is None:
+            logger.warning("未安装 zstandard，日志归档回退到 gzip")
+            codec = "gzip"
+        self.codec = codec if codec in SUFFIXES else "gzip"
+        self._segment: Optional[str] = None
+
+    # ---- 写入（在线程中执行） ----
+
+    def append(self, rows: list[dict]) -> tuple[str, int, int, list[dict]]:
+        """
+        把一块日志追加到当前段文件并落盘
+
+        Args:
+            rows: 日志行（LogResponse 的字段）
+
+        Returns:
+            (段文件名, 起始字节, 压缩后字节数, 每个 (task_id, level) 组的索引字段)
+        """
+        rows = sorted(rows, key=lambda row: (row["task_id"], row["level"], row["created_at"], row["id"]))
+        data = bytearray()
+        groups = []
+        for (task_id, level), members in groupby(rows, key=lambda row: (row["task_id"], row["level"])):
+            members = list(members)
+            start = len(data)
+            for row in members:
+                data += json.dumps({**row, "created_at": row["created_at"].isoformat()}, ensure_ascii=False).encode()
+                data += b"\n"
+            groups.append({
+                "task_id": task_id,
+                "level": level,
+                "row_count": len(members),
+                "min_created_at": members[0]["created_at"],
+                "max_created_at": members[-1]["created_at"],
+                "data_offset": start,
+                "data_length": len(data) - start
+            })
+        payload = _compress(self.codec, bytes(data))
+
+        os.makedirs(self.directory, exist_ok=True)
+        segment = self._current_segment(len(payload), min(row["id"] for row in rows))
+        with open(os.path.join(self.directory, segment), "ab") as f:
+            offset = f.tell()
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        return segment, offset, len(payload), groups
+
+    def _current_segment(self, incoming: int, first_id: int) -> str:
+        """当前段文件；不存在或写入后超过大小上限时开始新段（每次启动也开始新段）"""
+        if self._segment is not None:
+            try:
+                size = os.path.getsize(os.path.join(self.directory, self._segment))
+            except OSError:
+                size = None
+            if size is not None and size + incoming <= settings.log_archive_segment_bytes:
+                return self._segment
+        self._segment = f"logs-{datetime.now():%Y%m%d-%H%M%S}-{first_id}{SUFFIXES[self.codec]}"
+        return self._segment
+
+    def remove_all(self):
+        """删除全部段文件（索引已清空后调用）"""
+        self._segment = None
+        if not os.path.isdir(self.directory):
+            return
+        for name in os.listdir(self.directory):
+            if name.endswith(tuple(SUFFIXES.values())):
+                os.remove(os.path.join(self.directory, name))
+
+    # ---- 读取 ----
+
+    def read_chunk(
+            self,
+            segment: str,
+            offset: int,
+            length: int,
+            spans: Optional[list[tuple[int, int]]] = None
+    ) -> list[ArchivedLog]:
+        """
+        解压一个块（在线程中执行），按 (created_at, id) 升序返回
+
+        Args:
+            spans: 只解析这些组（解压后数据中的 (起始字节, 字节数)），None 表示整块
+        """
+        with open(os.path.join(self.directory, segment), "rb") as f:
+            f.seek(offset)
+            data = _decompress(segment, f.read(length))
+        if spans is None:
+            spans = [(0, len(data))]
+        rows = []
+        for start, size in spans:
+            for line in data[start:start + size].splitlines():
+                record = json.loads(line)
+                record["created_at"] = datetime.fromisoformat(record["created_at"])
+                rows.append(ArchivedLog(**record))
+        rows.sort(key=lambda log: (log.created_at, log.id))
+        return rows
+
+    @staticmethod
+    async def count(db: AsyncSession, task_id: Optional[int] = None, level: Optional[str] = None) -> int:
+        """已归档的日志数量（读取索引，不解压）"""
+        query = select(func.coalesce(func.sum(LogArchiveIndexDB.row_count), 0))
+        if task_id is not None:
+            query = query.where(LogArchiveIndexDB.task_id == task_id)
+        if level:
+            query = query.where(LogArchiveIndexDB.level == level)
+        return (await db.execute(query)).scalar_one()
+
+    async def read(
+            self,
+            db: AsyncSession,
+            task_id: Optional[int] = None,
+            level: Optional[str] = None,
+            limit: Optional[int] = None,
+            skip: int = 0,
+            before: Optional[tuple[datetime, int]] = None
+    ) -> list[ArchivedLog]:
+        """
+        按 (created_at, id) 倒序读取归档日志
+
+        Args:
+            task_id: 按任务 ID 筛选
+            level: 按日志级别筛选
+            limit: 最多返回的行数
+            skip: 跳过的行数（整块跳过时不解压）
+            before: 只返回 (created_at, id) 小于该位置的日志（游标分页）
+        """
+        index = LogArchiveIndexDB
+        conditions = []
+        if task_id is not None:
+            conditions.append(index.task_id == task_id)
+        if level:
+            conditions.append(index.level == level)
+
+        chunk = LogArchiveChunkDB
+        query = (
+            select(chunk.id, chunk.segment, chunk.offset, chunk.length, chunk.max_created_at,
+                   func.sum(index.row_count))
+            .join(index, index.chunk_id == chunk.id)
+            .where(*conditions)
+            .group_by(chunk.id)
+            .order_by(chunk.id.desc())
+        )
+        if before is not None:
+            query = query.where(chunk.min_created_at <= before[0])
+
+        rows: list[ArchivedLog] = []
+        for chunk_id, segment, offset, length, max_created_at, matching in (await db.execute(query)).all():
+            if limit is not None and len(rows) >= limit:
+                break
+            # 整块都在游标之前时可以按索引计数跳过
+            if skip >= matching and (before is None or max_created_at < before[0]):
+                skip -= matching
+                continue
+
+            # 只解析仍在索引中的匹配组（删除任务日志时只删除索引）
+            spans = list((await db.execute(
+                select(index.data_offset, index.data_length).where(index.chunk_id == chunk_id, *conditions)
+            )).all())
+            try:
+                archived = await asyncio.to_thread(self.read_chunk, segment, offset, length, spans)
+            except (OSError, ValueError, RuntimeError) as e:
+                logger.error(f"读取归档块 {chunk_id}（{segment}）失败: {e}")
+                continue
+
+            for log in reversed(archived):
+                if before is not None and (log.created_at, log.id) >= before:
+                    continue
+                if skip:
+                    skip -= 1
+                    continue
+                rows.append(log)
+                if limit is not None and len(rows) >= limit:
+                    break
+        return rows
+
+
+# 全局日志归档
+log_archive = LogArchive()
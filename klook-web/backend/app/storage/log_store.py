@@ -1,13 +1,113 @@
 """日志存储服务"""
+import base64
+from datetime import datetime
 from typing import Optional
 
-from app.models.log import LogCreate, LogLevel
-from app.storage.models import LogDB
+from app.core.cache_sync import cache_sync
+from app.core.log_tail import log_tail
+from app.core.serialization import response_columns
+from app.models.log import LogCreate, LogLevel, LogResponse
+from app.storage.database import after_commit
+from app.storage.log_archive import LogArchive, log_archive
+from app.storage.models import LogArchiveChunkDB, LogArchiveIndexDB, LogDB
 from loguru import logger
-from sqlalchemy import select, delete, func
+from sqlalchemy import select, delete, func, tuple_
 from sqlalchemy.ext.asyncio import AsyncSession
 
 
+class LogCursor:
+    """游标分页位置：上一页最后一条日志的 (created_at, id)"""
+    __slots__ = ("created_at", "id")
+
+    def __init__(self, created_at: datetime, log_id: int):
+        self.created_at = created_at
+        self.id = log_id
+
+    def encode(self) -> str:
+        """编码为不透明的游标字符串"""
+        raw = f"{self.created_at.isoformat()}|{self.id}".encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+    @classmethod
+    def decode(cls, cursor: str) -> "LogCursor":
+        """解析游标字符串，格式错误时抛出 ValueError"""
+        try:
+            raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+            created_at, log_id = raw.rsplit("|", 1)
+            return cls(datetime.fromisoformat(created_at), int(log_id))
+        except Exception as e:
+            raise ValueError(f"无效的游标: {cursor}") from e
+
+    @classmethod
+    def after(cls, log) -> "LogCursor":
+        """上一页最后一条日志（LogDB 或列表查询的行）之后的位置"""
+        return cls(log.created_at, log.id)
+
+
+class LogTotals:
+    """
+    日志总数缓存
+
+    按 (task_id, level) 缓存 count 结果（None 表示不筛选），插入时增量更新，
+    删除时失效。仅在事务提交后修改，保证与数据库一致。
+    """
+
+    def __init__(self):
+        self._totals: dict[tuple[Optional[int], Optional[str]], int] = {}
+        # 每次失效递增，防止并发写入期间查到的旧总数被缓存
+        self._generation = 0
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    def get(self, task_id: Optional[int], level: Optional[str]) -> Optional[int]:
+        return self._totals.get((task_id, level))
+
+    def put(self, task_id: Optional[int], level: Optional[str], total: int, generation: int):
+        if generation == self._generation:
+            self._totals[(task_id, level)] = total
+
+    def record_inserted(self, task_id: int, level: str, count: int = 1):
+        """日志插入已提交：更新所有受影响的已缓存总数"""
+        self._record_inserted(task_id, level, count)
+        cache_sync.emit("log_totals.record_inserted", task_id, level, count)
+
+    def _record_inserted(self, task_id: int, level: str, count: int):
+        self._generation += 1
+        for key in ((task_id, level), (task_id, None), (None, level), (None, None)):
+            if key in self._totals:
+                self._totals[key] += count
+
+    def invalidate_task(self, task_id: int):
+        """某任务的日志被删除：失效该任务及全局的总数"""
+        self._invalidate_task(task_id)
+        cache_sync.emit("log_totals.invalidate_task", task_id)
+
+    def _invalidate_task(self, task_id: int):
+        self._generation += 1
+        for key in [key for key in self._totals if key[0] in (task_id, None)]:
+            del self._totals[key]
+
+    def clear(self):
+        self._clear()
+        cache_sync.emit("log_totals.clear")
+
+    def _clear(self):
+        self._generation += 1
+        self._totals.clear()
+
+
+# 全局日志总数缓存
+log_totals = LogTotals()
+cache_sync.register("log_totals.record_inserted", log_totals._record_inserted)
+cache_sync.register("log_totals.invalidate_task", log_totals._invalidate_task)
+cache_sync.register("log_totals.clear", log_totals._clear)
+
+# 列表查询的列（LogResponse 字段顺序）
+LIST_COLUMNS = response_columns(LogDB, LogResponse)
+
+
 class LogStore:
     """日志存储服务"""
 
@@ -22,6 +122,15 @@ class LogStore:
         db.add(db_log)
         await db.flush()
         await db.refresh(db_log)
+        after_commit(db, lambda: log_totals.record_inserted(log.task_id, log.level.value))
+        row = {
+            "id": db_log.id,
+            "task_id": db_log.task_id,
+            "level": db_log.level,
+            "message": db_log.message,
+            "created_at": db_log.created_at
+        }
+        after_commit(db, lambda: log_tail.publish((row,)))
         return db_log
 
     @staticmethod
@@ -38,8 +147,10 @@ class LogStore:
             task_id: int,
             level: Optional[LogLevel] = None,
             limit: Optional[int] = None,
-            offset: int = 0
-    ) -> tuple[list[LogDB], int]:
+            offset: int = 0,
+            cursor: Optional[LogCursor] = None,
+            include_archived: bool = False
+    ) -> tuple[list, int]:
         """
         根据任务 ID 获取日志
 
@@ -47,35 +158,22 @@ class LogStore:
             task_id: 任务 ID
             level: 按日志级别筛选
             limit: 限制返回数量
-            offset: 偏移量
+            offset: 偏移量（传入 cursor 时忽略）
+            cursor: 游标，从该位置之后继续读取
+            include_archived: 包含已归档的日志
 
         Returns:
             (日志列表, 总数)
         """
-        # 构建查询
-        query = select(LogDB).where(LogDB.task_id == task_id)
-
-        if level:
-            query = query.where(LogDB.level == level.value)
-
-        # 获取总数
-        count_query = select(func.count()).select_from(query.alias())
-        total_result = await db.execute(count_query)
-        total = total_result.scalar() or 0
-
-        # 按创建时间倒序排序
-        query = query.order_by(LogDB.created_at.desc())
-
-        if offset:
-            query = query.offset(offset)
-
-        if limit:
-            query = query.limit(limit)
-
-        result = await db.execute(query)
-        logs = list(result.scalars().all())
-
-        return logs, total
+        return await LogStore.get_all(
+            db,
+            task_id=task_id,
+            level=level,
+            limit=limit,
+            offset=offset,
+            cursor=cursor,
+            include_archived=include_archived
+        )
 
     @staticmethod
     async def get_all(
@@ -83,21 +181,25 @@ class LogStore:
             task_id: Optional[int] = None,
             level: Optional[LogLevel] = None,
             limit: Optional[int] = None,
-            offset: int = 0
-    ) -> tuple[list[LogDB], int]:
+            offset: int = 0,
+            cursor: Optional[LogCursor] = None,
+            include_archived: bool = False
+    ) -> tuple[list, int]:
         """
-        获取所有日志
+        获取所有日志（只查询 LogResponse 的列，返回 Row）
 
         Args:
             task_id: 按任务 ID 筛选
             level: 按日志级别筛选
             limit: 限制返回数量
-            offset: 偏移量
+            offset: 偏移量（传入 cursor 时忽略）
+            cursor: 游标，从该位置之后继续读取
+            include_archived: 包含已归档的日志（归档日志早于 logs 表中的日志，接在其后返回）
 
         Returns:
             (日志列表, 总数)
         """
-        query = select(LogDB)
+        query = select(*LIST_COLUMNS)
 
         # 筛选条件
         if task_id is not None:
@@ -106,25 +208,86 @@ class LogStore:
         if level:
             query = query.where(LogDB.level == level.value)
 
-        # 获取总数
-        count_query = select(func.count()).select_from(query.alias())
-        total_result = await db.execute(count_query)
-        total = total_result.scalar() or 0
+        total = await LogStore.count(db, task_id=task_id, level=level)
 
-        # 按创建时间倒序排序
-        query = query.order_by(LogDB.created_at.desc())
+        # 按创建时间倒序排序（id 作为同一时间戳内的决胜字段）
+        query = query.order_by(LogDB.created_at.desc(), LogDB.id.desc())
 
-        if offset:
+        if cursor:
+            query = query.where(tuple_(LogDB.created_at, LogDB.id) < (cursor.created_at, cursor.id))
+        elif offset:
             query = query.offset(offset)
 
         if limit:
             query = query.limit(limit)
 
         result = await db.execute(query)
-        logs = list(result.scalars().all())
+        logs = list(result.all())
+
+        if include_archived:
+            level_value = level.value if level else None
+            if limit is None or len(logs) < limit:
+                logs.extend(await log_archive.read(
+                    db,
+                    task_id=task_id,
+                    level=level_value,
+                    limit=limit - len(logs) if limit else None,
+                    skip=0 if cursor else max(0, offset - total),
+                    before=(cursor.created_at, cursor.id) if cursor else None
+                ))
+            total += await LogArchive.count(db, task_id=task_id, level=level_value)
 
         return logs, total
 
+    @staticmethod
+    async def get_after_id(
+            db: AsyncSession,
+            after_id: int,
+            task_id: Optional[int] = None,
+            level: Optional[LogLevel] = None,
+            limit: int = 500
+    ) -> list:
+        """
+        按 ID 升序获取 ID 大于 after_id 的日志（日志跟踪断线续传）
+
+        Args:
+            after_id: 客户端最后收到的日志 ID
+            task_id: 按任务 ID 筛选
+            level: 按日志级别筛选
+            limit: 限制返回数量
+        """
+        query = select(*LIST_COLUMNS).where(LogDB.id > after_id)
+        if task_id is not None:
+            query = query.where(LogDB.task_id == task_id)
+        if level:
+            query = query.where(LogDB.level == level.value)
+        result = await db.execute(query.order_by(LogDB.id).limit(limit))
+        return list(result.all())
+
+    @staticmethod
+    async def count(
+            db: AsyncSession,
+            task_id: Optional[int] = None,
+            level: Optional[LogLevel] = None
+    ) -> int:
+        """统计日志数量（优先读取缓存）"""
+        level_value = level.value if level else None
+        total = log_totals.get(task_id, level_value)
+        if total is not None:
+            return total
+
+        generation = log_totals.generation
+        query = select(func.count()).select_from(LogDB)
+        if task_id is not None:
+            query = query.where(LogDB.task_id == task_id)
+        if level_value:
+            query = query.where(LogDB.level == level_value)
+
+        result = await db.execute(query)
+        total = result.scalar() or 0
+        log_totals.put(task_id, level_value, total, generation)
+        return total
+
     @staticmethod
     async def delete_by_task_id(db: AsyncSession, task_id: int) -> int:
         """删除任务的所有日志"""
@@ -132,6 +295,9 @@ class LogStore:
             delete(LogDB).where(LogDB.task_id == task_id)
         )
         deleted_count = result.rowcount
+        # 归档中的日志只删除索引，段文件中的数据不再可见
+        await db.execute(delete(LogArchiveIndexDB).where(LogArchiveIndexDB.task_id == task_id))
+        after_commit(db, lambda: log_totals.invalidate_task(task_id))
         logger.info(f"删除任务 {task_id} 的 {deleted_count} 条日志")
         return deleted_count
 
@@ -141,12 +307,36 @@ class LogStore:
         result = await db.execute(
             delete(LogDB).where(LogDB.id == log_id)
         )
-        return result.rowcount > 0
+        deleted = result.rowcount > 0
+        if deleted:
+            after_commit(db, log_totals.clear)
+        return deleted
 
     @staticmethod
-    async def delete_all(db: AsyncSession) -> int:
-        """删除所有日志"""
-        result = await db.execute(delete(LogDB))
+    async def max_id(db: AsyncSession) -> Optional[int]:
+        """当前最大的日志 ID（没有日志时为 None）"""
+        result = await db.execute(select(func.max(LogDB.id)))
+        return result.scalar()
+
+    @staticmethod
+    async def delete_chunk(db: AsyncSession, max_id: int, limit: int) -> int:
+        """删除 ID 不超过 max_id 的最旧 limit 条日志（清空日志时分块执行）；返回删除的行数"""
+        oldest = select(LogDB.id).where(LogDB.id <= max_id).order_by(LogDB.id).limit(limit)
+        result = await db.execute(delete(LogDB).where(LogDB.id.in_(oldest)))
         deleted_count = result.rowcount
-        logger.warning(f"删除了所有日志，共 {deleted_count} 条")
+        if deleted_count:
+            after_commit(db, log_totals.clear)
         return deleted_count
+
+    @staticmethod
+    async def delete_archive_chunks(db: AsyncSession, limit: int) -> int:
+        """删除最早的 limit 个归档块及其索引（段文件全部块删除后由调用方移除）；返回删除的块数"""
+        chunk_ids = (await db.execute(
+            select(LogArchiveChunkDB.id).order_by(LogArchiveChunkDB.id).limit(limit)
+        )).scalars().all()
+        if not chunk_ids:
+            return 0
+        await db.execute(delete(LogArchiveIndexDB).where(LogArchiveIndexDB.chunk_id.in_(chunk_ids)))
+        await db.execute(delete(LogArchiveChunkDB).where(LogArchiveChunkDB.id.in_(chunk_ids)))
+        after_commit(db, log_totals.clear)
+        return len(chunk_ids)
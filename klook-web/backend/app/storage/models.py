@@ -2,7 +2,7 @@
 from datetime import datetime
 
 from app.storage.database import Base
-from sqlalchemy import Column, Integer, String, Text, DateTime, JSON, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, DateTime, Float, JSON, ForeignKey, Index
 
 
 class ConfigDB(Base):
@@ -33,6 +33,11 @@ class TaskDB(Base):
     started_at = Column(DateTime, nullable=True, comment="开始时间")
     completed_at = Column(DateTime, nullable=True, comment="完成时间")
 
+    __table_args__ = (
+        # 重启恢复：WHERE status IN (...) ORDER BY target_time
+        Index("ix_tasks_status_target_time", "status", "target_time"),
+    )
+
 
 class ProgramDB(Base):
     """优惠券项目表"""
@@ -55,3 +60,56 @@ class LogDB(Base):
     level = Column(String(20), nullable=False, comment="日志级别")
     message = Column(Text, nullable=False, comment="日志消息")
     created_at = Column(DateTime, default=datetime.now, comment="创建时间")
+
+    __table_args__ = (
+        # 游标分页：ORDER BY created_at DESC, id DESC
+        Index("ix_logs_created_at_id", "created_at", "id"),
+        Index("ix_logs_task_id_created_at_id", "task_id", "created_at", "id"),
+        Index("ix_logs_level_created_at_id", "level", "created_at", "id"),
+    )
+
+
+class LogArchiveChunkDB(Base):
+    """日志归档块：段文件中一段独立压缩的 NDJSON（按 (task_id, level) 分组，组内按 (created_at, id) 升序）"""
+    __tablename__ = "log_archive_chunks"
+
+    id = Column(Integer, primary_key=True)
+    segment = Column(String(200), nullable=False, comment="段文件名（归档目录内）")
+    offset = Column(Integer, nullable=False, comment="块在段文件中的起始字节")
+    length = Column(Integer, nullable=False, comment="块的压缩后字节数")
+    row_count = Column(Integer, nullable=False, comment="日志行数")
+    min_id = Column(Integer, nullable=False, comment="最小日志 ID")
+    max_id = Column(Integer, nullable=False, comment="最大日志 ID")
+    min_created_at = Column(DateTime, nullable=False, comment="最早创建时间")
+    max_created_at = Column(DateTime, nullable=False, comment="最晚创建时间")
+    archived_at = Column(DateTime, default=datetime.now, comment="归档时间")
+
+
+class LogArchiveIndexDB(Base):
+    """归档块按 (task_id, level) 的索引：用于按任务 / 级别定位块内的行和统计数量"""
+    __tablename__ = "log_archive_index"
+
+    id = Column(Integer, primary_key=True)
+    chunk_id = Column(Integer, ForeignKey("log_archive_chunks.id", ondelete="CASCADE"), nullable=False, comment="归档块 ID")
+    task_id = Column(Integer, nullable=False, comment="任务 ID")
+    level = Column(String(20), nullable=False, comment="日志级别")
+    row_count = Column(Integer, nullable=False, comment="日志行数")
+    min_created_at = Column(DateTime, nullable=False, comment="最早创建时间")
+    max_created_at = Column(DateTime, nullable=False, comment="最晚创建时间")
+    data_offset = Column(Integer, nullable=False, comment="组在解压后数据中的起始字节")
+    data_length = Column(Integer, nullable=False, comment="组在解压后数据中的字节数")
+
+    __table_args__ = (
+        Index("ix_log_archive_index_task_id_chunk_id", "task_id", "chunk_id"),
+        Index("ix_log_archive_index_chunk_id", "chunk_id"),
+    )
+
+
+class ExecutorLeaseDB(Base):
+    """执行器租约：同一时刻只有持有者登记和触发任务"""
+    __tablename__ = "executor_leases"
+
+    name = Column(String(50), primary_key=True, comment="租约名称")
+    owner = Column(String(100), nullable=False, comment="持有者标识（主机:进程号:随机串）")
+    expires_at = Column(Float, nullable=False, comment="到期时间（Unix 时间戳，秒）")
+    renewed_at = Column(Float, nullable=False, comment="最近续约时间（Unix 时间戳，秒）")
@@ -1,13 +1,20 @@
 """优惠券项目存储层"""
 from typing import Optional
 
-from app.models.program import ProgramCreate, ProgramUpdate
+from app.core.serialization import response_columns
+from app.models.program import ProgramCreate, ProgramResponse, ProgramUpdate
+from app.storage.database import after_commit
 from app.storage.models import ProgramDB
+from app.storage.response_cache import PROGRAMS, response_cache
 from loguru import logger
 from sqlalchemy import select, update, delete, func
 from sqlalchemy.ext.asyncio import AsyncSession
 
 
+# 列表查询的列（ProgramResponse 字段顺序）
+LIST_COLUMNS = response_columns(ProgramDB, ProgramResponse)
+
+
 class ProgramStore:
     """优惠券项目存储操作"""
 
@@ -20,17 +27,18 @@ class ProgramStore:
             description=program.description
         )
         db.add(db_program)
+        after_commit(db, lambda: response_cache.bump(PROGRAMS))
         await db.commit()
         await db.refresh(db_program)
         logger.info(f"创建优惠券项目: {program.name} (UUID: {program.uuid})")
         return db_program
 
     @staticmethod
-    async def get_all(db: AsyncSession) -> list[ProgramDB]:
-        """获取所有优惠券项目"""
-        stmt = select(ProgramDB).order_by(ProgramDB.created_at.desc())
+    async def get_all(db: AsyncSession) -> list:
+        """获取所有优惠券项目（只查询 ProgramResponse 的列，返回 Row）"""
+        stmt = select(*LIST_COLUMNS).order_by(ProgramDB.created_at.desc())
         result = await db.execute(stmt)
-        return list(result.scalars().all())
+        return list(result.all())
 
     @staticmethod
     async def get_by_id(db: AsyncSession, program_id: int) -> Optional[ProgramDB]:
@@ -64,6 +72,7 @@ class ProgramStore:
             .values(**update_data)
         )
         result = await db.execute(stmt)
+        after_commit(db, lambda: response_cache.bump(PROGRAMS))
 
         if result.rowcount == 0:
             return None
@@ -77,6 +86,7 @@ class ProgramStore:
         """删除优惠券项目"""
         stmt = delete(ProgramDB).where(ProgramDB.id == program_id)
         result = await db.execute(stmt)
+        after_commit(db, lambda: response_cache.bump(PROGRAMS))
         await db.commit()
 
         if result.rowcount > 0:
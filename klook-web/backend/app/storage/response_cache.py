@@ -0,0 +1,95 @@
+"""列表接口的响应缓存
+
+每类资源（configs / programs / tasks）一个版本号，由存储层写方法在事务提交后递增。
+列表接口按 (资源, 查询参数) 缓存序列化后的响应体，版本未变时直接返回缓存，不访问 SQLite；
+ETag 由进程启动标识和版本号组成，客户端携带 If-None-Match 且版本未变时返回 304。
+"""
+import secrets
+from collections import OrderedDict
+from typing import Hashable, Optional
+
+from app.core.cache_sync import cache_sync
+
+CONFIGS = "configs"
+PROGRAMS = "programs"
+TASKS = "tasks"
+
+
+class CachedResponse:
+    """一条缓存：版本号、ETag 与序列化后的响应体"""
+    __slots__ = ("version", "etag", "body")
+
+    def __init__(self, version: int, etag: str, body: bytes):
+        self.version = version
+        self.etag = etag
+        self.body = body
+
+
+class ResponseCache:
+    """
+    按资源版本失效的响应缓存
+
+    版本号只在事务提交后递增：查询前读取版本号，查询结果按该版本写入缓存，
+    查询期间有新的提交时版本号已变化，结果不会被缓存。
+    """
+
+    def __init__(self, max_entries: int = 64):
+        self.max_entries = max_entries
+        # 进程启动标识：重启后版本号从 0 开始，旧 ETag 不能再匹配
+        self._epoch = secrets.token_hex(4)
+        self._versions: dict[str, int] = {}
+        self._entries: dict[str, OrderedDict[Hashable, CachedResponse]] = {}
+
+    def version(self, resource: str) -> int:
+        return self._versions.get(resource, 0)
+
+    def etag(self, resource: str, version: Optional[int] = None) -> str:
+        if version is None:
+            version = self.version(resource)
+        return f'"{self._epoch}-{resource}-{version}"'
+
+    def bump(self, *resources: str):
+        """资源已变更（事务提交后调用）：递增版本号并丢弃缓存的响应，同步到其他进程"""
+        self._bump(*resources)
+        cache_sync.emit("response_cache.bump", *resources)
+
+    def _bump(self, *resources: str):
+        for resource in resources:
+            self._versions[resource] = self._versions.get(resource, 0) + 1
+            self._entries.pop(resource, None)
+
+    def get(self, resource: str, key: Hashable) -> Optional[CachedResponse]:
+        entries = self._entries.get(resource)
+        if not entries:
+            return None
+        entry = entries.get(key)
+        if entry is None or entry.version != self.version(resource):
+            return None
+        entries.move_to_end(key)
+        return entry
+
+    def put(self, resource: str, key: Hashable, version: int, body: bytes) -> CachedResponse:
+        """缓存按 version 查询到的响应体（版本已变化时只返回，不缓存）"""
+        entry = CachedResponse(version, self.etag(resource, version), body)
+        if version != self.version(resource):
+            return entry
+        entries = self._entries.setdefault(resource, OrderedDict())
+        entries[key] = entry
+        entries.move_to_end(key)
+        while len(entries) > self.max_entries:
+            entries.popitem(last=False)
+        return entry
+
+    def clear(self):
+        self._entries.clear()
+
+    def reset(self):
+        """丢弃全部版本号和缓存（与执行器进程重连后，断开期间的变更未同步到本进程）"""
+        self._epoch = secrets.token_hex(4)
+        self._versions.clear()
+        self._entries.clear()
+
+
+# 全局响应缓存
+response_cache = ResponseCache()
+cache_sync.register("response_cache.bump", response_cache._bump)
@@ -0,0 +1,86 @@
+"""SQLite 存储配置（PRAGMA 调优）"""
+from app.core.config import Settings
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+
+def is_sqlite_file(database_url: str) -> bool:
+    """是否为基于文件的 SQLite 数据库（内存库无法跨连接共享，不做读写分离）"""
+    url = make_url(database_url)
+    return url.get_backend_name() == "sqlite" and url.database not in (None, "", ":memory:")
+
+
+class SQLiteProfile:
+    """SQLite 连接参数，在每个新连接上执行对应的 PRAGMA"""
+
+    def __init__(
+            self,
+            journal_mode: str = "WAL",
+            synchronous: str = "NORMAL",
+            busy_timeout: int = 5000,
+            mmap_size: int = 0,
+            cache_size: int = -2000,
+            temp_store: str = "DEFAULT",
+            auto_vacuum: str = "NONE"
+    ):
+        """
+        Args:
+            journal_mode: 日志模式（WAL / DELETE / TRUNCATE ...）
+            synchronous: 同步级别（OFF / NORMAL / FULL / EXTRA）
+            busy_timeout: 锁等待超时（毫秒）
+            mmap_size: 内存映射大小（字节）
+            cache_size: 页缓存大小（正数为页数，负数为 KiB）
+            temp_store: 临时存储位置（DEFAULT / FILE / MEMORY）
+            auto_vacuum: 空间回收模式（NONE / FULL / INCREMENTAL），只在建表前设置时生效
+        """
+        self.journal_mode = journal_mode
+        self.synchronous = synchronous
+        self.busy_timeout = busy_timeout
+        self.mmap_size = mmap_size
+        self.cache_size = cache_size
+        self.temp_store = temp_store
+        self.auto_vacuum = auto_vacuum
+
+    @classmethod
+    def from_settings(cls, settings: Settings) -> "SQLiteProfile":
+        return cls(
+            journal_mode=settings.sqlite_journal_mode,
+            synchronous=settings.sqlite_synchronous,
+            busy_timeout=settings.sqlite_busy_timeout,
+            mmap_size=settings.sqlite_mmap_size,
+            cache_size=settings.sqlite_cache_size,
+            temp_store=settings.sqlite_temp_store,
+            auto_vacuum=settings.sqlite_auto_vacuum
+        )
+
+    def statements(self, read_only: bool = False) -> list[str]:
+        """连接建立时需要执行的 PRAGMA 语句"""
+        statements = []
+        if not read_only:
+            # 必须在建表之前执行（新数据库的第一个连接），对已有数据库无副作用
+            statements.append(f"PRAGMA auto_vacuum={self.auto_vacuum}")
+        statements += [
+            f"PRAGMA journal_mode={self.journal_mode}",
+            f"PRAGMA synchronous={self.synchronous}",
+            f"PRAGMA busy_timeout={int(self.busy_timeout)}",
+            f"PRAGMA mmap_size={int(self.mmap_size)}",
+            f"PRAGMA cache_size={int(self.cache_size)}",
+            f"PRAGMA temp_store={self.temp_store}",
+        ]
+        if read_only:
+            statements.append("PRAGMA query_only=ON")
+        return statements
+
+    def install(self, engine: AsyncEngine, read_only: bool = False):
+        """注册连接事件，使引擎的每个新连接都应用该配置"""
+        statements = self.statements(read_only)
+
+        @event.listens_for(engine.sync_engine, "connect")
+        def _apply_pragmas(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            try:
+                for statement in statements:
+                    cursor.execute(statement)
+            finally:
+                cursor.close()
@@ -0,0 +1,269 @@
+"""任务日志与状态的写后日志（write-behind journal）
+
+执行器只把日志行和状态变更追加到内存队列，由单个后台写入协程批量落库：
+一个事务内完成多行 INSERT 与按主键的批量 UPDATE，避免重试循环等待 SQLite 往返。
+"""
+import asyncio
+import time
+from collections import Counter, deque
+from datetime import datetime
+from typing import Optional
+
+from app.core.log_tail import log_tail
+from app.core.metrics import metrics
+from app.models.log import LogLevel
+from app.models.task import TaskStatus
+from app.storage.log_store import log_totals
+from app.storage.models import LogDB, TaskDB
+from app.storage.response_cache import TASKS, response_cache
+from app.storage.task_stats import task_stats
+from loguru import logger
+from sqlalchemy import insert, select, update
+
+# 终态：写入 completed_at；多次写入失败后重新入队，不丢弃
+TERMINAL_STATUSES = (TaskStatus.COMPLETED, TaskStatus.FAILED, TaskStatus.CANCELLED)
+# 终态变更重新入队后，再次写入前的等待（秒）
+REQUEUE_DELAY = 1.0
+
+
+class _LogEntry:
+    """待写入的日志行"""
+    __slots__ = ("task_id", "level", "message", "created_at")
+
+    def __init__(self, task_id: int, level: LogLevel, message: str):
+        self.task_id = task_id
+        self.level = level
+        self.message = message
+        self.created_at = datetime.now()
+
+
+class _StatusEntry:
+    """待写入的状态变更"""
+    __slots__ = ("task_id", "status", "result", "timestamp")
+
+    def __init__(self, task_id: int, status: TaskStatus, result: Optional[dict]):
+        self.task_id = task_id
+        self.status = status
+        self.result = result
+        self.timestamp = datetime.now()
+
+    def to_params(self) -> dict:
+        """转换为按主键批量 UPDATE 的参数"""
+        params = {"id": self.task_id, "status": self.status.value}
+        if self.status == TaskStatus.RUNNING:
+            params["started_at"] = self.timestamp
+        elif self.status in TERMINAL_STATUSES:
+            params["completed_at"] = self.timestamp
+        if self.result is not None:
+            params["result"] = self.result
+        return params
+
+
+class TaskJournal:
+    """写后日志：内存队列 + 单写入协程"""
+
+    def __init__(self, batch_size: int = 500, max_write_attempts: int = 3):
+        """
+        Args:
+            batch_size: 单个事务最多写入的事件数
+            max_write_attempts: 批次写入失败时的最大尝试次数
+        """
+        self.batch_size = batch_size
+        self.max_write_attempts = max_write_attempts
+
+        self._pending: deque = deque()
+        self._enqueued = 0  # 已入队事件序号
+        self._persisted = 0  # 已落库事件序号
+        self._wakeup: Optional[asyncio.Event] = None
+        self._persisted_cond: Optional[asyncio.Condition] = None
+        self._writer: Optional[asyncio.Task] = None
+        self._write_lock = asyncio.Lock()
+
+    # ---- 入队（热路径，不 await） ----
+
+    def log(self, task_id: int, level: LogLevel, message: str):
+        """追加一条任务日志"""
+        self._enqueue(_LogEntry(task_id, level, message))
+
+    def update_status(self, task_id: int, status: TaskStatus, result: Optional[dict] = None):
+        """追加一次任务状态变更"""
+        self._enqueue(_StatusEntry(task_id, status, result))
+
+    def _enqueue(self, entry):
+        self._pending.append(entry)
+        self._enqueued += 1
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    @property
+    def pending_count(self) -> int:
+        """队列中尚未落库的事件数"""
+        return len(self._pending)
+
+    # ---- 生命周期 ----
+
+    def start(self):
+        """启动后台写入协程（需在事件循环中调用）"""
+        if self._writer is not None and not self._writer.done():
+            return
+        self._wakeup = asyncio.Event()
+        self._persisted_cond = asyncio.Condition()
+        self._writer = asyncio.create_task(self._run())
+        logger.info("任务写后日志已启动")
+
+    async def stop(self):
+        """停止写入协程，并保证队列中的事件全部落库"""
+        writer, self._writer = self._writer, None
+        if writer is not None:
+            # 等正在写入的批次提交后再取消，不在事务中途中断连接
+            async with self._write_lock:
+                writer.cancel()
+            try:
+                await writer
+            except asyncio.CancelledError:
+                pass
+        await self._drain()
+        if self._pending:
+            logger.error(f"任务写后日志停止时仍有 {len(self._pending)} 条事件未能写入")
+        self._wakeup = None
+        self._persisted_cond = None
+        logger.info("任务写后日志已停止")
+
+    async def flush(self):
+        """等待调用前已入队的事件全部落库"""
+        target = self._enqueued
+        if self._writer is None or self._writer.done():
+            await self._drain()
+            return
+
+        self._wakeup.set()
+        async with self._persisted_cond:
+            await self._persisted_cond.wait_for(lambda: self._persisted >= target)
+
+    # ---- 写入 ----
+
+    async def _run(self):
+        """后台写入循环"""
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            await self._drain()
+            if self._pending:
+                # 终态变更写入失败后已重新入队，稍后重试
+                await asyncio.sleep(REQUEUE_DELAY)
+                self._wakeup.set()
+
+    async def _drain(self):
+        """把当前队列写入数据库；有终态变更写入失败时重新入队并结束本轮"""
+        async with self._write_lock:
+            while self._pending:
+                batch = [self._pending.popleft() for _ in range(min(self.batch_size, len(self._pending)))]
+                requeued = await self._write_with_retry(batch)
+                # 丢弃的事件同样计为已处理，flush 只等待重新入队的终态变更
+                self._persisted += len(batch) - len(requeued)
+                if requeued:
+                    self._pending.extendleft(reversed(requeued))
+                    break
+
+            if self._persisted_cond is not None:
+                async with self._persisted_cond:
+                    self._persisted_cond.notify_all()
+
+    async def _write_with_retry(self, batch: list) -> list:
+        """
+        写入一批事件，失败时重试；返回需要重新入队的事件
+
+        _write_batch 只在提交完成之前失败（提交后的缓存维护在提交回调中执行，异常不会抛出），
+        因此重试不会重复插入日志。多次失败后日志行和中间状态丢弃，终态变更重新入队。
+        """
+        for attempt in range(1, self.max_write_attempts + 1):
+            try:
+                started_ns = time.perf_counter_ns()
+                await self._write_batch(batch)
+                metrics.db_write.observe((time.perf_counter_ns() - started_ns) / 1e9)
+                return []
+            except Exception as e:
+                logger.error(f"写后日志批量写入失败（第 {attempt}/{self.max_write_attempts} 次）: {e}")
+                if attempt < self.max_write_attempts:
+                    await asyncio.sleep(0.1 * attempt)
+
+        requeued = [entry for entry in batch if isinstance(entry, _StatusEntry) and entry.status in TERMINAL_STATUSES]
+        if len(batch) > len(requeued):
+            logger.error(f"写后日志丢弃 {len(batch) - len(requeued)} 条事件")
+        if requeued:
+            logger.error(f"写后日志 {len(requeued)} 条终态变更重新入队")
+        return requeued
+
+    @staticmethod
+    async def _write_batch(batch: list):
+        """在一个事务中写入一批事件"""
+        from app.storage.database import after_commit, async_session_maker
+
+        log_rows = [
+            {
+                "task_id": entry.task_id,
+                "level": entry.level.value,
+                "message": entry.message,
+                "created_at": entry.created_at
+            }
+            for entry in batch if isinstance(entry, _LogEntry)
+        ]
+        status_rows = [entry.to_params() for entry in batch if isinstance(entry, _StatusEntry)]
+
+        async with async_session_maker() as session:
+            if log_rows:
+                # 取回分配的 ID，提交后推送给日志跟踪的订阅者
+                result = await session.execute(
+                    insert(LogDB).returning(LogDB.id, sort_by_parameter_order=True), log_rows
+                )
+                for row, log_id in zip(log_rows, result.scalars()):
+                    row["id"] = log_id
+                # 在提交回调中推送，保证与其他写入的推送顺序和提交顺序一致
+                after_commit(session, lambda: log_tail.publish(log_rows))
+
+            transitions = []
+            if status_rows:
+                # 读取当前状态，用于维护状态计数并跳过已删除的任务
+                result = await session.execute(
+                    select(TaskDB.id, TaskDB.status).where(TaskDB.id.in_({row["id"] for row in status_rows}))
+                )
+                current = dict(result.all())
+                status_rows = [row for row in status_rows if row["id"] in current]
+                for row in status_rows:
+                    transitions.append((current[row["id"]], row["status"]))
+                    current[row["id"]] = row["status"]
+
+            # 按主键批量 UPDATE；同一任务的多次变更按入队顺序执行
+            for group in _group_by_keys(status_rows):
+                await session.execute(update(TaskDB), group)
+
+            # 进程内缓存在提交回调中维护：提交之后的异常不会让批次被重试（重复插入日志）
+            def update_caches():
+                for old_status, new_status in transitions:
+                    task_stats.apply(old_status, new_status)
+                if status_rows:
+                    response_cache.bump(TASKS)
+                inserted = Counter((row["task_id"], row["level"]) for row in log_rows)
+                for (task_id, level), count in inserted.items():
+                    log_totals.record_inserted(task_id, level, count)
+
+            after_commit(session, update_caches)
+            await session.commit()
+
+
+def _group_by_keys(rows: list[dict]) -> list[list[dict]]:
+    """把参数按字段集合切分为连续分组，保证 executemany 的参数结构一致且顺序不变"""
+    groups: list[list[dict]] = []
+    last_keys = None
+    for row in rows:
+        keys = row.keys()
+        if groups and keys == last_keys:
+            groups[-1].append(row)
+        else:
+            groups.append([row])
+            last_keys = keys
+    return groups
+
+
+# 全局写后日志实例
+task_journal = TaskJournal()
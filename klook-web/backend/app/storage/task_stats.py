@@ -0,0 +1,100 @@
+"""任务状态统计
+
+首次访问时用一条 GROUP BY status 查询加载各状态数量，之后由 TaskStore 与写后日志
+在事务提交后增量维护，统计接口为 O(1) 且不加载 ORM 对象。
+"""
+from collections import Counter
+from typing import Callable, Optional
+
+from app.core.cache_sync import cache_sync
+from app.models.task import TaskStatus
+from app.storage.models import TaskDB
+from loguru import logger
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+class TaskStats:
+    """进程内任务状态计数器"""
+
+    def __init__(self):
+        self._counts: Optional[Counter] = None
+        # 每次变更递增，防止加载期间提交的变更被重复计入
+        self._generation = 0
+        # 计数变化时的回调（用于推送统计）
+        self._listeners: list[Callable[[], None]] = []
+
+    @property
+    def loaded(self) -> bool:
+        return self._counts is not None
+
+    @staticmethod
+    async def count_by_status(db: AsyncSession) -> Counter:
+        """单次 GROUP BY 查询统计各状态数量"""
+        result = await db.execute(
+            select(TaskDB.status, func.count()).group_by(TaskDB.status)
+        )
+        return Counter({status: count for status, count in result.all()})
+
+    async def load(self, db: AsyncSession):
+        """从数据库加载计数（加载期间有变更提交时重试）"""
+        while True:
+            generation = self._generation
+            counts = await self.count_by_status(db)
+            if generation == self._generation:
+                self._counts = counts
+                return
+
+    def apply(self, old_status: Optional[str], new_status: Optional[str], count: int = 1):
+        """记录一次已提交的状态迁移（None 表示新建或删除）"""
+        self._apply(old_status, new_status, count)
+        cache_sync.emit("task_stats.apply", old_status, new_status, count)
+
+    def _apply(self, old_status: Optional[str], new_status: Optional[str], count: int):
+        self._generation += 1
+        if self._counts is None or old_status == new_status:
+            return
+        if old_status is not None:
+            self._counts[old_status] -= count
+        if new_status is not None:
+            self._counts[new_status] += count
+        self._notify()
+
+    def invalidate(self):
+        """丢弃计数，下次访问时重新加载"""
+        self._invalidate()
+        cache_sync.emit("task_stats.invalidate")
+
+    def _invalidate(self):
+        self._generation += 1
+        self._counts = None
+        self._notify()
+
+    def add_listener(self, listener: Callable[[], None]):
+        """注册计数变化回调（在事务提交后同步调用，不应阻塞）"""
+        self._listeners.append(listener)
+
+    def _notify(self):
+        for listener in self._listeners:
+            listener()
+
+    async def summary(self, db: AsyncSession) -> dict:
+        """返回总数及各状态数量"""
+        if self._counts is None:
+            await self.load(db)
+        elif any(count < 0 for count in self._counts.values()):
+            # 增量维护出现偏差（如漏记的迁移），丢弃计数并重新加载
+            logger.warning(f"任务状态计数出现负数，重新加载: {dict(self._counts)}")
+            self.invalidate()
+            await self.load(db)
+
+        return {
+            "total": sum(self._counts.values()),
+            "by_status": {status.value: self._counts[status.value] for status in TaskStatus}
+        }
+
+
+# 全局任务统计实例
+task_stats = TaskStats()
+cache_sync.register("task_stats.apply", task_stats._apply)
+cache_sync.register("task_stats.invalidate", task_stats._invalidate)
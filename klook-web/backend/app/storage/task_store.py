@@ -2,13 +2,21 @@
 from datetime import datetime
 from typing import Optional
 
-from app.models.task import TaskCreate, TaskUpdate, TaskStatus
-from app.storage.models import TaskDB
+from app.core.serialization import response_columns
+from app.models.task import TaskCreate, TaskResponse, TaskUpdate, TaskStatus
+from app.storage.database import after_commit
+from app.storage.models import ConfigDB, TaskDB
+from app.storage.response_cache import TASKS, response_cache
+from app.storage.task_stats import task_stats
 from loguru import logger
-from sqlalchemy import select, delete
+from sqlalchemy import select, delete, func
 from sqlalchemy.ext.asyncio import AsyncSession
 
 
+# 列表查询的列（TaskResponse 字段顺序）
+LIST_COLUMNS = response_columns(TaskDB, TaskResponse)
+
+
 class TaskStore:
     """任务存储服务"""
 
@@ -27,6 +35,8 @@ class TaskStore:
         db.add(db_task)
         await db.flush()
         await db.refresh(db_task)
+        after_commit(db, lambda: task_stats.apply(None, TaskStatus.PENDING.value))
+        after_commit(db, lambda: response_cache.bump(TASKS))
         logger.info(f"创建任务 ID: {db_task.id}, 目标时间: {task.target_time}")
         return db_task
 
@@ -43,15 +53,15 @@ class TaskStore:
             db: AsyncSession,
             status: Optional[TaskStatus] = None,
             limit: Optional[int] = None
-    ) -> list[TaskDB]:
+    ) -> list:
         """
-        获取所有任务
+        获取所有任务（只查询 TaskResponse 的列，返回 Row）
 
         Args:
             status: 按状态筛选
             limit: 限制返回数量
         """
-        query = select(TaskDB).order_by(TaskDB.created_at.desc())
+        query = select(*LIST_COLUMNS).order_by(TaskDB.created_at.desc())
 
         if status:
             query = query.where(TaskDB.status == status.value)
@@ -60,7 +70,17 @@ class TaskStore:
             query = query.limit(limit)
 
         result = await db.execute(query)
-        return list(result.scalars().all())
+        return list(result.all())
+
+    @staticmethod
+    async def get_existing_ids(db: AsyncSession, task_ids: list[int]) -> set[int]:
+        """返回给定 ID 中实际存在的任务 ID（单次查询）"""
+        if not task_ids:
+            return set()
+        result = await db.execute(
+            select(TaskDB.id).where(TaskDB.id.in_(task_ids))
+        )
+        return set(result.scalars().all())
 
     @staticmethod
     async def get_by_config(db: AsyncSession, config_id: int) -> list[TaskDB]:
@@ -83,6 +103,7 @@ class TaskStore:
         if not db_task:
             return None
 
+        old_status = db_task.status
         update_data = task_update.model_dump(exclude_unset=True)
         for field, value in update_data.items():
             if field == "status" and isinstance(value, TaskStatus):
@@ -92,6 +113,9 @@ class TaskStore:
 
         await db.flush()
         await db.refresh(db_task)
+        new_status = db_task.status
+        after_commit(db, lambda: task_stats.apply(old_status, new_status))
+        after_commit(db, lambda: response_cache.bump(TASKS))
         logger.info(f"更新任务 ID: {task_id}")
         return db_task
 
@@ -114,6 +138,7 @@ class TaskStore:
         if not db_task:
             return None
 
+        old_status = db_task.status
         db_task.status = status.value
 
         # 更新时间戳
@@ -128,6 +153,8 @@ class TaskStore:
 
         await db.flush()
         await db.refresh(db_task)
+        after_commit(db, lambda: task_stats.apply(old_status, status.value))
+        after_commit(db, lambda: response_cache.bump(TASKS))
         logger.info(f"任务 ID {task_id} 状态更新为: {status.value}")
         return db_task
 
@@ -135,29 +162,47 @@ class TaskStore:
     async def delete_by_id(db: AsyncSession, task_id: int) -> bool:
         """删除任务"""
         result = await db.execute(
-            delete(TaskDB).where(TaskDB.id == task_id)
+            delete(TaskDB).where(TaskDB.id == task_id).returning(TaskDB.status)
         )
-        deleted = result.rowcount > 0
+        old_status = result.scalar_one_or_none()
+        deleted = old_status is not None
         if deleted:
+            after_commit(db, lambda: task_stats.apply(old_status, None))
+            after_commit(db, lambda: response_cache.bump(TASKS))
             logger.info(f"删除任务 ID: {task_id}")
         return deleted
 
     @staticmethod
     async def count(db: AsyncSession, status: Optional[TaskStatus] = None) -> int:
         """统计任务数量"""
-        query = select(TaskDB)
+        query = select(func.count()).select_from(TaskDB)
         if status:
             query = query.where(TaskDB.status == status.value)
 
         result = await db.execute(query)
-        return len(list(result.scalars().all()))
+        return result.scalar_one()
 
     @staticmethod
-    async def get_pending_tasks(db: AsyncSession) -> list[TaskDB]:
-        """获取所有待执行的任务（pending 或 countdown 状态）"""
+    async def get_scheduled_tasks(db: AsyncSession) -> list:
+        """
+        获取已登记触发的任务（countdown 或 running 状态），按目标时间排序
+
+        用于服务重启后恢复触发计划：只查询触发所需的列并连带配置的 headers，
+        由 (status, target_time) 索引完成筛选和排序
+        """
         result = await db.execute(
-            select(TaskDB)
-            .where(TaskDB.status.in_([TaskStatus.PENDING.value, TaskStatus.COUNTDOWN.value]))
+            select(
+                TaskDB.id,
+                TaskDB.status,
+                TaskDB.program_uuid,
+                TaskDB.target_time,
+                TaskDB.network_compensation,
+                TaskDB.max_retries,
+                TaskDB.retry_interval,
+                ConfigDB.headers
+            )
+            .join(ConfigDB, ConfigDB.id == TaskDB.config_id)
+            .where(TaskDB.status.in_([TaskStatus.COUNTDOWN.value, TaskStatus.RUNNING.value]))
             .order_by(TaskDB.target_time)
         )
-        return list(result.scalars().all())
+        return list(result.all())
@@ -0,0 +1,62 @@
+"""基准共用的小工具：空闲端口、批量生成测试数据、延迟分布摘要、原实现的倒计时"""
+import asyncio
+import socket
+import sqlite3
+from typing import Iterable, Optional
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def populate(db_path: str, *inserts: tuple[str, Iterable[tuple]], analyze: bool = False):
+    """
+    直接用 sqlite3 批量生成测试数据（绕过 ORM），在一个事务中提交
+
+    Args:
+        db_path: 数据库文件（表已由 init_db 创建）
+        inserts: (INSERT 语句, 参数行) 序列，按顺序执行
+        analyze: 提交后执行 ANALYZE，让查询规划器使用真实的统计信息
+    """
+    conn = sqlite3.connect(db_path)
+    try:
+        for statement, rows in inserts:
+            conn.executemany(statement, rows)
+        conn.commit()
+        if analyze:
+            conn.execute("ANALYZE")
+    finally:
+        conn.close()
+
+
+def percentile(values: list[float], p: float) -> float:
+    """第 p 百分位（最近秩，values 无需有序）"""
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+def summary(values: list[float], unit: str = "ms", points: tuple[float, ...] = (50, 95),
+            precision: int = 3, maximum: bool = True) -> str:
+    """延迟分布的一行摘要，如 p50   0.054  p95   0.066  max   0.090 ms"""
+    width = precision + 4
+    parts = [f"p{point:g} {percentile(values, point):{width}.{precision}f}" for point in points]
+    if maximum:
+        parts.append(f"max {max(values):{width}.{precision}f}")
+    return "  ".join(parts) + f" {unit}"
+
+
+async def legacy_countdown(timer) -> Optional[int]:
+    """
+    原实现的倒计时（每个任务一个协程，按剩余时间分段睡眠轮询），作为基准的对照
+
+    Args:
+        timer: PrecisionTimer（按 sleep 模式完成最后阶段）
+
+    Returns:
+        触发误差（纳秒）
+    """
+    while (remaining := timer.remaining_ns() / 1e9) > 0:
+        await asyncio.sleep(timer.calculate_sleep_interval(remaining))
+    return await timer.fire_at_deadline()
@@ -0,0 +1,114 @@
+"""网络补偿校准基准：本地 Klook 替身服务注入延迟和时钟偏移
+
+替身服务（benchmarks/mock_klook.py）的 Date 头按注入的时钟偏移生成，前置延迟代理注入单程延迟和抖动。
+每个场景启动一个替身服务子进程，用真实的 TaskExecutor 执行一个任务（自动应用校准结果），
+替身服务按自己的时钟记录抢购请求到达的时刻，与任务目标时间比较：
+- 校准: 推荐补偿与理论值（时钟偏移 + 单程延迟）的差
+- 到达误差: 应用推荐补偿后请求到达服务器的时刻 - 目标时刻（服务器时钟）
+- 默认补偿: 同一次运行按默认 250ms 补偿推算的到达误差
+
+运行: cd klook-web/backend && python -m benchmarks.bench_calibration
+"""
+import asyncio
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from benchmarks.mock_klook import MockKlook
+
+# (时钟偏移秒, 单程延迟毫秒, 抖动毫秒)
+SCENARIOS = [
+    (0.0, 20, 0),
+    (0.35, 40, 5),
+    (-0.2, 80, 20),
+    (1.7, 10, 2),
+]
+PREWARM_LEAD = 10.0
+DEFAULT_COMPENSATION = 250
+
+
+async def run_scenario(skew: float, delay_ms: float, jitter_ms: float) -> dict:
+    from app.core.config import settings
+    from app.core.klook_client import klook_clients
+    from app.models.config import ConfigCreate
+    from app.models.task import TaskCreate
+    from app.services.task_executor import TaskExecutor
+    from app.storage.config_store import ConfigStore
+    from app.storage.database import async_session_maker
+    from app.storage.task_store import TaskStore
+
+    with MockKlook(skew=skew, delay_ms=delay_ms, jitter_ms=jitter_ms) as mock:
+        # 每个场景从空的客户端注册表开始，新客户端使用本场景的替身服务地址
+        settings.klook_base_url = mock.base_url
+
+        executor = TaskExecutor()
+        async with async_session_maker() as session:
+            config = await ConfigStore.create(session, ConfigCreate(
+                name=f"bench-{time.time_ns()}",
+                headers={"token": "bench"}
+            ))
+            task = await TaskStore.create(session, TaskCreate(
+                config_id=config.id,
+                program_uuid=f"bench-{time.time_ns()}",
+                target_time=datetime.now() + timedelta(seconds=PREWARM_LEAD + 2),
+                network_compensation=DEFAULT_COMPENSATION,
+                max_retries=1,
+                retry_interval=0
+            ))
+            await session.commit()
+            await executor.start_task(task.id, session)
+            await session.commit()
+
+        spec = executor.armed[task.id]
+        while task.id in executor.armed:
+            await asyncio.sleep(0.05)
+        await executor.stop()
+        await klook_clients.close()
+
+        arrival = (await mock.arrivals(task.program_uuid))[0]
+
+    calibration = spec.metrics["calibration"]
+    applied = spec.metrics["network_compensation_applied"]
+    arrival_error_ms = (arrival - task.target_time.timestamp()) * 1000
+    return {
+        "calibration": calibration,
+        "expected_ms": skew * 1000 + delay_ms + jitter_ms / 2,
+        "applied": applied,
+        "arrival_error_ms": arrival_error_ms,
+        # 同一次运行改用默认补偿时，请求会晚 (applied - 250) 毫秒发出
+        "default_error_ms": arrival_error_ms + applied - DEFAULT_COMPENSATION,
+    }
+
+
+async def main():
+    from loguru import logger
+
+    from app.core.config import settings
+    from app.storage.database import init_db
+    from app.storage.task_journal import task_journal
+
+    logger.remove()
+    settings.klook_prewarm_lead = PREWARM_LEAD
+    settings.calibration_enabled = True
+    settings.calibration_auto_apply = True
+    await init_db()
+    task_journal.start()
+
+    print(f"{'偏移':>7} {'延迟':>5} {'抖动':>4} | {'理论补偿':>8} {'推荐':>8} {'区间':>17} {'采样':>4}"
+          f" | {'到达误差':>8} | {'默认 250ms 误差':>14}")
+    for skew, delay_ms, jitter_ms in SCENARIOS:
+        result = await run_scenario(skew, delay_ms, jitter_ms)
+        calibration = result["calibration"]
+        print(f"{skew * 1000:6.0f}ms {delay_ms:4.0f}ms {jitter_ms:3.0f}ms"
+              f" | {result['expected_ms']:7.1f}ms {calibration['recommended_ms']:7.1f}ms"
+              f" [{calibration['ci_low_ms']:7.1f}, {calibration['ci_high_ms']:7.1f}]"
+              f" {len(calibration['samples']):4d}"
+              f" | {result['arrival_error_ms']:7.1f}ms | {result['default_error_ms']:13.1f}ms")
+    await task_journal.stop()
+
+
+if __name__ == "__main__":
+    os.environ.setdefault("DATABASE_URL", f"sqlite+aiosqlite:///{os.path.join(tempfile.mkdtemp(prefix='klook-bench-'), 'bench.db')}")
+    os.environ.setdefault("DEBUG", "false")
+    asyncio.run(main())
@@ -0,0 +1,127 @@
+"""连接预热基准：触发后抢购请求是否还承担连接建立（TCP / TLS 握手）
+
+本地 Klook 替身服务（benchmarks/mock_klook.py，自签名证书 HTTPS）前置延迟代理模拟公网往返时间，
+用真实的 TaskExecutor 和触发运行时执行抢购，读取每次尝试的耗时分解：
+- cold: 不预热（KLOOK_PREWARM_LEAD=0），每轮从空连接池开始，与原先触发后新建客户端相同
+- prewarm: 触发前预热并保活，第一次尝试直接复用连接
+
+延迟代理在本地接受 TCP 连接，只延迟转发的数据：TLS 握手承担往返延迟，
+TCP 三次握手和 DNS 解析的往返不在模拟范围内，真实网络下冷连接的开销更大。
+
+运行: cd klook-web/backend && python -m benchmarks.bench_connection_prewarm [轮数] [单程延迟毫秒]
+需要 openssl 命令生成自签名证书。
+"""
+import asyncio
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from benchmarks.mock_klook import MockKlook, create_certificate
+
+ROUNDS = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+ONE_WAY_DELAY_MS = float(sys.argv[2]) if len(sys.argv) > 2 else 20
+ATTEMPTS = 3
+PREWARM_LEAD = 2.0
+KEEPALIVE_INTERVAL = 0.5
+
+
+# ---- 客户端 ----
+
+async def fire_once(target_in: float) -> dict:
+    """创建并启动一个任务，等待抢购结束，返回其测量值"""
+    from app.core.klook_client import klook_clients
+    from app.models.config import ConfigCreate
+    from app.models.task import TaskCreate
+    from app.services.task_executor import TaskExecutor
+    from app.storage.config_store import ConfigStore
+    from app.storage.database import async_session_maker
+    from app.storage.task_store import TaskStore
+
+    executor = TaskExecutor()
+    async with async_session_maker() as session:
+        config = await ConfigStore.create(session, ConfigCreate(
+            name=f"bench-{time.time_ns()}",
+            headers={"token": "bench"}
+        ))
+        task = await TaskStore.create(session, TaskCreate(
+            config_id=config.id,
+            program_uuid="bench",
+            target_time=datetime.now() + timedelta(seconds=target_in),
+            network_compensation=0,
+            max_retries=ATTEMPTS,
+            retry_interval=0
+        ))
+        await session.commit()
+        await executor.start_task(task.id, session)
+        await session.commit()
+
+    spec = executor.armed[task.id]
+    while task.id in executor.armed:
+        await asyncio.sleep(0.05)
+    await executor.stop()
+    # 下一轮从空连接池开始
+    await klook_clients.close()
+    return spec.metrics
+
+
+async def run(prewarm: bool) -> list[dict]:
+    from app.core.config import settings
+
+    settings.klook_prewarm_lead = PREWARM_LEAD if prewarm else 0
+    settings.klook_keepalive_interval = KEEPALIVE_INTERVAL
+    target_in = (PREWARM_LEAD if prewarm else 0) + 1.5
+    return [await fire_once(target_in) for _ in range(ROUNDS)]
+
+
+def report(name: str, rounds: list[dict]):
+    first = [metrics["attempt_timings"][0] for metrics in rounds]
+    later = [timing for metrics in rounds for timing in metrics["attempt_timings"][1:]]
+    reused = sum(timing["reused_connection"] for timing in first)
+    warmup = [metrics["warmup_ms"] for metrics in rounds if "warmup_ms" in metrics]
+    print(f"{name:<8} 首次尝试 p50 {statistics.median(t['total_ms'] for t in first):7.1f} ms"
+          f"  max {max(t['total_ms'] for t in first):7.1f} ms"
+          f" | 其中建连 p50 {statistics.median(t['connect_ms'] for t in first):7.1f} ms"
+          f" | 复用连接 {reused}/{len(first)}"
+          f" | 后续尝试 p50 {statistics.median(t['total_ms'] for t in later):7.1f} ms"
+          + (f" | 预热耗时 p50 {statistics.median(warmup):7.1f} ms" if warmup else ""))
+
+
+async def main():
+    from loguru import logger
+
+    from app.storage.database import init_db
+    from app.storage.task_journal import task_journal
+
+    logger.remove()
+    await init_db()
+    task_journal.start()
+
+    print(f"轮数: {ROUNDS}, 单程延迟: {ONE_WAY_DELAY_MS:.0f} ms, 每轮尝试 {ATTEMPTS} 次")
+    report("cold", await run(prewarm=False))
+    report("prewarm", await run(prewarm=True))
+    await task_journal.stop()
+
+
+def client_main():
+    if shutil.which("openssl") is None:
+        print("需要 openssl 命令生成自签名证书")
+        return
+
+    cert_dir = tempfile.mkdtemp(prefix="klook-bench-cert-")
+    create_certificate(cert_dir)
+
+    with MockKlook(script="fail", delay_ms=ONE_WAY_DELAY_MS, cert_dir=cert_dir) as mock:
+        os.environ.setdefault("DATABASE_URL", f"sqlite+aiosqlite:///{os.path.join(cert_dir, 'bench.db')}")
+        os.environ.setdefault("DEBUG", "false")
+        os.environ["KLOOK_BASE_URL"] = mock.base_url
+        # httpx 读取 SSL_CERT_FILE 作为信任的证书
+        os.environ["SSL_CERT_FILE"] = os.path.join(cert_dir, "cert.pem")
+        asyncio.run(main())
+
+
+if __name__ == "__main__":
+    client_main()
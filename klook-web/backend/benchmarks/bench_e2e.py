@@ -0,0 +1,320 @@
+"""端到端基准：本地 Klook 替身服务 + 真实应用（HTTP API、TaskExecutor、写后日志、WebSocket）
+
+每个场景启动一个替身服务子进程（benchmarks/mock_klook.py，注入延迟、抖动和响应脚本），
+在本进程内用 uvicorn 运行 main:app（执行 lifespan，与生产启动路径一致），然后按真实用户的操作走完整流程：
+创建配置和任务 → 验证配置（get_simple_profile_by_token）→ 订阅 /api/ws → 启动任务 → 等待 success / failed。
+
+每轮记录：
+- firing_error_ms: 触发误差（任务结果中的 firing_error_ns）
+- ttfb_ms / total_ms: 抢购请求的首字节时间和总耗时（每次尝试）
+- retry_overhead_ms: 重试循环本身的开销 = 相邻两次尝试的间隔 - 上一次请求耗时 - retry_interval
+- db_write_ms: 写后日志每批写入数据库的耗时（TaskJournal._write_batch）
+- ws_publish_ms: 从 TaskExecutor 发布任务消息到 WebSocket 客户端收到的耗时
+- validate_ms: 验证配置接口的往返耗时
+
+结果按场景汇总为 p50 / p95 / max，输出 JSON，便于比较两次提交：
+    cd klook-web/backend && python -m benchmarks.bench_e2e --rounds 5 --output e2e-new.json
+    python -m benchmarks.bench_e2e --output e2e-new.json --compare e2e-old.json
+
+同样的场景在 tests/test_e2e.py 中作为 pytest 测试运行（断言结果状态、尝试次数和触发误差，不输出报告）。
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import Optional
+
+from benchmarks._common import free_port
+from benchmarks.mock_klook import MockKlook
+
+# 名称 -> (响应脚本, 单程延迟毫秒, 抖动毫秒, 最大重试次数, 重试间隔毫秒)
+SCENARIOS = {
+    "baseline": ("ok", 20, 0, 1, 0),
+    "jitter": ("fail,fail,ok", 30, 20, 5, 10),
+    "failures": ("http500,http429@50,fail,ok", 20, 5, 5, 10),
+}
+PREWARM_LEAD = 2.0
+KEEPALIVE_INTERVAL = 0.5
+# 运行场景前覆盖的配置（tests/test_e2e.py 同样使用）
+SETTINGS = {
+    "klook_prewarm_lead": PREWARM_LEAD,
+    "klook_keepalive_interval": KEEPALIVE_INTERVAL,
+}
+TARGET_IN = PREWARM_LEAD + 1.5
+# 各轮之间触发时刻错开，避免上一轮的写库和推送落在下一轮的触发窗口内
+ROUND_GAP = 0.5
+
+
+class Probes:
+    """运行期间对写后日志和 WebSocket 发布打点（同一进程、同一单调时钟）"""
+
+    def __init__(self):
+        self.db_write_ms: list[float] = []
+        # (task_id, 消息类型) -> 发布时刻（perf_counter_ns）
+        self.published: dict[tuple[int, str], int] = {}
+        self._restore = []
+
+    def install(self):
+        from app.core.websocket_manager import websocket_manager
+        from app.storage.task_journal import TaskJournal
+
+        write_batch = TaskJournal._write_batch
+        send_message = websocket_manager.send_message
+
+        async def timed_write_batch(batch: list):
+            start = time.perf_counter_ns()
+            try:
+                return await write_batch(batch)
+            finally:
+                self.db_write_ms.append((time.perf_counter_ns() - start) / 1e6)
+
+        async def timed_send_message(task_id: int, message: dict):
+            self.published.setdefault((task_id, message.get("type")), time.perf_counter_ns())
+            return await send_message(task_id, message)
+
+        TaskJournal._write_batch = staticmethod(timed_write_batch)
+        websocket_manager.send_message = timed_send_message
+        self._restore = [
+            lambda: setattr(TaskJournal, "_write_batch", staticmethod(write_batch)),
+            lambda: delattr(websocket_manager, "send_message"),
+        ]
+
+    def uninstall(self):
+        for restore in self._restore:
+            restore()
+        self._restore = []
+
+
+async def run_round(client, port: int, probes: Probes, index: int, max_retries: int, retry_interval: int) -> dict:
+    """走完一次完整的用户流程，返回本轮测量值"""
+    from websockets.asyncio.client import connect
+
+    response = await client.post("/api/configs", json={
+        "name": f"e2e-{time.time_ns()}",
+        "headers": {"token": "bench"}
+    })
+    config_id = response.json()["id"]
+    program_uuid = f"e2e-{time.time_ns()}"
+    response = await client.post("/api/tasks", json={
+        "config_id": config_id,
+        "program_uuid": program_uuid,
+        "target_time": (datetime.now() + timedelta(seconds=TARGET_IN + index * ROUND_GAP)).isoformat(),
+        "network_compensation": 0,
+        "max_retries": max_retries,
+        "retry_interval": retry_interval
+    })
+    task_id = response.json()["id"]
+
+    start = time.perf_counter()
+    response = await client.post(f"/api/configs/{config_id}/validate")
+    validate_ms = (time.perf_counter() - start) * 1000
+    valid = response.json().get("valid")
+
+    received: dict[str, int] = {}
+    async with connect(f"ws://127.0.0.1:{port}/api/ws") as websocket:
+        await websocket.send(json.dumps({"type": "subscribe", "task_ids": [task_id]}))
+        # 等待订阅确认后再启动，保证收到全部任务消息
+        while json.loads(await websocket.recv()).get("type") != "subscribed":
+            pass
+
+        response = await client.post(f"/api/tasks/{task_id}/start")
+        response.raise_for_status()
+
+        while True:
+            message = json.loads(await asyncio.wait_for(websocket.recv(), TARGET_IN + 30))
+            if message.get("task_id") != task_id:
+                continue
+            received.setdefault(message.get("type"), time.perf_counter_ns())
+            if message.get("type") in ("success", "failed", "error"):
+                break
+
+    # 等待最终状态落库
+    for _ in range(100):
+        task = (await client.get(f"/api/tasks/{task_id}")).json()
+        if task["status"] in ("completed", "failed") and task.get("result"):
+            break
+        await asyncio.sleep(0.05)
+    result = task.get("result") or {}
+
+    attempts = result.get("attempt_timings", [])
+    retry_overhead = [
+        later["at_ms"] - earlier["at_ms"] - earlier["total_ms"] - retry_interval
+        for earlier, later in zip(attempts, attempts[1:])
+    ]
+    ws_publish = [
+        (received[kind] - published) / 1e6
+        for (published_task, kind), published in probes.published.items()
+        if published_task == task_id and kind in received
+    ]
+    return {
+        "task_id": task_id,
+        "status": task["status"],
+        "valid": valid,
+        "attempts": len(attempts),
+        "firing_error_ms": result["firing_error_ns"] / 1e6 if "firing_error_ns" in result else None,
+        "first_ttfb_ms": attempts[0]["ttfb_ms"] if attempts else None,
+        "ttfb_ms": [attempt["ttfb_ms"] for attempt in attempts if attempt["ttfb_ms"] is not None],
+        "total_ms": [attempt["total_ms"] for attempt in attempts],
+        "retry_overhead_ms": retry_overhead,
+        "ws_publish_ms": ws_publish,
+        "validate_ms": validate_ms,
+    }
+
+
+async def run_scenario(name: str, rounds: int) -> dict:
+    import httpx
+    import uvicorn
+
+    from app.core.config import settings
+
+    script, delay_ms, jitter_ms, max_retries, retry_interval = SCENARIOS[name]
+    with MockKlook(script=script, delay_ms=delay_ms, jitter_ms=jitter_ms) as mock:
+        # 应用启动时按当前配置创建共享的 Klook 客户端
+        settings.klook_base_url = mock.base_url
+
+        from main import app
+
+        port = free_port()
+        server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+        serving = asyncio.create_task(server.serve())
+        while not server.started:
+            await asyncio.sleep(0.05)
+
+        probes = Probes()
+        probes.install()
+        try:
+            async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=30) as client:
+                results = await asyncio.gather(*(
+                    run_round(client, port, probes, index, max_retries, retry_interval)
+                    for index in range(rounds)
+                ))
+        finally:
+            probes.uninstall()
+            server.should_exit = True
+            await serving
+
+    return {
+        "script": script,
+        "delay_ms": delay_ms,
+        "jitter_ms": jitter_ms,
+        "max_retries": max_retries,
+        "retry_interval_ms": retry_interval,
+        "summary": summarize(results, probes),
+        "rounds": results,
+    }
+
+
+def distribution(values: list[float]) -> Optional[dict]:
+    """p50 / p95 / max（毫秒）"""
+    values = sorted(value for value in values if value is not None)
+    if not values:
+        return None
+    p95 = values[min(len(values) - 1, round(0.95 * (len(values) - 1)))]
+    return {
+        "n": len(values),
+        "p50": round(statistics.median(values), 3),
+        "p95": round(p95, 3),
+        "max": round(values[-1], 3),
+    }
+
+
+def summarize(results: list[dict], probes: Probes) -> dict:
+    return {
+        "firing_error_ms": distribution([abs(r["firing_error_ms"]) for r in results if r["firing_error_ms"] is not None]),
+        "first_ttfb_ms": distribution([r["first_ttfb_ms"] for r in results]),
+        "ttfb_ms": distribution([value for r in results for value in r["ttfb_ms"]]),
+        "total_ms": distribution([value for r in results for value in r["total_ms"]]),
+        "retry_overhead_ms": distribution([value for r in results for value in r["retry_overhead_ms"]]),
+        "db_write_ms": distribution(probes.db_write_ms),
+        "ws_publish_ms": distribution([value for r in results for value in r["ws_publish_ms"]]),
+        "validate_ms": distribution([r["validate_ms"] for r in results]),
+    }
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_report(report: dict, baseline: Optional[dict]):
+    for name, scenario in report["scenarios"].items():
+        print(f"\n[{name}] 脚本={scenario['script']} 延迟={scenario['delay_ms']}ms 抖动={scenario['jitter_ms']}ms")
+        old = (baseline or {}).get("scenarios", {}).get(name, {}).get("summary", {})
+        for metric, stats in scenario["summary"].items():
+            if stats is None:
+                continue
+            line = f"  {metric:<18} p50 {stats['p50']:9.3f}  p95 {stats['p95']:9.3f}  max {stats['max']:9.3f}  (n={stats['n']})"
+            if old.get(metric):
+                delta = stats["p50"] - old[metric]["p50"]
+                line += f" | 对比 p50 {old[metric]['p50']:9.3f} ({delta:+.3f})"
+            print(line)
+
+
+async def main(args):
+    from loguru import logger
+
+    from app.core.config import settings
+
+    logger.remove()
+    for name, value in SETTINGS.items():
+        setattr(settings, name, value)
+    settings.firing_runtime = args.runtime
+
+    report = {
+        "revision": git_revision(),
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "settings": {
+            "firing_runtime": settings.firing_runtime,
+            "timer_mode": settings.timer_mode,
+            "klook_prewarm_lead": settings.klook_prewarm_lead,
+            "calibration_enabled": settings.calibration_enabled,
+            "rounds": args.rounds,
+        },
+        "scenarios": {},
+    }
+    for name in args.scenarios:
+        report["scenarios"][name] = await run_scenario(name, args.rounds)
+    return report
+
+
+def cli():
+    parser = argparse.ArgumentParser(description="端到端延迟基准")
+    parser.add_argument("--rounds", type=int, default=5, help="每个场景的轮数（并发执行，触发时刻错开）")
+    parser.add_argument("--scenarios", nargs="+", default=list(SCENARIOS), choices=list(SCENARIOS))
+    parser.add_argument("--runtime", default="local", choices=["local", "thread"], help="触发运行时")
+    parser.add_argument("--output", default=None, help="结果 JSON 文件")
+    parser.add_argument("--compare", default=None, help="与之前的结果 JSON 比较")
+    args = parser.parse_args()
+
+    os.environ.setdefault("DATABASE_URL", f"sqlite+aiosqlite:///{os.path.join(tempfile.mkdtemp(prefix='klook-e2e-'), 'bench.db')}")
+    os.environ.setdefault("DEBUG", "false")
+
+    report = asyncio.run(main(args))
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+    print(f"revision={report['revision']} runtime={report['settings']['firing_runtime']} rounds={args.rounds}")
+    print_report(report, baseline)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\n结果已写入 {args.output}")
+
+
+if __name__ == "__main__":
+    sys.exit(cli())
@@ -0,0 +1,177 @@
+"""触发运行时基准：API 负载下的触发误差
+
+每种运行时（local / thread）各启动一个真实的 uvicorn 服务子进程，通过 API 创建并
+启动一批间隔触发的任务，同时由负载生成器子进程（低调度优先级）并发请求日志列表接口，
+任务结束后从 TaskDB.result 读取 firing_error_ns。Klook 接口指向本地关闭的端口，
+请求会立即失败，只测量触发时刻。
+
+运行: cd klook-web/backend && python -m benchmarks.bench_firing_runtime [任务数] [并发数]
+"""
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import httpx
+
+from benchmarks._common import free_port, populate
+
+TASKS = int(sys.argv[1]) if len(sys.argv) > 1 and sys.argv[1] != "--load" else 40
+CONCURRENCY = int(sys.argv[2]) if len(sys.argv) > 2 and sys.argv[1] != "--load" else 16
+SPACING = 0.1  # 相邻任务触发间隔（秒）
+LEAD = 3.0  # 首个任务触发前的准备时间（秒）
+SEED_LOGS = 20_000  # 预先写入的日志条数，让日志列表请求有实际开销
+
+
+def start_server(runtime: str, port: int, db_path: str) -> subprocess.Popen:
+    env = dict(
+        os.environ,
+        DATABASE_URL=f"sqlite+aiosqlite:///{db_path}",
+        DEBUG="false",
+        FIRING_RUNTIME=runtime,
+        KLOOK_BASE_URL=f"http://127.0.0.1:{free_port()}",
+    )
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+
+
+async def wait_ready(client: httpx.AsyncClient):
+    for _ in range(100):
+        try:
+            if (await client.get("/api/health")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.1)
+    raise RuntimeError("服务启动超时")
+
+
+def seed_logs(db_path: str, task_id: int):
+    """直接写入日志数据"""
+    now = datetime.now()
+    populate(db_path, (
+        "INSERT INTO logs (task_id, level, message, created_at) VALUES (?, ?, ?, ?)",
+        (
+            (task_id, "info", f"bench log {i} " + "x" * 120, (now - timedelta(seconds=i)).strftime("%Y-%m-%d %H:%M:%S.%f"))
+            for i in range(SEED_LOGS)
+        )
+    ))
+
+
+async def seed(client: httpx.AsyncClient) -> list[int]:
+    """创建配置和一批间隔触发的任务"""
+    config = (await client.post("/api/configs", json={
+        "name": "bench",
+        "headers": {"token": "bench"}
+    })).json()
+
+    start = datetime.now() + timedelta(seconds=LEAD)
+    task_ids = []
+    for i in range(TASKS):
+        task = (await client.post("/api/tasks", json={
+            "config_id": config["id"],
+            "program_uuid": "bench",
+            "target_time": (start + timedelta(seconds=i * SPACING)).isoformat(),
+            "network_compensation": 0,
+            "max_retries": 1,
+            "retry_interval": 0
+        })).json()
+        task_ids.append(task["id"])
+    return task_ids
+
+
+def start_load(port: int) -> subprocess.Popen:
+    """负载生成器子进程，降低调度优先级，模拟来自其他机器的请求，不与服务进程争抢 CPU"""
+    return subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.bench_firing_runtime", "--load", str(port), str(CONCURRENCY)],
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        preexec_fn=lambda: os.nice(10),
+        text=True,
+    )
+
+
+async def generate_load(port: int, concurrency: int):
+    """并发请求日志列表接口，直到标准输入关闭，输出每秒请求数"""
+    stop = asyncio.Event()
+    count = 0
+
+    async def worker(client: httpx.AsyncClient):
+        nonlocal count
+        while not stop.is_set():
+            await client.get("/api/logs", params={"limit": 500})
+            count += 1
+
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=60) as client:
+        workers = [asyncio.create_task(worker(client)) for _ in range(concurrency)]
+        started = time.perf_counter()
+        await asyncio.to_thread(sys.stdin.read)
+        stop.set()
+        await asyncio.gather(*workers)
+    print(count / (time.perf_counter() - started))
+
+
+async def run(runtime: str, with_load: bool) -> tuple[list[float], float]:
+    port = free_port()
+    db_path = os.path.join(tempfile.mkdtemp(prefix="klook-bench-"), "bench.db")
+    server = start_server(runtime, port, db_path)
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=60) as client:
+            await wait_ready(client)
+            task_ids = await seed(client)
+            seed_logs(db_path, task_ids[0])
+            for task_id in task_ids:
+                await client.post(f"/api/tasks/{task_id}/start")
+
+            load = start_load(port) if with_load else None
+
+            # 等待全部任务结束
+            pending = set(task_ids)
+            while pending:
+                await asyncio.sleep(0.5)
+                for task_id in list(pending):
+                    task = (await client.get(f"/api/tasks/{task_id}")).json()
+                    if task["status"] in ("completed", "failed"):
+                        pending.discard(task_id)
+            rps = float(load.communicate()[0]) if load else 0.0
+
+            errors = []
+            for task_id in task_ids:
+                result = (await client.get(f"/api/tasks/{task_id}")).json()["result"] or {}
+                if result.get("firing_error_ns") is not None:
+                    errors.append(result["firing_error_ns"] / 1000)
+            return errors, rps
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def report(label: str, errors: list[float], rps: float):
+    errors.sort()
+    p99 = errors[max(int(len(errors) * 0.99) - 1, 0)]
+    print(f"{label:<16} 触发误差 p50 {statistics.median(errors):9.1f} µs  p99 {p99:9.1f} µs"
+          f"  max {errors[-1]:9.1f} µs | 负载 {rps:6.1f} req/s | 样本 {len(errors)}")
+
+
+def main():
+    print(f"任务数: {TASKS}, 负载并发: {CONCURRENCY}")
+    for runtime in ("local", "thread"):
+        for with_load in (False, True):
+            errors, rps = asyncio.run(run(runtime, with_load))
+            report(f"{runtime}{' + 负载' if with_load else ''}", errors, rps)
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["--load"]:
+        asyncio.run(generate_load(int(sys.argv[2]), int(sys.argv[3])))
+    else:
+        main()
@@ -0,0 +1,98 @@
+"""列表接口缓存基准：重复请求 /api/configs、/api/programs、/api/tasks
+
+前端每次操作后都会重新获取三个列表。对比三种情况（ASGI 进程内调用，不含网络）：
+- 未命中: 每次请求前递增版本号，相当于原实现（查询 + 逐行校验 + 序列化）
+- 缓存命中: 版本未变，直接返回缓存的响应体，不访问 SQLite
+- 304: 客户端携带 If-None-Match，只返回响应头
+
+运行: cd klook-web/backend && python -m benchmarks.bench_list_cache [任务数] [请求次数]
+"""
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+DB_PATH = os.path.join(tempfile.mkdtemp(prefix="klook-bench-"), "bench.db")
+os.environ.setdefault("DATABASE_URL", f"sqlite+aiosqlite:///{DB_PATH}")
+os.environ.setdefault("DEBUG", "false")
+
+import httpx  # noqa: E402
+from loguru import logger  # noqa: E402
+
+from app.storage.database import engine, init_db  # noqa: E402
+from app.storage.response_cache import CONFIGS, PROGRAMS, TASKS, response_cache  # noqa: E402
+from benchmarks._common import populate  # noqa: E402
+from main import app  # noqa: E402
+
+TASK_ROWS = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+REQUESTS = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+CONFIG_ROWS = 20
+PROGRAM_ROWS = 50
+ENDPOINTS = (("/api/configs", CONFIGS), ("/api/programs", PROGRAMS), ("/api/tasks", TASKS))
+
+
+def test_data() -> tuple:
+    """测试数据：(INSERT 语句, 参数行) 序列"""
+    now = datetime.now()
+    return (
+        (
+            "INSERT INTO configs (name, headers, created_at, updated_at) VALUES (?, ?, ?, ?)",
+            ((f"config-{i}", '{"token": "bench"}', str(now), str(now)) for i in range(CONFIG_ROWS))
+        ),
+        (
+            "INSERT INTO programs (uuid, name, description, created_at, updated_at) VALUES (?, ?, ?, ?, ?)",
+            ((f"uuid-{i}", f"program-{i}", "bench", str(now), str(now)) for i in range(PROGRAM_ROWS))
+        ),
+        (
+            "INSERT INTO tasks (config_id, program_uuid, target_time, network_compensation, max_retries,"
+            " retry_interval, status, result, created_at) VALUES (?, ?, ?, 250, 3, 500, 'completed', ?, ?)",
+            (
+                (i % CONFIG_ROWS + 1, f"uuid-{i % PROGRAM_ROWS}", str(now + timedelta(hours=1)),
+                 '{"success": true, "firing_error_ns": 1200}', str(now - timedelta(seconds=i)))
+                for i in range(TASK_ROWS)
+            )
+        )
+    )
+
+
+async def run(client: httpx.AsyncClient, path: str, resource: str, mode: str) -> tuple[float, list[float], int]:
+    """返回 (请求/秒, 每次耗时毫秒, 最后一次响应大小)"""
+    response = await client.get(path)
+    etag = response.headers["etag"]
+    headers = {"If-None-Match": etag} if mode == "304" else {}
+
+    durations = []
+    start = time.perf_counter()
+    for _ in range(REQUESTS):
+        if mode == "miss":
+            response_cache.bump(resource)
+        began = time.perf_counter()
+        response = await client.get(path, headers=headers)
+        durations.append((time.perf_counter() - began) * 1000)
+    elapsed = time.perf_counter() - start
+    expected = 304 if mode == "304" else 200
+    assert response.status_code == expected, response.status_code
+    return REQUESTS / elapsed, durations, len(response.content)
+
+
+async def main():
+    logger.remove()
+    await init_db()
+    populate(DB_PATH, *test_data())
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        print(f"任务 {TASK_ROWS} 行，配置 {CONFIG_ROWS} 行，项目 {PROGRAM_ROWS} 行，每项 {REQUESTS} 次请求")
+        for path, resource in ENDPOINTS:
+            for mode, label in (("miss", "未命中"), ("hit", "缓存命中"), ("304", "304")):
+                rate, durations, size = await run(client, path, resource, mode)
+                print(f"{path:<14} {label:<6} {rate:9.0f} 请求/秒 | p50 {statistics.median(durations):8.3f} ms"
+                      f" | 响应 {size:>8} 字节")
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
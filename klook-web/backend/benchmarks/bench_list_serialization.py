@@ -0,0 +1,139 @@
+"""列表接口序列化基准：请求/秒（ASGI 进程内调用，不含网络）
+
+- 原实现: ORM 对象 → response_model 逐行 from_attributes 校验 → jsonable_encoder → json.dumps
+  （在本基准中以 /legacy/... 路由复现）
+- TypeAdapter: 列查询的行字典 → TypeAdapter 批量校验 → pydantic-core 序列化（未安装 orjson 时）
+- orjson: 列查询的行字典直接由 orjson 序列化
+
+/api/tasks 等带响应缓存的接口每次请求前递增版本号，只测量查询与序列化。
+
+运行: cd klook-web/backend && python -m benchmarks.bench_list_serialization [请求次数]
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import Optional
+
+DB_PATH = os.path.join(tempfile.mkdtemp(prefix="klook-bench-"), "bench.db")
+os.environ.setdefault("DATABASE_URL", f"sqlite+aiosqlite:///{DB_PATH}")
+os.environ.setdefault("DEBUG", "false")
+
+import httpx  # noqa: E402
+from fastapi import APIRouter, Depends  # noqa: E402
+from loguru import logger  # noqa: E402
+from sqlalchemy import select  # noqa: E402
+from sqlalchemy.ext.asyncio import AsyncSession  # noqa: E402
+
+from app.core import serialization  # noqa: E402
+from app.models.config import ConfigListResponse  # noqa: E402
+from app.models.log import LogListResponse  # noqa: E402
+from app.models.task import TaskListResponse  # noqa: E402
+from app.storage.database import engine, get_read_db, init_db  # noqa: E402
+from app.storage.models import ConfigDB, LogDB, TaskDB  # noqa: E402
+from app.storage.response_cache import CONFIGS, TASKS, response_cache  # noqa: E402
+from benchmarks._common import populate  # noqa: E402
+from main import app  # noqa: E402
+
+REQUESTS = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+TASK_ROWS = 1000
+LOG_ROWS = 20000
+CONFIG_ROWS = 200
+
+# 路径 -> (原实现路径, 需要失效的缓存资源)
+ENDPOINTS = {
+    "/api/logs?limit=1000": ("/legacy/logs?limit=1000", None),
+    "/api/tasks": ("/legacy/tasks", TASKS),
+    "/api/configs": ("/legacy/configs", CONFIGS),
+}
+
+legacy = APIRouter()
+
+
+@legacy.get("/legacy/logs", response_model=LogListResponse)
+async def legacy_logs(limit: int = 100, db: AsyncSession = Depends(get_read_db)):
+    result = await db.execute(select(LogDB).order_by(LogDB.created_at.desc(), LogDB.id.desc()).limit(limit))
+    return LogListResponse(total=LOG_ROWS, logs=list(result.scalars().all()), next_cursor=None)
+
+
+@legacy.get("/legacy/tasks", response_model=TaskListResponse)
+async def legacy_tasks(limit: Optional[int] = None, db: AsyncSession = Depends(get_read_db)):
+    result = await db.execute(select(TaskDB).order_by(TaskDB.created_at.desc()))
+    tasks = list(result.scalars().all())
+    return {"total": len(tasks), "items": tasks}
+
+
+@legacy.get("/legacy/configs", response_model=ConfigListResponse)
+async def legacy_configs(db: AsyncSession = Depends(get_read_db)):
+    result = await db.execute(select(ConfigDB).order_by(ConfigDB.created_at.desc()))
+    configs = list(result.scalars().all())
+    return {"total": len(configs), "items": configs}
+
+
+def test_data() -> tuple:
+    """测试数据：(INSERT 语句, 参数行) 序列"""
+    now = datetime.now()
+    return (
+        (
+            "INSERT INTO configs (name, headers, created_at, updated_at) VALUES (?, ?, ?, ?)",
+            ((f"config-{i}", '{"token": "bench", "cookie": "a=1; b=2"}', str(now), str(now)) for i in range(CONFIG_ROWS))
+        ),
+        (
+            "INSERT INTO tasks (config_id, program_uuid, target_time, network_compensation, max_retries,"
+            " retry_interval, status, result, created_at) VALUES (?, ?, ?, 250, 3, 500, 'completed', ?, ?)",
+            (
+                (i % CONFIG_ROWS + 1, f"uuid-{i}", str(now + timedelta(hours=1)),
+                 '{"success": true, "firing_error_ns": 1200, "attempt_timings": [{"attempt": 1, "total_ms": 45.1}]}',
+                 str(now - timedelta(seconds=i)))
+                for i in range(TASK_ROWS)
+            )
+        ),
+        (
+            "INSERT INTO logs (task_id, level, message, created_at) VALUES (?, ?, ?, ?)",
+            (
+                (i % TASK_ROWS + 1, "warning", f"第 {i % 3 + 1}/3 次尝试失败: {{'success': False, 'error': 'sold out'}}",
+                 str(now - timedelta(milliseconds=i)))
+                for i in range(LOG_ROWS)
+            )
+        )
+    )
+
+
+async def rate(client: httpx.AsyncClient, path: str, resource: Optional[str]) -> float:
+    """请求/秒"""
+    await client.get(path)
+    start = time.perf_counter()
+    for _ in range(REQUESTS):
+        if resource is not None:
+            response_cache.bump(resource)
+        response = await client.get(path)
+        assert response.status_code == 200, response.status_code
+    return REQUESTS / (time.perf_counter() - start)
+
+
+async def main():
+    logger.remove()
+    await init_db()
+    populate(DB_PATH, *test_data())
+    app.include_router(legacy)
+
+    installed = serialization.orjson
+    print(f"任务 {TASK_ROWS} 行，日志 {LOG_ROWS} 行，配置 {CONFIG_ROWS} 行，每项 {REQUESTS} 次请求"
+          + ("" if installed else "（未安装 orjson，跳过 orjson 列）"))
+    print(f"{'接口':<22} {'原实现':>10} {'TypeAdapter':>12} {'orjson':>10}  请求/秒")
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        for path, (legacy_path, resource) in ENDPOINTS.items():
+            before = await rate(client, legacy_path, None)
+            serialization.orjson = None
+            adapter = await rate(client, path, resource)
+            serialization.orjson = installed
+            fast = await rate(client, path, resource) if installed else None
+            print(f"{path:<22} {before:10.1f} {adapter:12.1f} " + (f"{fast:10.1f}" if fast else f"{'-':>10}")
+                  + f"  ({(fast or adapter) / before:.1f}x)")
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
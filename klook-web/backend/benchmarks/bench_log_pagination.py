@@ -0,0 +1,96 @@
+"""日志分页基准：100 万行 logs 表上的 offset 分页 vs 游标分页 + 缓存总数
+
+运行: cd klook-web/backend && python -m benchmarks.bench_log_pagination [行数]
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+DB_PATH = os.path.join(tempfile.mkdtemp(prefix="klook-bench-"), "bench.db")
+os.environ.setdefault("DATABASE_URL", f"sqlite+aiosqlite:///{DB_PATH}")
+os.environ.setdefault("DEBUG", "false")
+
+from sqlalchemy import func, select  # noqa: E402
+
+from app.models.log import LogLevel  # noqa: E402
+from app.storage.database import async_session_maker, engine, init_db  # noqa: E402
+from app.storage.log_store import LogCursor, LogStore, log_totals  # noqa: E402
+from app.storage.models import LogDB  # noqa: E402
+from benchmarks._common import populate  # noqa: E402
+
+ROWS = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+TASKS = 100
+PAGE = 100
+DEPTH_PAGES = (0, 100, 1000, 5000)
+LEVELS = [level.value for level in LogLevel]
+
+
+def log_rows():
+    """测试日志的参数行"""
+    start = datetime(2026, 1, 1)
+    return (
+        (i % TASKS + 1, LEVELS[i % len(LEVELS)], f"bench log {i}", (start + timedelta(milliseconds=i)).strftime("%Y-%m-%d %H:%M:%S.%f"))
+        for i in range(ROWS)
+    )
+
+
+async def timed(coro) -> tuple[float, object]:
+    start = time.perf_counter()
+    result = await coro
+    return (time.perf_counter() - start) * 1000, result
+
+
+async def legacy_count(session, task_id=None):
+    """原实现：每次请求 SELECT count(*) FROM (子查询)"""
+    query = select(LogDB)
+    if task_id is not None:
+        query = query.where(LogDB.task_id == task_id)
+    return (await session.execute(select(func.count()).select_from(query.alias()))).scalar()
+
+
+async def bench(task_id=None):
+    label = "全部日志" if task_id is None else f"task_id={task_id}"
+    print(f"\n== {label} ==")
+    async with async_session_maker() as session:
+        ms, _ = await timed(legacy_count(session, task_id))
+        print(f"旧总数查询（每页一次）    {ms:9.2f} ms")
+
+        log_totals.clear()
+        ms, _ = await timed(LogStore.count(session, task_id=task_id))
+        print(f"缓存总数（首次冷启动）    {ms:9.2f} ms")
+        ms, _ = await timed(LogStore.count(session, task_id=task_id))
+        print(f"缓存总数（命中）          {ms:9.4f} ms")
+
+        for depth in DEPTH_PAGES:
+            offset = depth * PAGE
+            ms_offset, (logs, _) = await timed(LogStore.get_all(session, task_id=task_id, limit=PAGE, offset=offset))
+            if not logs:
+                break
+            # 游标取自上一页最后一条，定位到同一页
+            cursor = None
+            if offset:
+                previous, _ = await LogStore.get_all(session, task_id=task_id, limit=1, offset=offset - 1)
+                cursor = LogCursor.after(previous[0])
+            ms_cursor, (cursor_logs, _) = await timed(
+                LogStore.get_all(session, task_id=task_id, limit=PAGE, cursor=cursor)
+            )
+            assert [log.id for log in logs] == [log.id for log in cursor_logs]
+            print(f"第 {depth:>5} 页  offset {ms_offset:9.2f} ms | cursor {ms_cursor:9.2f} ms")
+
+
+async def main():
+    await init_db()
+    start = time.perf_counter()
+    populate(DB_PATH, ("INSERT INTO logs (task_id, level, message, created_at) VALUES (?, ?, ?, ?)", log_rows()), analyze=True)
+    print(f"生成 {ROWS} 行日志耗时 {time.perf_counter() - start:.1f} s")
+
+    await bench()
+    await bench(task_id=1)
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
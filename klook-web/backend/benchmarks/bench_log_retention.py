@@ -0,0 +1,178 @@
+"""日志保留基准：归档大量旧日志时的写锁持有时间、压缩率和归档日志的读取延迟
+
+- 每块总耗时（查询 + 压缩并写入段文件 + 写事务）与其中写事务的耗时（按 ID 删除 + 写索引，即写锁持有时间）
+- 归档期间并发写入单条日志的延迟（模拟任务日志写入）
+- 段文件大小与原始 NDJSON 大小之比
+- 通过 /api/logs?include_archived=true 读取归档日志的延迟（游标翻页 / offset 跳页 / 按任务筛选）
+
+运行: cd klook-web/backend && python -m benchmarks.bench_log_retention [日志行数]
+"""
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+
+WORK_DIR = tempfile.mkdtemp(prefix="klook-bench-")
+DB_PATH = os.path.join(WORK_DIR, "bench.db")
+os.environ.setdefault("DATABASE_URL", f"sqlite+aiosqlite:///{DB_PATH}")
+os.environ.setdefault("DEBUG", "false")
+os.environ.setdefault("LOG_ARCHIVE_DIR", os.path.join(WORK_DIR, "archive"))
+os.environ.setdefault("LOG_RETENTION_DAYS", "30")
+
+import httpx  # noqa: E402
+from loguru import logger  # noqa: E402
+from sqlalchemy import select  # noqa: E402
+
+from app.core.config import settings  # noqa: E402
+from app.models.log import LogCreate, LogLevel  # noqa: E402
+from app.services import log_retention as log_retention_module  # noqa: E402
+from app.services.log_retention import LogRetention  # noqa: E402
+from app.storage.database import async_session_maker, engine, init_db  # noqa: E402
+from app.storage.log_archive import log_archive  # noqa: E402
+from app.storage.log_store import LogStore  # noqa: E402
+from app.storage.models import LogArchiveChunkDB  # noqa: E402
+from benchmarks._common import populate  # noqa: E402
+from main import app  # noqa: E402
+
+LOG_ROWS = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+TASKS = 500
+# 超过保留期的比例
+OLD_FRACTION = 0.9
+READS = 20
+
+
+def log_rows():
+    """测试日志的参数行：大部分早于保留期；各任务交错写入（索引的最坏情况：每块每个任务一组）"""
+    now = datetime.now()
+    old = int(LOG_ROWS * OLD_FRACTION)
+    messages = (
+        "任务启动，目标时间: 2024-01-01T10:00:00, 网络补偿: 250ms",
+        "第 1/3 次尝试失败: {'success': False, 'error': 'sold out'}",
+        "抢购成功! 尝试次数: 2, 结果: {'success': True, 'order_no': 'KL20240101'}",
+    )
+    return (
+        (i % TASKS + 1, ("info", "warning", "info")[i % 3], messages[i % 3],
+         str(now - timedelta(days=60) + timedelta(seconds=i) if i < old else now - timedelta(seconds=LOG_ROWS - i)))
+        for i in range(LOG_ROWS)
+    )
+
+
+def percentiles(values: list[float]) -> str:
+    values = sorted(values)
+    p95 = values[min(len(values) - 1, int(len(values) * 0.95))]
+    return f"p50 {statistics.median(values):7.2f} ms | p95 {p95:7.2f} ms | max {values[-1]:7.2f} ms"
+
+
+async def concurrent_writes(stop: asyncio.Event, latencies: list[float]):
+    """归档期间每 10ms 写入一条日志"""
+    while not stop.is_set():
+        began = time.perf_counter()
+        async with async_session_maker() as session:
+            await LogStore.create(session, LogCreate(task_id=1, level=LogLevel.INFO, message="并发写入"))
+            await session.commit()
+        latencies.append((time.perf_counter() - began) * 1000)
+        await asyncio.sleep(0.01)
+
+
+async def timed_get(client: httpx.AsyncClient, path: str) -> tuple[float, dict]:
+    began = time.perf_counter()
+    response = await client.get(path)
+    elapsed = (time.perf_counter() - began) * 1000
+    assert response.status_code == 200, response.text
+    return elapsed, response.json()
+
+
+async def main():
+    logger.remove()
+    await init_db()
+    populate(DB_PATH, ("INSERT INTO logs (task_id, level, message, created_at) VALUES (?, ?, ?, ?)", log_rows()))
+    db_size = os.path.getsize(DB_PATH)
+
+    # 记录每块的总耗时，以及块内写事务（写连接会话）的耗时
+    chunk_ms: list[float] = []
+    transaction_ms: list[float] = []
+    archive_chunk = LogRetention._archive_chunk
+
+    @asynccontextmanager
+    async def timed_write_session():
+        async with async_session_maker() as session:
+            began = time.perf_counter()
+            yield session
+        transaction_ms.append((time.perf_counter() - began) * 1000)
+
+    async def timed_chunk(limit, cutoff):
+        began = time.perf_counter()
+        log_retention_module.async_session_maker = timed_write_session
+        try:
+            count = await archive_chunk(limit, cutoff)
+        finally:
+            log_retention_module.async_session_maker = async_session_maker
+        if count:
+            chunk_ms.append((time.perf_counter() - began) * 1000)
+        return count
+
+    retention = LogRetention()
+    retention._archive_chunk = timed_chunk
+
+    stop = asyncio.Event()
+    write_ms: list[float] = []
+    writer = asyncio.create_task(concurrent_writes(stop, write_ms))
+    summary = await retention.run_once()
+    stop.set()
+    await writer
+
+    # 原始 NDJSON 大小（解压后的字节数）
+    raw = 0
+    async with async_session_maker() as session:
+        chunks = (await session.execute(
+            select(LogArchiveChunkDB.segment, LogArchiveChunkDB.offset, LogArchiveChunkDB.length)
+        )).all()
+    for chunk in chunks:
+        raw += sum(len(json.dumps({**log._asdict(), "created_at": log.created_at.isoformat()},
+                                  ensure_ascii=False).encode()) + 1
+                   for log in log_archive.read_chunk(*chunk))
+    archived_bytes = sum(os.path.getsize(os.path.join(log_archive.directory, name))
+                         for name in os.listdir(log_archive.directory))
+
+    print(f"日志 {LOG_ROWS} 行（{OLD_FRACTION:.0%} 超过 {settings.log_retention_days} 天），"
+          f"每块 {settings.log_retention_chunk_size} 行，压缩 {log_archive.codec}")
+    print(f"归档 {summary['archived']} 行，{summary['chunks']} 块，总耗时 {summary['duration_s']} s")
+    print(f"每块总耗时            {percentiles(chunk_ms)}")
+    print(f"其中写事务（写锁持有）{percentiles(transaction_ms)}")
+    print(f"并发单条写入 ({len(write_ms):>4} 次) {percentiles(write_ms)}")
+    print(f"数据库 {db_size / 1e6:.1f} MB → {os.path.getsize(DB_PATH) / 1e6:.1f} MB；"
+          f"归档段 {archived_bytes / 1e6:.2f} MB，原始 NDJSON {raw / 1e6:.2f} MB（压缩率 {raw / archived_bytes:.1f}x）")
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        # 翻过 logs 表进入归档：游标连续翻页
+        durations = []
+        _, page = await timed_get(client, "/api/logs?limit=1000&include_archived=true")
+        for _ in range(READS):
+            elapsed, page = await timed_get(
+                client, f"/api/logs?limit=1000&include_archived=true&cursor={page['next_cursor']}")
+            durations.append(elapsed)
+        print(f"游标翻页 (1000 行)      {percentiles(durations)}")
+
+        durations = []
+        for i in range(READS):
+            elapsed, _ = await timed_get(
+                client, f"/api/logs?limit=100&include_archived=true&offset={LOG_ROWS // 2 + i * 997}")
+            durations.append(elapsed)
+        print(f"offset 跳页 (100 行)    {percentiles(durations)}")
+
+        durations = []
+        for i in range(READS):
+            elapsed, page = await timed_get(client, f"/api/tasks/{i + 2}/logs?limit=100&include_archived=true")
+            assert page["total"] >= len(page["logs"])
+            durations.append(elapsed)
+        print(f"按任务筛选 (100 行)     {percentiles(durations)}")
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,177 @@
+"""日志实时跟踪基准：N 个查看者轮询 /api/logs 与订阅 /api/logs/stream 的对比
+
+服务端以子进程运行（uvicorn main:app），按固定速率写入日志（POST /api/logs），
+每个查看者关注一个任务：
+- 轮询: 每秒请求一次该任务最新一页日志（原 LogView 的做法）
+- 跟踪: 保持一个 SSE 连接，新日志由写入路径直接推送
+
+报告服务端 CPU 占用（/proc/<pid>/stat）、查看者看到新日志的延迟（写入请求发出 → 查看者收到）
+以及查看者收到的字节数。
+
+运行: cd klook-web/backend && python -m benchmarks.bench_log_stream [查看者数] [秒数]
+"""
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from benchmarks._common import free_port
+
+VIEWERS = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+DURATION = float(sys.argv[2]) if len(sys.argv) > 2 else 10
+TASKS = 20
+WRITES_PER_SECOND = 20
+POLL_INTERVAL = 1.0
+
+
+def cpu_seconds(pid: int) -> float:
+    """进程累计 CPU 时间（用户态 + 内核态）"""
+    with open(f"/proc/{pid}/stat") as f:
+        fields = f.read().rsplit(")", 1)[1].split()
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+
+class Server:
+    """以子进程运行的服务端"""
+
+    def __init__(self):
+        self.port = free_port()
+        self.base_url = f"http://127.0.0.1:{self.port}/api"
+        work_dir = tempfile.mkdtemp(prefix="klook-bench-")
+        self.env = {
+            **os.environ,
+            "DATABASE_URL": f"sqlite+aiosqlite:///{os.path.join(work_dir, 'bench.db')}",
+            "DEBUG": "false",
+            "LOG_RETENTION_ENABLED": "false",
+        }
+        self.process: subprocess.Popen = None
+
+    async def __aenter__(self) -> "Server":
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--port", str(self.port), "--log-level", "warning"],
+            env=self.env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        async with httpx.AsyncClient() as client:
+            for _ in range(100):
+                try:
+                    await client.get(f"{self.base_url}/health")
+                    return self
+                except httpx.TransportError:
+                    await asyncio.sleep(0.1)
+        raise RuntimeError("服务端未能启动")
+
+    async def __aexit__(self, *exc):
+        self.process.terminate()
+        self.process.wait()
+
+
+class Viewer:
+    """一个查看者：记录每条日志第一次被看到的时刻和收到的字节数"""
+
+    def __init__(self, task_id: int):
+        self.task_id = task_id
+        self.seen: dict[int, float] = {}
+        self.bytes = 0
+
+    async def poll(self, client: httpx.AsyncClient, base_url: str, stop: asyncio.Event):
+        while not stop.is_set():
+            response = await client.get(f"{base_url}/tasks/{self.task_id}/logs", params={"limit": 100})
+            now = time.perf_counter()
+            self.bytes += len(response.content)
+            for log in response.json()["logs"]:
+                self.seen.setdefault(log["id"], now)
+            try:
+                await asyncio.wait_for(stop.wait(), POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+
+    async def stream(self, client: httpx.AsyncClient, base_url: str, connected: asyncio.Event):
+        async with client.stream("GET", f"{base_url}/logs/stream", params={"task_id": self.task_id}) as response:
+            connected.set()
+            buffer = ""
+            async for chunk in response.aiter_text():
+                now = time.perf_counter()
+                self.bytes += len(chunk.encode())
+                buffer += chunk
+                *events, buffer = buffer.split("\n\n")
+                for event in events:
+                    for line in event.split("\n"):
+                        if line.startswith("data: "):
+                            self.seen.setdefault(json.loads(line[6:])["id"], now)
+
+
+async def write_logs(client: httpx.AsyncClient, base_url: str, sent: dict[int, tuple[int, float]]):
+    """按固定速率写入日志，记录 {日志 ID: (任务 ID, 发出时刻)}"""
+    count = int(DURATION * WRITES_PER_SECOND)
+    started = time.perf_counter()
+    for i in range(count):
+        await asyncio.sleep(max(0.0, started + i / WRITES_PER_SECOND - time.perf_counter()))
+        task_id = i % TASKS + 1
+        began = time.perf_counter()
+        response = await client.post(f"{base_url}/logs", json={
+            "task_id": task_id, "level": "info", "message": f"第 {i} 条日志：抢购重试中"
+        })
+        sent[response.json()["id"]] = (task_id, began)
+
+
+async def run(mode: str) -> dict:
+    async with Server() as server:
+        limits = httpx.Limits(max_connections=VIEWERS + 10, max_keepalive_connections=VIEWERS + 10)
+        async with httpx.AsyncClient(limits=limits, timeout=30) as client:
+            viewers = [Viewer(i % TASKS + 1) for i in range(VIEWERS)]
+            stop = asyncio.Event()
+            if mode == "poll":
+                runners = [asyncio.create_task(viewer.poll(client, server.base_url, stop)) for viewer in viewers]
+            else:
+                ready = [asyncio.Event() for _ in viewers]
+                runners = [asyncio.create_task(viewer.stream(client, server.base_url, event))
+                           for viewer, event in zip(viewers, ready)]
+                await asyncio.gather(*(event.wait() for event in ready))
+            await asyncio.sleep(1)
+
+            cpu_before = cpu_seconds(server.process.pid)
+            sent: dict[int, tuple[int, float]] = {}
+            await write_logs(client, server.base_url, sent)
+            await asyncio.sleep(POLL_INTERVAL * 1.5)
+            cpu = cpu_seconds(server.process.pid) - cpu_before
+
+            stop.set()
+            for runner in runners:
+                runner.cancel()
+            await asyncio.gather(*runners, return_exceptions=True)
+
+    delays, missed = [], 0
+    for viewer in viewers:
+        for log_id, (task_id, began) in sent.items():
+            if task_id != viewer.task_id:
+                continue
+            if log_id in viewer.seen:
+                delays.append((viewer.seen[log_id] - began) * 1000)
+            else:
+                missed += 1
+    delays.sort()
+    return {
+        "cpu": cpu / (DURATION + POLL_INTERVAL * 1.5),
+        "p50": statistics.median(delays),
+        "p95": delays[int(len(delays) * 0.95)],
+        "missed": missed,
+        "bytes": sum(viewer.bytes for viewer in viewers)
+    }
+
+
+async def main():
+    print(f"{VIEWERS} 个查看者，{TASKS} 个任务，写入 {WRITES_PER_SECOND} 条/秒，持续 {DURATION:.0f} 秒")
+    for mode, label in (("poll", "轮询 (1 秒)"), ("stream", "SSE 跟踪")):
+        result = await run(mode)
+        print(f"{label:<12} 服务端 CPU {result['cpu']:6.1%} | 延迟 p50 {result['p50']:7.1f} ms"
+              f" p95 {result['p95']:7.1f} ms | 未收到 {result['missed']:>4} | 下行 {result['bytes'] / 1e6:7.2f} MB")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,93 @@
+"""每次抢购尝试的日志开销（调用方耗时）
+
+每次尝试与 KlookClient.manual_redeem 一样写两条日志：请求前一条、收到响应后一条（带响应体，
+模拟 4 KB 的响应）。对比三种配置下调用方（事件循环 / 触发线程）花在日志上的时间：
+
+- 改造前: loguru 默认的同步处理器，两条都是 INFO，响应体完整写入
+- enqueue: loguru 自带的 enqueue=True（调用方仍要格式化并 pickle 记录）
+- 改造后: app.core.logging_config 的队列处理器，请求前一条降为 DEBUG，响应体只写预览
+
+每种配置分别写入普通文件和慢速输出（每次写入耗时 0.2 ms，模拟终端 / 管道被阻塞）。
+
+运行: cd klook-web/backend && python -m benchmarks.bench_logging [尝试次数]
+"""
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("DEBUG", "false")
+
+from loguru import logger  # noqa: E402
+
+from app.core import logging_config  # noqa: E402
+
+ATTEMPTS = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+BODY = ('{"success":false,"error":{"code":"-1","message":"sold out"},"result":' + '"' + "x" * 4000 + '"}').encode()
+
+
+class SlowStream:
+    """每次写入耗时 0.2 ms 的输出"""
+
+    def __init__(self, target):
+        self.target = target
+
+    def write(self, text: str):
+        time.sleep(0.0002)
+        self.target.write(text)
+
+    def flush(self):
+        self.target.flush()
+
+
+def attempt_before(program_uuid: str):
+    logger.info(f"开始兑换优惠券: program_uuid={program_uuid}")
+    logger.info(f"兑换优惠券 API 响应: status=200, body={BODY.decode()}")
+
+
+def attempt_after(program_uuid: str):
+    logger.debug(f"开始兑换优惠券: program_uuid={program_uuid}")
+    logger.info(f"兑换优惠券 API 响应: status=200, body={logging_config.payload_preview(BODY)}")
+
+
+def measure(attempt) -> list[float]:
+    """返回每次尝试的日志耗时（微秒）"""
+    samples = []
+    for _ in range(ATTEMPTS):
+        started = time.perf_counter_ns()
+        attempt("bench")
+        samples.append((time.perf_counter_ns() - started) / 1000)
+    return samples
+
+
+def run(stream, mode: str) -> list[float]:
+    if mode == "after":
+        stderr, sys.stderr = sys.stderr, stream
+        logging_config.setup_logging()
+        sys.stderr = stderr
+        samples = measure(attempt_after)
+        logging_config.shutdown_logging()
+    else:
+        logger.remove()
+        logger.add(stream, level="INFO", enqueue=mode == "enqueue")
+        samples = measure(attempt_before)
+        logger.complete()
+        logger.remove()
+    return samples
+
+
+def main():
+    print(f"每次尝试的日志耗时（{ATTEMPTS} 次，微秒）")
+    with tempfile.TemporaryDirectory(prefix="klook-bench-") as work_dir:
+        for output in ("文件", "慢速输出"):
+            for mode, label in (("before", "改造前"), ("enqueue", "enqueue"), ("after", "改造后")):
+                with open(os.path.join(work_dir, f"{mode}.log"), "w", encoding="utf-8") as file:
+                    stream = file if output == "文件" else SlowStream(file)
+                    samples = sorted(run(stream, mode))
+                print(f"  {output:<4} {label:<7} p50 {statistics.median(samples):8.1f}"
+                      f"  p99 {samples[int(len(samples) * 0.99)]:8.1f}  max {samples[-1]:8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""事件循环延迟看门狗：触发窗口内加密采样的代价与检测能力
+
+1. 代价：hybrid 定时器在主事件循环上等待触发（与触发运行时一样处于 firing_window 内），
+   比较看门狗关闭 / 开启（窗口内每 LOOP_LAG_GUARD_INTERVAL_MS 采样一次）时的触发误差；
+   两种情况逐轮交替，虚拟机调度抖动对两者的影响相同
+2. 检测：触发前 35 ms 注入一次 12 ms 的阻塞，确认看门狗记录的窗口内最大延迟覆盖该阻塞
+
+运行: cd klook-web/backend && python -m benchmarks.bench_loop_watchdog [轮数]
+"""
+import asyncio
+import os
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+os.environ.setdefault("DEBUG", "false")
+
+from loguru import logger  # noqa: E402
+
+from app.core.metrics import metrics  # noqa: E402
+from app.core.timer import PrecisionTimer, TimerMode  # noqa: E402
+from app.services.firing_runtime import firing_window, window_opens_at  # noqa: E402
+from benchmarks._common import summary  # noqa: E402
+
+ROUNDS = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+STALL_BEFORE = 0.035
+STALL = 0.012
+
+
+async def fire_once(task_id: int, stall: bool) -> tuple[float, dict]:
+    """返回 (触发误差微秒, 看门狗在触发时的记录)"""
+    timer = PrecisionTimer(datetime.now() + timedelta(seconds=0.15), network_compensation=0, mode=TimerMode.HYBRID)
+    metrics.loop_lag.watch(lambda: [(task_id, window_opens_at(timer), timer.deadline)])
+    if stall:
+        asyncio.get_running_loop().call_at(timer.deadline - STALL_BEFORE, time.sleep, STALL)
+    with firing_window:
+        error_ns = await timer.fire_at_deadline()
+    recorded = metrics.loop_lag.at_fire(task_id)
+    return abs(error_ns) / 1e3, recorded
+
+
+def error_summary(values: list[float]) -> str:
+    return (f"{summary(values, 'µs', (50, 90), precision=1, maximum=False)}"
+            f"  超过 100 µs {sum(1 for value in values if value > 100)} 次")
+
+
+async def main():
+    logger.remove()
+    print(f"触发误差（{ROUNDS} 次）")
+    errors_off, errors_on = [], []
+    for task_id in range(ROUNDS):
+        errors_off.append((await fire_once(task_id, False))[0])
+        metrics.start()
+        errors_on.append((await fire_once(task_id, False))[0])
+        await metrics.stop()
+    print(f"  看门狗关闭 {error_summary(errors_off)}")
+    print(f"  看门狗开启 {error_summary(errors_on)}")
+
+    metrics.start()
+    detected = [(await fire_once(ROUNDS + task_id, True))[1]["loop_lag_window_max_ms"] for task_id in range(ROUNDS)]
+    hits = sum(1 for lag in detected if lag is not None and lag >= STALL * 1000 * 0.9)
+    print(f"注入 {STALL * 1000:.0f} ms 阻塞: 窗口内最大延迟 p50 {statistics.median(lag or 0 for lag in detected):.2f} ms，"
+          f"检出 {hits}/{ROUNDS}")
+    await metrics.stop()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,98 @@
+"""预构建的抢购请求：唤醒到请求发出的耗时
+
+本地 Klook 替身服务（benchmarks/mock_klook.py）上用已预热的连接发送兑换请求，
+请求头模拟真实配置（认证、Cookie 等约 20 个字段），比较两种发送方式：
+- 触发时构建: 原 manual_redeem 的方式，触发后拼接 URL、合并请求头、编码 JSON 请求体再发送
+- 预构建: 触发前 prepare_redeem，触发后只为本次发送复制请求对象（PreparedRequest.build）
+
+每次尝试记录唤醒（perf_counter_ns）到开始写请求头的微秒数（RequestTimings.wakeup_to_send_us），
+另外单独测量不含网络的构建耗时。
+
+运行: cd klook-web/backend && python -m benchmarks.bench_prepared_request [尝试次数]
+"""
+import asyncio
+import os
+import sys
+import time
+
+os.environ.setdefault("DEBUG", "false")
+
+from loguru import logger  # noqa: E402
+
+from app.core.klook_client import REDEEM_PATH, KlookClient, RequestTimings  # noqa: E402
+from benchmarks._common import summary  # noqa: E402
+from benchmarks.mock_klook import MockKlook  # noqa: E402
+
+ATTEMPTS = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+BUILD_ROUNDS = 20000
+HEADERS = {
+    "Accept": "application/json, text/plain, */*",
+    "Accept-Language": "zh_CN",
+    "Authorization": "Bearer " + "t" * 600,
+    "Content-Type": "application/json;charset=UTF-8",
+    "Cookie": "; ".join(f"cookie_{i}={'c' * 40}" for i in range(20)),
+    "Currency": "CNY",
+    "Origin": "https://www.klook.cn",
+    "Referer": "https://www.klook.cn/zh-CN/coupons/",
+    "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko)",
+    "X-Klook-Host": "www.klook.cn",
+    "X-Platform": "desktop",
+    **{f"X-Trace-{i}": "v" * 32 for i in range(9)}
+}
+
+
+def micros(values: list[float]) -> str:
+    return summary(values, "µs", (50, 99), precision=1)
+
+
+async def send_built_at_fire(client: KlookClient, timings: RequestTimings):
+    """原 manual_redeem 的发送方式"""
+    response = await client.client.post(
+        url=f"{client.base_url}/v2/promosrv/program/manual_redeem",
+        headers=HEADERS,
+        json={"program_uuid": "bench"},
+        extensions={"trace": timings}
+    )
+    response.json()
+
+
+async def measure_send(client: KlookClient, send) -> list[float]:
+    samples = []
+    for _ in range(ATTEMPTS):
+        timings = RequestTimings(time.perf_counter_ns())
+        await send(timings)
+        samples.append((timings.sent_ns - timings.woke_ns) / 1e3)
+    return samples
+
+
+def measure_build(build) -> list[float]:
+    samples = []
+    for _ in range(BUILD_ROUNDS):
+        started = time.perf_counter_ns()
+        build()
+        samples.append((time.perf_counter_ns() - started) / 1e3)
+    return samples
+
+
+async def main():
+    logger.remove()
+    with MockKlook(script="fail") as mock:
+        client = KlookClient(mock.base_url)
+        await client.warm_up()
+        prepared = client.prepare_redeem("bench", HEADERS)
+
+        built = await measure_send(client, lambda timings: send_built_at_fire(client, timings))
+        staged = await measure_send(client, lambda timings: client.redeem(prepared, timings))
+        print(f"唤醒到请求发出（{ATTEMPTS} 次）")
+        print(f"  触发时构建 {micros(built)}")
+        print(f"  预构建     {micros(staged)}")
+
+        url = f"{client.base_url}{REDEEM_PATH}"
+        print(f"构建请求对象（{BUILD_ROUNDS} 次，不含网络）")
+        print(f"  触发时构建 {micros(measure_build(lambda: client.client.build_request('POST', url, headers=HEADERS, json={'program_uuid': 'bench'})))}")
+        print(f"  预构建     {micros(measure_build(prepared.build))}")
+        await client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
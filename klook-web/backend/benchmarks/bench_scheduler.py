@@ -0,0 +1,99 @@
+"""调度器基准：1 万个已启动任务的内存占用与唤醒抖动
+
+- legacy: 每个任务一个轮询倒计时协程（原实现）
+- scheduler: 集中式最小堆调度器 + 紧凑触发计划
+
+运行: cd klook-web/backend && python -m benchmarks.bench_scheduler [任务数]
+"""
+import asyncio
+import gc
+import os
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+os.environ.setdefault("DEBUG", "false")
+
+from loguru import logger  # noqa: E402
+
+from app.core.scheduler import DeadlineScheduler  # noqa: E402
+from app.core.timer import PrecisionTimer  # noqa: E402
+from benchmarks._common import legacy_countdown  # noqa: E402
+
+TASKS = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+SPREAD = 3.0  # 触发时间分布区间（秒）
+LEAD = 2.0  # 首个触发前的准备时间（秒）
+
+
+def report(label: str, memory: int, errors: list[float]):
+    errors = sorted(e * 1000 for e in errors)
+    p99 = errors[int(len(errors) * 0.99) - 1]
+    print(f"{label:<10} 内存 {memory / 1024 / 1024:7.2f} MiB ({memory / TASKS:6.0f} B/任务)"
+          f" | 唤醒误差 p50 {statistics.median(errors):7.3f} ms  p99 {p99:7.3f} ms  max {errors[-1]:7.3f} ms"
+          f" | 触发 {len(errors)}")
+
+
+async def fire_legacy(timer: PrecisionTimer, errors: list[float]):
+    await legacy_countdown(timer)
+    errors.append(time.time() - timer.target_timestamp)
+
+
+async def bench_legacy():
+    errors = []
+    now = time.time()
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+
+    tasks = []
+    for _ in range(TASKS):
+        target = now + LEAD + random.random() * SPREAD
+        timer = PrecisionTimer(datetime.fromtimestamp(target), network_compensation=0)
+        tasks.append(asyncio.create_task(fire_legacy(timer, errors)))
+
+    await asyncio.sleep(LEAD / 2)
+    memory = tracemalloc.get_traced_memory()[0] - baseline
+    tracemalloc.stop()
+    await asyncio.gather(*tasks)
+    report("legacy", memory, errors)
+
+
+async def bench_scheduler():
+    errors = []
+    scheduler = DeadlineScheduler()
+    loop = asyncio.get_running_loop()
+    now = time.time()
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+
+    done = asyncio.Event()
+
+    async def fire(deadline: float):
+        errors.append(loop.time() - deadline)
+        if len(errors) == TASKS:
+            done.set()
+
+    for task_id in range(TASKS):
+        deadline = scheduler.deadline_from_timestamp(now + LEAD + random.random() * SPREAD)
+        scheduler.schedule(task_id, deadline, lambda deadline=deadline: fire(deadline))
+
+    await asyncio.sleep(LEAD / 2)
+    memory = tracemalloc.get_traced_memory()[0] - baseline
+    tracemalloc.stop()
+    await done.wait()
+    await scheduler.stop()
+    report("scheduler", memory, errors)
+
+
+def main():
+    logger.remove()
+    print(f"任务数: {TASKS}")
+    asyncio.run(bench_legacy())
+    gc.collect()
+    asyncio.run(bench_scheduler())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""SQLite 存储配置基准：UI 读负载下触发路径的写入延迟
+
+写入协程模拟执行器写后日志（每 10ms 一次小批量 INSERT + COMMIT），
+同时多个读取协程模拟 UI 查询：在 logs 表上执行全表扫描型统计，长时间持有读锁。
+对比默认配置（回滚日志、FULL 同步、无连接池）与调优配置（WAL + 读写分离连接池）。
+
+运行: cd klook-web/backend && python -m benchmarks.bench_sqlite_profile
+"""
+import asyncio
+import os
+import sqlite3
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+os.environ.setdefault("DEBUG", "false")
+
+from sqlalchemy import func, insert, select  # noqa: E402
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine  # noqa: E402
+from sqlalchemy.pool import AsyncAdaptedQueuePool  # noqa: E402
+
+from app.core.config import settings  # noqa: E402
+from app.storage.database import Base  # noqa: E402
+from app.storage.models import LogDB  # noqa: E402
+from app.storage.sqlite_profile import SQLiteProfile  # noqa: E402
+
+ROWS = 200_000
+READERS = 8
+WRITES = 300
+WRITE_INTERVAL = 0.01
+
+
+def create_database(path: str):
+    """建表并生成日志数据"""
+    conn = sqlite3.connect(path)
+    conn.close()
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+
+    async def create_tables():
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        await engine.dispose()
+
+    asyncio.run(create_tables())
+    conn = sqlite3.connect(path)
+    start = datetime(2026, 1, 1)
+    conn.executemany(
+        "INSERT INTO logs (task_id, level, message, created_at) VALUES (?, ?, ?, ?)",
+        ((i % 50 + 1, "info", f"bench log {i} " + "x" * 100,
+          (start + timedelta(milliseconds=i)).strftime("%Y-%m-%d %H:%M:%S.%f")) for i in range(ROWS))
+    )
+    conn.commit()
+    conn.close()
+
+
+def legacy_engines(url: str):
+    engine = create_async_engine(url)
+    return engine, engine
+
+
+def tuned_engines(url: str):
+    profile = SQLiteProfile.from_settings(settings)
+    write_engine = create_async_engine(url, poolclass=AsyncAdaptedQueuePool, pool_size=settings.db_write_pool_size,
+                                       max_overflow=0)
+    read_engine = create_async_engine(url, poolclass=AsyncAdaptedQueuePool, pool_size=settings.db_read_pool_size,
+                                      max_overflow=0)
+    profile.install(write_engine)
+    profile.install(read_engine, read_only=True)
+    return write_engine, read_engine
+
+
+async def run(label: str, engines, with_readers: bool):
+    write_engine, read_engine = engines
+    write_sessions = async_sessionmaker(write_engine, expire_on_commit=False)
+    read_sessions = async_sessionmaker(read_engine, expire_on_commit=False)
+    stop = asyncio.Event()
+    reads = 0
+
+    async def reader():
+        nonlocal reads
+        while not stop.is_set():
+            async with read_sessions() as session:
+                await session.execute(select(func.count()).where(LogDB.message.like(f"%{reads % 10}%")))
+            reads += 1
+
+    async def writer() -> list[float]:
+        latencies = []
+        for i in range(WRITES):
+            start = time.perf_counter()
+            async with write_sessions() as session:
+                await session.execute(insert(LogDB), [
+                    {"task_id": 1, "level": "info", "message": f"fire {i}-{n}"} for n in range(3)
+                ])
+                await session.commit()
+            latencies.append((time.perf_counter() - start) * 1000)
+            await asyncio.sleep(WRITE_INTERVAL)
+        return latencies
+
+    readers = [asyncio.create_task(reader()) for _ in range(READERS if with_readers else 0)]
+    latencies = await writer()
+    stop.set()
+    await asyncio.gather(*readers)
+    await write_engine.dispose()
+    if read_engine is not write_engine:
+        await read_engine.dispose()
+
+    latencies.sort()
+    p99 = latencies[int(len(latencies) * 0.99) - 1]
+    load = f"读负载 {reads:>4} 次" if with_readers else "无读负载    "
+    print(f"{label:<6} {load} | 写延迟 p50 {statistics.median(latencies):7.2f} ms"
+          f"  p99 {p99:7.2f} ms  max {latencies[-1]:7.2f} ms")
+
+
+def main():
+    for label, factory in (("默认", legacy_engines), ("调优", tuned_engines)):
+        path = os.path.join(tempfile.mkdtemp(prefix="klook-bench-"), "bench.db")
+        create_database(path)
+        url = f"sqlite+aiosqlite:///{path}"
+        asyncio.run(run(label, factory(url), with_readers=False))
+        asyncio.run(run(label, factory(url), with_readers=True))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""写后日志基准：重试循环在网络调用之外花费的时间
+
+对比两种写法：
+- legacy: 原实现，每条日志 / 每次状态变更单独开会话并提交
+- journal: 触发运行时的重试循环 + TaskExecutor 事件处理 + 写后日志
+
+运行: cd klook-web/backend && python -m benchmarks.bench_task_journal
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+DB_PATH = os.path.join(tempfile.mkdtemp(prefix="klook-bench-"), "bench.db")
+os.environ.setdefault("DATABASE_URL", f"sqlite+aiosqlite:///{DB_PATH}")
+os.environ.setdefault("DEBUG", "false")
+
+from loguru import logger  # noqa: E402
+
+from app.models.config import ConfigCreate  # noqa: E402
+from app.models.log import LogCreate, LogLevel  # noqa: E402
+from app.models.task import TaskCreate, TaskStatus  # noqa: E402
+from app.core.timer import PrecisionTimer  # noqa: E402
+from app.services.firing_runtime import FireSpec, run_fire_plan  # noqa: E402
+from app.services.task_executor import TaskExecutor  # noqa: E402
+from app.storage.config_store import ConfigStore  # noqa: E402
+from app.storage.database import async_session_maker, init_db  # noqa: E402
+from app.storage.log_store import LogStore  # noqa: E402
+from app.storage.task_journal import task_journal  # noqa: E402
+from app.storage.task_store import TaskStore  # noqa: E402
+
+ATTEMPTS = 20
+NETWORK_DELAY = 0.005  # 模拟单次请求耗时（秒）
+
+
+class StubClient:
+    """模拟 KlookClient：固定延迟，始终失败，统计网络耗时"""
+    network_time = 0.0
+
+    def prepare_redeem(self, program_uuid: str, headers: dict):
+        return program_uuid
+
+    async def redeem(self, prepared, timings=None):
+        start = time.perf_counter()
+        await asyncio.sleep(NETWORK_DELAY)
+        StubClient.network_time += time.perf_counter() - start
+        return False, {"success": False, "error": {"code": "bench"}}
+
+    async def manual_redeem(self, program_uuid: str, headers: dict, timings=None):
+        return await self.redeem(self.prepare_redeem(program_uuid, headers), timings)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        pass
+
+
+async def create_task():
+    async with async_session_maker() as session:
+        config = await ConfigStore.create(session, ConfigCreate(
+            name=f"bench-{time.time_ns()}",
+            headers={"token": "bench"}
+        ))
+        task = await TaskStore.create(session, TaskCreate(
+            config_id=config.id,
+            program_uuid="bench",
+            target_time=datetime.now() + timedelta(minutes=1),
+            max_retries=ATTEMPTS,
+            retry_interval=0
+        ))
+        await session.commit()
+        return task, config
+
+
+async def legacy_loop(task_id: int):
+    """原实现的重试循环写入模式"""
+    client = StubClient()
+
+    async def write_log(level: LogLevel, message: str):
+        async with async_session_maker() as session:
+            await LogStore.create(session, LogCreate(task_id=task_id, level=level, message=message))
+            await session.commit()
+
+    async def write_status(status: TaskStatus, result=None):
+        async with async_session_maker() as session:
+            await TaskStore.update_status(session, task_id, status, result)
+            await session.commit()
+
+    await write_log(LogLevel.INFO, "开始执行抢购")
+    await write_status(TaskStatus.RUNNING)
+    for retry_count in range(1, ATTEMPTS + 1):
+        _, result = await client.manual_redeem("bench", {})
+        await write_log(LogLevel.WARNING, f"第 {retry_count}/{ATTEMPTS} 次尝试失败: {result}")
+        await asyncio.sleep(0)
+    await write_log(LogLevel.ERROR, "抢购失败")
+    await write_status(TaskStatus.FAILED, {"success": False})
+
+
+async def journal_loop(task, config):
+    """当前实现：触发运行时产出事件，TaskExecutor 在主事件循环上写入写后日志"""
+    executor = TaskExecutor()
+    executor.start()
+    spec = FireSpec(task, config)
+    spec.timer = PrecisionTimer(datetime.now(), network_compensation=0)
+    executor.armed[task.id] = spec
+    await run_fire_plan(spec, StubClient(), executor._emit)
+    # 等待事件全部处理完
+    while task.id in executor.armed:
+        await asyncio.sleep(0)
+    await executor.stop()
+
+
+async def measure(name: str, coro_factory) -> float:
+    StubClient.network_time = 0.0
+    start = time.perf_counter()
+    await coro_factory()
+    elapsed = time.perf_counter() - start
+    overhead = elapsed - StubClient.network_time
+    print(f"{name:<8} 总耗时 {elapsed * 1000:8.2f} ms | 网络 {StubClient.network_time * 1000:8.2f} ms"
+          f" | 网络之外 {overhead * 1000:8.2f} ms ({overhead / ATTEMPTS * 1000:.3f} ms/次)")
+    return overhead
+
+
+async def main():
+    logger.remove()
+    logger.add(sys.stderr, level="CRITICAL")
+    await init_db()
+
+    task, config = await create_task()
+    legacy = await measure("legacy", lambda: legacy_loop(task.id))
+
+    task, config = await create_task()
+    task_journal.start()
+    journal = await measure("journal", lambda: journal_loop(task, config))
+    flush_start = time.perf_counter()
+    await task_journal.stop()
+    print(f"journal 收尾落库 {(time.perf_counter() - flush_start) * 1000:.2f} ms（不在重试循环内）")
+
+    print(f"网络之外的耗时降低 {legacy / max(journal, 1e-9):.1f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,127 @@
+"""任务统计基准与一致性校验
+
+在数万条任务上：
+- 对比原实现（7 次 TaskStore.count，每次加载全部 ORM 行）与 task_stats.summary 的耗时
+- 通过 TaskStore / 写后日志执行随机状态迁移，逐步校验计数器与 GROUP BY 慢路径一致
+
+运行: cd klook-web/backend && python -m benchmarks.bench_task_stats [任务数]
+"""
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+DB_PATH = os.path.join(tempfile.mkdtemp(prefix="klook-bench-"), "bench.db")
+os.environ.setdefault("DATABASE_URL", f"sqlite+aiosqlite:///{DB_PATH}")
+os.environ.setdefault("DEBUG", "false")
+
+from loguru import logger  # noqa: E402
+from sqlalchemy import select  # noqa: E402
+
+from app.models.task import TaskCreate, TaskStatus  # noqa: E402
+from app.storage.database import async_session_maker, engine, init_db  # noqa: E402
+from app.storage.models import TaskDB  # noqa: E402
+from app.storage.task_journal import task_journal  # noqa: E402
+from app.storage.task_stats import task_stats  # noqa: E402
+from app.storage.task_store import TaskStore  # noqa: E402
+from benchmarks._common import populate  # noqa: E402
+
+TASKS = int(sys.argv[1]) if len(sys.argv) > 1 else 30_000
+STEPS = 300
+STATUSES = list(TaskStatus)
+
+
+def test_data() -> tuple:
+    """测试数据：(INSERT 语句, 参数行) 序列"""
+    target = (datetime.now() + timedelta(days=1)).strftime("%Y-%m-%d %H:%M:%S.%f")
+    return (
+        ("INSERT INTO configs (name, headers) VALUES ('bench', '{}')", [()]),
+        (
+            "INSERT INTO tasks (config_id, program_uuid, target_time, status) VALUES (1, 'bench', ?, ?)",
+            ((target, random.choice(STATUSES).value) for _ in range(TASKS))
+        )
+    )
+
+
+async def legacy_summary(session) -> dict:
+    """原实现：7 次加载全部 ORM 行后 len()"""
+    async def count(status=None):
+        query = select(TaskDB)
+        if status:
+            query = query.where(TaskDB.status == status.value)
+        return len(list((await session.execute(query)).scalars().all()))
+
+    return {
+        "total": await count(),
+        "by_status": {status.value: await count(status) for status in STATUSES}
+    }
+
+
+async def random_step(task_ids: list[int]):
+    """通过存储层或写后日志执行一次随机变更"""
+    action = random.random()
+    async with async_session_maker() as session:
+        if action < 0.1:
+            task = await TaskStore.create(session, TaskCreate(
+                config_id=1,
+                program_uuid="bench",
+                target_time=datetime.now() + timedelta(days=1)
+            ))
+            await session.commit()
+            task_ids.append(task.id)
+        elif action < 0.2:
+            await TaskStore.delete_by_id(session, task_ids.pop(random.randrange(len(task_ids))))
+            await session.commit()
+        elif action < 0.3:
+            # 回滚的变更不应影响计数
+            await TaskStore.update_status(session, random.choice(task_ids), random.choice(STATUSES))
+            await session.rollback()
+        elif action < 0.6:
+            await TaskStore.update_status(session, random.choice(task_ids), random.choice(STATUSES))
+            await session.commit()
+        else:
+            task_journal.update_status(random.choice(task_ids), random.choice(STATUSES))
+            await task_journal.flush()
+
+
+async def main():
+    logger.remove()
+    await init_db()
+    populate(DB_PATH, *test_data())
+    print(f"任务数: {TASKS}")
+
+    async with async_session_maker() as session:
+        start = time.perf_counter()
+        expected = await legacy_summary(session)
+        print(f"原实现（7 次全量加载）     {(time.perf_counter() - start) * 1000:9.2f} ms")
+
+        start = time.perf_counter()
+        summary = await task_stats.summary(session)
+        print(f"GROUP BY 首次加载          {(time.perf_counter() - start) * 1000:9.2f} ms")
+        assert summary == expected, (summary, expected)
+
+        start = time.perf_counter()
+        for _ in range(1000):
+            await task_stats.summary(session)
+        print(f"计数器读取（均值）         {(time.perf_counter() - start):9.4f} ms")
+
+        task_ids = list((await session.execute(select(TaskDB.id))).scalars().all())
+
+    task_journal.start()
+    for _ in range(STEPS):
+        await random_step(task_ids)
+        async with async_session_maker() as session:
+            slow = await task_stats.count_by_status(session)
+            summary = await task_stats.summary(session)
+        assert summary["by_status"] == {status.value: slow[status.value] for status in STATUSES}
+        assert summary["total"] == sum(slow.values())
+    await task_journal.stop()
+    print(f"{STEPS} 次随机变更后计数器与慢路径一致")
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
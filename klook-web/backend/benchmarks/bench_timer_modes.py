@@ -0,0 +1,95 @@
+"""定时器触发误差基准：sleep 与 hybrid 模式
+
+按执行器的方式触发（调度器在 wake_deadline 唤醒，再由 fire_at_deadline 完成最后阶段），
+事件循环上同时运行模拟 API 请求的负载协程。另附原实现（每任务一个轮询协程）作参考。
+
+运行: cd klook-web/backend && python -m benchmarks.bench_timer_modes [触发次数]
+"""
+import asyncio
+import os
+import statistics
+import sys
+import time
+from datetime import datetime
+from functools import partial
+
+os.environ.setdefault("DEBUG", "false")
+
+from loguru import logger  # noqa: E402
+
+from app.core.config import settings  # noqa: E402
+from app.core.scheduler import DeadlineScheduler  # noqa: E402
+from app.core.timer import PrecisionTimer, TimerMode  # noqa: E402
+from benchmarks._common import legacy_countdown  # noqa: E402
+
+FIRINGS = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+SPACING = 0.03  # 相邻触发间隔（秒），大于保护窗口避免互相干扰
+
+
+async def background_load(stop: asyncio.Event):
+    """模拟 API 负载：频繁的短 CPU 片段"""
+    while not stop.is_set():
+        end = time.perf_counter() + 0.0003
+        while time.perf_counter() < end:
+            pass
+        await asyncio.sleep(0.001)
+
+
+def make_timer(target: float, mode: TimerMode) -> PrecisionTimer:
+    return PrecisionTimer(
+        datetime.fromtimestamp(target),
+        network_compensation=0,
+        mode=mode,
+        guard_window_ms=settings.timer_guard_window_ms,
+        spin_window_ms=settings.timer_spin_window_ms
+    )
+
+
+async def run_scheduled(mode: TimerMode) -> list[int]:
+    scheduler = DeadlineScheduler()
+    errors: list[int] = []
+    done = asyncio.Event()
+
+    async def fire(timer: PrecisionTimer):
+        errors.append(await timer.fire_at_deadline())
+        if len(errors) == FIRINGS:
+            done.set()
+
+    start = time.time() + 0.5
+    for i in range(FIRINGS):
+        timer = make_timer(start + i * SPACING, mode)
+        scheduler.schedule(i, timer.wake_deadline, partial(fire, timer))
+    await done.wait()
+    await scheduler.stop()
+    return errors
+
+
+async def run_legacy_countdown() -> list[int]:
+    start = time.time() + 0.5
+    timers = [make_timer(start + i * SPACING, TimerMode.SLEEP) for i in range(FIRINGS)]
+    return list(await asyncio.gather(*(legacy_countdown(timer) for timer in timers)))
+
+
+async def measure(label: str, runner):
+    stop = asyncio.Event()
+    loads = [asyncio.create_task(background_load(stop)) for _ in range(3)]
+    errors = sorted(await runner())
+    stop.set()
+    await asyncio.gather(*loads)
+
+    us = [e / 1000 for e in errors]
+    p99 = us[max(int(len(us) * 0.99) - 1, 0)]
+    print(f"{label:<18} 触发误差 p50 {statistics.median(us):9.1f} µs  p99 {p99:9.1f} µs  max {us[-1]:9.1f} µs"
+          f"  min {us[0]:8.1f} µs")
+
+
+def main():
+    logger.remove()
+    print(f"触发次数: {FIRINGS}, 保护窗口 {settings.timer_guard_window_ms}ms, 自旋窗口 {settings.timer_spin_window_ms}ms")
+    asyncio.run(measure("countdown（原实现）", run_legacy_countdown))
+    asyncio.run(measure("sleep", partial(run_scheduled, TimerMode.SLEEP)))
+    asyncio.run(measure("hybrid", partial(run_scheduled, TimerMode.HYBRID)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""重启恢复基准：10k 个已登记任务的恢复耗时（time-to-armed）
+
+模拟服务在大量任务倒计时期间重启：
+- 数据库中预置 N 个 countdown 状态的未来任务、若干目标时间已过的任务，
+  以及一个目标时间在重启后几秒的任务
+- 执行 main.py 的 lifespan 启动流程（建表 / 补建索引 / 启动执行器 / 恢复触发计划），
+  测量从启动到全部任务登记完成的耗时
+- 等待临近任务触发，确认重启后仍按时触发（触发误差取自任务结果）
+
+运行: cd klook-web/backend && python -m benchmarks.bench_warm_restart [任务数]
+"""
+import asyncio
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from benchmarks._common import free_port
+
+DB_PATH = os.path.join(tempfile.mkdtemp(prefix="klook-bench-"), "bench.db")
+os.environ.setdefault("DATABASE_URL", f"sqlite+aiosqlite:///{DB_PATH}")
+os.environ.setdefault("DEBUG", "false")
+
+# 抢购请求发往本地未监听的端口，立即失败
+os.environ.setdefault("KLOOK_BASE_URL", f"http://127.0.0.1:{free_port()}")
+
+from loguru import logger  # noqa: E402
+from sqlalchemy import create_engine  # noqa: E402
+
+from main import app, lifespan  # noqa: E402
+from app.services.task_executor import task_executor  # noqa: E402
+from app.storage.database import Base  # noqa: E402
+
+TASKS = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+PAST_TASKS = 100
+FIRE_AFTER = 3.0  # 临近任务在重启开始后多少秒触发
+
+
+def seed() -> int:
+    """预置任务，返回临近任务的 ID"""
+    sync_engine = create_engine(f"sqlite:///{DB_PATH}")
+    Base.metadata.create_all(sync_engine)
+    sync_engine.dispose()
+
+    now = datetime.now()
+    with sqlite3.connect(DB_PATH) as conn:
+        conn.execute(
+            "INSERT INTO configs (id, name, headers, created_at, updated_at) VALUES (1, 'bench', ?, ?, ?)",
+            (json.dumps({"token": "bench"}), str(now), str(now))
+        )
+        columns = "config_id, program_uuid, target_time, network_compensation, max_retries, retry_interval, status, created_at"
+        insert = f"INSERT INTO tasks ({columns}) VALUES (1, 'bench', ?, 0, 1, 0, ?, ?)"
+        conn.executemany(insert, (
+            (str(now + timedelta(hours=1, seconds=i)), "countdown", str(now)) for i in range(TASKS)
+        ))
+        conn.executemany(insert, (
+            (str(now - timedelta(minutes=1, seconds=i)), "countdown", str(now)) for i in range(PAST_TASKS)
+        ))
+        # 已完成的历史任务不应被查询到
+        conn.executemany(insert, (
+            (str(now - timedelta(days=1, seconds=i)), "completed", str(now)) for i in range(TASKS)
+        ))
+        cursor = conn.execute(insert, (str(now), "countdown", str(now)))
+        return cursor.lastrowid
+
+
+async def main():
+    soon_id = seed()
+    logger.remove()
+
+    # 临近任务的目标时间在重启开始后 FIRE_AFTER 秒
+    target_time = datetime.now() + timedelta(seconds=FIRE_AFTER)
+    with sqlite3.connect(DB_PATH) as conn:
+        conn.execute("UPDATE tasks SET target_time = ? WHERE id = ?", (str(target_time), soon_id))
+
+    started = time.perf_counter()
+    async with lifespan(app):
+        armed_after = time.perf_counter() - started
+        armed = len(task_executor.armed)
+
+        while soon_id in task_executor.armed:
+            await asyncio.sleep(0.05)
+        fired_after = time.perf_counter() - started
+
+    with sqlite3.connect(DB_PATH) as conn:
+        result = json.loads(conn.execute("SELECT result FROM tasks WHERE id = ?", (soon_id,)).fetchone()[0])
+        by_status = dict(conn.execute("SELECT status, COUNT(*) FROM tasks GROUP BY status").fetchall())
+        missed = conn.execute(
+            "SELECT COUNT(*) FROM tasks WHERE status = 'failed' AND json_extract(result, '$.missed')"
+        ).fetchone()[0]
+
+    print(f"已登记任务: {TASKS + 1} 个未来任务 + {PAST_TASKS} 个已过期任务 + {TASKS} 个历史任务")
+    print(f"启动到全部登记完成: {armed_after * 1000:.1f} ms（已登记 {armed} 个）")
+    print(f"标记错过: {missed} 个 | 状态分布: {by_status}")
+    print(f"临近任务在重启后 {fired_after:.3f} s 触发（目标 {FIRE_AFTER:.1f} s），"
+          f"触发误差 {result['firing_error_ns'] / 1e6:.3f} ms")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,214 @@
+"""WebSocket 广播基准：1000 个客户端，其中一部分读取缓慢
+
+对比两种连接管理器：
+- legacy: 原实现，逐个连接 await send_json，每个连接各自序列化
+- queued: 当前实现，单次序列化 + 每连接有界队列与写协程
+
+服务端是一个子进程中的最小 FastAPI 应用，端点与 /api/ws/tasks/{task_id} 一致。
+一次突发模拟执行器的推送：倒计时帧 + 携带较大响应体的重试消息 + 终态 success。
+本进程中的客户端连接后持续读取；慢客户端接收缓冲区很小，每条消息间隔读取。
+延迟为突发开始到客户端收到 success 的时间。
+
+运行: cd klook-web/backend && python -m benchmarks.bench_websocket_fanout [客户端数] [慢客户端数]
+"""
+import asyncio
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+from benchmarks._common import free_port
+
+CLIENTS = int(sys.argv[1]) if len(sys.argv) > 1 and sys.argv[1] != "--serve" else 1000
+SLOW = int(sys.argv[2]) if len(sys.argv) > 2 and sys.argv[1] != "--serve" else 50
+COUNTDOWN_FRAMES = 20
+RETRY_FRAMES = 5
+RETRY_PAYLOAD = 16 * 1024  # 重试消息携带的响应体大小（字节）
+SLOW_READ_DELAY = 0.05  # 慢客户端每条消息的读取间隔（秒）
+TASK_ID = 1
+
+
+# ---- 服务端（子进程） ----
+
+class LegacyConnectionManager:
+    """原实现：顺序 await 每个连接"""
+
+    def __init__(self):
+        self.active_connections = {}
+
+    async def connect(self, websocket, task_id: int):
+        await websocket.accept()
+        self.active_connections.setdefault(task_id, set()).add(websocket)
+
+    def disconnect(self, websocket, task_id: int):
+        connections = self.active_connections.get(task_id)
+        if connections is not None:
+            connections.discard(websocket)
+
+    async def send_message(self, task_id: int, message: dict):
+        disconnected = set()
+        for connection in self.active_connections.get(task_id, ()):
+            try:
+                await connection.send_json(message)
+            except Exception:
+                disconnected.add(connection)
+        for connection in disconnected:
+            self.disconnect(connection, task_id)
+
+    def get_connection_count(self, task_id: int) -> int:
+        return len(self.active_connections.get(task_id, ()))
+
+
+def build_app(mode: str):
+    from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+
+    from app.core.websocket_manager import ConnectionManager
+
+    manager = LegacyConnectionManager() if mode == "legacy" else ConnectionManager()
+    app = FastAPI()
+
+    @app.websocket("/ws/tasks/{task_id}")
+    async def websocket_endpoint(websocket: WebSocket, task_id: int):
+        await manager.connect(websocket, task_id)
+        try:
+            while True:
+                await websocket.receive_text()
+        except WebSocketDisconnect:
+            pass
+        finally:
+            manager.disconnect(websocket, task_id)
+
+    @app.get("/connections")
+    async def connections():
+        return {"count": manager.get_connection_count(TASK_ID)}
+
+    @app.post("/burst")
+    async def burst():
+        """模拟执行器一次任务的推送，返回调用方被阻塞的总时长"""
+        blocked = 0.0
+
+        async def send(message: dict):
+            nonlocal blocked
+            start = time.perf_counter()
+            await manager.send_message(TASK_ID, message)
+            blocked += time.perf_counter() - start
+
+        for i in range(COUNTDOWN_FRAMES):
+            await send({"type": "countdown", "task_id": TASK_ID, "remaining": (COUNTDOWN_FRAMES - i) / 10})
+        for i in range(RETRY_FRAMES):
+            await send({"type": "retry", "task_id": TASK_ID, "retry_count": i + 1, "result": {"body": "x" * RETRY_PAYLOAD}})
+        await send({"type": "success", "task_id": TASK_ID})
+        return {"blocked_ms": blocked * 1000}
+
+    return app
+
+
+def serve(mode: str, port: int):
+    import uvicorn
+    from loguru import logger
+
+    logger.remove()
+    uvicorn.run(build_app(mode), host="127.0.0.1", port=port, log_level="warning")
+
+
+# ---- 客户端（本进程） ----
+
+async def client(port: int, slow: bool, connected: asyncio.Event, done: list, results: list):
+    from websockets.asyncio.client import connect
+
+    sock = socket.socket()
+    if slow:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4096)
+    sock.connect(("127.0.0.1", port))
+    async with connect(f"ws://127.0.0.1:{port}/ws/tasks/{TASK_ID}", sock=sock, max_queue=1 if slow else 16,
+                       open_timeout=60, ping_interval=None) as websocket:
+        done[0] += 1
+        if done[0] == done[1]:
+            connected.set()
+        received = 0
+        async for raw in websocket:
+            received += 1
+            message = json.loads(raw)
+            if message["type"] == "success":
+                results.append((slow, time.time(), received))
+                return
+            if slow:
+                await asyncio.sleep(SLOW_READ_DELAY)
+
+
+async def run(mode: str) -> dict:
+    import httpx
+
+    port = free_port()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.bench_websocket_fanout", "--serve", mode, str(port)],
+        env=dict(os.environ, DEBUG="false"),
+    )
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=300) as http:
+            for _ in range(100):
+                try:
+                    await http.get("/connections")
+                    break
+                except httpx.TransportError:
+                    await asyncio.sleep(0.1)
+
+            connected = asyncio.Event()
+            done = [0, CLIENTS]
+            results = []
+            clients = []
+            for i in range(CLIENTS):
+                clients.append(asyncio.create_task(client(port, i < SLOW, connected, done, results)))
+                if i % 100 == 99:
+                    await asyncio.sleep(0.05)
+            await connected.wait()
+
+            burst_at = time.time()
+            started = time.perf_counter()
+            burst = (await http.post("/burst")).json()
+            burst_elapsed = time.perf_counter() - started
+
+            await asyncio.wait_for(asyncio.gather(*clients), 300)
+            total = time.perf_counter() - started
+    finally:
+        server.terminate()
+        server.wait()
+
+    # success 到达时刻，相对突发开始
+    fast = sorted((at - burst_at) * 1000 for slow, at, _ in results if not slow)
+    slow = sorted((at - burst_at) * 1000 for slow, at, _ in results if slow)
+    slow_received = [received for is_slow, _, received in results if is_slow]
+    return {
+        "blocked_ms": burst["blocked_ms"],
+        "burst_ms": burst_elapsed * 1000,
+        "fast": fast,
+        "slow": slow,
+        "slow_received": statistics.mean(slow_received) if slow_received else 0,
+        "total_ms": total * 1000,
+    }
+
+
+def report(mode: str, result: dict):
+    fast = result["fast"]
+    p99 = fast[max(int(len(fast) * 0.99) - 1, 0)]
+    print(f"{mode:<7} 推送方阻塞 {result['blocked_ms']:9.1f} ms | 快客户端 success 延迟 p50 {statistics.median(fast):8.1f} ms"
+          f"  p99 {p99:8.1f} ms  ({len(fast)} 个)"
+          f" | 慢客户端 success 延迟 p50 {statistics.median(result['slow']):8.1f} ms"
+          f"  收到 {result['slow_received']:.1f} 条/{COUNTDOWN_FRAMES + RETRY_FRAMES + 1}"
+          f" ({len(result['slow'])} 个) | 全部完成 {result['total_ms']:8.1f} ms")
+
+
+def main():
+    print(f"客户端: {CLIENTS}, 慢客户端: {SLOW}, 每次突发 {COUNTDOWN_FRAMES + RETRY_FRAMES + 1} 条消息")
+    for mode in ("legacy", "queued"):
+        report(mode, asyncio.run(run(mode)))
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["--serve"]:
+        serve(sys.argv[2], int(sys.argv[3]))
+    else:
+        main()
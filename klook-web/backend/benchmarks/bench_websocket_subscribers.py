@@ -0,0 +1,143 @@
+"""WebSocket 订阅者内存基准：每任务一个连接 vs 多路复用连接
+
+模拟若干浏览器标签页，每个标签页关注同一批任务：
+- per-task: 每个任务一个 /api/ws/tasks/{task_id} 连接（原方式）
+- multiplexed: 每个标签页一个 /api/ws 连接，订阅全部任务
+
+每种方式启动一个真实的 uvicorn 服务子进程，测量建立全部订阅前后服务进程的 RSS，
+并发布一条任务消息确认每个订阅者都能收到。
+
+运行: cd klook-web/backend && python -m benchmarks.bench_websocket_subscribers [标签页数] [每页任务数]
+"""
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+import httpx
+from websockets.asyncio.client import connect
+
+from benchmarks._common import free_port
+
+TABS = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+TASKS_PER_TAB = int(sys.argv[2]) if len(sys.argv) > 2 else 40
+
+
+def rss_bytes(pid: int) -> int:
+    with open(f"/proc/{pid}/status") as status:
+        for line in status:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) * 1024
+    raise RuntimeError("无法读取 RSS")
+
+
+async def wait_ready(client: httpx.AsyncClient):
+    for _ in range(100):
+        try:
+            if (await client.get("/api/health")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.1)
+    raise RuntimeError("服务启动超时")
+
+
+async def create_tasks(client: httpx.AsyncClient) -> list[int]:
+    config = (await client.post("/api/configs", json={"name": "bench", "headers": {"token": "bench"}})).json()
+    target_time = (datetime.now() + timedelta(hours=1)).isoformat()
+    task_ids = []
+    for _ in range(TASKS_PER_TAB):
+        task = (await client.post("/api/tasks", json={
+            "config_id": config["id"],
+            "program_uuid": "bench",
+            "target_time": target_time
+        })).json()
+        task_ids.append(task["id"])
+    return task_ids
+
+
+async def open_per_task(port: int, task_ids: list[int], sockets: list):
+    for _ in range(TABS):
+        for task_id in task_ids:
+            websocket = await connect(f"ws://127.0.0.1:{port}/api/ws/tasks/{task_id}", ping_interval=None)
+            assert json.loads(await websocket.recv())["type"] == "connected"
+            sockets.append(websocket)
+
+
+async def open_multiplexed(port: int, task_ids: list[int], sockets: list):
+    for _ in range(TABS):
+        websocket = await connect(f"ws://127.0.0.1:{port}/api/ws", ping_interval=None)
+        assert json.loads(await websocket.recv())["type"] == "connected"
+        await websocket.send(json.dumps({"type": "subscribe", "task_ids": task_ids}))
+        reply = json.loads(await websocket.recv())
+        assert reply["type"] == "subscribed" and len(reply["task_ids"]) == len(task_ids)
+        sockets.append(websocket)
+
+
+async def count_deliveries(sockets: list, task_id: int) -> int:
+    """统计收到指定任务 task_started 消息的订阅数"""
+
+    async def drain(websocket) -> int:
+        received = 0
+        try:
+            while True:
+                message = json.loads(await asyncio.wait_for(websocket.recv(), 2))
+                if message.get("type") == "task_started" and message.get("task_id") == task_id:
+                    received += 1
+        except asyncio.TimeoutError:
+            return received
+
+    return sum(await asyncio.gather(*(drain(websocket) for websocket in sockets)))
+
+
+async def run(mode: str) -> dict:
+    port = free_port()
+    db_path = os.path.join(tempfile.mkdtemp(prefix="klook-bench-"), "bench.db")
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        env=dict(os.environ, DATABASE_URL=f"sqlite+aiosqlite:///{db_path}", DEBUG="false"),
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    sockets = []
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=60) as client:
+            await wait_ready(client)
+            task_ids = await create_tasks(client)
+
+            # 预热一个连接，排除首次导入 / 初始化的内存
+            warmup = []
+            await (open_per_task if mode == "per-task" else open_multiplexed)(port, task_ids[:1], warmup)
+            await warmup[0].close()
+            await asyncio.sleep(0.5)
+
+            before = rss_bytes(server.pid)
+            await (open_per_task if mode == "per-task" else open_multiplexed)(port, task_ids, sockets)
+            await asyncio.sleep(0.5)
+            after = rss_bytes(server.pid)
+
+            await client.post(f"/api/tasks/{task_ids[0]}/start")
+            delivered = await count_deliveries(sockets, task_ids[0])
+    finally:
+        for websocket in sockets:
+            await websocket.close()
+        server.terminate()
+        server.wait()
+
+    return {"sockets": len(sockets), "rss": after - before, "delivered": delivered}
+
+
+def main():
+    subscriptions = TABS * TASKS_PER_TAB
+    print(f"标签页: {TABS}, 每页任务: {TASKS_PER_TAB}, 订阅总数: {subscriptions}")
+    for mode in ("per-task", "multiplexed"):
+        result = asyncio.run(run(mode))
+        print(f"{mode:<12} 连接 {result['sockets']:5d} | 服务端 RSS 增长 {result['rss'] / 1024 / 1024:7.2f} MiB"
+              f" ({result['rss'] / subscriptions:7.0f} B/订阅) | 收到任务消息的标签页 {result['delivered']}/{TABS}")
+
+
+if __name__ == "__main__":
+    main()
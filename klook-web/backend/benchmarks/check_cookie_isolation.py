@@ -0,0 +1,65 @@
+"""共享 Klook 客户端的 Cookie 隔离检查
+
+所有配置共享同一个 httpx.AsyncClient（klook_clients 注册表），配置验证、网络校准和抢购都走它。
+替身传输（httpx.MockTransport）对每个响应都返回 Set-Cookie，依次用两个配置的请求头
+获取用户信息和兑换，检查：
+- 每个请求携带的 Cookie 恰好是该配置请求头里的 Cookie
+- 客户端本身没有保存任何 Cookie
+
+不通过时以非零状态退出。
+
+运行: cd klook-web/backend && python -m benchmarks.check_cookie_isolation
+"""
+import asyncio
+import os
+import sys
+
+os.environ.setdefault("DEBUG", "false")
+
+import httpx  # noqa: E402
+from loguru import logger  # noqa: E402
+
+from app.core.klook_client import KlookClient  # noqa: E402
+
+BASE_URL = "https://klook.test"
+CONFIGS = {
+    "account-a": {"Cookie": "klk_session=aaaa; klk_currency=CNY", "Authorization": "Bearer a"},
+    "account-b": {"Cookie": "klk_session=bbbb", "Authorization": "Bearer b"},
+    "no-cookie": {"Authorization": "Bearer c"}
+}
+
+
+def handler(seen: list[tuple[str, str]]):
+    def handle(request: httpx.Request) -> httpx.Response:
+        account = request.headers["authorization"].removeprefix("Bearer ")
+        seen.append((account, request.headers.get("cookie", "")))
+        # 模拟 Klook 轮换会话：每个响应都下发带账号标识的 Cookie
+        headers = [
+            ("Set-Cookie", f"klk_session=rotated-{account}; Path=/; Domain=klook.test"),
+            ("Set-Cookie", f"klk_ga=ga-{account}; Path=/")
+        ]
+        return httpx.Response(200, headers=headers, json={"success": True, "result": {"user_id": account}})
+    return handle
+
+
+async def main() -> int:
+    logger.remove()
+    seen: list[tuple[str, str]] = []
+    client = KlookClient(BASE_URL, transport=httpx.MockTransport(handler(seen)))
+    for _ in range(2):
+        for headers in CONFIGS.values():
+            await client.get_user_profile(headers)
+            await client.redeem(client.prepare_redeem("check", headers))
+    stored = list(client.client.cookies.jar)
+    await client.close()
+
+    expected = {headers["Authorization"].removeprefix("Bearer "): headers.get("Cookie", "") for headers in CONFIGS.values()}
+    leaked = [(account, cookie) for account, cookie in seen if cookie != expected[account]]
+    print(f"请求 {len(seen)} 次，Cookie 与配置不符 {len(leaked)} 次，客户端保存的 Cookie {len(stored)} 个")
+    for account, cookie in leaked:
+        print(f"  {account}: {cookie}")
+    return 1 if leaked or stored else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
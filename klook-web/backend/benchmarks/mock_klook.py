@@ -0,0 +1,196 @@
+"""本地 Klook 替身服务
+
+提供 manual_redeem 和 get_simple_profile_by_token 两个接口，以及 HEAD /（预热 / 校准采样），
+可注入网络延迟与抖动（前置延迟代理）、服务器时钟偏移（Date 头）和按请求编排的响应脚本。
+
+响应脚本是逗号分隔的结果序列，按同一 program_uuid 的请求顺序依次使用，最后一项重复：
+- ok: 兑换成功
+- fail: HTTP 200，success=false（已抢完）
+- http<code>: 返回指定 HTTP 状态码，如 http500、http429
+每项可带 @<毫秒> 表示服务端额外处理耗时，如 "fail@30,fail,ok"。
+
+命令行: python -m benchmarks.mock_klook --port 9000 --delay-ms 20 --jitter-ms 5 --script "fail,ok"
+在基准中通过 MockKlook 以子进程启动。
+"""
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import time
+from email.utils import formatdate
+from typing import Optional
+
+from benchmarks._common import free_port
+
+REDEEM_PATH = "/v2/promosrv/program/manual_redeem"
+PROFILE_PATH = "/v3/userserv/user/profile_service/get_simple_profile_by_token"
+
+
+def parse_script(script: str) -> list[tuple[str, float]]:
+    """解析响应脚本为 [(结果, 额外耗时秒)]"""
+    steps = []
+    for token in script.split(","):
+        outcome, _, extra_ms = token.strip().partition("@")
+        if outcome not in ("ok", "fail") and not (outcome.startswith("http") and outcome[4:].isdigit()):
+            raise ValueError(f"无效的脚本项: {token}")
+        steps.append((outcome, float(extra_ms) / 1000 if extra_ms else 0.0))
+    return steps
+
+
+def build_app(script: str, skew: float = 0.0):
+    from fastapi import FastAPI, Request, Response
+
+    app = FastAPI()
+    steps = parse_script(script)
+    # 每个 program_uuid 的请求计数及到达时刻（服务器时钟）
+    counters: dict[str, int] = {}
+    arrivals: dict[str, list[float]] = {}
+
+    def server_now() -> float:
+        return time.time() + skew
+
+    def date_header() -> dict:
+        return {"Date": formatdate(server_now(), usegmt=True)}
+
+    def json_response(body: str, status_code: int = 200) -> Response:
+        return Response(content=body, status_code=status_code, media_type="application/json", headers=date_header())
+
+    @app.head("/")
+    async def root():
+        return Response(headers=date_header())
+
+    @app.post(REDEEM_PATH)
+    async def manual_redeem(request: Request):
+        program_uuid = (await request.json()).get("program_uuid", "")
+        arrivals.setdefault(program_uuid, []).append(server_now())
+        index = counters.get(program_uuid, 0)
+        counters[program_uuid] = index + 1
+
+        outcome, extra = steps[min(index, len(steps) - 1)]
+        if extra:
+            await asyncio.sleep(extra)
+        if outcome == "ok":
+            return json_response('{"success":true,"result":{"redeem_id":"mock"}}')
+        if outcome == "fail":
+            return json_response('{"success":false,"error":{"code":"sold_out","message":"已抢完"}}')
+        return json_response('{"success":false}', status_code=int(outcome[4:]))
+
+    @app.get(PROFILE_PATH)
+    async def get_profile():
+        return json_response('{"success":true,"result":{"user_id":1,"mobile":"","email":"mock@example.com"}}')
+
+    @app.get("/_mock/arrivals")
+    async def get_arrivals(program_uuid: str):
+        return arrivals.get(program_uuid, [])
+
+    return app
+
+
+async def serve(port: int, script: str, delay_ms: float, jitter_ms: float, skew: float, cert_dir: Optional[str]):
+    import uvicorn
+
+    from benchmarks.netem import start_delay_proxy
+
+    upstream_port = free_port()
+    ssl_options = {}
+    if cert_dir:
+        ssl_options = {
+            "ssl_keyfile": os.path.join(cert_dir, "key.pem"),
+            "ssl_certfile": os.path.join(cert_dir, "cert.pem")
+        }
+    server = uvicorn.Server(uvicorn.Config(
+        build_app(script, skew),
+        host="127.0.0.1",
+        port=upstream_port,
+        log_level="warning",
+        date_header=False,
+        **ssl_options
+    ))
+    proxy = await start_delay_proxy(port, upstream_port, delay_ms / 1000, jitter_ms / 1000)
+    async with proxy:
+        await server.serve()
+
+
+def create_certificate(cert_dir: str):
+    """用 openssl 生成 localhost 的自签名证书（cert.pem / key.pem）"""
+    subprocess.run(
+        [
+            "openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+            "-keyout", os.path.join(cert_dir, "key.pem"),
+            "-out", os.path.join(cert_dir, "cert.pem"),
+            "-subj", "/CN=localhost",
+            "-addext", "subjectAltName=DNS:localhost,IP:127.0.0.1"
+        ],
+        check=True,
+        capture_output=True
+    )
+
+
+class MockKlook:
+    """以子进程运行替身服务（with 语句内有效）"""
+
+    def __init__(
+            self,
+            script: str = "ok",
+            delay_ms: float = 0,
+            jitter_ms: float = 0,
+            skew: float = 0.0,
+            cert_dir: Optional[str] = None
+    ):
+        parse_script(script)
+        self.port = free_port()
+        self.args = [
+            "--port", str(self.port), "--script", script,
+            "--delay-ms", str(delay_ms), "--jitter-ms", str(jitter_ms), "--skew", str(skew)
+        ]
+        if cert_dir:
+            self.args += ["--cert-dir", cert_dir]
+        self.scheme = "https" if cert_dir else "http"
+        self._process: Optional[subprocess.Popen] = None
+
+    @property
+    def base_url(self) -> str:
+        host = "localhost" if self.scheme == "https" else "127.0.0.1"
+        return f"{self.scheme}://{host}:{self.port}"
+
+    def __enter__(self) -> "MockKlook":
+        self._process = subprocess.Popen([sys.executable, "-m", "benchmarks.mock_klook", *self.args])
+        for _ in range(100):
+            try:
+                socket.create_connection(("127.0.0.1", self.port), timeout=0.1).close()
+                break
+            except OSError:
+                time.sleep(0.1)
+        # 代理先于上游就绪，再等上游启动
+        time.sleep(0.5)
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self._process.terminate()
+        self._process.wait()
+
+    async def arrivals(self, program_uuid: str) -> list[float]:
+        """替身服务记录的兑换请求到达时刻（服务器时钟）"""
+        import httpx
+
+        async with httpx.AsyncClient(base_url=self.base_url, verify=False) as client:
+            response = await client.get("/_mock/arrivals", params={"program_uuid": program_uuid})
+            return response.json()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本地 Klook 替身服务")
+    parser.add_argument("--port", type=int, required=True)
+    parser.add_argument("--script", default="ok", help="响应脚本，如 fail,fail,ok")
+    parser.add_argument("--delay-ms", type=float, default=0, help="单程网络延迟（毫秒）")
+    parser.add_argument("--jitter-ms", type=float, default=0, help="单程延迟抖动上限（毫秒）")
+    parser.add_argument("--skew", type=float, default=0.0, help="服务器时钟偏移（秒）")
+    parser.add_argument("--cert-dir", default=None, help="包含 cert.pem / key.pem 的目录，启用 HTTPS")
+    args = parser.parse_args()
+    asyncio.run(serve(args.port, args.script, args.delay_ms, args.jitter_ms, args.skew, args.cert_dir))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""基准共用的网络模拟：按固定单程延迟（可加抖动）转发 TCP 数据的本地代理"""
+import asyncio
+import random
+
+
+async def delay_pipe(reader: asyncio.StreamReader, writer: asyncio.StreamWriter, delay: float, jitter: float = 0.0):
+    """按单程延迟转发数据，抖动为 [0, jitter) 秒的均匀分布，保持顺序"""
+    loop = asyncio.get_running_loop()
+    chunks: asyncio.Queue = asyncio.Queue()
+
+    async def pump():
+        last_deliver_at = 0.0
+        while True:
+            data = await reader.read(65536)
+            # 同一方向的数据不乱序
+            last_deliver_at = max(last_deliver_at, loop.time() + delay + random.uniform(0, jitter))
+            chunks.put_nowait((last_deliver_at, data))
+            if not data:
+                return
+
+    async def drain():
+        while True:
+            deliver_at, data = await chunks.get()
+            await asyncio.sleep(max(0.0, deliver_at - loop.time()))
+            if not data:
+                writer.close()
+                return
+            writer.write(data)
+            await writer.drain()
+
+    try:
+        await asyncio.gather(pump(), drain())
+    except (ConnectionError, asyncio.IncompleteReadError):
+        writer.close()
+
+
+async def start_delay_proxy(port: int, upstream_port: int, delay: float, jitter: float = 0.0) -> asyncio.Server:
+    """在 port 上启动代理，双向各加 delay 秒单程延迟后转发到 upstream_port"""
+
+    async def handle(client_reader, client_writer):
+        try:
+            upstream_reader, upstream_writer = await asyncio.open_connection("127.0.0.1", upstream_port)
+            await asyncio.gather(
+                delay_pipe(client_reader, upstream_writer, delay, jitter),
+                delay_pipe(upstream_reader, client_writer, delay, jitter)
+            )
+        except (ConnectionError, asyncio.CancelledError):
+            client_writer.close()
+
+    return await asyncio.start_server(handle, "127.0.0.1", port)
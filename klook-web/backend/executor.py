@@ -0,0 +1,96 @@
+"""独立执行器进程入口
+
+拆分部署时由本进程持有执行器租约、登记和触发任务、执行日志归档，
+API 工作进程（EXECUTOR_MODE=api uvicorn main:app --workers N）经 Unix 套接字调用本进程。
+
+同时启动多个执行器进程时只有一个获得租约，其余作为备用进程等待接管；
+持有者失去租约时停止触发并退出（退出码 1），由进程管理器重启为备用进程。
+
+运行: cd klook-web/backend && python executor.py
+"""
+import asyncio
+import os
+import signal
+import sys
+
+# 在导入应用模块前确定部署方式（全局执行器实例按此创建）
+os.environ["EXECUTOR_MODE"] = "executor"
+
+from loguru import logger  # noqa: E402
+
+from app.core.config import settings  # noqa: E402
+from app.core.logging_config import setup_logging, shutdown_logging  # noqa: E402
+
+
+async def main() -> int:
+    from app.core.klook_client import klook_clients
+    from app.core.metrics import metrics
+    from app.services.executor_ipc import ExecutorServer
+    from app.services.firing_runtime import set_fence
+    from app.services.log_retention import log_retention
+    from app.services.task_executor import task_executor
+    from app.storage.database import close_db, init_db
+    from app.storage.executor_lease import ExecutorLease
+    from app.storage.task_journal import task_journal
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, stop.set)
+
+    await init_db()
+    task_journal.start()
+    metrics.start()
+
+    lease = ExecutorLease()
+    acquiring = asyncio.create_task(lease.acquire())
+    await asyncio.wait([acquiring, asyncio.create_task(stop.wait())], return_when=asyncio.FIRST_COMPLETED)
+    if not acquiring.done():
+        # 作为备用进程等待期间收到退出信号
+        acquiring.cancel()
+        await metrics.stop()
+        await task_journal.stop()
+        await close_db()
+        return 0
+
+    # 触发前检查本地租约有效期，续约失败后不会再发出抢购请求
+    set_fence(lease.valid)
+    lost = asyncio.Event()
+    keeper = asyncio.create_task(lease.keep(lost))
+
+    task_executor.start()
+    await task_executor.restore()
+    server = ExecutorServer(task_executor, lease)
+    await server.start()
+    log_retention.start(task_executor.quiet_for)
+    logger.info(f"🚀 {settings.app_name} 执行器进程启动成功（pid={os.getpid()}）")
+
+    lost_wait = asyncio.create_task(lost.wait())
+    stop_wait = asyncio.create_task(stop.wait())
+    await asyncio.wait([lost_wait, stop_wait], return_when=asyncio.FIRST_COMPLETED)
+    lost_wait.cancel()
+    stop_wait.cancel()
+    if lost.is_set():
+        logger.error("执行器租约已丢失，停止触发并退出")
+
+    # 关闭顺序与 API 进程一致：先停止 IPC 和触发，最后刷新写后日志
+    keeper.cancel()
+    await server.stop()
+    await log_retention.stop()
+    await task_executor.stop()
+    await metrics.stop()
+    await klook_clients.close()
+    await task_journal.stop()
+    if not lost.is_set():
+        # 正常退出时释放租约，备用进程无需等待到期
+        await lease.release()
+    await close_db()
+    logger.info(f"👋 {settings.app_name} 执行器进程关闭")
+    return 1 if lost.is_set() else 0
+
+
+if __name__ == "__main__":
+    setup_logging()
+    code = asyncio.run(main())
+    shutdown_logging()
+    sys.exit(code)
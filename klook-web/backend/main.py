@@ -6,24 +6,54 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from loguru import logger
 
-from app.api import health, config, task, program, websocket, log
+from app.api import health, config, task, program, websocket, log, calibration, metrics
 from app.core.config import settings
+from app.core.logging_config import setup_logging
+
+# 日志经队列由后台线程写出（每个工作进程各自配置，进程退出时写完队列）
+setup_logging()
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """应用生命周期管理"""
     # 启动时执行
-    from app.storage.database import init_db
+    from app.core.klook_client import klook_clients
+    from app.core.metrics import metrics
+    from app.services.health_monitor import health_monitor
+    from app.services.log_retention import log_retention
+    from app.services.stats_publisher import stats_publisher
+    from app.services.task_executor import task_executor
+    from app.storage.database import init_db, close_db
+    from app.storage.task_journal import task_journal
     await init_db()
     logger.info("✅ 数据库初始化完成")
+    task_journal.start()
+    metrics.start()
+    task_executor.start()
+    # 恢复重启前已登记的触发计划
+    await task_executor.restore()
+    # 日志归档只在没有任务临近触发时执行（拆分部署时由执行器进程负责），SQLite 探测同样在预热和触发期间暂停
+    if settings.executor_mode != "api":
+        log_retention.start(task_executor.quiet_for)
+        health_monitor.start(task_executor.quiet_for)
+    else:
+        health_monitor.start()
     logger.info(f"🚀 {settings.app_name} v{settings.version} 启动成功")
     logger.info(f"📍 服务地址: http://{settings.host}:{settings.port}")
     logger.info(f"📚 API 文档: http://{settings.host}:{settings.port}/docs")
 
     yield
 
-    # 关闭时执行
+    # 关闭时执行：停止日志归档和触发运行时，关闭 Klook 连接池，刷新写后日志，保证日志和状态不丢失
+    await log_retention.stop()
+    await health_monitor.stop()
+    await task_executor.stop()
+    await stats_publisher.stop()
+    await metrics.stop()
+    await klook_clients.close()
+    await task_journal.stop()
+    await close_db()
     logger.info(f"👋 {settings.app_name} 关闭")
 
 
@@ -51,6 +81,8 @@ app.include_router(program.router, prefix="/api", tags=["优惠券项目"])
 app.include_router(task.router, prefix="/api", tags=["任务管理"])
 app.include_router(log.router, prefix="/api", tags=["日志管理"])
 app.include_router(websocket.router, prefix="/api", tags=["WebSocket"])
+app.include_router(calibration.router, prefix="/api", tags=["网络补偿校准"])
+app.include_router(metrics.router, prefix="/api", tags=["运行指标"])
 
 if __name__ == "__main__":
     uvicorn.run(
@@ -0,0 +1,87 @@
+"""测试公共夹具
+
+应用在导入时读取配置并创建数据库引擎，因此先把环境变量指向临时目录中的 SQLite 数据库，
+再导入 app。Klook 接口指向本地关闭的端口（请求立即失败），触发前不预热、不校准。
+
+运行: cd klook-web/backend && python -m pytest
+"""
+import os
+import tempfile
+
+from benchmarks._common import free_port
+
+WORK_DIR = tempfile.mkdtemp(prefix="klook-test-")
+os.environ.update({
+    "DATABASE_URL": f"sqlite+aiosqlite:///{os.path.join(WORK_DIR, 'test.db')}",
+    "DEBUG": "false",
+    "EXECUTOR_MODE": "embedded",
+    "KLOOK_BASE_URL": f"http://127.0.0.1:{free_port()}",
+    "KLOOK_PREWARM_LEAD": "0",
+    "CALIBRATION_ENABLED": "false",
+    "LOG_RETENTION_ENABLED": "false",
+    "LOG_ARCHIVE_DIR": os.path.join(WORK_DIR, "log-archive"),
+})
+
+import pytest  # noqa: E402
+from loguru import logger  # noqa: E402
+
+from app.core.config import settings  # noqa: E402
+from app.models.config import ConfigCreate  # noqa: E402
+from app.services.task_executor import task_executor  # noqa: E402
+from app.storage.config_store import ConfigStore  # noqa: E402
+from app.storage.database import Base, async_session_maker, close_db, engine, init_db  # noqa: E402
+from app.storage.log_store import log_totals  # noqa: E402
+from app.storage.response_cache import response_cache  # noqa: E402
+from app.storage.task_journal import task_journal  # noqa: E402
+from app.storage.task_stats import task_stats  # noqa: E402
+
+
+@pytest.fixture(scope="session", autouse=True)
+async def database():
+    """建表；测试会话结束时释放连接池"""
+    logger.remove()
+    await init_db()
+    yield
+    await close_db()
+
+
+@pytest.fixture(autouse=True)
+async def clean_database():
+    """每个测试结束后清空所有表和进程内缓存"""
+    yield
+    async with engine.begin() as conn:
+        for table in reversed(Base.metadata.sorted_tables):
+            await conn.execute(table.delete())
+    task_stats.invalidate()
+    log_totals.clear()
+    response_cache.reset()
+
+
+@pytest.fixture
+async def journal():
+    """运行中的写后日志"""
+    task_journal.start()
+    yield task_journal
+    await task_journal.stop()
+
+
+@pytest.fixture
+async def executor(request, monkeypatch, journal):
+    """
+    运行中的执行器；结束时撤销全部触发计划
+
+    间接参数化时参数为触发运行时（local / thread），默认取 settings.firing_runtime
+    """
+    monkeypatch.setattr(settings, "firing_runtime", getattr(request, "param", settings.firing_runtime))
+    task_executor.start()
+    yield task_executor
+    await task_executor.stop()
+
+
+@pytest.fixture
+async def config_id() -> int:
+    """一条 Klook 配置"""
+    async with async_session_maker() as db:
+        config = await ConfigStore.create(db, ConfigCreate(name="test", headers={"token": "test"}))
+        await db.commit()
+        return config.id
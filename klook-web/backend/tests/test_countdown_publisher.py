@@ -0,0 +1,36 @@
+"""倒计时推送：触发窗口只暂停本任务，残留的倒计时不会让推送协程永久等待"""
+import asyncio
+import time
+
+from app.core.websocket_manager import websocket_manager
+from app.services import countdown_publisher as module
+from app.services.countdown_publisher import CountdownPublisher
+
+
+async def test_quiet_window_pauses_only_its_task(monkeypatch):
+    frames: list[int] = []
+
+    async def send_message(task_id: int, message: dict):
+        frames.append(task_id)
+
+    monkeypatch.setattr(websocket_manager, "wants", lambda task_id: True)
+    monkeypatch.setattr(websocket_manager, "send_message", send_message)
+    monkeypatch.setattr(module, "QUIET_GUARD", 0.1)
+    publisher = CountdownPublisher(rate_hz=50)
+    try:
+        now = time.monotonic()
+        # 任务 1 已进入触发窗口，之后不再被移除（触发事件丢失）
+        publisher.track(1, now + 0.1, now)
+        publisher.track(2, now + 0.6, now + 0.5)
+        await asyncio.sleep(0.3)
+
+        # 任务 2 照常推送（临近目标时刻时按刷新率），任务 1 不推送，残留的任务 1 已丢弃
+        assert 1 not in frames
+        assert frames.count(2) >= 5
+        assert 1 not in publisher
+
+        # 之后任务 2 也进入触发窗口并残留：推送协程在超时后结束，而不是一直等待
+        await asyncio.wait_for(publisher._runner, 1.0)
+        assert 2 not in publisher
+    finally:
+        await publisher.stop()
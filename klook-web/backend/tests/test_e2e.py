@@ -0,0 +1,33 @@
+"""端到端：本地 Klook 替身服务 + 真实应用（HTTP API、执行器、写后日志、WebSocket）
+
+场景与 benchmarks/bench_e2e.py 相同：创建配置和任务 → 验证配置 → 订阅 /api/ws → 启动任务 → 等待结束。
+"""
+import pytest
+
+from app.core.config import settings
+from app.core.klook_client import klook_clients
+from benchmarks import bench_e2e
+
+ROUNDS = 2
+# 场景 -> 每轮的抢购尝试次数（按替身服务的响应脚本）
+ATTEMPTS = {"baseline": 1, "jitter": 3, "failures": 4}
+FIRING_ERROR_MS = 50.0
+
+
+@pytest.mark.parametrize("scenario", list(bench_e2e.SCENARIOS))
+async def test_scenario(monkeypatch, scenario):
+    for name, value in bench_e2e.SETTINGS.items():
+        monkeypatch.setattr(settings, name, value)
+    # 场景把 klook_base_url 指向替身服务；之前测试创建的客户端仍指向关闭的端口，先关闭
+    monkeypatch.setattr(settings, "klook_base_url", settings.klook_base_url)
+    await klook_clients.close()
+
+    report = await bench_e2e.run_scenario(scenario, ROUNDS)
+
+    for result in report["rounds"]:
+        assert result["status"] == "completed"
+        assert result["valid"] is True
+        assert result["attempts"] == ATTEMPTS[scenario]
+        assert abs(result["firing_error_ms"]) < FIRING_ERROR_MS
+        # 所有任务消息都经 WebSocket 送达订阅者
+        assert result["ws_publish_ms"]
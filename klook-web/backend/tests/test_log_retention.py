@@ -0,0 +1,67 @@
+"""清空日志：分块删除日志行和归档，块之间避开触发"""
+import os
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, insert, select
+
+from app.core.config import settings
+from app.models.log import LogLevel
+from app.models.task import TaskCreate
+from app.services import log_retention as module
+from app.services.log_retention import log_retention
+from app.storage.database import async_session_maker, read_session_maker
+from app.storage.log_archive import log_archive
+from app.storage.models import LogArchiveChunkDB, LogArchiveIndexDB, LogDB
+from app.storage.task_store import TaskStore
+
+CHUNK_SIZE = 100
+
+
+async def count(model) -> int:
+    async with read_session_maker() as db:
+        return (await db.execute(select(func.count()).select_from(model))).scalar_one()
+
+
+async def test_delete_all_in_chunks(monkeypatch, config_id):
+    monkeypatch.setattr(settings, "log_retention_chunk_size", CHUNK_SIZE)
+    monkeypatch.setattr(module, "QUIET_POLL", 0.01)
+    # 第一块之前有任务即将触发，之后每块之前都远离触发
+    quiet = [0.0]
+    monkeypatch.setattr(log_retention, "_quiet_for", lambda: quiet.pop() if quiet else 60.0)
+
+    async with async_session_maker() as db:
+        task = await TaskStore.create(db, TaskCreate(
+            config_id=config_id, program_uuid="test", target_time=datetime.now() + timedelta(hours=1)
+        ))
+        await db.execute(insert(LogDB), [
+            {
+                "task_id": task.id,
+                "level": LogLevel.INFO.value,
+                "message": f"log {i}",
+                "created_at": datetime(2026, 1, 1) + timedelta(seconds=i)
+            }
+            for i in range(3 * CHUNK_SIZE + 50)
+        ])
+        await db.commit()
+    # 最旧的两块先归档
+    for _ in range(2):
+        assert await log_retention._archive_chunk(CHUNK_SIZE, None) == CHUNK_SIZE
+    assert os.listdir(log_archive.directory)
+
+    # 每个事务删除一块：日志行 150 条分两块，归档块一个事务
+    deletes = []
+    delete_chunk = module.LogStore.delete_chunk
+
+    async def counted_delete_chunk(db, max_id, limit):
+        deletes.append(limit)
+        return await delete_chunk(db, max_id, limit)
+
+    monkeypatch.setattr(module.LogStore, "delete_chunk", staticmethod(counted_delete_chunk))
+    assert await log_retention.delete_all() == CHUNK_SIZE + 50
+    assert deletes == [CHUNK_SIZE, CHUNK_SIZE]
+    assert not quiet
+
+    assert await count(LogDB) == 0
+    assert await count(LogArchiveChunkDB) == 0
+    assert await count(LogArchiveIndexDB) == 0
+    assert not os.listdir(log_archive.directory)
@@ -0,0 +1,60 @@
+"""日志跟踪（SSE）续传：补齐与实时推送之间不重复、迟到的日志不改变续传位置"""
+import json
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert
+
+from app.api.log import _tail
+from app.core.log_tail import log_tail
+from app.models.log import LogLevel
+from app.models.task import TaskCreate
+from app.storage.database import async_session_maker
+from app.storage.models import LogDB
+from app.storage.task_store import TaskStore
+
+
+def log_row(task_id: int, log_id: int) -> dict:
+    return {
+        "id": log_id,
+        "task_id": task_id,
+        "level": LogLevel.INFO.value,
+        "message": f"log {log_id}",
+        "created_at": datetime(2026, 1, 1) + timedelta(seconds=log_id)
+    }
+
+
+def parse(text: str) -> list[tuple]:
+    """SSE 文本 → [(id 字段（没有时为 None）, 日志 ID)]"""
+    events = []
+    for block in text.strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.split("\n"))
+        events.append((int(fields["id"]) if "id" in fields else None, json.loads(fields["data"])["id"]))
+    return events
+
+
+async def test_resume_without_duplicates(config_id):
+    async with async_session_maker() as db:
+        task = await TaskStore.create(db, TaskCreate(
+            config_id=config_id, program_uuid="test", target_time=datetime.now() + timedelta(hours=1)
+        ))
+        await db.execute(insert(LogDB), [log_row(task.id, log_id) for log_id in range(1, 6)])
+        await db.commit()
+
+    # 本进程已按序分发到 5（当时没有订阅者）
+    log_tail.resync()
+    log_tail.publish([log_row(task.id, log_id) for log_id in range(1, 6)])
+
+    stream = _tail(None, None, 2)
+    try:
+        assert await anext(stream) == "retry: 1000\n\n"
+        # 续传：从数据库补齐 2 之后的日志
+        assert parse(await anext(stream)) == [(3, 3), (4, 4), (5, 5)]
+
+        # 3、4 作为迟到事件再次到达（补齐时已读到），1 是连接期间才提交的迟到日志，6 按序到达
+        log_tail.publish([log_row(task.id, 4), log_row(task.id, 1), log_row(task.id, 3)])
+        log_tail.publish([log_row(task.id, 6)])
+        # 迟到的 1 不带 id 字段：客户端的 Last-Event-ID 仍为 5，之后是 6
+        assert parse(await anext(stream)) == [(None, 1), (6, 6)]
+    finally:
+        await stream.aclose()
+        log_tail.resync()
@@ -0,0 +1,100 @@
+"""改期与取消在实际触发路径（执行器 + 触发运行时 + 调度器）上的响应延迟
+
+任务不预热（KLOOK_PREWARM_LEAD=0），运行时在触发窗口打开时接管，随后由 fire_at_deadline 等待到触发时刻；
+Klook 接口指向关闭的端口，抢购请求立即失败，只关心触发时刻。
+"""
+import asyncio
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import select
+
+from app.models.task import TaskCreate, TaskStatus
+from app.services.firing_runtime import window_opens_at
+from app.storage.database import async_session_maker, read_session_maker
+from app.storage.models import TaskDB
+from app.storage.task_store import TaskStore
+
+# 改期后的触发误差、取消到触发计划撤销的上限（毫秒）
+REACTION_MS = 50.0
+
+pytestmark = pytest.mark.parametrize("executor", ["local", "thread"], indirect=True)
+
+
+async def start_task(executor, config_id: int, seconds: float) -> int:
+    """创建并启动一个 seconds 秒后触发的任务"""
+    async with async_session_maker() as db:
+        task = await TaskStore.create(db, TaskCreate(
+            config_id=config_id,
+            program_uuid="test",
+            target_time=datetime.now() + timedelta(seconds=seconds),
+            network_compensation=0,
+            max_retries=1,
+            retry_interval=0
+        ))
+        await db.commit()
+        assert await executor.start_task(task.id, db)
+    return task.id
+
+
+async def wait_finished(executor, task_id: int, timeout: float):
+    """等待任务触发并结束抢购（离开 armed）"""
+    async def finished():
+        while executor.is_running(task_id):
+            await asyncio.sleep(0.005)
+    await asyncio.wait_for(finished(), timeout)
+
+
+async def task_status(task_id: int) -> str:
+    async with read_session_maker() as db:
+        return (await db.execute(select(TaskDB.status).where(TaskDB.id == task_id))).scalar_one()
+
+
+@pytest.mark.parametrize("seconds, new_seconds", [(60, 0.4), (0.3, 0.6)], ids=["earlier", "later"])
+async def test_reschedule_fires_at_new_time(executor, journal, config_id, seconds, new_seconds):
+    task_id = await start_task(executor, config_id, seconds)
+    spec = executor.armed[task_id]
+
+    started = time.perf_counter()
+    outcome = await executor.reschedule(task_id, {"target_time": datetime.now() + timedelta(seconds=new_seconds)})
+    assert outcome == "rescheduled"
+    assert (time.perf_counter() - started) * 1000 < REACTION_MS
+
+    await wait_finished(executor, task_id, new_seconds + 5)
+    # 仍按原时刻触发时误差为数百毫秒（提前）或数十秒（推迟后根本等不到）
+    firing_error_ms = spec.metrics["firing_error_ns"] / 1e6
+    assert abs(firing_error_ms) < REACTION_MS, f"改期后触发误差 {firing_error_ms:.3f} ms"
+
+    await journal.flush()
+    assert await task_status(task_id) == TaskStatus.FAILED.value
+
+
+async def test_reschedule_refused_once_window_opens(executor, config_id):
+    task_id = await start_task(executor, config_id, 0.3)
+    spec = executor.armed[task_id]
+    await asyncio.sleep(max(0.0, window_opens_at(spec.timer) - time.monotonic()) + 0.005)
+
+    assert await executor.reschedule(task_id, {"target_time": datetime.now() + timedelta(seconds=60)}) == "firing"
+    await wait_finished(executor, task_id, 5)
+    assert "firing_error_ns" in spec.metrics
+
+
+@pytest.mark.parametrize("lead", [0.3, 0.02], ids=["scheduled", "final-wait"])
+async def test_cancel_stops_firing(executor, journal, config_id, lead):
+    """触发前 lead 秒取消：调度器等待期间（窗口未打开），或运行时已接管、最后阶段等待期间"""
+    task_id = await start_task(executor, config_id, 0.5)
+    spec = executor.armed[task_id]
+    await asyncio.sleep(max(0.0, spec.timer.deadline - lead - time.monotonic()))
+    assert (time.monotonic() >= window_opens_at(spec.timer)) == (lead < 0.05)
+
+    started = time.perf_counter()
+    await executor.cancel_task(task_id)
+    assert (time.perf_counter() - started) * 1000 < REACTION_MS
+    assert not executor.is_running(task_id)
+
+    # 越过原触发时刻后仍未触发：没有触发误差，也没有写入执行中状态
+    await asyncio.sleep(lead + REACTION_MS / 1000)
+    assert "firing_error_ns" not in spec.metrics
+    await journal.flush()
+    assert await task_status(task_id) == TaskStatus.COUNTDOWN.value
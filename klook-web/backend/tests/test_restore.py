@@ -0,0 +1,73 @@
+"""重启恢复：1 万个已登记任务的 time-to-armed"""
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert, select
+
+from app.models.task import TaskStatus
+from app.storage.database import async_session_maker, read_session_maker
+from app.storage.models import TaskDB
+
+FUTURE_TASKS = 10_000
+PAST_TASKS = 100
+RUNNING_TASKS = 20
+# 恢复全部任务的耗时上限（秒）；本机约 0.5 秒，留出慢机器的余量
+ARMED_WITHIN = 5.0
+
+
+async def seed(config_id: int) -> tuple[set[int], set[int]]:
+    """预置任务，返回 (应恢复的任务 ID, 应标记错过的任务 ID)"""
+    now = datetime.now()
+
+    def rows(count: int, status: TaskStatus, offset: timedelta) -> list[dict]:
+        return [
+            {
+                "config_id": config_id,
+                "program_uuid": "test",
+                "target_time": now + offset + timedelta(seconds=i),
+                "network_compensation": 0,
+                "max_retries": 1,
+                "retry_interval": 0,
+                "status": status.value
+            }
+            for i in range(count)
+        ]
+
+    async with async_session_maker() as db:
+        async def insert_ids(values: list[dict]) -> set[int]:
+            result = await db.execute(insert(TaskDB).returning(TaskDB.id), values)
+            return set(result.scalars())
+
+        future = await insert_ids(rows(FUTURE_TASKS, TaskStatus.COUNTDOWN, timedelta(hours=1)))
+        missed = await insert_ids(rows(PAST_TASKS, TaskStatus.COUNTDOWN, -timedelta(hours=1)))
+        # 重启时正在抢购的任务，目标时间未到也按中断处理
+        missed |= await insert_ids(rows(RUNNING_TASKS, TaskStatus.RUNNING, timedelta(minutes=5)))
+        # 已结束和未启动的任务不受影响
+        await insert_ids(rows(FUTURE_TASKS, TaskStatus.COMPLETED, -timedelta(days=1)))
+        await insert_ids(rows(10, TaskStatus.PENDING, timedelta(hours=1)))
+        await db.commit()
+    return future, missed
+
+
+async def test_restore_arms_all_tasks(executor, journal, config_id):
+    future, missed = await seed(config_id)
+
+    started = time.perf_counter()
+    outcome = await executor.restore()
+    elapsed = time.perf_counter() - started
+
+    assert outcome == {"restored": len(future), "missed": len(missed)}
+    assert set(executor.armed) == future
+    assert elapsed < ARMED_WITHIN, f"恢复 {len(future)} 个任务耗时 {elapsed:.2f} 秒"
+
+    await journal.flush()
+    async with read_session_maker() as db:
+        result = await db.execute(select(TaskDB.id, TaskDB.status, TaskDB.result).where(TaskDB.id.in_(missed)))
+        rows = result.all()
+    assert len(rows) == len(missed)
+    for row in rows:
+        assert row.status == TaskStatus.FAILED.value
+        assert row.result["missed"] is True
+
+    # 再次恢复不会重复登记或重复标记
+    assert await executor.restore() == {"restored": 0, "missed": 0}
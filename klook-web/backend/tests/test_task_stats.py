@@ -0,0 +1,92 @@
+"""任务状态计数器与 GROUP BY 慢路径一致"""
+from datetime import datetime, timedelta
+
+from app.models.task import TaskCreate, TaskStatus
+from app.storage.database import async_session_maker, read_session_maker
+from app.storage.task_stats import task_stats
+from app.storage.task_store import TaskStore
+
+
+async def assert_matches_slow_path():
+    """计数器（O(1)）与单次 GROUP BY 查询的结果相同"""
+    async with read_session_maker() as db:
+        summary = await task_stats.summary(db)
+        counts = await task_stats.count_by_status(db)
+    assert summary == {
+        "total": sum(counts.values()),
+        "by_status": {status.value: counts[status.value] for status in TaskStatus}
+    }
+
+
+async def create_tasks(config_id: int, count: int) -> list[int]:
+    async with async_session_maker() as db:
+        tasks = [
+            await TaskStore.create(db, TaskCreate(
+                config_id=config_id,
+                program_uuid="test",
+                target_time=datetime.now() + timedelta(hours=1)
+            ))
+            for _ in range(count)
+        ]
+        await db.commit()
+    return [task.id for task in tasks]
+
+
+async def update_status(task_id: int, status: TaskStatus):
+    """接口路径：TaskStore 在事务中更新状态"""
+    async with async_session_maker() as db:
+        await TaskStore.update_status(db, task_id, status)
+        await db.commit()
+
+
+async def test_counters_follow_transitions(journal, config_id):
+    # 先加载计数，之后的变更都走增量维护
+    await assert_matches_slow_path()
+
+    started, cancelled, succeeded, failed, deleted = await create_tasks(config_id, 5)
+    await assert_matches_slow_path()
+
+    # 启动：执行器经写后日志写入倒计时状态
+    for task_id in (started, cancelled, succeeded, failed):
+        journal.update_status(task_id, TaskStatus.COUNTDOWN)
+    await journal.flush()
+    await assert_matches_slow_path()
+
+    # 取消：接口经 TaskStore 写入
+    await update_status(cancelled, TaskStatus.CANCELLED)
+    await assert_matches_slow_path()
+
+    # 触发、成功与失败：同一批次内同一任务的多次迁移
+    for task_id in (succeeded, failed):
+        journal.update_status(task_id, TaskStatus.RUNNING)
+    journal.update_status(succeeded, TaskStatus.COMPLETED, {"success": True})
+    journal.update_status(failed, TaskStatus.FAILED, {"success": False})
+    await journal.flush()
+    await assert_matches_slow_path()
+
+    # 重启时错过目标时间：倒计时直接标记失败
+    journal.update_status(started, TaskStatus.FAILED, {"success": False, "missed": True})
+    await journal.flush()
+    await assert_matches_slow_path()
+
+    # 已删除任务的状态变更被跳过，不计入
+    async with async_session_maker() as db:
+        assert await TaskStore.delete_by_id(db, deleted)
+        await db.commit()
+    journal.update_status(deleted, TaskStatus.COUNTDOWN)
+    await journal.flush()
+    await assert_matches_slow_path()
+
+
+async def test_negative_count_reloads(config_id):
+    await create_tasks(config_id, 3)
+    await assert_matches_slow_path()
+
+    # 漏记的迁移：计数器以为有一个已完成任务变回了等待中
+    task_stats.apply(TaskStatus.COMPLETED.value, TaskStatus.PENDING.value)
+    await assert_matches_slow_path()
+
+    async with read_session_maker() as db:
+        summary = await task_stats.summary(db)
+    assert summary["by_status"][TaskStatus.PENDING.value] == 3
+    assert summary["by_status"][TaskStatus.COMPLETED.value] == 0
@@ -0,0 +1,56 @@
+"""WebSocket 发送队列的积压策略"""
+import asyncio
+import json
+
+from app.core.websocket_manager import ClientConnection, Frame
+
+
+class StalledWebSocket:
+    """写入一直阻塞到 release() 的客户端"""
+
+    def __init__(self):
+        self.sent: list[dict] = []
+        self._released = asyncio.Event()
+
+    async def send_text(self, text: str):
+        await self._released.wait()
+        self.sent.append(json.loads(text))
+
+    def release(self):
+        self._released.set()
+
+
+async def drain(connection: ClientConnection):
+    while connection.pending:
+        await asyncio.sleep(0.001)
+
+
+async def test_protocol_errors_are_bounded():
+    websocket = StalledWebSocket()
+    connection = ClientConnection(websocket, max_queue=4)
+    try:
+        # 写协程取出第一帧后卡在发送上
+        connection.enqueue(Frame({"type": "connected"}))
+        await asyncio.sleep(0)
+
+        connection.enqueue(Frame({"type": "failed", "task_id": 1}))
+        # 客户端不断发送错误帧：回复的协议错误不保证送达，队列不超过上限
+        for i in range(100):
+            connection.enqueue(Frame({"type": "error", "message": f"未知消息类型: {i}"}))
+        connection.enqueue(Frame({"type": "error", "task_id": 2, "message": "任务执行异常"}))
+        assert connection.pending == 1 + 4 + 1
+
+        websocket.release()
+        await drain(connection)
+    finally:
+        connection.close()
+
+    # 任务的终态消息全部送达，协议错误只保留最新的 4 条
+    assert [(message["type"], message.get("task_id")) for message in websocket.sent] == [
+        ("connected", None),
+        ("failed", 1),
+        *[("error", None)] * 4,
+        ("error", 2)
+    ]
+    assert websocket.sent[2]["message"] == "未知消息类型: 96"
+    assert connection.dropped == 96
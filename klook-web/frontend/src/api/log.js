@@ -13,6 +13,7 @@ export const logApi = {
      * @param {string} params.level - 日志级别（可选）
      * @param {number} params.limit - 每页数量（默认100）
      * @param {number} params.offset - 偏移量（默认0）
+     * @param {string} params.cursor - 游标（上一页返回的 next_cursor，传入时忽略 offset）
      */
     async getAll(params = {}) {
         const response = await axios.get(`${API_BASE}/logs`, {params})
@@ -35,6 +36,7 @@ export const logApi = {
      * @param {string} params.level - 日志级别（可选）
      * @param {number} params.limit - 每页数量（默认100）
      * @param {number} params.offset - 偏移量（默认0）
+     * @param {string} params.cursor - 游标（上一页返回的 next_cursor，传入时忽略 offset）
      */
     async getByTaskId(taskId, params = {}) {
         const response = await axios.get(`${API_BASE}/tasks/${taskId}/logs`, {params})
@@ -1,9 +1,15 @@
 /**
  * WebSocket 连接管理工具
+ *
+ * 每个浏览器标签页只建立一个到 /api/ws 的多路复用连接，
+ * 各任务通过 subscribe / unsubscribe 共享该连接。
  */
-export class TaskWebSocket {
-    constructor(taskId) {
-        this.taskId = taskId
+
+/**
+ * 多路复用 WebSocket 连接（页面内共享）
+ */
+class MultiplexedSocket {
+    constructor() {
         this.ws = null
         this.reconnectTimer = null
         this.reconnectAttempts = 0
@@ -12,24 +18,57 @@ export class TaskWebSocket {
         this.heartbeatTimer = null
         this.heartbeatInterval = 30000 // 30秒心跳
 
-        // 回调函数
-        this.onConnected = null
-        this.onCountdown = null
-        this.onExecuting = null
-        this.onRetry = null
-        this.onSuccess = null
-        this.onFailed = null
-        this.onCancelled = null
-        this.onError = null
-        this.onDisconnected = null
+        // 订阅者：{topic: Set<listener>}，topic 为任务 ID 或频道名（tasks / stats）
+        this.listeners = new Map()
+        // 服务端已确认订阅的主题
+        this.acknowledged = new Set()
+    }
+
+    /**
+     * 订阅任务或频道，返回取消订阅函数
+     *
+     * listener: {onMessage(message), onOpen(), onClose(event), onError(error)}
+     */
+    subscribe(topic, listener) {
+        if (!this.listeners.has(topic)) {
+            this.listeners.set(topic, new Set())
+            this.sendSubscription('subscribe', [topic])
+        } else if (this.acknowledged.has(topic)) {
+            // 主题已订阅，直接通知新订阅者
+            queueMicrotask(() => listener.onOpen && listener.onOpen())
+        }
+        this.listeners.get(topic).add(listener)
+        this.connect()
+
+        return () => this.unsubscribe(topic, listener)
+    }
+
+    /**
+     * 取消订阅，最后一个订阅者离开时关闭连接
+     */
+    unsubscribe(topic, listener) {
+        const listeners = this.listeners.get(topic)
+        if (!listeners) {
+            return
+        }
+
+        listeners.delete(listener)
+        if (listeners.size === 0) {
+            this.listeners.delete(topic)
+            this.acknowledged.delete(topic)
+            this.sendSubscription('unsubscribe', [topic])
+        }
+
+        if (this.listeners.size === 0) {
+            this.close()
+        }
     }
 
     /**
      * 连接 WebSocket
      */
     connect() {
-        if (this.ws && this.ws.readyState === WebSocket.OPEN) {
-            console.log('WebSocket 已连接')
+        if (this.ws && (this.ws.readyState === WebSocket.OPEN || this.ws.readyState === WebSocket.CONNECTING)) {
             return
         }
 
@@ -38,48 +77,248 @@ export class TaskWebSocket {
             ? import.meta.env.VITE_API_BASE_URL.replace(/^https?:\/\//, '')
             : 'localhost:8000'
 
-        const wsUrl = `${protocol}//${host}/api/ws/tasks/${this.taskId}`
+        const wsUrl = `${protocol}//${host}/api/ws`
 
         console.log('正在连接 WebSocket:', wsUrl)
-        this.ws = new WebSocket(wsUrl)
+        const ws = new WebSocket(wsUrl)
+        this.ws = ws
 
-        this.ws.onopen = () => {
+        ws.onopen = () => {
             console.log('WebSocket 连接成功')
             this.reconnectAttempts = 0
             this.startHeartbeat()
+
+            // 连接（或重连）后重新订阅全部主题
+            this.sendSubscription('subscribe', [...this.listeners.keys()])
         }
 
-        this.ws.onmessage = (event) => {
+        ws.onmessage = (event) => {
             try {
                 const message = JSON.parse(event.data)
-                this.handleMessage(message)
+                this.dispatch(message)
             } catch (error) {
                 console.error('解析 WebSocket 消息失败:', error)
             }
         }
 
-        this.ws.onerror = (error) => {
+        ws.onerror = (error) => {
             console.error('WebSocket 错误:', error)
-            if (this.onError) {
-                this.onError(error)
-            }
+            this.forEachListener((listener) => listener.onError && listener.onError(error))
         }
 
-        this.ws.onclose = (event) => {
+        ws.onclose = (event) => {
             console.log('WebSocket 连接关闭:', event.code, event.reason)
+            // 已被新连接替换（主动关闭后又重新订阅）
+            if (this.ws !== ws) {
+                return
+            }
             this.stopHeartbeat()
+            this.ws = null
+            this.acknowledged.clear()
 
-            if (this.onDisconnected) {
-                this.onDisconnected(event)
-            }
+            this.forEachListener((listener) => listener.onClose && listener.onClose(event))
 
-            // 尝试重连（除非是正常关闭）
-            if (event.code !== 1000 && this.reconnectAttempts < this.maxReconnectAttempts) {
+            // 仍有订阅者时尝试重连（除非是正常关闭）
+            if (event.code !== 1000 && this.listeners.size > 0 && this.reconnectAttempts < this.maxReconnectAttempts) {
                 this.scheduleReconnect()
             }
         }
     }
 
+    /**
+     * 按主题分发消息
+     */
+    dispatch(message) {
+        switch (message.type) {
+            case 'subscribed':
+                for (const topic of [...(message.task_ids || []), ...(message.channels || [])]) {
+                    this.acknowledged.add(topic)
+                    this.notify(topic, (listener) => listener.onOpen && listener.onOpen())
+                }
+                for (const taskId of message.missing || []) {
+                    console.warn(`任务 ${taskId} 不存在，订阅失败`)
+                }
+                return
+
+            case 'connected':
+            case 'unsubscribed':
+            case 'pong':
+                return
+
+            case 'stats':
+                this.notify('stats', (listener) => listener.onMessage(message))
+                return
+        }
+
+        if (message.task_id === undefined) {
+            console.warn('未知消息:', message)
+            return
+        }
+
+        this.notify(message.task_id, (listener) => listener.onMessage(message))
+        this.notify('tasks', (listener) => listener.onMessage(message))
+    }
+
+    notify(topic, callback) {
+        const listeners = this.listeners.get(topic)
+        if (listeners) {
+            listeners.forEach(callback)
+        }
+    }
+
+    forEachListener(callback) {
+        this.listeners.forEach((listeners) => listeners.forEach(callback))
+    }
+
+    /**
+     * 发送订阅 / 退订消息（未连接时在连接建立后统一订阅）
+     */
+    sendSubscription(type, topics) {
+        if (!this.isConnected() || topics.length === 0) {
+            return
+        }
+
+        this.send({
+            type,
+            task_ids: topics.filter((topic) => typeof topic === 'number'),
+            channels: topics.filter((topic) => typeof topic === 'string')
+        })
+    }
+
+    /**
+     * 发送消息
+     */
+    send(message) {
+        if (this.isConnected()) {
+            this.ws.send(JSON.stringify(message))
+        } else {
+            console.warn('WebSocket 未连接，无法发送消息')
+        }
+    }
+
+    /**
+     * 开始心跳
+     */
+    startHeartbeat() {
+        this.stopHeartbeat()
+        this.heartbeatTimer = setInterval(() => {
+            this.send({type: 'ping'})
+        }, this.heartbeatInterval)
+    }
+
+    /**
+     * 停止心跳
+     */
+    stopHeartbeat() {
+        if (this.heartbeatTimer) {
+            clearInterval(this.heartbeatTimer)
+            this.heartbeatTimer = null
+        }
+    }
+
+    /**
+     * 安排重连
+     */
+    scheduleReconnect() {
+        if (this.reconnectTimer) {
+            return
+        }
+
+        this.reconnectAttempts++
+        console.log(`${this.reconnectDelay / 1000}秒后尝试第 ${this.reconnectAttempts} 次重连...`)
+
+        this.reconnectTimer = setTimeout(() => {
+            this.reconnectTimer = null
+            this.connect()
+        }, this.reconnectDelay)
+    }
+
+    /**
+     * 关闭连接
+     */
+    close() {
+        this.stopHeartbeat()
+
+        if (this.reconnectTimer) {
+            clearTimeout(this.reconnectTimer)
+            this.reconnectTimer = null
+        }
+
+        if (this.ws) {
+            this.ws.close(1000, 'Client disconnect')
+            this.ws = null
+        }
+        this.acknowledged.clear()
+
+        // 重置重连计数
+        this.reconnectAttempts = 0
+    }
+
+    /**
+     * 检查连接状态
+     */
+    isConnected() {
+        return this.ws && this.ws.readyState === WebSocket.OPEN
+    }
+}
+
+// 页面内共享的多路复用连接
+export const taskChannel = new MultiplexedSocket()
+
+/**
+ * 单个任务的订阅（基于共享连接，接口与原先每任务一个连接时一致）
+ */
+export class TaskWebSocket {
+    constructor(taskId) {
+        this.taskId = taskId
+        this.unsubscribeFn = null
+        this.connected = false
+
+        // 回调函数
+        this.onConnected = null
+        this.onCountdown = null
+        this.onExecuting = null
+        this.onRetry = null
+        this.onSuccess = null
+        this.onFailed = null
+        this.onCancelled = null
+        this.onError = null
+        this.onDisconnected = null
+    }
+
+    /**
+     * 订阅任务
+     */
+    connect() {
+        if (this.unsubscribeFn) {
+            console.log('WebSocket 已连接')
+            return
+        }
+
+        this.unsubscribeFn = taskChannel.subscribe(this.taskId, {
+            onOpen: () => {
+                this.connected = true
+                this.handleMessage({
+                    type: 'connected',
+                    task_id: this.taskId,
+                    message: `已连接到任务 ${this.taskId}`
+                })
+            },
+            onMessage: (message) => this.handleMessage(message),
+            onError: (error) => {
+                if (this.onError) {
+                    this.onError(error)
+                }
+            },
+            onClose: (event) => {
+                this.connected = false
+                if (this.onDisconnected) {
+                    this.onDisconnected(event)
+                }
+            }
+        })
+    }
+
     /**
      * 处理接收到的消息
      */
@@ -94,11 +333,16 @@ export class TaskWebSocket {
                 break
 
             case 'task_started':
+            case 'rescheduled':
                 if (this.onConnected) {
                     this.onConnected(message)
                 }
                 break
 
+            case 'snapshot':
+                this.handleSnapshot(message)
+                break
+
             case 'countdown':
                 if (this.onCountdown) {
                     this.onCountdown(message)
@@ -135,10 +379,6 @@ export class TaskWebSocket {
                 }
                 break
 
-            case 'pong':
-                // 心跳响应，无需处理
-                break
-
             case 'error':
                 console.error('任务执行错误:', message.message)
                 if (this.onError) {
@@ -152,77 +392,45 @@ export class TaskWebSocket {
     }
 
     /**
-     * 发送消息
+     * 处理订阅时的回放快照：依次回放最近事件，倒计时中时再按快照给出剩余时间
      */
-    send(message) {
-        if (this.ws && this.ws.readyState === WebSocket.OPEN) {
-            this.ws.send(JSON.stringify(message))
-        } else {
-            console.warn('WebSocket 未连接，无法发送消息')
+    handleSnapshot(snapshot) {
+        for (const event of snapshot.events || []) {
+            this.handleMessage(event)
         }
-    }
-
-    /**
-     * 开始心跳
-     */
-    startHeartbeat() {
-        this.stopHeartbeat()
-        this.heartbeatTimer = setInterval(() => {
-            this.send({type: 'ping'})
-        }, this.heartbeatInterval)
-    }
 
-    /**
-     * 停止心跳
-     */
-    stopHeartbeat() {
-        if (this.heartbeatTimer) {
-            clearInterval(this.heartbeatTimer)
-            this.heartbeatTimer = null
+        if (snapshot.status === 'countdown' && snapshot.remaining !== null && this.onCountdown) {
+            this.onCountdown({
+                type: 'countdown',
+                task_id: snapshot.task_id,
+                remaining: snapshot.remaining,
+                message: `剩余 ${snapshot.remaining.toFixed(3)} 秒`
+            })
         }
     }
 
     /**
-     * 安排重连
+     * 发送消息
      */
-    scheduleReconnect() {
-        if (this.reconnectTimer) {
-            return
-        }
-
-        this.reconnectAttempts++
-        console.log(`${this.reconnectDelay / 1000}秒后尝试第 ${this.reconnectAttempts} 次重连...`)
-
-        this.reconnectTimer = setTimeout(() => {
-            this.reconnectTimer = null
-            this.connect()
-        }, this.reconnectDelay)
+    send(message) {
+        taskChannel.send(message)
     }
 
     /**
-     * 断开连接
+     * 取消订阅
      */
     disconnect() {
-        this.stopHeartbeat()
-
-        if (this.reconnectTimer) {
-            clearTimeout(this.reconnectTimer)
-            this.reconnectTimer = null
-        }
-
-        if (this.ws) {
-            this.ws.close(1000, 'Client disconnect')
-            this.ws = null
+        if (this.unsubscribeFn) {
+            this.unsubscribeFn()
+            this.unsubscribeFn = null
         }
-
-        // 重置重连计数
-        this.reconnectAttempts = 0
+        this.connected = false
     }
 
     /**
      * 检查连接状态
      */
     isConnected() {
-        return this.ws && this.ws.readyState === WebSocket.OPEN
+        return this.connected && taskChannel.isConnected()
     }
-}
\ No newline at end of file
+}